@@ -0,0 +1,51 @@
+"""
+Local HTTP API of the cutting conditions calculator.
+Serves the calculation core (single checks, batch checks, machine capacity)
+and its latency metrics on localhost, for scripts and other workshop tools.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+from config import API_CONFIG, CONDITIONS_FILE, MACHINE_CAPACITIES_FILE, DEFAULT_MAX_POWER, DEFAULT_MAX_TORQUE
+from http_api import ApiServer
+
+async def serve(args: argparse.Namespace):
+    """Start the server and answer requests until interrupted."""
+    server = ApiServer(args.conditions, args.machine, args.max_power, args.max_torque,
+                       host=args.host, port=args.port, workers=args.workers)
+    await server.start()
+    print(f"[INFO] API à l'écoute sur http://{server.host}:{server.port} "
+          f"({args.workers} processus pour les gros lots)")
+    print("[INFO] GET /health, GET /capacity?n=, POST /check, POST /batch, GET /metrics")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="API HTTP locale du calcul des conditions de coupe.")
+    parser.add_argument("--host", default=API_CONFIG["host"], help="Adresse d'écoute (défaut : localhost)")
+    parser.add_argument("--port", type=int, default=API_CONFIG["port"], help="Port d'écoute")
+    parser.add_argument("--workers", type=int, default=API_CONFIG["workers"],
+                        help="Processus vérifiant les gros lots (0 : dans le serveur)")
+    parser.add_argument("--conditions", default=CONDITIONS_FILE, help="Conditions de coupe (JSON ou catalogue JSONL)")
+    parser.add_argument("--machine", default=MACHINE_CAPACITIES_FILE, help="Courbe de capacité machine (JSON ou .mcap)")
+    parser.add_argument("--max-power", type=float, default=DEFAULT_MAX_POWER, help="Puissance hors courbe (kW)")
+    parser.add_argument("--max-torque", type=float, default=DEFAULT_MAX_TORQUE, help="Couple hors courbe (Nm)")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except (FileNotFoundError, ValueError) as e:
+        print(f"[ERROR] {e}")
+        sys.exit(2)
+    except KeyboardInterrupt:
+        print("[INFO] Arrêt de l'API")
+
+if __name__ == "__main__":
+    main()
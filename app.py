@@ -1,11 +1,33 @@
 # -- coding: utf-8 --
 import streamlit as st
-import json, os, sys, math
-import pandas as pd
-import plotly.graph_objects as go
+import os, sys, time, statistics, tempfile
+import importlib.util
+from collections import deque
+import numpy as np
 from datetime import datetime
 from streamlit.runtime.scriptrunner import get_script_run_ctx
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+from calculations.optimizer import optimize_mrr
+from calculations.feasibility import feasibility_grid
+from calculations.machine_registry import MachineRegistry
+from calculations.curve_simplify import downsample_curve
+from calculations.batch import BORING, DRILLING, GROOVING
+from calculations.operations import OperationGraph
+from calculations.result_cache import RESULT_CACHE, cached_compute_operation
+from calculations.uncertainty import Distribution, DISTRIBUTION_KINDS, cached_simulate
+from data.data_loader import DataLoader
+from data.history_archive import archive_format, export_history, import_history
+from data.history_store import HistoryStore
+from data.hot_reload import HotReloader
+from config import (CATALOG_CONFIG, CONDITIONS_FILE, DATA_WATCH_CONFIG, HISTORY_DB_FILE, HISTORY_CONFIG,
+                    MACHINE_CAPACITIES_FILE, MACHINES_DIR, MACHINE_REGISTRY_CONFIG, PLOT_CONFIG, TRACE_CONFIG,
+                    UNCERTAINTY_CONFIG, DEFAULT_MAX_POWER, DEFAULT_MAX_TORQUE)
+from tracing import Tracer, discard, span, stage
+from ui.components import UIComponents, fragment
+
+_rerun_start = time.perf_counter()
+
 # =============================================================================
 # 1) Configuration générale
 # =============================================================================
@@ -21,48 +43,99 @@ if get_script_run_ctx() is None:
     st.error("⚠ Lancez l'app avec streamlit run app.py")
     sys.exit(1)
 
+# Chronologie du rerun (mode débogage de la barre latérale, ou CUTTING_TRACE=1 pour toutes les sessions) :
+# hors trace, les span() des modules ne coûtent qu'une lecture de variable de contexte
+@st.cache_resource(show_spinner=False)
+def tracer():
+    """Traces JSON lines (à côté de app.log), partagées par toutes les sessions."""
+    return Tracer(os.environ.get("CUTTING_TRACE_FILE", TRACE_CONFIG["file"]), max_bytes=TRACE_CONFIG["max_bytes"])
+
+tracing_on = (TRACE_CONFIG["enabled"] or os.environ.get("CUTTING_TRACE") == "1"
+              or st.session_state.get("debug_trace", False))
+if tracing_on:
+    tracer().start("rerun", session=get_script_run_ctx().session_id)
+else:
+    discard()
+stage("app.data")
+
 # =============================================================================
 # 2) Chargement des données
 # =============================================================================
-@st.cache_data
-def load_conditions(path="conditions_coupe_sandvik.json"):
-    if not os.path.exists(path):
-        st.error(f"Fichier introuvable : {path}")
-        st.stop()
-    return json.load(open(path, encoding="utf-8"))
-
-@st.cache_data
-def load_machine_caps(path="machine_capacities.json"):
-    if not os.path.exists(path):
-        st.error(f"Fichier introuvable : {path}")
-        st.stop()
-    return json.load(open(path, encoding="utf-8"))
-
-def get_local_capacity(n, caps, max_power, max_torque):
+def load_data():
+    """
+    Catalogue des plaquettes et courbe machine d'une même version des fichiers.
+    Exécuté au démarrage puis par le thread de surveillance, hors des reruns :
+    validation (une fois par contenu), index du catalogue, courbe triée ou .mcap.
     """
-    Retourne (power, torque) pour un régime n donné par interpolation
-    linéaire entre les deux points machine_caps encadrant n.
+    catalog = DataLoader.load_catalog(CONDITIONS_FILE, cache_size=CATALOG_CONFIG["cache_size"])
+    DataLoader.validate_file(catalog.path, "conditions")
+    with span("data.catalog_index"):
+        len(catalog)  # construit les index
+    if os.path.exists(MACHINE_CAPACITIES_FILE):
+        DataLoader.validate_file(MACHINE_CAPACITIES_FILE, "curve")
+    return catalog, DataLoader.load_machine_curve(MACHINE_CAPACITIES_FILE)
+
+def data_sources():
+    """Fichiers surveillés : sources JSON et leurs versions .jsonl / .mcap."""
+    return (CONDITIONS_FILE, os.path.splitext(CONDITIONS_FILE)[0] + ".jsonl",
+            MACHINE_CAPACITIES_FILE, os.path.splitext(MACHINE_CAPACITIES_FILE)[0] + ".mcap")
+
+@st.cache_resource
+def data_watcher():
+    """Données partagées par toutes les sessions, rechargées en arrière-plan quand les fichiers changent."""
+    return HotReloader(load_data, data_sources, interval=DATA_WATCH_CONFIG["interval"]).start()
+
+try:
+    data_reloader = data_watcher()
+except FileNotFoundError as e:
+    st.error(f"Fichier introuvable : {e}")
+    st.stop()
+except ValueError as e:
+    st.error(f"Données invalides : {e}")
+    st.stop()
+
+# Une seule version des données pour tout le rerun, même si un rechargement a lieu pendant
+data_snapshot = data_reloader.current()
+conds, machine_curve = data_snapshot.data
+
+@st.cache_resource(max_entries=32)
+def feasibility_map(plaquette_key, D, y_name, fixed_value, hexv, kr, max_power, max_torque,
+                    curve_version, data_version):
     """
-    ns = [rec["n"] for rec in caps]
-    # fallback global
-    if n <= ns[0] or n >= ns[-1]:
-        return max_power, max_torque
-    for i in range(len(ns)-1):
-        n1, n2 = ns[i], ns[i+1]
-        if n1 <= n <= n2:
-            p1, p2 = caps[i]["power"], caps[i+1]["power"]
-            t1, t2 = caps[i]["torque"], caps[i+1]["torque"]
-            α = (n - n1) / (n2 - n1)
-            power = p1 + α * (p2 - p1)
-            torque= t1 + α * (t2 - t1)
-            return power, torque
-    return max_power, max_torque
-
-conds        = load_conditions()
-machine_caps = load_machine_caps()
-
-if "history" not in st.session_state:
-    st.session_state.history = []
+    Grille d'utilisation 400×400 mise en cache par (plaquette, D, version des données) :
+    déplacer le point de fonctionnement ne recalcule pas le champ.
+    """
+    fixed = {"ap": fixed_value} if y_name == "fn" else {"fn": fixed_value}
+    return feasibility_grid(conds[plaquette_key], D, machine_curve, max_power, max_torque,
+                            y_name=y_name, hexv=hexv, kr=kr, resolution=400, **fixed)
+
+def machine_files():
+    """Fichiers du parc machines (un ajout, une suppression ou une modification recharge le registre)."""
+    if not os.path.isdir(MACHINES_DIR):
+        return (MACHINES_DIR,)
+    return (MACHINES_DIR,) + tuple(os.path.join(MACHINES_DIR, name) for name in sorted(os.listdir(MACHINES_DIR)))
+
+@st.cache_resource
+def machine_registry():
+    """Parc machines (dossier machines/), courbes chargées à la première utilisation, rechargé en arrière-plan."""
+    return HotReloader(
+        lambda: MachineRegistry.from_directory(MACHINES_DIR, DEFAULT_MAX_POWER, DEFAULT_MAX_TORQUE,
+                                               table_size=MACHINE_REGISTRY_CONFIG["table_size"]),
+        machine_files, interval=DATA_WATCH_CONFIG["interval"]
+    ).start()
+
+@st.cache_resource
+def history_store():
+    """Historique SQLite partagé par toutes les sessions (écritures groupées)."""
+    return HistoryStore(HISTORY_DB_FILE, batch_size=HISTORY_CONFIG["batch_size"],
+                        flush_interval=HISTORY_CONFIG["flush_interval"])
+
+history = history_store()
+session_id = get_script_run_ctx().session_id
+
+# Dernier point enregistré automatiquement par cette session (seul état conservé en mémoire)
+if "last_logged" not in st.session_state:
+    st.session_state.last_logged = None
 
 # Variables d'état pour gérer le calcul et l'enregistrement
 if "calculation_done" not in st.session_state:
@@ -70,41 +143,60 @@ if "calculation_done" not in st.session_state:
 if "last_result" not in st.session_state:
     st.session_state.last_result = None
 
+# Durées des derniers reruns complets (ms), affichées dans la barre latérale
+if "rerun_ms" not in st.session_state:
+    st.session_state.rerun_ms = deque(maxlen=50)
+
 # =============================================================================
 # 3) Fonctions de calcul
 # =============================================================================
-def rotation_speed(Vc, D): 
-    return (1000 * Vc) / (math.pi * D)
-
-def hex_co(fn, kr): 
-    return fn * math.sin(math.radians(kr))
-
-def length_la(ap, kr):
-    return ap / math.sin(math.radians(kr)) if kr and kr != 0 else float("inf")
-
-def coefficient_kc(kc1, fn, kr, m0, Y0):
-    hex = hex_co(fn, kr)
-    if hex == 0:
-        raise ValueError("Invalid input parameters: hex coordinate cannot be zero")
-    return kc1 * (1/hex**m0) * (1 - Y0/100)
-
-def power_pc(F, Vc): 
-    return F * Vc / 60000
-
-def torque_mc(Pc, n): 
-    return (30000 * Pc) / (n * math.pi)
-
-def effort_axial_percage(kc1, fn, D): 
-    return kc1 * fn * D
+# Les formules et les règles propres à chaque opération (perçage, alésage,
+# gorge, tournage) sont dans src/calculations. Le point de fonctionnement est
+# calculé une seule fois par rerun (section 7) et toutes les sections suivantes
+# (métriques, diagnostic, jauges, historique) lisent le même résultat.
+
+def history_record(r, saved=False):
+    """Ligne d'historique (pleine précision) d'un OperationResult."""
+    return {
+        "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "session": session_id,
+        "insert_name": r.tool,
+        "operation": r.operation,
+        "machine": machine_curve.machine_id,
+        "curve_version": machine_curve.content_hash,
+        "D": r.D,
+        "Vc": r.Vc,
+        "fn": r.fn,
+        **({"ap": r.ap, "hex": r.hexv, "La": r.La} if r.La is not None and r.ap > 0 else {}),
+        "Pc": r.Pc,
+        "Mc": r.Mc,
+        **({"Fa": r.Fa} if r.Fa is not None else {}),
+        "saved": int(saved)
+    }
 
 # =============================================================================
 # 4) Barre latérale
 # =============================================================================
+stage("app.sidebar")
 st.sidebar.header("⚙ Paramètres machine global")
 max_power  = st.sidebar.number_input("Puissance max (kW)", value=10.5, step=0.1)
 max_torque = st.sidebar.number_input("Couple max (Nm)" , value=95.0, step=1.0)
 
-plaquette_key = st.sidebar.selectbox("Choisir une plaquette", list(conds.keys()))
+with st.sidebar.expander("Filtrer le catalogue"):
+    op_filter  = st.selectbox("Opération", ["Toutes"] + conds.operations())
+    mat_filter = st.selectbox("Matériau", ["Tous"] + conds.materials())
+    vc_filter  = st.number_input("Accepte Vc (m/min)", min_value=0.0, value=None, step=10.0)
+matching = conds.query(operation=None if op_filter == "Toutes" else op_filter,
+                       material=None if mat_filter == "Tous" else mat_filter,
+                       Vc=vc_filter)
+if not matching:
+    st.sidebar.warning("Aucune plaquette ne correspond aux filtres.")
+    st.stop()
+if len(matching) > CATALOG_CONFIG["max_options"]:
+    st.sidebar.caption(f"{len(matching)} plaquettes : seules les {CATALOG_CONFIG['max_options']} "
+                       "premières sont listées, affinez les filtres.")
+    matching = matching[:CATALOG_CONFIG["max_options"]]
+plaquette_key = st.sidebar.selectbox("Choisir une plaquette", matching)
 
 img_name = plaquette_key.replace(" ", "_") + ".png"
 img_path = os.path.join("images", img_name)
@@ -119,190 +211,187 @@ p = conds[plaquette_key]
 def color_span(txt, col):
     return f"<span style='color:{col}; font-weight:bold'>{txt}</span>"
 
-st.subheader(f"Recommandations — {plaquette_key}")
-md = [
-    f"- *Opération* : {p['operation']}",
-    f"- *Matériau*  : {p['material']}",
-    "- *Avance fn* : "
-      f"{color_span(str(p['avance_f_mmtr']), '#4CAF50')} "
-      f"(recommandé : {color_span(p['avance_f_rec'], '#2196F3')})",
-    "- *Vc* : "
-      f"{color_span(str(p['vitesse_coupe_Vc_mmin']), '#4CAF50')} "
-      f"(recommandé : {color_span(p['vitesse_coupe_rec'], '#2196F3')})"
-]
-if plaquette_key == "N123G2-0300-0001-CF 1125":
-    md.append(
-      "- *Largeur plaquette* : "
-      f"{color_span(f"{p['insert_length_mm']} mm", '#FF9800')} "
-      f"(utilisée comme ap pour les calculs)"
-    )
-elif "profondeur_passe_ap_mm" in p:
-    md.append(
-      "- *ap* : "
-      f"{color_span(str(p['profondeur_passe_ap_mm']), '#4CAF50')} "
-      f"(recommandé : {color_span(p['profondeur_passe_rec'], '#2196F3')})"
-    )
-if "hex_mm" in p:
+@st.cache_data
+def recommendations_markdown(plaquette_key, p):
+    """Bloc de recommandations d'une plaquette : statique, construit une fois par plaquette."""
+    md = [
+        f"- *Opération* : {p['operation']}",
+        f"- *Matériau*  : {p['material']}",
+        "- *Avance fn* : "
+          f"{color_span(str(p['avance_f_mmtr']), '#4CAF50')} "
+          f"(recommandé : {color_span(p['avance_f_rec'], '#2196F3')})",
+        "- *Vc* : "
+          f"{color_span(str(p['vitesse_coupe_Vc_mmin']), '#4CAF50')} "
+          f"(recommandé : {color_span(p['vitesse_coupe_rec'], '#2196F3')})"
+    ]
+    if plaquette_key == "N123G2-0300-0001-CF 1125":
+        md.append(
+          "- *Largeur plaquette* : "
+          f"{color_span(str(p['insert_length_mm']) + ' mm', '#FF9800')} "
+          f"(utilisée comme ap pour les calculs)"
+        )
+    elif "profondeur_passe_ap_mm" in p:
+        md.append(
+          "- *ap* : "
+          f"{color_span(str(p['profondeur_passe_ap_mm']), '#4CAF50')} "
+          f"(recommandé : {color_span(p['profondeur_passe_rec'], '#2196F3')})"
+        )
+    if "hex_mm" in p:
+        md.append(
+          "- *hex* : "
+          f"{color_span(str(p['hex_mm']), '#4CAF50')} "
+          f"(recommandé : {color_span(p['hex_rec'], '#2196F3')})"
+        )
     md.append(
-      "- *hex* : "
-      f"{color_span(str(p['hex_mm']), '#4CAF50')} "
-      f"(recommandé : {color_span(p['hex_rec'], '#2196F3')})"
+        "- *Y₀* : "
+        f"{color_span(str(p['Y0'])+' %', '#9E9E9E')}"
     )
-md.append(
-    "- *Y₀* : "
-    f"{color_span(str(p['Y0'])+' %', '#9E9E9E')}"
-)
-st.markdown("\n".join(md), unsafe_allow_html=True)
+    return "\n".join(md)
+
+stage("app.recommendations")
+st.subheader(f"Recommandations — {plaquette_key}")
+st.markdown(recommendations_markdown(plaquette_key, p), unsafe_allow_html=True)
 
 # =============================================================================
 # 6) Saisie des entrées utilisateur
 # =============================================================================
-col1, col2, col3 = st.columns(3)
-with col1:
-    D  = st.number_input("Diamètre D (mm)", min_value=0.1, value=50.0, step=0.1)
-    fn = st.number_input("Avance fn (mm/tr)",
-                         min_value=p['avance_f_mmtr'][0],
-                         max_value=p['avance_f_mmtr'][1],
-                         value=p['avance_f_rec'])
-    operation = p['operation'].lower()
-
-with col2:
-    Vc = st.number_input("Vc (m/min)",
-                         min_value=p['vitesse_coupe_Vc_mmin'][0],
-                         max_value=p['vitesse_coupe_Vc_mmin'][1],
-                         value=p['vitesse_coupe_rec'])
-    if plaquette_key == "N123G2-0300-0001-CF 1125":
-        st.info("ℹ Pour cette plaquette de gorge, la largeur de la plaquette (3.0 mm) est utilisée comme ap pour les calculs.")
-        ap = p.get('insert_length_mm', 0.0)
-    elif "profondeur_passe_ap_mm" in p:
-        ap = st.number_input("ap (mm)",
-                             min_value=p['profondeur_passe_ap_mm'][0],
-                             max_value=p['profondeur_passe_ap_mm'][1],
-                             value=p['profondeur_passe_rec'])
-    else:
-        ap = 0.0
-
-with col3:
-    if "hex_mm" in p:
-        hexv = st.number_input("hex (mm)",
-                               min_value=p['hex_mm'][0],
-                               max_value=p['hex_mm'][1],
-                               value=p['hex_rec'])
-    else:
-        hexv = 0.0
-    kr = st.number_input("Angle KAPR (°)", min_value=0.0, max_value=180.0, value=95.0)
-    m0 = st.number_input("m₀ (épaisseur copeau)", value=0.25, disabled=True)
-    Y0 = p['Y0']
+stage("app.inputs")
+# Mode formulaire : les modifications sont envoyées ensemble, en un seul rerun
+form_mode = st.sidebar.checkbox("Mode formulaire (valider les entrées en une fois)")
+with (st.form("entrees") if form_mode else st.container()):
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        D  = st.number_input("Diamètre D (mm)", min_value=0.1, value=50.0, step=0.1)
+        fn = st.number_input("Avance fn (mm/tr)",
+                             min_value=p['avance_f_mmtr'][0],
+                             max_value=p['avance_f_mmtr'][1],
+                             value=p['avance_f_rec'])
+        operation = p['operation'].lower()
+
+    with col2:
+        Vc = st.number_input("Vc (m/min)",
+                             min_value=p['vitesse_coupe_Vc_mmin'][0],
+                             max_value=p['vitesse_coupe_Vc_mmin'][1],
+                             value=p['vitesse_coupe_rec'])
+        if plaquette_key == "N123G2-0300-0001-CF 1125":
+            st.info("ℹ Pour cette plaquette de gorge, la largeur de la plaquette (3.0 mm) est utilisée comme ap pour les calculs.")
+            ap = p.get('insert_length_mm', 0.0)
+        elif "profondeur_passe_ap_mm" in p:
+            ap = st.number_input("ap (mm)",
+                                 min_value=p['profondeur_passe_ap_mm'][0],
+                                 max_value=p['profondeur_passe_ap_mm'][1],
+                                 value=p['profondeur_passe_rec'])
+        else:
+            ap = 0.0
+
+    with col3:
+        if "hex_mm" in p:
+            hexv = st.number_input("hex (mm)",
+                                   min_value=p['hex_mm'][0],
+                                   max_value=p['hex_mm'][1],
+                                   value=p['hex_rec'])
+        else:
+            hexv = 0.0
+        kr = st.number_input("Angle KAPR (°)", min_value=0.0, max_value=180.0, value=95.0)
+        m0 = st.number_input("m₀ (épaisseur copeau)", value=0.25, disabled=True)
+        Y0 = p['Y0']
+    if form_mode:
+        st.form_submit_button("Appliquer")
 
 # =============================================================================
 # 7) Calculs
 # =============================================================================
-n = rotation_speed(Vc, D)
-local_max_power, local_max_torque = get_local_capacity(n, machine_caps, max_power, max_torque)
-
-if "perçage" in operation:
-    kc1 = 400
-    Y0 = 20
-    m0 = 0.25  # Peut être rendu paramétrable si besoin
-    kr = 90    # Peut être rendu paramétrable si besoin
-    hexv = fn * math.sin(math.radians(kr))
-    kc = kc1 * ((2 / hexv)**m0) * (1 - Y0/100)
-    Fa = kc * fn * D
-    Pc = (Fa * Vc) / 240000  # Spécifique au perçage
-    Mc = torque_mc(Pc, n)
-    hexv_chart = hexv
-    La = None
-elif "alésage" in operation:
-    kc1 = 400
-    Y0 = p.get('Y0', 6)
-    m0 = 0.25  # Peut être rendu paramétrable si besoin
-    # Utiliser les variables déjà saisies dans la section 6
-    kc = kc1 * (1 / hexv**m0) * (1 - Y0/100)
-    Fc = kc * ap * fn
-    n = rotation_speed(Vc, D)
-    Pc = power_pc(Fc, Vc)
-    Mc = torque_mc(Pc, n)
-    La = length_la(ap, 90)  # kr=90° par défaut pour l'alésage
-    Fa = None
-else:
-    hexv = hex_co(fn, kr)
-    if plaquette_key == "N123G2-0300-0001-CF 1125":
-        ap = p.get('insert_length_mm', 0.0)
-        st.info("ℹ Pour cette plaquette de gorge, la largeur de la plaquette (3.0 mm) est utilisée comme ap pour les calculs.")
-        Y0 = 20
-    La   = length_la(ap, kr) if ap>0 else 0.0
-    kc   = coefficient_kc(400, fn, kr, m0, Y0)
-    Fc   = kc * ap * fn
-    Pc   = power_pc(Fc, Vc)
-    Mc   = torque_mc(Pc, n)
+stage("app.calculation")
+# Cache partagé par toutes les sessions du serveur ; un point absent est calculé par le graphe
+# de la session, où seuls les nœuds dont une entrée a changé sont recalculés
+# (une nouvelle valeur de ap ne recalcule ni n, ni la capacité interpolée, ni kc)
+if "operation_graph" not in st.session_state:
+    st.session_state.operation_graph = OperationGraph()
+graph = st.session_state.operation_graph
+result = cached_compute_operation(
+    plaquette_key, p, D, Vc, fn, ap,
+    hexv if "hex_mm" in p else None, kr,
+    machine_curve, max_power, max_torque, m0=m0, graph=graph
+)
 
+# =============================================================================
+# 7 bis) Mode optimisation (débit copeaux maximal)
+# =============================================================================
+stage("app.optimization")
+if st.sidebar.checkbox("Mode optimisation (débit copeaux max)"):
+    opt = optimize_mrr(p, D, machine_curve, max_power, max_torque, hexv=hexv, kr=kr)
+    st.subheader("Optimisation — débit copeaux maximal")
+    if not opt.feasible:
+        st.warning("⚠ Aucun point de la plage admissible ne respecte les capacités machine : "
+                   "le point le moins chargé est affiché.")
+    oc = st.columns(6)
+    oc[0].metric("Vc (m/min)", f"{opt.Vc:.0f}", delta=f"{opt.Vc - Vc:+.0f}")
+    oc[1].metric("fn (mm/tr)", f"{opt.fn:.3f}", delta=f"{opt.fn - fn:+.3f}")
+    oc[2].metric("ap (mm)", f"{opt.ap:.2f}")
+    oc[3].metric("Q (cm³/min)", f"{opt.mrr:.1f}")
+    oc[4].metric("Pc (kW)", f"{opt.Pc:.2f}", delta=f"{opt.local_power:.2f}", delta_color="inverse")
+    oc[5].metric("Mc (Nm)", f"{opt.Mc:.2f}", delta=f"{opt.local_torque:.2f}", delta_color="inverse")
 
 # =============================================================================
-# 8) Calculs (bouton "Calculer")
+# 7 ter) Mode incertitude (Monte Carlo sur kc1, m0, Y0, D et Vc)
 # =============================================================================
-if st.sidebar.button("Calculer"):
-    # 1) Calculs de base
-    n = rotation_speed(Vc, D)
-    local_max_power, local_max_torque = get_local_capacity(n, machine_caps, max_power, max_torque)
-    is_perc = "perçage" in operation
-
-    if is_perc:
-        kc1 = 400
-        Y0 = 20
-        m0 = 0.25
-        kr = 90
-        hexv_chart = fn * math.sin(math.radians(kr))
-        kc = kc1 * ((2 / hexv_chart)**m0) * (1 - Y0/100)
-        Fa = kc * fn * D
-        Pc = (Fa * Vc) / 240000  # Spécifique au perçage
-        Mc = torque_mc(Pc, n)
-        La = None
-    elif "alésage" in operation:
-        kc1 = 400
-        Y0 = p.get('Y0', 6)
-        m0 = 0.25
-        if 'hex_mm' in p:
-            hexv_chart = st.session_state.get('hexv', p['hex_rec'])
-        else:
-            hexv_chart = p.get('hex_rec', 0.25)
-        kc = kc1 * (1 / hexv_chart**m0) * (1 - Y0/100)
-        ap = st.session_state.get('ap', p['profondeur_passe_rec'])
-        fn = st.session_state.get('fn', p['avance_f_rec'])
-        Fc = kc * ap * fn
-        Vc = st.session_state.get('Vc', p['vitesse_coupe_rec'])
-        D = st.session_state.get('D', 50.0)
-        n = rotation_speed(Vc, D)
-        Pc = power_pc(Fc, Vc)
-        Mc = torque_mc(Pc, n)
-        La = length_la(ap, 90)
-        Fa = None
-    else:
-        if plaquette_key == "N123G2-0300-0001-CF 1125":
-            Y0 = 20
-        kc = coefficient_kc(400, fn, kr, m0, Y0)
-        hexv_chart = hex_co(fn, kr)
-        if plaquette_key == "N123G2-0300-0001-CF 1125":
-            ap = p.get('insert_length_mm', 0.0)
-        La = length_la(ap, kr) if ap>0 else None
-        Fc = kc * ap * fn
-        Pc = power_pc(Fc, Vc); Mc = torque_mc(Pc, n)
-        Fa = None
+stage("app.uncertainty")
+UNCERTAINTY_LABELS = {"kc1": ("kc1", "N/mm²"), "m0": ("m₀", ""), "Y0": ("Y₀", "%"),
+                      "D": ("D", "mm"), "Vc": ("Vc", "m/min")}
+if st.sidebar.checkbox("Mode incertitude (Monte Carlo)"):
+    distributions = {}
+    with st.sidebar.expander("Dispersion des paramètres"):
+        st.caption("Écart-type (loi normale) ou demi-largeur (uniforme, triangulaire) autour de la valeur nominale.")
+        for name, (kind, spread, relative) in UNCERTAINTY_CONFIG["distributions"].items():
+            label, unit = UNCERTAINTY_LABELS[name]
+            dc1, dc2 = st.columns(2)
+            kind = dc1.selectbox(label, DISTRIBUTION_KINDS, index=DISTRIBUTION_KINDS.index(kind),
+                                 key=f"mc_kind_{name}")
+            if relative:
+                spread = dc2.number_input(f"± (% de {label})", min_value=0.0, value=100 * spread, step=1.0,
+                                          key=f"mc_spread_{name}") / 100
+            else:
+                spread = dc2.number_input(f"± ({unit})" if unit else "±", min_value=0.0, value=float(spread),
+                                          step=float(spread) / 10 or 0.01, format="%g", key=f"mc_spread_{name}")
+            distributions[name] = Distribution(kind, spread, relative)
+    # Tirages à graine fixe : résultat mis en cache par point de fonctionnement et dispersions
+    mc = cached_simulate(
+        plaquette_key, p, D, Vc, fn, ap,
+        hexv if "hex_mm" in p else None, kr,
+        machine_curve, max_power, max_torque, m0=m0, distributions=distributions
+    )
+    st.subheader(f"Incertitude — {mc.samples:,} tirages".replace(",", " "))
+    uc = st.columns(5)
+    uc[0].metric("P(surcharge)", f"{100 * mc.p_overload:.1f} %", help=f"± {100 * mc.overload_error:.2f} % (erreur type)")
+    uc[1].metric("P(Pc > capacité)", f"{100 * mc.p_power:.1f} %")
+    uc[2].metric("P(Mc > capacité)", f"{100 * mc.p_torque:.1f} %")
+    uc[3].metric("Pc P5–P95 (kW)", f"{mc.Pc_quantiles[0]:.2f} – {mc.Pc_quantiles[-1]:.2f}",
+                 help=f"Médiane {mc.Pc_quantiles[1]:.2f} kW, écart-type {mc.Pc_std:.2f} kW")
+    uc[4].metric("Mc P5–P95 (Nm)", f"{mc.Mc_quantiles[0]:.2f} – {mc.Mc_quantiles[-1]:.2f}",
+                 help=f"Médiane {mc.Mc_quantiles[1]:.2f} Nm, écart-type {mc.Mc_std:.2f} Nm")
+    UIComponents.plot_uncertainty(mc, result.local_power, result.local_torque)
 
-    # 2) Préparer la liste des métriques à afficher
+# =============================================================================
+# 8) Calculs (bouton "Calculer")
+# =============================================================================
+@fragment
+def calculation_details(r, graph):
+    """Métriques, contrôles et diagnostic détaillé d'un OperationResult et du graphe qui l'a calculé."""
+    # 1) Préparer la liste des métriques à afficher
     metrics = [
-        ("n (tr/min)", f"{n:.1f}"),
-        ("Kc (N/mm²)" , f"{kc:.1f}")
+        ("n (tr/min)", f"{r.n:.1f}"),
+        ("Kc (N/mm²)" , f"{r.kc:.1f}")
     ]
-    if is_perc:
-        metrics.append(("Fa (N)", f"{Fa:.1f}"))
+    if r.Fa is not None:
+        metrics.append(("Fa (N)", f"{r.Fa:.1f}"))
     else:
-        metrics.append(("hex (mm)", f"{hexv_chart:.3f}"))
-        metrics.append(("La (mm)", f"{La:.2f}" if La is not None else "—", f"{0.7*D:.2f}"))
+        metrics.append(("hex (mm)", f"{r.hexv:.3f}"))
+        metrics.append(("La (mm)", f"{r.La:.2f}" if r.La is not None else "—", f"{r.max_engagement:.2f}"))
 
-    metrics.append(("Pc (kW)", f"{Pc:.2f}", f"{local_max_power:.2f}", "inverse"))
-    metrics.append(("Mc (Nm)", f"{Mc:.2f}", f"{local_max_torque:.2f}", "inverse"))
+    metrics.append(("Pc (kW)", f"{r.Pc:.2f}", f"{r.local_power:.2f}", "inverse"))
+    metrics.append(("Mc (Nm)", f"{r.Mc:.2f}", f"{r.local_torque:.2f}", "inverse"))
 
-    # 3) Afficher dynamiquement
+    # 2) Afficher dynamiquement
     cols = st.columns(len(metrics))
     for col, m in zip(cols, metrics):
         if len(m) == 2:
@@ -315,12 +404,11 @@ if st.sidebar.button("Calculer"):
             label, val, ref, delta_color = m
             col.metric(label, val, delta=ref, delta_color=delta_color)
 
-    # 4) Diagnostic résumé
+    # 3) Diagnostic résumé
     errs = []
-    if Pc > local_max_power:    errs.append(f"⚠ Pc={Pc:.2f} kW > {local_max_power:.2f} kW (interpolée)")
-    if Mc > local_max_torque:   errs.append(f"⚠ Mc={Mc:.2f} Nm > {local_max_torque:.2f} Nm (interpolé)")
-    if La is not None and La > 0.7*D:
-        errs.append(f"⚠ La={La:.2f} mm > 0.7·D={0.7*D:.2f} mm")
+    if not r.power_ok:      errs.append(f"⚠ Pc={r.Pc:.2f} kW > {r.local_power:.2f} kW (interpolée)")
+    if not r.torque_ok:     errs.append(f"⚠ Mc={r.Mc:.2f} Nm > {r.local_torque:.2f} Nm (interpolé)")
+    if not r.engagement_ok: errs.append(f"⚠ La={r.La:.2f} mm > 0.7·D={r.max_engagement:.2f} mm")
 
     if not errs:
         st.success("✅ Tous les paramètres sont dans les limites locales.")
@@ -328,81 +416,74 @@ if st.sidebar.button("Calculer"):
         for e in errs:
             st.error(e)
 
-    # 5) Diagnostic détaillé pédagogique
+    # 4) Diagnostic détaillé pédagogique
     with st.expander("Voir le diagnostic détaillé"):
         st.markdown("### Interpolation des capacités machine")
-        st.markdown(f"- Vitesse de rotation demandée : *n = {n:.1f} tr/min*")
-        # Trouver les deux points d'interpolation
-        caps = sorted(machine_caps, key=lambda rec: rec["n"])
-        ns = [rec["n"] for rec in caps]
-        idx = None
-        for i in range(len(ns)-1):
-            if ns[i] <= n <= ns[i+1]:
-                idx = i
-                break
-        if idx is not None:
-            n1, n2 = ns[idx], ns[idx+1]
-            p1, p2 = caps[idx]["power"], caps[idx+1]["power"]
-            t1, t2 = caps[idx]["torque"], caps[idx+1]["torque"]
-            alpha = (n - n1) / (n2 - n1)
+        st.markdown(f"- Vitesse de rotation demandée : *n = {r.n:.1f} tr/min*")
+        # Points d'interpolation (mêmes que ceux utilisés pour local_power/local_torque)
+        if r.bracket is not None:
+            n1, n2, p1, p2, t1, t2, alpha = r.bracket
             st.markdown(f"- Points utilisés : n₁ = {n1}, n₂ = {n2}")
             st.markdown(f"- Puissance : P₁ = {p1:.2f} kW, P₂ = {p2:.2f} kW")
             st.markdown(f"- Couple : T₁ = {t1:.2f} Nm, T₂ = {t2:.2f} Nm")
-            st.markdown(f"- α = (n - n₁) / (n₂ - n₁) = ({n:.1f} - {n1}) / ({n2} - {n1}) = {alpha:.3f}")
-            st.markdown(f"- Puissance interpolée = P₁ + α·(P₂-P₁) = {p1:.2f} + {alpha:.3f}·({p2:.2f}-{p1:.2f}) = *{local_max_power:.2f} kW*")
-            st.markdown(f"- Couple interpolé = T₁ + α·(T₂-T₁) = {t1:.2f} + {alpha:.3f}·({t2:.2f}-{t1:.2f}) = *{local_max_torque:.2f} Nm*")
+            st.markdown(f"- α = (n - n₁) / (n₂ - n₁) = ({r.n:.1f} - {n1}) / ({n2} - {n1}) = {alpha:.3f}")
+            st.markdown(f"- Puissance interpolée = P₁ + α·(P₂-P₁) = {p1:.2f} + {alpha:.3f}·({p2:.2f}-{p1:.2f}) = *{r.local_power:.2f} kW*")
+            st.markdown(f"- Couple interpolé = T₁ + α·(T₂-T₁) = {t1:.2f} + {alpha:.3f}·({t2:.2f}-{t1:.2f}) = *{r.local_torque:.2f} Nm*")
         else:
             st.markdown("- n hors plage, valeurs max utilisées.")
 
         st.markdown("---")
         st.markdown("### Formules et calculs")
-        st.markdown(f"- *Vitesse de rotation* : n = (1000 × Vc) / (π × D) = (1000 × {Vc}) / (π × {D}) = *{n:.1f} tr/min*")
-        if not is_perc:
-            if plaquette_key == "N123G2-0300-0001-CF 1125":
-                st.markdown(f"- *Kc* = kc1 × (1/hex)^m0 × (1-Y0/100) = 400 × (1/{hexv_chart:.3f})^{m0} × (1-20/100) = *{kc:.1f} N/mm²*")
-                st.markdown(f"- *hex* = fn × sin(kr) = {fn} × sin({kr}) = *{hexv_chart:.3f} mm*")
-                st.markdown(f"- *La* = insert_length_mm / sin(kr) = {p.get('insert_length_mm', 0.0)} / sin({kr}) = *{La:.2f} mm*")
-                st.markdown(f"- *Fc* = Kc × insert_length_mm × fn = {kc:.1f} × {p.get('insert_length_mm', 0.0)} × {fn} = *{kc*p.get('insert_length_mm', 0.0)*fn:.1f} N*")
+        st.markdown(f"- *Vitesse de rotation* : n = (1000 × Vc) / (π × D) = (1000 × {r.Vc}) / (π × {r.D}) = *{r.n:.1f} tr/min*")
+        if r.kind != DRILLING:
+            if r.kind == BORING:
+                st.markdown(f"- *hex* = *{r.hexv:.3f} mm* (saisi)")
             else:
-                st.markdown(f"- *Kc* = kc1 × (1/hex)^m0 × (1-Y0/100) = 400 × (1/{hexv_chart:.3f})^{m0} × (1-{Y0}/100) = *{kc:.1f} N/mm²*")
-                st.markdown(f"- *hex* = fn × sin(kr) = {fn} × sin({kr}) = *{hexv_chart:.3f} mm*")
-                if La is not None:
-                    st.markdown(f"- *La* = ap / sin(kr) = {ap} / sin({kr}) = *{La:.2f} mm*")
-                    st.markdown(f"- *Fc* = Kc × ap × fn = {kc:.1f} × {ap} × {fn} = *{kc*ap*fn:.1f} N*")
-            st.markdown(f"- *Pc* = Fc × Vc / 60000 = {kc*ap*fn:.1f} × {Vc} / 60000 = *{Pc:.2f} kW*")
-            st.markdown(f"- *Mc* = (30000 × Pc) / (n × π) = (30000 × {Pc:.2f}) / ({n:.1f} × π) = *{Mc:.2f} kN.m*")
+                st.markdown(f"- *hex* = fn × sin(kr) = {r.fn} × sin({r.kr}) = *{r.hexv:.3f} mm*")
+            st.markdown(f"- *Kc* = kc1 × (1/hex)^m0 × (1-Y0/100) = {r.kc1:g} × (1/{r.hexv:.3f})^{r.m0} × (1-{r.Y0:g}/100) = *{r.kc:.1f} N/mm²*")
+            ap_label = "insert_length_mm" if r.kind == GROOVING else "ap"
+            if r.La is not None:
+                st.markdown(f"- *La* = {ap_label} / sin(kr) = {r.ap} / sin({r.kr}) = *{r.La:.2f} mm*")
+            st.markdown(f"- *Fc* = Kc × {ap_label} × fn = {r.kc:.1f} × {r.ap} × {r.fn} = *{r.Fc:.1f} N*")
+            st.markdown(f"- *Pc* = Fc × Vc / 60000 = {r.Fc:.1f} × {r.Vc} / 60000 = *{r.Pc:.2f} kW*")
         else:
-            st.markdown(f"- *Y₀* = 20 (fixé pour le perçage)")
-            st.markdown(f"- *kc* = 400 × ((2/hex)^0.25) × (1-20/100) = 400 × ((2/{hexv_chart:.3f})^0.25) × 0.8 = *{kc:.1f} N/mm²*")
-            st.markdown(f"- *hex* = fn × sin(kr) = {fn} × sin({kr}) = *{hexv_chart:.3f} mm*")
-            st.markdown(f"- *Fa* = kc × fn × D = {kc:.1f} × {fn} × {D} = *{Fa:.1f} N*")
-            st.markdown(f"- *Pc* = Fa × Vc / 240000 = {Fa:.1f} × {Vc} / 240000 = *{Pc:.2f} kW*")
-            st.markdown(f"- *Mc* = (30000 × Pc) / (n × π) = (30000 × {Pc:.2f}) / ({n:.1f} × π) = *{Mc:.2f} kN.m*")
+            st.markdown(f"- *Y₀* = {r.Y0:g} (fixé pour le perçage)")
+            st.markdown(f"- *hex* = fn × sin(kr) = {r.fn} × sin({r.kr}) = *{r.hexv:.3f} mm*")
+            st.markdown(f"- *kc* = {r.kc1:g} × ((2/hex)^{r.m0}) × (1-{r.Y0:g}/100) = {r.kc1:g} × ((2/{r.hexv:.3f})^{r.m0}) × {1 - r.Y0/100:g} = *{r.kc:.1f} N/mm²*")
+            st.markdown(f"- *Fa* = kc × fn × D = {r.kc:.1f} × {r.fn} × {r.D} = *{r.Fa:.1f} N*")
+            st.markdown(f"- *Pc* = Fa × Vc / 240000 = {r.Fa:.1f} × {r.Vc} / 240000 = *{r.Pc:.2f} kW*")
+        st.markdown(f"- *Mc* = (30000 × Pc) / (n × π) = (30000 × {r.Pc:.2f}) / ({r.n:.1f} × π) = *{r.Mc:.2f} Nm*")
         st.markdown("---")
         st.markdown("### Comparaisons et contrôles")
-        st.markdown(f"- *Puissance de coupe* : {Pc:.2f} kW {'<=' if Pc<=local_max_power else '>'} {local_max_power:.2f} kW (interpolée)")
-        st.markdown(f"- *Couple de coupe* : {Mc:.2f} Nm {'<=' if Mc<=local_max_torque else '>'} {local_max_torque:.2f} Nm (interpolé)")
-        if La is not None:
-            st.markdown(f"- *Longueur d'engagement* : {La:.2f} mm {'<=' if La<=0.7*D else '>'} {0.7*D:.2f} mm (0.7×D)")
+        st.markdown(f"- *Puissance de coupe* : {r.Pc:.2f} kW {'<=' if r.power_ok else '>'} {r.local_power:.2f} kW (interpolée)")
+        st.markdown(f"- *Couple de coupe* : {r.Mc:.2f} Nm {'<=' if r.torque_ok else '>'} {r.local_torque:.2f} Nm (interpolé)")
+        if r.La is not None:
+            st.markdown(f"- *Longueur d'engagement* : {r.La:.2f} mm {'<=' if r.engagement_ok else '>'} {r.max_engagement:.2f} mm (0.7×D)")
+        st.markdown("---")
+        st.markdown("### Graphe de calcul")
+        recomputed = set(graph.recomputed)
+        rows = ["| Nœud | Dépend de | Valeur | Recalculs | Dernier rerun |", "|---|---|---|---|---|"]
+        for name in graph.names:
+            if graph.is_input(name):
+                continue
+            value = graph[name]
+            text = "—" if value is None else f"{value:.4g}" if isinstance(value, float) else ""
+            rows.append(f"| {name} | {', '.join(graph.dependencies(name))} | {text} | {graph.recomputes[name]} | "
+                        f"{'recalculé' if name in recomputed else 'réutilisé'} |")
+        st.markdown("\n".join(rows))
+
+stage("app.details")
+if st.sidebar.button("Calculer"):
+    r = result
+    calculation_details(r, graph)
 
-    # 6) Activer l'enregistrement
+    # 5) Activer l'enregistrement
     st.session_state.calculation_done = True
-    st.session_state.last_result = {
-        "Date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "Plaquette": plaquette_key,
-        "Op": p["operation"],
-        "Vc": round(Vc, 1),
-        "fn": round(fn, 3),
-        "D": round(D, 1),
-        **({"ap": round(ap, 2), "hex": round(hexv, 3), "La": round(La, 2)} if La is not None else {}),
-        "Pc": round(Pc, 2) if Pc is not None else None,
-        "Mc": round(Mc, 2) if Mc is not None else None,
-        **({"Fa": round(Fa, 2)} if is_perc else {})
-    }
+    st.session_state.last_result = history_record(r, saved=True)
 
 # Bouton Enregistrer (activé seulement après calcul)
 if st.session_state.calculation_done and st.sidebar.button("Enregistrer"):
-    st.session_state.history.append(st.session_state.last_result)
+    history.append(st.session_state.last_result, flush=True)
     st.success("✅ Calcul enregistré dans l'historique.")
     st.session_state.calculation_done = False
     st.session_state.last_result = None
@@ -411,64 +492,245 @@ if st.session_state.calculation_done and st.sidebar.button("Enregistrer"):
 # =============================================================================
 # 10) Jauges graphiques
 # =============================================================================
-g1, g2 = st.columns(2)
-with g1:
-    fig1 = go.Figure(go.Indicator(
-        mode="gauge+number+delta", value=Pc, delta={'reference':local_max_power},
-        title={'text':"Puissance (kW)"},
-        gauge={
-            'axis':{'range':[0,local_max_power]},
-            'steps':[
-                {'range':[0,0.8*local_max_power],'color':'lightgreen'},
-                {'range':[0.8*local_max_power,local_max_power],'color':'yellow'}
-            ],
-            'threshold':{'value':local_max_power,'line':{'color':'red','width':4}}
-        }
-    ))
-    st.plotly_chart(fig1, use_container_width=True)
-
-with g2:
-    fig2 = go.Figure(go.Indicator(
-        mode="gauge+number+delta", value=Mc, delta={'reference':local_max_torque},
-        title={'text':"Couple (Nm)"},
-        gauge={
-            'axis':{'range':[0,local_max_torque]},
-            'steps':[
-                {'range':[0,0.8*local_max_torque],'color':'lightblue'},
-                {'range':[0.8*local_max_torque,local_max_torque],'color':'orange'}
-            ],
-            'threshold':{'value':local_max_torque,'line':{'color':'red','width':4}}
-        }
-    ))
-    st.plotly_chart(fig2, use_container_width=True)
+stage("app.gauges")
+# Les figures sont construites une fois par session, seules les valeurs changent ensuite
+if "gauge_figures" not in st.session_state:
+    with span("ui.gauge_figures"):
+        st.session_state.gauge_figures = (
+            UIComponents.gauge_figure("Puissance (kW)", "lightgreen", "yellow"),
+            UIComponents.gauge_figure("Couple (Nm)", "lightblue", "orange")
+        )
+
+@fragment
+def gauges(r):
+    """Jauges puissance/couple du point de fonctionnement."""
+    fig1, fig2 = st.session_state.gauge_figures
+    with span("ui.update_gauges"):
+        UIComponents.update_gauge(fig1, r.Pc, r.local_power)
+        UIComponents.update_gauge(fig2, r.Mc, r.local_torque)
+    g1, g2 = st.columns(2)
+    with span("ui.render_chart"):
+        with g1:
+            st.plotly_chart(fig1, use_container_width=True)
+        with g2:
+            st.plotly_chart(fig2, use_container_width=True)
+
+gauges(result)
 
 # =============================================================================
 # 11) Historique & onglets
 # =============================================================================
-res = {
-    "Date":datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-    "Plaquette":plaquette_key,
-    "Op": p['operation'],
-    "Vc": round(Vc,1), "fn": round(fn,3), "D": round(D,1),
-    **({"ap":round(ap,2), "hex":round(hexv,3), "La":round(La,2)} if ap>0 else {}),
-    "Pc":round(Pc,2), "Mc":round(Mc,2),
-    **({"Fa":round(Fa,2)} if "perçage" in operation else {})
+stage("app.history")
+# Le point de fonctionnement est journalisé quand il change (écriture groupée en base)
+res = history_record(result)
+point = {k: v for k, v in res.items() if k not in ("date", "saved")}
+if st.session_state.last_logged != point:
+    history.append(res)
+    st.session_state.last_logged = point
+
+# Colonnes affichées (nom, arrondi), dans l'ordre de l'ancien tableau
+HISTORY_DISPLAY = {
+    "date": ("Date", None), "insert_name": ("Plaquette", None), "operation": ("Op", None),
+    "Vc": ("Vc", 1), "fn": ("fn", 3), "D": ("D", 1), "ap": ("ap", 2), "hex": ("hex", 3),
+    "La": ("La", 2), "Pc": ("Pc", 2), "Mc": ("Mc", 2), "Fa": ("Fa", 2)
 }
-if not st.session_state.history or st.session_state.history[-1]!=res:
-    st.session_state.history.append(res)
 
-tabs = st.tabs(["Calcul","Historique"])
-with tabs[1]:
-    df = pd.DataFrame(st.session_state.history)
-    if df.empty:
+def download_export(container, label, write, file_name):
+    """Bouton de téléchargement d'un export écrit par blocs dans un fichier temporaire (pas de copie en mémoire)."""
+    fd, path = tempfile.mkstemp(suffix=os.path.splitext(file_name)[1])
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        with open(path, "rb") as f:
+            container.download_button(label, f, file_name)
+    finally:
+        os.remove(path)
+
+@fragment
+def history_tab():
+    """Historique paginé : seule la page affichée est lue en base."""
+    hc1, hc2, hc3 = st.columns(3)
+    inserts = ["Toutes"] + history.distinct("insert_name")
+    insert_name = hc1.selectbox("Plaquette", inserts, key="history_insert")
+    filters = {
+        "insert_name": None if insert_name == "Toutes" else insert_name,
+        "session": None if hc2.checkbox("Toutes les sessions", key="history_all") else session_id,
+        "saved": 1 if hc3.checkbox("Enregistrés seulement", key="history_saved") else None
+    }
+    with span("data.history_count"):
+        total = history.count(**filters)
+    if not total:
         st.info("Aucun calcul enregistré.")
-    else:
-        st.dataframe(df, use_container_width=True)
-        st.download_button("Exporter CSV", df.to_csv(index=False).encode(), "history.csv")
+        return
+
+    page_size = HISTORY_CONFIG["page_size"]
+    pages = -(-total // page_size)
+    page = st.number_input(f"Page (sur {pages}, {total} lignes)", min_value=1, max_value=pages,
+                           value=1, step=1, key="history_page")
+    with span("data.history_page"):
+        rows = history.page(page - 1, page_size, **filters)
+    with span("ui.dataframe"):
+        import pandas as pd  # importé au premier affichage de l'historique (démarrage plus rapide)
+        df = pd.DataFrame(rows)
+        df = df[[c for c in HISTORY_DISPLAY if c in df and df[c].notna().any()]]
+        for column, (_, decimals) in HISTORY_DISPLAY.items():
+            if decimals is not None and column in df:
+                df[column] = df[column].round(decimals)
+    with span("ui.render_dataframe"):
+        st.dataframe(df.rename(columns={c: name for c, (name, _) in HISTORY_DISPLAY.items()}),
+                     use_container_width=True, hide_index=True)
+
+    # L'export est lu en base par blocs, seulement à la demande, en pleine précision ; Parquet et Arrow
+    # (compressés, en colonnes, avec machine et version de courbe) nécessitent pyarrow
+    columnar = importlib.util.find_spec("pyarrow") is not None
+    ec1, ec2 = st.columns(2)
+    fmt = ec1.radio("Format d'export", ["CSV", "Parquet", "Arrow"] if columnar else ["CSV"], horizontal=True,
+                    key="history_format")
+    if ec1.button("Préparer l'export", key="history_export"):
+        if fmt == "CSV":
+            download_export(ec1, "Exporter CSV", lambda f: f.writelines(history.iter_csv(**filters)), "history.csv")
+        else:
+            with span("data.history_export"):
+                download_export(ec1, f"Exporter {fmt}",
+                                lambda f: export_history(history, f, fmt=fmt.lower(), **filters),
+                                f"history.{fmt.lower()}")
+    if columnar:
+        archive = ec2.file_uploader("Importer un historique (Parquet ou Arrow)", type=["parquet", "arrow", "feather"],
+                                    key="history_import_file")
+        if archive is not None and ec2.button("Importer", key="history_import"):
+            try:
+                with span("data.history_import"):
+                    count = import_history(history, archive, fmt=archive_format(archive.name))
+                ec2.success(f"✅ {count} calculs importés dans l'historique.")
+            except ValueError as e:
+                ec2.error(f"Import impossible : {e}")
+
+@fragment
+def feasibility_tab(r, hexv, kr):
+    """Carte de faisabilité : changer de plan ou d'indicateur ne relance que ce bloc."""
+    planes = {"Vc × fn": "fn"}
+    if r.kind not in (DRILLING, GROOVING) and "profondeur_passe_ap_mm" in p:
+        planes["Vc × ap"] = "ap"
+    fc1, fc2 = st.columns(2)
+    y_name = planes[fc1.radio("Plan", list(planes), horizontal=True)]
+    metric = {"Max": "max", "Puissance": "power", "Couple": "torque"}[
+        fc2.radio("Utilisation", ["Max", "Puissance", "Couple"], horizontal=True)]
+    with span("calc.feasibility_grid"):
+        grid = feasibility_map(
+            plaquette_key, r.D, y_name,
+            r.ap if y_name == "fn" else r.fn,
+            hexv if r.kind == BORING else None,
+            kr if r.kind not in (DRILLING, BORING) else None,
+            max_power, max_torque, machine_curve.content_hash, data_snapshot.version
+        )
+    UIComponents.plot_feasibility_map(grid, (r.Vc, r.fn if y_name == "fn" else r.ap), metric)
+
+@st.cache_resource(max_entries=8)
+def display_curve(curve_version, _curve):
+    """Courbe réduite (LTTB) envoyée au navigateur, calculée une fois par version de la courbe."""
+    return downsample_curve(_curve, PLOT_CONFIG["capacity_max_points"])
+
+@fragment
+def capacity_tab(r):
+    """Courbe de capacité avec le point courant et, au choix, les points de l'historique de la machine."""
+    cc1, cc2 = st.columns(2)
+    history_points = None
+    if cc1.checkbox("Superposer l'historique", key="capacity_history"):
+        saved_only = cc2.checkbox("Enregistrés seulement", key="capacity_saved")
+        with span("data.history_columns"):
+            columns = history.columns(("insert_name", "D", "Vc", "Pc", "Mc"), PLOT_CONFIG["history_max_points"],
+                                      machine=machine_curve.machine_id, saved=1 if saved_only else None)
+        D_hist, Vc_hist = (np.array(columns[name], dtype=np.float64) for name in ("D", "Vc"))
+        history_points = {
+            "n": 1000 * Vc_hist / (np.pi * D_hist),
+            "Pc": np.array(columns["Pc"], dtype=np.float64),
+            "Mc": np.array(columns["Mc"], dtype=np.float64),
+            "insert_name": columns["insert_name"]
+        }
+        st.caption(f"{len(D_hist)} points de l'historique (les {PLOT_CONFIG['history_max_points']} plus récents au plus)")
+    UIComponents.plot_capacity_curve(display_curve(machine_curve.content_hash, machine_curve),
+                                     (r.n, r.Pc, r.Mc), history_points, PLOT_CONFIG["capacity_max_points"])
+
+@fragment
+def fleet_tab(r, hexv, kr):
+    """Machines du parc capables de réaliser le point de fonctionnement, par marge décroissante."""
+    registry = machine_registry().current().data
+    if not len(registry):
+        st.info(f"Aucune machine dans le dossier « {MACHINES_DIR} » : ajoutez-y une courbe "
+                "(.json ou .mcap) par machine, et éventuellement un fichier machines.json "
+                "(nom, max_power, max_torque par machine).")
+        return
+    with span("calc.fleet_check"):
+        fleet = registry.check(p, r.D, r.Vc, r.fn, ap=r.ap,
+                               hexv=hexv if r.kind == BORING else None,
+                               kr=kr if r.kind not in (DRILLING, BORING) else None)
+    import pandas as pd
+    df = pd.DataFrame({
+        "Machine": fleet.machine_ids,
+        "Nom": [registry.spec(m).name for m in fleet.machine_ids],
+        "P dispo (kW)": fleet.power_available[:, 0].round(2),
+        "C dispo (Nm)": fleet.torque_available[:, 0].round(2),
+        "Marge puissance (%)": (100 * fleet.power_margin[:, 0]).round(1),
+        "Marge couple (%)": (100 * fleet.torque_margin[:, 0]).round(1),
+        "Marge engagement (%)": (100 * fleet.engagement_margin[:, 0]).round(1),
+        "OK": fleet.ok[:, 0]
+    }).iloc[np.argsort(-fleet.margin[:, 0], kind="stable")]
+    st.markdown(f"**{int(fleet.ok[:, 0].sum())} / {len(df)}** machines peuvent réaliser ce point "
+                f"(Pc = {r.Pc:.2f} kW, Mc = {r.Mc:.2f} Nm).")
+    with span("ui.render_dataframe"):
+        st.dataframe(df.replace([np.inf, -np.inf], np.nan), use_container_width=True, hide_index=True)
+
+tabs = st.tabs(["Calcul","Historique","Faisabilité","Parc machines","Capacité machine"])
+with tabs[1]:
+    history_tab()
+
+stage("app.feasibility")
+with tabs[2]:
+    feasibility_tab(result, hexv, kr)
+
+stage("app.fleet")
+with tabs[3]:
+    fleet_tab(result, hexv, kr)
+
+stage("app.capacity")
+with tabs[4]:
+    capacity_tab(result)
+stage(None)
 
 # =============================================================================
 # Footer
 # =============================================================================
+rerun_ms = (time.perf_counter() - _rerun_start) * 1000
+st.session_state.rerun_ms.append(rerun_ms)
+st.sidebar.caption(
+    f"Rerun : {rerun_ms:.0f} ms (médiane {statistics.median(st.session_state.rerun_ms):.0f} ms "
+    f"sur les {len(st.session_state.rerun_ms)} derniers)"
+)
+cache_stats = RESULT_CACHE.stats()
+st.sidebar.caption(
+    f"Cache calculs : {cache_stats.hits} réutilisés / {cache_stats.misses} calculés "
+    f"({cache_stats.size}/{cache_stats.maxsize} entrées)"
+)
+computed_nodes = [name for name in graph.names if not graph.is_input(name)]
+st.sidebar.caption(
+    f"Graphe de calcul : {len(graph.recomputed)}/{len(computed_nodes)} nœuds recalculés à ce rerun, "
+    f"{sum(graph.recomputes.values())} recalculs depuis le début de la session"
+)
+reload_stats = data_reloader.stats()
+st.sidebar.caption(
+    f"Données : version {data_snapshot.version} du {datetime.fromtimestamp(data_snapshot.loaded_at):%H:%M:%S}, "
+    f"{reload_stats.reloads} chargement(s), dernier en {reload_stats.last_duration * 1000:.0f} ms"
+)
+if reload_stats.last_error:
+    st.sidebar.warning(f"Rechargement des données refusé, version précédente conservée : {reload_stats.last_error}")
+
+# Chronologie des derniers reruns de la session (le rerun courant est terminé, le panneau n'y figure pas)
+if "traces" not in st.session_state:
+    st.session_state.traces = deque(maxlen=TRACE_CONFIG["keep"])
+if tracing_on:
+    st.session_state.traces.append(tracer().finish())
+UIComponents.trace_sidebar(list(st.session_state.traces), tracer().path, TRACE_CONFIG["keep"])
+
 st.markdown("---")
 st.markdown(
     "<div style='text-align:center; color: grey;'>"
@@ -0,0 +1,158 @@
+"""
+Headless job checker for the cutting conditions calculator.
+Streams a CSV/XLSX job sheet in chunks, checks every line against the cutting
+conditions and the machine capacity curve in a process pool, and writes the
+results with pass/fail flags to a CSV file.
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pandas is used to format the CSV instead (about 10x slower)
+    pa = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+from config import CONDITIONS_FILE, MACHINE_CAPACITIES_FILE, DEFAULT_MAX_POWER, DEFAULT_MAX_TORQUE
+from calculations.batch import CHECK_FIELDS, check_table
+from data.catalog import load_catalog
+from data.curve_store import load_curve
+
+# Per-worker state, loaded once by _init_worker
+_worker = {}
+
+def _init_worker(conditions_path: str, curve_path: str, max_power: float, max_torque: float, tool_column: str):
+    """Load the cutting conditions and the capacity curve once per worker process."""
+    _worker["conditions"] = load_catalog(conditions_path)
+    _worker["curve"] = load_curve(curve_path)
+    _worker["limits"] = (max_power, max_torque)
+    _worker["tool_column"] = tool_column
+
+def _check_chunk(chunk: pd.DataFrame, header: bool) -> Tuple[bytes, int, int]:
+    """
+    Check one chunk of jobs and format it as CSV.
+
+    Args:
+        chunk (pd.DataFrame): Job lines
+        header (bool): Whether to include the CSV header
+
+    Returns:
+        Tuple[bytes, int, int]: (CSV content, number of lines, number of failed lines)
+    """
+    results = check_table(chunk, _worker["conditions"], _worker["curve"], *_worker["limits"],
+                          tool_column=_worker["tool_column"])
+    out = chunk.copy()
+    for field in CHECK_FIELDS:
+        out[field] = results[field]
+    if pa is not None:
+        buffer = pa.BufferOutputStream()
+        pa_csv.write_csv(pa.Table.from_pandas(out, preserve_index=False), buffer,
+                         pa_csv.WriteOptions(include_header=header))
+        text = buffer.getvalue().to_pybytes()
+    else:
+        text = out.to_csv(index=False, header=header).encode("utf-8")
+    return text, len(out), int(np.count_nonzero(~results["ok"]))
+
+def read_chunks(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """
+    Stream a job sheet in chunks of at most chunk_size lines.
+
+    CSV files are parsed by pandas chunk by chunk; XLSX files are read row by
+    row with openpyxl in read-only mode, so neither is loaded whole.
+
+    Args:
+        path (str): Path to a .csv or .xlsx job sheet
+        chunk_size (int): Maximum number of lines per chunk
+
+    Yields:
+        pd.DataFrame: Consecutive chunks of the sheet
+    """
+    if path.lower().endswith((".xlsx", ".xlsm")):
+        from openpyxl import load_workbook
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            columns = [str(name) for name in next(rows)]
+            buffer = []
+            for row in rows:
+                buffer.append(row)
+                if len(buffer) == chunk_size:
+                    yield pd.DataFrame.from_records(buffer, columns=columns)
+                    buffer = []
+            if buffer:
+                yield pd.DataFrame.from_records(buffer, columns=columns)
+        finally:
+            workbook.close()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+def run(args: argparse.Namespace) -> Dict[str, float]:
+    """
+    Check a job sheet and write the results.
+
+    At most two chunks per worker are in flight, so memory stays bounded by
+    the chunk size whatever the size of the sheet. Results are written in the
+    order of the input.
+
+    Args:
+        args (argparse.Namespace): Parsed command-line arguments
+
+    Returns:
+        Dict[str, float]: Number of lines, failed lines and elapsed seconds
+    """
+    start = time.perf_counter()
+    lines = failed = 0
+    workers = args.workers or os.cpu_count() or 1
+    initargs = (args.conditions, args.machine, args.max_power, args.max_torque, args.tool_column)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool, \
+            open(args.output, "wb") as out:
+        pending = deque()
+        for i, chunk in enumerate(read_chunks(args.input, args.chunk_size)):
+            pending.append(pool.submit(_check_chunk, chunk, i == 0))
+            if len(pending) >= 2 * workers:
+                text, n, bad = pending.popleft().result()
+                out.write(text)
+                lines, failed = lines + n, failed + bad
+        while pending:
+            text, n, bad = pending.popleft().result()
+            out.write(text)
+            lines, failed = lines + n, failed + bad
+    return {"lines": lines, "failed": failed, "seconds": time.perf_counter() - start}
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Vérifie une liste de travaux (CSV/XLSX) contre les capacités machine.")
+    parser.add_argument("input", help="Fichier de travaux .csv ou .xlsx (colonnes Plaquette, D, Vc, fn, ap, hex optionnelle)")
+    parser.add_argument("-o", "--output", help="Fichier CSV de résultats (défaut : <input>_resultats.csv)")
+    parser.add_argument("--conditions", default=CONDITIONS_FILE, help="Conditions de coupe (JSON ou catalogue JSONL)")
+    parser.add_argument("--machine", default=MACHINE_CAPACITIES_FILE, help="Courbe de capacité machine (JSON ou .mcap)")
+    parser.add_argument("--max-power", type=float, default=DEFAULT_MAX_POWER, help="Puissance hors courbe (kW)")
+    parser.add_argument("--max-torque", type=float, default=DEFAULT_MAX_TORQUE, help="Couple hors courbe (Nm)")
+    parser.add_argument("--tool-column", default="Plaquette", help="Nom de la colonne plaquette")
+    parser.add_argument("--chunk-size", type=int, default=100000, help="Lignes par bloc")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Nombre de processus")
+    args = parser.parse_args()
+    args.output = args.output or os.path.splitext(args.input)[0] + "_resultats.csv"
+
+    for path in (args.input, args.conditions, args.machine):
+        if not os.path.exists(path):
+            print(f"[ERROR] Fichier introuvable : {path}")
+            sys.exit(2)
+
+    summary = run(args)
+    print(f"[INFO] {summary['lines']} lignes vérifiées en {summary['seconds']:.2f} s, "
+          f"{summary['failed']} hors limites -> {args.output}")
+    sys.exit(1 if summary["failed"] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Converts a machine capacity curve (JSON records or digitized Excel sheet) to
+the memory-mapped binary format read by the application, optionally smoothing
+and simplifying it under a maximum error.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+from config import CURVE_SIMPLIFY_CONFIG, MACHINE_CAPACITIES_FILE
+from calculations.curve_simplify import simplify_curve
+from data.curve_store import binary_path, read_source_curve, write_curve
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Convertit une courbe de capacité (JSON ou Excel) au format binaire .mcap.")
+    parser.add_argument("source", nargs="?", default=MACHINE_CAPACITIES_FILE,
+                        help="Fichier .json (liste n/power/torque) ou .xlsx (colonnes n, power, torque)")
+    parser.add_argument("-o", "--output", help="Fichier .mcap (défaut : à côté de la source)")
+    parser.add_argument("--machine-id", help="Identifiant machine (défaut : nom du fichier)")
+    parser.add_argument("--simplify", action="store_true",
+                        help="Lisser le bruit de numérisation et supprimer les points superflus")
+    parser.add_argument("--window", type=int, default=CURVE_SIMPLIFY_CONFIG["window"],
+                        help="Points par régression locale (0 = sans lissage)")
+    parser.add_argument("--max-power-error", type=float, default=CURVE_SIMPLIFY_CONFIG["max_power_error"],
+                        help="Écart de puissance maximal à la courbe source (kW)")
+    parser.add_argument("--max-torque-error", type=float, default=CURVE_SIMPLIFY_CONFIG["max_torque_error"],
+                        help="Écart de couple maximal à la courbe source (Nm)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.source):
+        print(f"[ERROR] Fichier introuvable : {args.source}")
+        sys.exit(2)
+
+    output = args.output or binary_path(args.source)
+    try:
+        curve = read_source_curve(args.source, args.machine_id)
+        if args.simplify:
+            curve, report = simplify_curve(curve, args.max_power_error, args.max_torque_error, args.window)
+            print(f"[INFO] {report.points_in} -> {report.points_out} points ({report.reduction:.0%} supprimés)")
+            print(f"[INFO] Lissage        : écart max {report.smoothing_power_error:.3f} kW, "
+                  f"{report.smoothing_torque_error:.3f} Nm")
+            print(f"[INFO] Simplification : écart max {report.simplification_power_error:.3f} kW, "
+                  f"{report.simplification_torque_error:.3f} Nm")
+            print(f"[INFO] Total / source : écart max {report.max_power_error:.3f} kW, "
+                  f"{report.max_torque_error:.3f} Nm (RMS {report.rms_power_error:.3f} kW, "
+                  f"{report.rms_torque_error:.3f} Nm)")
+            if not report.within(args.max_power_error, args.max_torque_error):
+                raise ValueError(f"L'écart à la source ({report.max_power_error:.3f} kW, "
+                                 f"{report.max_torque_error:.3f} Nm) dépasse les tolérances "
+                                 f"({args.max_power_error:g} kW, {args.max_torque_error:g} Nm)")
+        write_curve(output, curve)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+    print(f"[INFO] {len(curve)} points écrits dans {output} (version {curve.content_hash[:12]})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Ingests a folder of digitizer exports (XLSX/CSV, columns n, power, torque)
+into the machine store read by the "Parc machines" tab. Only new or changed
+files are converted; --watch keeps polling the folder.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+from config import CURVE_SIMPLIFY_CONFIG, INGEST_CONFIG, MACHINES_DIR
+from data.ingest import Ingestor
+
+def print_results(results):
+    """Print one line per converted, failed or removed file and a summary."""
+    counts = {"converted": 0, "unchanged": 0, "failed": 0, "removed": 0}
+    for result in results:
+        counts[result.status] += 1
+        if result.status == "converted":
+            print(f"[INFO] {result.machine_id} : {result.points} points ({result.seconds * 1000:.0f} ms, "
+                  f"écart max à l'export {result.max_power_error:.3f} kW, {result.max_torque_error:.3f} Nm)")
+        elif result.status == "failed":
+            print(f"[ERROR] {os.path.basename(result.source)} : {result.error}")
+        elif result.status == "removed":
+            print(f"[INFO] {result.machine_id} : export supprimé, courbe retirée du parc")
+    total = sum(result.seconds for result in results)
+    print(f"[INFO] {counts['converted']} converti(s), {counts['unchanged']} inchangé(s), "
+          f"{counts['failed']} en erreur, {counts['removed']} retiré(s) en {total:.2f} s")
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Convertit les exports du numériseur en courbes .mcap du parc machines.")
+    parser.add_argument("source", nargs="?", default=INGEST_CONFIG["source_dir"],
+                        help="Dossier des exports .xlsx/.csv (un fichier par machine)")
+    parser.add_argument("--store", default=MACHINES_DIR, help="Dossier du parc machines")
+    parser.add_argument("--simplify", action="store_true",
+                        help="Lisser et simplifier les courbes (réglages CURVE_SIMPLIFY_CONFIG)")
+    parser.add_argument("--force", action="store_true", help="Reconvertir tous les fichiers")
+    parser.add_argument("--workers", type=int, default=INGEST_CONFIG["workers"], help="Nombre de processus")
+    parser.add_argument("--watch", action="store_true", help="Surveiller le dossier (Ctrl+C pour arrêter)")
+    parser.add_argument("--interval", type=float, default=INGEST_CONFIG["interval"],
+                        help="Secondes entre deux passages en mode --watch")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.source):
+        print(f"[ERROR] Dossier introuvable : {args.source}")
+        sys.exit(2)
+
+    ingestor = Ingestor(args.source, args.store, CURVE_SIMPLIFY_CONFIG if args.simplify else None, args.workers)
+    start = time.perf_counter()
+    results = ingestor.run(force=args.force)
+    print_results(results)
+    print(f"[INFO] Durée totale : {time.perf_counter() - start:.2f} s")
+    if args.watch:
+        print(f"[INFO] Surveillance de {args.source} (toutes les {args.interval:g} s)")
+        try:
+            ingestor.watch(args.interval, callback=print_results)
+        except KeyboardInterrupt:
+            pass
+    sys.exit(1 if any(result.status == "failed" for result in results) else 0)
+
+if __name__ == "__main__":
+    main()
@@ -3,17 +3,25 @@ Launcher script for the cutting conditions calculator.
 Handles environment setup and application launch.
 """
 
+import argparse
+import ast
 import subprocess
 import os
 import sys
 import importlib.util
+import time
 from datetime import datetime
 import logging
+from typing import Dict, List, Tuple
+
+APP_SCRIPT = "app.py"  # the Streamlit app (src/app.py is the former single-tab version)
+LOG_FILE = "app.log"
+TRACE_FILE = "traces.jsonl"  # rerun traces of the app (JSON lines), written next to LOG_FILE
 
 def setup_logging():
     """Setup logging configuration."""
     logging.basicConfig(
-        filename="app.log",
+        filename=LOG_FILE,
         level=logging.INFO,
         format="%(asctime)s - %(levelname)s - %(message)s",
         datefmt="%Y-%m-%d %H:%M:%S"
@@ -49,27 +57,105 @@ def check_requirements():
             log_message("error", "Failed to install packages")
             sys.exit(1)
 
+def app_imports(script: str) -> List[str]:
+    """
+    List the modules a script imports at module level (without running it).
+
+    Args:
+        script (str): Path to the Python script
+
+    Returns:
+        List[str]: Imported module names, in order
+    """
+    with open(script, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=script)
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+def profile_imports(script: str, project_path: str) -> Tuple[float, List[Tuple[str, float]]]:
+    """
+    Measure the cold import time of a script's modules in a fresh interpreter.
+
+    Args:
+        script (str): Path to the app script
+        project_path (str): Project directory (its src folder is put on the path)
+
+    Returns:
+        Tuple[float, List[Tuple[str, float]]]: Total import time in ms, and the cumulative
+        time in ms of each top-level package, slowest first
+    """
+    code = (
+        "import sys, time\n"
+        f"sys.path[:0] = [{os.path.join(project_path, 'src')!r}, {project_path!r}]\n"
+        "start = time.perf_counter()\n"
+        + "".join(f"import {module}\n" for module in app_imports(script))
+        + "print((time.perf_counter() - start) * 1000)\n"
+    )
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True, cwd=project_path, check=True)
+    packages: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        # Top-level imports are indented by one space, nested ones by more
+        if name.startswith("  ") or not cumulative.strip().isdigit():
+            continue
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0.0) + int(cumulative) / 1000
+    return float(result.stdout.strip().splitlines()[-1]), sorted(packages.items(), key=lambda item: -item[1])
+
+def log_import_profile(script: str, project_path: str, top: int = 10):
+    """Log the import time of the app and of its slowest packages."""
+    total, packages = profile_imports(script, project_path)
+    log_message("info", f"Import profile of {script}: {total:.0f} ms")
+    for package, ms in packages[:top]:
+        log_message("info", f"  {package:<24} {ms:8.1f} ms")
+
 def main():
     """Main launcher function."""
+    parser = argparse.ArgumentParser(description="Lance le calculateur de conditions de coupe.")
+    parser.add_argument("--profile-imports", action="store_true",
+                        help="Mesurer le temps d'import de l'application avant de la lancer (app.log)")
+    parser.add_argument("--trace", action="store_true",
+                        help=f"Chronométrer les étapes de chaque rerun de toutes les sessions ({TRACE_FILE})")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
     setup_logging()
     log_message("info", "Starting application launcher")
     
     # Check project directory
     project_path = os.path.dirname(os.path.abspath(__file__))
-    if not os.path.exists(os.path.join(project_path, "src", "app.py")):
+    if not os.path.exists(os.path.join(project_path, APP_SCRIPT)):
         log_message("error", f"Application file not found in: {project_path}")
         sys.exit(1)
         
     # Check requirements
     check_requirements()
+
+    if args.profile_imports:
+        log_import_profile(os.path.join(project_path, APP_SCRIPT), project_path)
     
+    # The app runs from the project directory: give it the trace file next to app.log
+    env = dict(os.environ, CUTTING_TRACE_FILE=os.path.join(os.path.dirname(os.path.abspath(LOG_FILE)), TRACE_FILE))
+    if args.trace:
+        env["CUTTING_TRACE"] = "1"
+        log_message("info", f"Tracing every rerun to {env['CUTTING_TRACE_FILE']}")
+
     # Launch application
     try:
-        log_message("info", "Launching application...")
+        log_message("info", f"Launching application ({(time.perf_counter() - start) * 1000:.0f} ms after start)...")
         subprocess.run(
-            [sys.executable, "-m", "streamlit", "run", "src/app.py"],
+            [sys.executable, "-m", "streamlit", "run", APP_SCRIPT],
             check=True,
-            cwd=project_path
+            cwd=project_path,
+            env=env
         )
     except subprocess.CalledProcessError as e:
         log_message("error", f"Application failed to start: {str(e)}")
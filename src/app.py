@@ -6,18 +6,19 @@ import streamlit as st
 from streamlit.runtime.scriptrunner import get_script_run_ctx
 import sys
 import os
+import json
+from collections import deque
 
 from ui.components import UIComponents
 from data.data_loader import DataLoader
-from calculations.cutting_calculations import (
-    rotation_speed_alesage,
-    coefficient_kc_alesage,
-    force_coupe_alesage,
-    power_coupe_alesage,
-    couple_coupe_alesage,
-    longueur_engagement_alesage,
-    get_local_capacity
-)
+from calculations.operations import compute_operation
+from config import TRACE_CONFIG
+from tracing import Tracer, discard, stage
+
+@st.cache_resource(show_spinner=False)
+def tracer() -> Tracer:
+    """Trace file writer shared by every session (CUTTING_TRACE_FILE is set by launcher.py next to app.log)."""
+    return Tracer(os.environ.get("CUTTING_TRACE_FILE", TRACE_CONFIG["file"]), max_bytes=TRACE_CONFIG["max_bytes"])
 
 def main():
     """Main application function."""
@@ -28,17 +29,31 @@ def main():
     if get_script_run_ctx() is None:
         UIComponents.error_message("Lancez l'app avec `streamlit run app.py`")
         sys.exit(1)
+
+    # Timing of the rerun stages (debug panel of the sidebar, or CUTTING_TRACE=1 for every session)
+    if "traces" not in st.session_state:
+        st.session_state.traces = deque(maxlen=TRACE_CONFIG["keep"])
+    tracing_on = (TRACE_CONFIG["enabled"] or os.environ.get("CUTTING_TRACE") == "1"
+                  or st.session_state.get("debug_trace", False))
+    if tracing_on:
+        tracer().start("rerun", session=get_script_run_ctx().session_id)
+    else:
+        discard()
         
     try:
         # Load data
+        stage("app.data")
         conditions = DataLoader.load_json("conditions_coupe_sandvik.json")
-        machine_caps = DataLoader.load_json("machine_capacities.json")
         
-        # Validate data
-        DataLoader.validate_cutting_conditions(conditions)
-        DataLoader.validate_machine_capacities(machine_caps)
+        # Validate data (once per file content)
+        stage("app.validation")
+        DataLoader.validate_file("conditions_coupe_sandvik.json", "conditions")
+        DataLoader.validate_file("machine_capacities.json", "curve")
+        # Sorted curve built once per file version (or mapped from its .mcap sibling)
+        machine_curve = DataLoader.load_machine_curve("machine_capacities.json")
         
         # Get machine parameters
+        stage("app.inputs")
         machine_params = UIComponents.machine_parameters_sidebar()
         
         # Tool selection
@@ -60,18 +75,17 @@ def main():
 
         # Debug : affiche toutes les valeurs juste avant le calcul
         st.write(f"DEBUG: D={D}, fn={fn}, Vc={Vc}, ap={ap}, hexv={hexv}, kr={kr}, m0={m0}, Y0={Y0}")
-        n = rotation_speed_alesage(Vc, D)
-        kc = coefficient_kc_alesage(kc1, hexv, m0, Y0)
-        Fc = force_coupe_alesage(kc, ap, fn)
-        Pc = power_coupe_alesage(Fc, Vc)
-        Mc = couple_coupe_alesage(Pc, n)
-        La = longueur_engagement_alesage(ap, kr)
-        local_power, local_torque = get_local_capacity(
-            n,
-            machine_caps,
+        stage("app.calculation")
+        r = compute_operation(
+            selected_tool, tool_conditions, D, Vc, fn, ap, hexv, kr,
+            machine_curve,
             machine_params["max_power"],
-            machine_params["max_torque"]
+            machine_params["max_torque"],
+            kc1=kc1, m0=m0
         )
+        n, kc, Fc, Pc, Mc, La = r.n, r.kc, r.Fc, r.Pc, r.Mc, r.La
+        local_power, local_torque = r.local_power, r.local_torque
+        stage("app.results")
         st.subheader("Résultats")
         st.metric("n (tr/min)", f"{n:.1f}")
         st.metric("Kc (N/mm²)", f"{kc:.1f}")
@@ -102,5 +116,9 @@ def main():
     except Exception as e:
         UIComponents.error_message(f"Une erreur inattendue s'est produite: {str(e)}")
 
+    if tracing_on:
+        st.session_state.traces.append(tracer().finish())
+    UIComponents.trace_sidebar(list(st.session_state.traces), tracer().path, TRACE_CONFIG["keep"])
+
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,311 @@
+"""
+Module for batch cutting condition calculations.
+Evaluates the cutting formulas over NumPy arrays or columnar tables in a single call,
+applying the same per-operation rules as the application.
+"""
+
+import math
+from typing import Any, Callable, Dict, Mapping, Optional
+import numpy as np
+
+from config import CUTTING_CONSTANTS, VALIDATION_THRESHOLDS
+from calculations.capacity_curve import CapacityCurve
+
+# Operation kinds
+DRILLING = "perçage"
+BORING = "alésage"
+GROOVING = "gorge"
+TURNING = "tournage"
+
+RESULT_FIELDS = ("n", "hex", "kc", "Fc", "Fa", "Pc", "Mc", "La")
+
+# Calculators by operation kind, filled by register_operation
+OPERATIONS: Dict[str, Callable[..., Dict[str, Any]]] = {}
+
+def register_operation(*kinds: str) -> Callable:
+    """
+    Register the calculator of one or more operation kinds.
+
+    A calculator receives the operation parameters from operation_parameters()
+    and the broadcast D, Vc, fn, ap and hexv arrays, and returns the hex, kc,
+    Fc, Fa, Pc and La arrays.
+
+    Args:
+        *kinds (str): Operation kinds handled by the decorated function
+
+    Returns:
+        Callable: Decorator registering the function
+    """
+    def decorator(func: Callable) -> Callable:
+        for kind in kinds:
+            OPERATIONS[kind] = func
+        return func
+    return decorator
+
+def operation_kind(tool_conditions: Dict[str, Any]) -> str:
+    """
+    Get the calculation rule set to apply for an insert.
+
+    Args:
+        tool_conditions (Dict[str, Any]): Cutting conditions of the insert
+
+    Returns:
+        str: One of DRILLING, BORING, GROOVING or TURNING
+    """
+    operation = str(tool_conditions.get("operation", "")).lower()
+    if "perçage" in operation:
+        return DRILLING
+    if "alésage" in operation:
+        return BORING
+    if "gorge" in operation or "insert_length_mm" in tool_conditions:
+        return GROOVING
+    return TURNING
+
+def operation_parameters(tool_conditions: Dict[str, Any], kr: Any = None,
+                         kc1: Any = None, m0: Any = None, Y0: Any = None) -> Dict[str, Any]:
+    """
+    Get the constants the operation rules apply for an insert.
+
+    Args:
+        tool_conditions (Dict[str, Any]): Cutting conditions of the insert
+        kr (Any): Requested cutting edge angle in degrees (None means default)
+        kc1 (Any): Specific cutting force for 1mm² chip area (None means default)
+        m0 (Any): Material constant (None means default)
+        Y0 (Any): Rake angle in %, replacing the one of the operation rules (None keeps it)
+
+    Returns:
+        Dict[str, Any]: kind, kc1, m0, Y0, kr and ap (the fixed depth of cut, or None)
+    """
+    kind = operation_kind(tool_conditions)
+    params = {
+        "kind": kind,
+        "kc1": CUTTING_CONSTANTS["kc1"] if kc1 is None else kc1,
+        "m0": CUTTING_CONSTANTS["m0"] if m0 is None else m0,
+        "Y0": tool_conditions.get("Y0", CUTTING_CONSTANTS["Y0"]),
+        "kr": CUTTING_CONSTANTS["kr"] if kr is None else kr,
+        "ap": None
+    }
+    if kind == DRILLING:
+        params.update(Y0=CUTTING_CONSTANTS["drilling_Y0"], kr=CUTTING_CONSTANTS["drilling_kr"])
+    elif kind == BORING:
+        params.update(kr=CUTTING_CONSTANTS["boring_kr"], hex_rec=tool_conditions.get("hex_rec"))
+    elif kind == GROOVING:
+        params.update(Y0=CUTTING_CONSTANTS["grooving_Y0"], ap=tool_conditions.get("insert_length_mm", 0.0))
+    if Y0 is not None:
+        params["Y0"] = Y0
+    return params
+
+def _as_array(values: Any, size: int) -> np.ndarray:
+    """Broadcast a scalar or array-like to a float64 array of the given size."""
+    return np.broadcast_to(np.asarray(values, dtype=np.float64), (size,))
+
+def _sin_kr(kr: Any) -> Any:
+    """sin(kr), kept scalar when kr is a scalar; NaN angles fall back to the default."""
+    if np.ndim(kr) == 0:
+        return math.sin(math.radians(kr))
+    return np.sin(np.radians(np.where(np.isnan(kr), CUTTING_CONSTANTS["kr"], kr)))
+
+def _check_hex(hexv: np.ndarray):
+    """Reject zero chip thicknesses like coefficient_kc does."""
+    if np.any(hexv == 0):
+        raise ValueError("Invalid input parameters: hex coordinate cannot be zero")
+
+@register_operation(DRILLING)
+def _drilling(params: Dict[str, Any], D: np.ndarray, Vc: np.ndarray, fn: np.ndarray,
+              ap: np.ndarray, hexv: Optional[np.ndarray]) -> Dict[str, Any]:
+    """Perçage: kc on (2/hex)^m0, axial force Fa = kc × fn × D and Pc = Fa × Vc / 240000."""
+    hexv = fn * _sin_kr(params["kr"])
+    _check_hex(hexv)
+    kc = (2 / hexv)**params["m0"]
+    kc *= params["kc1"] * (1 - params["Y0"]/100)
+    Fa = kc * fn
+    Fa *= D
+    Pc = Fa * Vc
+    Pc /= CUTTING_CONSTANTS["drilling_power_divisor"]
+    nan = np.full(D.size, np.nan)
+    return {"hex": hexv, "kc": kc, "Fc": nan, "Fa": Fa, "Pc": Pc, "La": nan}
+
+@register_operation(BORING, GROOVING, TURNING)
+def _turning(params: Dict[str, Any], D: np.ndarray, Vc: np.ndarray, fn: np.ndarray,
+             ap: np.ndarray, hexv: Optional[np.ndarray]) -> Dict[str, Any]:
+    """Alésage, gorge and turning: Fc = kc × ap × fn and Pc = Fc × Vc / 60000."""
+    sin_kr = _sin_kr(params["kr"])
+    if params["kind"] == BORING:
+        default_hex = params["hex_rec"] if params["hex_rec"] is not None else fn * sin_kr
+        hexv = _as_array(default_hex if hexv is None else hexv, D.size)
+        hexv = np.where(np.isnan(hexv), default_hex, hexv)
+    else:
+        hexv = fn * sin_kr
+    _check_hex(hexv)
+    kc = hexv**-params["m0"]
+    kc *= params["kc1"] * (1 - params["Y0"]/100)
+    Fc = kc * ap
+    Fc *= fn
+    Pc = Fc * Vc
+    Pc /= 60000
+    with np.errstate(divide="ignore", invalid="ignore"):
+        La = ap / sin_kr
+    La[~(ap > 0)] = 0.0
+    return {"hex": hexv, "kc": kc, "Fc": Fc, "Fa": np.full(D.size, np.nan), "Pc": Pc, "La": La}
+
+def evaluate_batch(tool_conditions: Dict[str, Any], D: Any, Vc: Any, fn: Any,
+                   ap: Any = None, hexv: Any = None, kr: Any = None,
+                   kc1: Any = None, m0: Any = None, Y0: Any = None) -> Dict[str, np.ndarray]:
+    """
+    Evaluate the cutting formulas for many operating points of one insert.
+
+    Scalars are broadcast against arrays, the constants kc1, m0 and Y0
+    included (sampled material data). Fields that do not apply to the
+    operation (Fc for drilling, Fa and La otherwise) are returned as NaN.
+
+    Args:
+        tool_conditions (Dict[str, Any]): Cutting conditions of the insert
+        D (Any): Tool or workpiece diameter in mm
+        Vc (Any): Cutting speed in m/min
+        fn (Any): Feed per revolution in mm
+        ap (Any): Depth of cut in mm (ignored for drilling and grooving)
+        hexv (Any): Chip thickness in mm (boring only, NaN or None means hex_rec)
+        kr (Any): Cutting edge angle in degrees (turning and grooving only, NaN or None means default)
+        kc1 (Any): Specific cutting force for 1mm² chip area (None means default)
+        m0 (Any): Material constant (None means default)
+        Y0 (Any): Rake angle in % (None means the value of the operation rules)
+
+    Returns:
+        Dict[str, np.ndarray]: Arrays n, hex, kc, Fc, Fa, Pc, Mc and La
+
+    Raises:
+        ValueError: If a diameter is not positive or a chip thickness is zero
+    """
+    size = np.broadcast(*(np.asarray(v) for v in (D, Vc, fn, ap, hexv, kr, kc1, m0, Y0) if v is not None)).size
+    params = operation_parameters(tool_conditions, None if kr is None else _as_array(kr, size), kc1, m0, Y0)
+    D, Vc, fn = (_as_array(v, size) for v in (D, Vc, fn))
+    if params["ap"] is not None:
+        ap = params["ap"]
+    ap = _as_array(0.0 if ap is None else ap, size)
+
+    if np.any(D <= 0):
+        raise ValueError("Tool diameter must be positive")
+    # Same operation order as rotation_speed() and torque_mc(), so the scalar and
+    # batch paths give the same n bit for bit (it selects the capacity bracket)
+    n = 1000 * Vc
+    n /= np.pi * D
+
+    results = OPERATIONS[params["kind"]](params, D, Vc, fn, ap, hexv)
+    Mc = 30000 * results["Pc"]
+    Mc /= n * np.pi
+    return {
+        "n": n,
+        "hex": np.broadcast_to(results["hex"], (size,)),
+        "kc": results["kc"],
+        "Fc": results["Fc"],
+        "Fa": results["Fa"],
+        "Pc": results["Pc"],
+        "Mc": Mc,
+        "La": results["La"]
+    }
+
+def evaluate_table(table: Mapping[str, Any], conditions: Dict[str, Dict[str, Any]],
+                   tool_column: str = "Plaquette") -> Dict[str, np.ndarray]:
+    """
+    Evaluate the cutting formulas for every row of a columnar table.
+
+    The table may be a pandas DataFrame or a mapping of column names to arrays.
+    Required columns are the insert name, D, Vc and fn; ap, hex and kr are
+    optional. Rows are grouped by insert and each group is evaluated at once.
+
+    Args:
+        table (Mapping[str, Any]): Columnar table of operating points
+        conditions (Dict[str, Dict[str, Any]]): Cutting conditions by insert
+        tool_column (str): Name of the insert column
+
+    Returns:
+        Dict[str, np.ndarray]: Arrays n, hex, kc, Fc, Fa, Pc, Mc and La, one value per row
+
+    Raises:
+        ValueError: If an insert is unknown or the inputs are invalid
+    """
+    tools, codes = np.unique(np.asarray(table[tool_column]).astype(str), return_inverse=True)
+    columns = {
+        name: np.asarray(table[name], dtype=np.float64)
+        for name in ("D", "Vc", "fn", "ap", "hex", "kr") if name in table
+    }
+    size = len(codes)
+    results = {field: np.empty(size) for field in RESULT_FIELDS}
+
+    for code, tool in enumerate(tools):
+        if tool not in conditions:
+            raise ValueError(f"Unknown insert: {tool}")
+        rows = np.flatnonzero(codes == code) if len(tools) > 1 else slice(None)
+        group = {name: values[rows] for name, values in columns.items()}
+        evaluated = evaluate_batch(
+            conditions[tool],
+            group["D"],
+            group["Vc"],
+            group["fn"],
+            ap=group.get("ap"),
+            hexv=group.get("hex"),
+            kr=group.get("kr")
+        )
+        for field in RESULT_FIELDS:
+            results[field][rows] = evaluated[field]
+
+    return results
+
+CHECK_FIELDS = RESULT_FIELDS + ("local_power", "local_torque", "valid", "power_ok", "torque_ok", "engagement_ok", "ok")
+
+def check_table(table: Mapping[str, Any], conditions: Dict[str, Dict[str, Any]], curve: CapacityCurve,
+                max_power: float, max_torque: float, tool_column: str = "Plaquette") -> Dict[str, np.ndarray]:
+    """
+    Evaluate every row of a job table and check it against the machine capacity.
+
+    Rows with an unknown insert or unusable inputs (missing values, D ≤ 0,
+    fn ≤ 0, kr outside ]0, 180[ for the operations that use the entered kr,
+    hex = 0) are flagged valid=False and ok=False instead of raising, so one bad
+    line does not stop a whole job sheet.
+
+    Args:
+        table (Mapping[str, Any]): Columnar table of operating points
+        conditions (Dict[str, Dict[str, Any]]): Cutting conditions by insert
+        curve (CapacityCurve): Machine capacity curve
+        max_power (float): Power outside the curve range in kW
+        max_torque (float): Torque outside the curve range in Nm
+        tool_column (str): Name of the insert column
+
+    Returns:
+        Dict[str, np.ndarray]: Result arrays, interpolated capacities and pass/fail flags
+    """
+    tools = np.asarray(table[tool_column]).astype(str)
+    D, Vc, fn = (np.asarray(table[name], dtype=np.float64) for name in ("D", "Vc", "fn"))
+    # Membership is tested once per distinct insert, so large catalogs are not listed
+    names, inverse = np.unique(tools, return_inverse=True)
+    known = np.array([name in conditions for name in names], dtype=bool)
+    valid = known[inverse.reshape(-1)] & (D > 0) & (fn > 0) & np.isfinite(Vc)
+    if "hex" in table:
+        valid &= np.asarray(table["hex"], dtype=np.float64) != 0
+    if "kr" in table:
+        # Drilling and boring fix kr by rule; a missing kr (NaN) means the default angle
+        uses_kr = np.array([name in conditions and operation_kind(conditions[name]) not in (DRILLING, BORING)
+                            for name in names], dtype=bool)
+        kr = np.asarray(table["kr"], dtype=np.float64)
+        valid &= ~uses_kr[inverse.reshape(-1)] | np.isnan(kr) | ((kr > 0) & (kr < 180))
+
+    size = len(tools)
+    results = {field: np.full(size, np.nan) for field in RESULT_FIELDS}
+    if valid.all():
+        results = evaluate_table(table, conditions, tool_column)
+    elif valid.any():
+        rows = np.flatnonzero(valid)
+        subset = {name: np.asarray(table[name])[rows] for name in (tool_column, "D", "Vc", "fn", "ap", "hex", "kr") if name in table}
+        for field, values in evaluate_table(subset, conditions, tool_column).items():
+            results[field][rows] = values
+
+    local_power, local_torque = curve.query_array(results["n"], max_power, max_torque)
+    max_la = VALIDATION_THRESHOLDS["engagement_warning"] * D
+    results["local_power"] = local_power
+    results["local_torque"] = local_torque
+    results["valid"] = valid
+    results["power_ok"] = valid & (results["Pc"] <= local_power)
+    results["torque_ok"] = valid & (results["Mc"] <= local_torque)
+    results["engagement_ok"] = valid & ~(results["La"] > max_la)
+    results["ok"] = results["power_ok"] & results["torque_ok"] & results["engagement_ok"]
+    return results
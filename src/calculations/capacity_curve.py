@@ -0,0 +1,294 @@
+"""
+Module for machine capacity curves.
+Holds a digitized power/torque curve as sorted contiguous arrays and answers
+interpolation queries without re-sorting or scanning the records.
+"""
+
+import bisect
+import hashlib
+import json
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+
+# Above this size, scalar lookups use np.searchsorted instead of a Python list copy
+_BISECT_MAX_POINTS = 4096
+
+class CapacityBracket(NamedTuple):
+    """The two curve points surrounding a rotation speed and the interpolation factor."""
+    n1: float
+    n2: float
+    p1: float
+    p2: float
+    t1: float
+    t2: float
+    alpha: float
+
+class CapacityCurve:
+    """Sorted machine capacity curve with O(log n) scalar and vectorized array queries."""
+
+    def __init__(self, n: Any, power: Any, torque: Any, machine_id: str = "machine"):
+        """
+        Build the curve from three parallel arrays.
+
+        Args:
+            n (Any): Rotation speeds in RPM
+            power (Any): Available power in kW at each speed
+            torque (Any): Available torque in Nm at each speed
+            machine_id (str): Identifier of the machine the curve belongs to
+        """
+        n = np.asarray(n, dtype=np.float64)
+        power = np.asarray(power, dtype=np.float64)
+        torque = np.asarray(torque, dtype=np.float64)
+        if not n.shape == power.shape == torque.shape or n.ndim != 1:
+            raise ValueError("n, power and torque must be 1-D arrays of the same length")
+        if n.size > 1 and np.any(n[1:] < n[:-1]):
+            order = np.argsort(n, kind="stable")
+            n, power, torque = n[order], power[order], torque[order]
+        self.n = np.ascontiguousarray(n)
+        self.power = np.ascontiguousarray(power)
+        self.torque = np.ascontiguousarray(torque)
+        self.machine_id = machine_id
+        self._n_list = None
+        self._content_hash = None
+
+    @classmethod
+    def from_sorted_arrays(cls, n: np.ndarray, power: np.ndarray, torque: np.ndarray,
+                           machine_id: str = "machine", content_hash: Optional[str] = None) -> "CapacityCurve":
+        """
+        Wrap arrays already sorted by n without copying or checking them.
+
+        Used for memory-mapped curve files, whose arrays are written sorted and
+        whose content hash is stored in the header.
+
+        Args:
+            n (np.ndarray): Sorted float64 rotation speeds in RPM
+            power (np.ndarray): Available power in kW at each speed
+            torque (np.ndarray): Available torque in Nm at each speed
+            machine_id (str): Identifier of the machine the curve belongs to
+            content_hash (Optional[str]): Known content hash, computed lazily if None
+
+        Returns:
+            CapacityCurve: Curve backed by the given arrays
+        """
+        curve = cls.__new__(cls)
+        curve.n, curve.power, curve.torque = n, power, torque
+        curve.machine_id = machine_id
+        curve._n_list = None
+        curve._content_hash = content_hash
+        return curve
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, float]], machine_id: str = "machine") -> "CapacityCurve":
+        """
+        Build the curve from machine capacity records.
+
+        Args:
+            records (List[Dict[str, float]]): Records with n, power and torque fields
+            machine_id (str): Identifier of the machine the curve belongs to
+
+        Returns:
+            CapacityCurve: The sorted curve
+        """
+        return cls(
+            [rec["n"] for rec in records],
+            [rec["power"] for rec in records],
+            [rec["torque"] for rec in records],
+            machine_id
+        )
+
+    def __len__(self) -> int:
+        return self.n.size
+
+    @property
+    def content_hash(self) -> str:
+        """Hash of the curve values, used as a version identifier in caches."""
+        if self._content_hash is None:
+            digest = hashlib.sha1()
+            for values in (self.n, self.power, self.torque):
+                digest.update(values.tobytes())
+            self._content_hash = digest.hexdigest()
+        return self._content_hash
+
+    def bracket(self, n: float) -> Optional[CapacityBracket]:
+        """
+        Find the two curve points surrounding a rotation speed.
+
+        Args:
+            n (float): Rotation speed in RPM
+
+        Returns:
+            Optional[CapacityBracket]: The bracketing points and α, or None if n is
+            outside the curve range
+        """
+        size = self.n.size
+        if size > _BISECT_MAX_POINTS:
+            # Large (typically memory-mapped) curves are searched in place
+            if not self.n[0] < n < self.n[-1]:
+                return None
+            i = int(np.searchsorted(self.n, n, side="left"))
+            n1, n2 = float(self.n[i-1]), float(self.n[i])
+        else:
+            if self._n_list is None:
+                # Python floats make bisect several times faster than np.searchsorted on scalars
+                self._n_list = self.n.tolist()
+            ns = self._n_list
+            if size < 2 or not ns[0] < n < ns[-1]:
+                return None
+            i = bisect.bisect_left(ns, n)
+            n1, n2 = ns[i-1], ns[i]
+        alpha = (n - n1) / (n2 - n1)
+        return CapacityBracket(
+            n1, n2,
+            float(self.power[i-1]), float(self.power[i]),
+            float(self.torque[i-1]), float(self.torque[i]),
+            alpha
+        )
+
+    def query(self, n: float, max_power: float, max_torque: float) -> Tuple[float, float]:
+        """
+        Get machine capacity (power and torque) for a given rotation speed.
+
+        Args:
+            n (float): Rotation speed in RPM
+            max_power (float): Power returned outside the curve range in kW
+            max_torque (float): Torque returned outside the curve range in Nm
+
+        Returns:
+            Tuple[float, float]: (power, torque) for the given rotation speed
+        """
+        b = self.bracket(n)
+        if b is None:
+            return max_power, max_torque
+        return b.p1 + b.alpha * (b.p2 - b.p1), b.t1 + b.alpha * (b.t2 - b.t1)
+
+    def query_array(self, n: Any, max_power: float, max_torque: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get machine capacity for many rotation speeds in one pass.
+
+        Args:
+            n (Any): Rotation speeds in RPM
+            max_power (float): Power returned outside the curve range in kW
+            max_torque (float): Torque returned outside the curve range in Nm
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (power, torque) arrays shaped like n
+        """
+        n = np.asarray(n, dtype=np.float64)
+        if self.n.size < 2:
+            return np.full(n.shape, max_power, dtype=np.float64), np.full(n.shape, max_torque, dtype=np.float64)
+        inside = (n > self.n[0]) & (n < self.n[-1])
+        i = np.clip(np.searchsorted(self.n, n, side="left"), 1, self.n.size - 1)
+        n1, n2 = self.n[i-1], self.n[i]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            alpha = (n - n1) / (n2 - n1)
+        power = self.power[i-1] + alpha * (self.power[i] - self.power[i-1])
+        torque = self.torque[i-1] + alpha * (self.torque[i] - self.torque[i-1])
+        return np.where(inside, power, max_power), np.where(inside, torque, max_torque)
+
+    def resample(self, size: int = 4096) -> "UniformCapacityTable":
+        """
+        Resample the curve on a uniform grid for O(1) lookups.
+
+        Args:
+            size (int): Number of grid points
+
+        Returns:
+            UniformCapacityTable: Lookup table spanning the curve range
+        """
+        if self.n.size < 2:
+            raise ValueError("At least two curve points are needed to resample")
+        grid = np.linspace(self.n[0], self.n[-1], size)
+        return UniformCapacityTable(
+            grid[0],
+            grid[1] - grid[0],
+            np.interp(grid, self.n, self.power),
+            np.interp(grid, self.n, self.torque)
+        )
+
+class UniformCapacityTable:
+    """Capacity curve resampled on a uniform speed grid, answering queries in O(1)."""
+
+    def __init__(self, n0: float, dn: float, power: np.ndarray, torque: np.ndarray):
+        """
+        Build the table from a uniform grid.
+
+        Args:
+            n0 (float): First grid speed in RPM
+            dn (float): Grid step in RPM
+            power (np.ndarray): Power in kW at each grid speed
+            torque (np.ndarray): Torque in Nm at each grid speed
+        """
+        self.n0 = float(n0)
+        self.dn = float(dn)
+        self.power = np.ascontiguousarray(power, dtype=np.float64)
+        self.torque = np.ascontiguousarray(torque, dtype=np.float64)
+        self.n_max = self.n0 + self.dn * (self.power.size - 1)
+
+    def query(self, n: float, max_power: float, max_torque: float) -> Tuple[float, float]:
+        """
+        Get machine capacity for a given rotation speed by direct indexing.
+
+        Args:
+            n (float): Rotation speed in RPM
+            max_power (float): Power returned outside the curve range in kW
+            max_torque (float): Torque returned outside the curve range in Nm
+
+        Returns:
+            Tuple[float, float]: (power, torque) for the given rotation speed
+        """
+        if not self.n0 < n < self.n_max:
+            return max_power, max_torque
+        x = (n - self.n0) / self.dn
+        i = min(int(x), self.power.size - 2)
+        alpha = x - i
+        p1, p2 = float(self.power[i]), float(self.power[i+1])
+        t1, t2 = float(self.torque[i]), float(self.torque[i+1])
+        return p1 + alpha * (p2 - p1), t1 + alpha * (t2 - t1)
+
+    def query_array(self, n: Any, max_power: float, max_torque: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get machine capacity for many rotation speeds by direct indexing.
+
+        Args:
+            n (Any): Rotation speeds in RPM
+            max_power (float): Power returned outside the curve range in kW
+            max_torque (float): Torque returned outside the curve range in Nm
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (power, torque) arrays shaped like n
+        """
+        n = np.asarray(n, dtype=np.float64)
+        inside = (n > self.n0) & (n < self.n_max)
+        x = np.clip(np.nan_to_num((n - self.n0) / self.dn), 0, self.power.size - 1)
+        i = np.minimum(x.astype(np.intp), self.power.size - 2)
+        alpha = x - i
+        power = self.power[i] + alpha * (self.power[i+1] - self.power[i])
+        torque = self.torque[i] + alpha * (self.torque[i+1] - self.torque[i])
+        return np.where(inside, power, max_power), np.where(inside, torque, max_torque)
+
+@lru_cache(maxsize=16)
+def _load_curve(path: str, mtime_ns: int, size: int) -> CapacityCurve:
+    """Build a curve from a JSON records file (cached per file version)."""
+    with open(path, encoding="utf-8") as f:
+        records = json.load(f)
+    return CapacityCurve.from_records(records, os.path.splitext(os.path.basename(path))[0])
+
+def load_capacity_curve(path: str) -> CapacityCurve:
+    """
+    Load a capacity curve file, building the sorted arrays once per file version.
+
+    Args:
+        path (str): Path to the machine capacities JSON file
+
+    Returns:
+        CapacityCurve: The sorted curve
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"File not found: {path}")
+    stat = os.stat(path)
+    return _load_curve(os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
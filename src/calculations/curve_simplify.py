@@ -0,0 +1,261 @@
+"""
+Module for the preprocessing of digitized capacity curves.
+Smooths the digitization noise with a local linear regression capped to the
+tolerances, then removes the points that linear interpolation can rebuild
+within a maximum power and torque error of the source points (Douglas-Peucker
+on the vertical error), and reports the error introduced by each stage. For
+display, curves are also reduced to a fixed number of points that keeps their
+visual shape (Largest-Triangle-Three-Buckets).
+"""
+
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from calculations.capacity_curve import CapacityCurve
+
+# Relative slack of SimplificationReport.within() for the rounding of the interpolation
+ROUNDING_TOLERANCE = 1e-9
+
+class SimplificationReport(NamedTuple):
+    """Size and error of a preprocessed curve, measured at the source speeds."""
+    points_in: int
+    points_out: int
+    smoothing_power_error: float  # max |smoothed - source| in kW
+    smoothing_torque_error: float  # max |smoothed - source| in Nm
+    simplification_power_error: float  # max |simplified - smoothed| in kW
+    simplification_torque_error: float  # max |simplified - smoothed| in Nm
+    max_power_error: float  # max |simplified - source| in kW
+    max_torque_error: float  # max |simplified - source| in Nm
+    rms_power_error: float  # RMS of simplified - source in kW
+    rms_torque_error: float  # RMS of simplified - source in Nm
+
+    @property
+    def reduction(self) -> float:
+        """Share of the source points removed."""
+        return 1 - self.points_out / self.points_in if self.points_in else 0.0
+
+    def within(self, max_power_error: float, max_torque_error: float) -> bool:
+        """
+        Whether the simplified curve stays within the tolerances of the source points.
+
+        simplify_curve() guarantees it for its own tolerances (up to rounding);
+        callers check it before writing a curve.
+
+        Args:
+            max_power_error (float): Maximum power error in kW
+            max_torque_error (float): Maximum torque error in Nm
+
+        Returns:
+            bool: True if max_power_error and max_torque_error are within the tolerances
+        """
+        return (self.max_power_error <= max_power_error * (1 + ROUNDING_TOLERANCE)
+                and self.max_torque_error <= max_torque_error * (1 + ROUNDING_TOLERANCE))
+
+def local_linear_smooth(x: np.ndarray, y: np.ndarray, window: int) -> np.ndarray:
+    """
+    Smooth y with a least-squares line fitted on the window nearest points.
+
+    Unlike a moving average, the fit follows slopes and is not biased at the
+    ends of the curve. Computed in O(n) with cumulative sums. The result is not
+    monotone, even where y is.
+
+    Args:
+        x (np.ndarray): Sorted abscissas
+        y (np.ndarray): Values to smooth
+        window (int): Points per fit (odd, at least 3; windows are shifted inward at the ends)
+
+    Returns:
+        np.ndarray: Smoothed values at x
+    """
+    size = x.size
+    if window < 3 or size < 3:
+        return y.astype(np.float64, copy=True)
+    window = min(window | 1, size - (1 - size % 2))
+    half = window // 2
+    start = np.clip(np.arange(size) - half, 0, size - window)
+    end = start + window
+    # Centering x keeps the sums well conditioned
+    xc = x - x.mean()
+    sums = [np.concatenate(([0.0], np.cumsum(v))) for v in (xc, y, xc * xc, xc * y)]
+    sx, sy, sxx, sxy = (s[end] - s[start] for s in sums)
+    denominator = window * sxx - sx * sx
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.where(denominator > 0, (window * sxy - sx * sy) / denominator, 0.0)
+    intercept = (sy - slope * sx) / window
+    return intercept + slope * xc
+
+def douglas_peucker(x: np.ndarray, values: Sequence[np.ndarray], tolerances: Sequence[float],
+                    targets: Optional[Sequence[np.ndarray]] = None) -> np.ndarray:
+    """
+    Select the points to keep so that linear interpolation stays within the tolerances.
+
+    The error of a dropped point is its vertical distance to the chord of the
+    kept points around it (the error of an interpolated lookup), checked on
+    every value series against its own tolerance.
+
+    Args:
+        x (np.ndarray): Sorted abscissas
+        values (Sequence[np.ndarray]): Value series sharing x
+        tolerances (Sequence[float]): Maximum error of each series
+        targets (Optional[Sequence[np.ndarray]]): Series the chords are compared with
+            (default: values), e.g. the source points of smoothed values
+
+    Returns:
+        np.ndarray: Sorted indices of the kept points (always includes both ends)
+    """
+    size = x.size
+    if size <= 2:
+        return np.arange(size)
+    if targets is None:
+        targets = values
+    keep = np.zeros(size, dtype=bool)
+    keep[[0, -1]] = True
+    stack: List[Tuple[int, int]] = [(0, size - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2:
+            continue
+        inner = slice(i + 1, j)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            alpha = (x[inner] - x[i]) / (x[j] - x[i])
+        alpha = np.nan_to_num(alpha)
+        # Worst error relative to its tolerance over all series
+        ratio = np.zeros(j - i - 1)
+        for y, target, tolerance in zip(values, targets, tolerances):
+            error = np.abs(target[inner] - (y[i] + alpha * (y[j] - y[i])))
+            ratio = np.maximum(ratio, error / tolerance if tolerance > 0 else np.where(error > 0, np.inf, 0.0))
+        k = int(np.argmax(ratio))
+        if ratio[k] > 1:
+            split = i + 1 + k
+            keep[split] = True
+            stack.append((i, split))
+            stack.append((split, j))
+    return np.flatnonzero(keep)
+
+def simplify_curve(curve: CapacityCurve, max_power_error: float, max_torque_error: float,
+                   window: int = 0) -> Tuple[CapacityCurve, SimplificationReport]:
+    """
+    Smooth and simplify a digitized capacity curve under a maximum error.
+
+    The smoothed values are clipped to the tolerances around the source points
+    and the dropped points are checked against the source, so the interpolated
+    result stays within max_power_error and max_torque_error of every source
+    point whatever the window.
+
+    Args:
+        curve (CapacityCurve): Source curve
+        max_power_error (float): Maximum power error to the source points in kW
+        max_torque_error (float): Maximum torque error to the source points in Nm
+        window (int): Points per local linear fit, 0 to skip smoothing
+
+    Returns:
+        Tuple[CapacityCurve, SimplificationReport]: Simplified curve and its errors
+
+    Raises:
+        ValueError: If a tolerance is negative
+    """
+    if max_power_error < 0 or max_torque_error < 0:
+        raise ValueError("Maximum errors must be positive")
+    n = np.asarray(curve.n, dtype=np.float64)
+    power = np.asarray(curve.power, dtype=np.float64)
+    torque = np.asarray(curve.torque, dtype=np.float64)
+    smooth_power = np.clip(local_linear_smooth(n, power, window), power - max_power_error, power + max_power_error)
+    smooth_torque = np.clip(local_linear_smooth(n, torque, window), torque - max_torque_error,
+                            torque + max_torque_error)
+
+    kept = douglas_peucker(n, (smooth_power, smooth_torque), (max_power_error, max_torque_error),
+                           targets=(power, torque))
+    simplified = CapacityCurve(n[kept], smooth_power[kept], smooth_torque[kept], curve.machine_id)
+
+    def max_abs(values: np.ndarray) -> float:
+        return float(np.max(np.abs(values))) if values.size else 0.0
+
+    def rms(values: np.ndarray) -> float:
+        return float(np.sqrt(np.mean(values * values))) if values.size else 0.0
+
+    # Linear interpolation of the kept points at every source speed
+    power_out = np.interp(n, simplified.n, simplified.power) if len(simplified) else power
+    torque_out = np.interp(n, simplified.n, simplified.torque) if len(simplified) else torque
+    report = SimplificationReport(
+        points_in=len(curve),
+        points_out=len(simplified),
+        smoothing_power_error=max_abs(smooth_power - power),
+        smoothing_torque_error=max_abs(smooth_torque - torque),
+        simplification_power_error=max_abs(power_out - smooth_power),
+        simplification_torque_error=max_abs(torque_out - smooth_torque),
+        max_power_error=max_abs(power_out - power),
+        max_torque_error=max_abs(torque_out - torque),
+        rms_power_error=rms(power_out - power),
+        rms_torque_error=rms(torque_out - torque)
+    )
+    return simplified, report
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Select threshold points that keep the visual shape of a series (Largest-Triangle-Three-Buckets).
+
+    The inner points are split into threshold - 2 buckets; from each bucket
+    the point forming the largest triangle with the point kept in the
+    previous bucket and the average of the next bucket is kept, so peaks and
+    knees survive where striding would skip them.
+
+    Args:
+        x (np.ndarray): Sorted abscissas
+        y (np.ndarray): Values at x
+        threshold (int): Number of points to keep (at least 3)
+
+    Returns:
+        np.ndarray: Sorted indices of the kept points (both ends included), all indices
+        when the series has no more than threshold points
+
+    Raises:
+        ValueError: If threshold is below 3
+    """
+    if threshold < 3:
+        raise ValueError(f"LTTB needs at least 3 points, got {threshold}")
+    size = x.size
+    if size <= threshold:
+        return np.arange(size)
+    # Bucket b (1 .. threshold - 2) spans [edges[b - 1], edges[b]) of the inner points
+    edges = (np.arange(threshold - 1) * ((size - 2) / (threshold - 2))).astype(np.int64) + 1
+    edges[-1] = size - 1
+    # Average point of every bucket at once, the last point standing for the bucket after the last
+    cx, cy = np.cumsum(x), np.cumsum(y)
+    lengths = np.diff(edges)
+    avg_x = np.append((cx[edges[1:] - 1] - cx[edges[:-1] - 1]) / lengths, x[-1])
+    avg_y = np.append((cy[edges[1:] - 1] - cy[edges[:-1] - 1]) / lengths, y[-1])
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, size - 1
+    a = 0
+    for b in range(threshold - 2):
+        start, stop = edges[b], edges[b + 1]
+        bx, by = x[start:stop], y[start:stop]
+        # Twice the triangle area, up to the sign
+        area = np.abs((x[a] - avg_x[b + 1]) * (by - y[a]) - (x[a] - bx) * (avg_y[b + 1] - y[a]))
+        a = start + int(np.argmax(area))
+        kept[b + 1] = a
+    return kept
+
+def downsample_curve(curve: CapacityCurve, max_points: int) -> CapacityCurve:
+    """
+    Reduce a capacity curve to about max_points points for plotting.
+
+    Power and torque are downsampled separately with lttb() on half the
+    points each, and the union of the kept speeds is returned, so both
+    traces keep their shape on a shared axis.
+
+    Args:
+        curve (CapacityCurve): Source curve
+        max_points (int): Maximum number of points of the result (at least 6)
+
+    Returns:
+        CapacityCurve: The curve itself if it is small enough, otherwise a curve over a subset of its points
+    """
+    if len(curve) <= max_points:
+        return curve
+    n = np.asarray(curve.n, dtype=np.float64)
+    kept = np.union1d(lttb(n, np.asarray(curve.power, dtype=np.float64), max_points // 2),
+                      lttb(n, np.asarray(curve.torque, dtype=np.float64), max_points // 2))
+    return CapacityCurve.from_sorted_arrays(n[kept], np.asarray(curve.power)[kept],
+                                            np.asarray(curve.torque)[kept], curve.machine_id)
@@ -0,0 +1,79 @@
+"""
+Module for feasibility maps.
+Evaluates power and torque utilization against the interpolated machine capacity
+over a whole (Vc, fn) or (Vc, ap) plane in one vectorized pass.
+"""
+
+from typing import Any, Dict, NamedTuple, Optional
+import numpy as np
+
+from calculations.batch import evaluate_batch
+from calculations.capacity_curve import CapacityCurve
+
+class FeasibilityGrid(NamedTuple):
+    """Utilization of the machine capacity over a plane of operating points."""
+    x_name: str
+    y_name: str
+    x: np.ndarray
+    y: np.ndarray
+    power_utilization: np.ndarray
+    torque_utilization: np.ndarray
+
+    @property
+    def utilization(self) -> np.ndarray:
+        """Highest of the power and torque utilization at each grid point."""
+        return np.maximum(self.power_utilization, self.torque_utilization)
+
+def feasibility_grid(tool_conditions: Dict[str, Any], D: float, curve: CapacityCurve,
+                     max_power: float, max_torque: float, y_name: str = "fn",
+                     fn: Optional[float] = None, ap: Optional[float] = None,
+                     hexv: Optional[float] = None, kr: Optional[float] = None,
+                     resolution: int = 400) -> FeasibilityGrid:
+    """
+    Evaluate the machine utilization over the Vc × fn or Vc × ap plane of an insert.
+
+    The plane spans the insert's admissible ranges; the variable that is not on
+    an axis is held at the given value. Utilization is Pc / interpolated power
+    and Mc / interpolated torque, so values above 1 exceed the machine.
+
+    Args:
+        tool_conditions (Dict[str, Any]): Cutting conditions of the insert
+        D (float): Tool diameter in mm
+        curve (CapacityCurve): Machine capacity curve
+        max_power (float): Power outside the curve range in kW
+        max_torque (float): Torque outside the curve range in Nm
+        y_name (str): Vertical axis, "fn" or "ap"
+        fn (Optional[float]): Feed per revolution in mm when y_name is "ap"
+        ap (Optional[float]): Depth of cut in mm when y_name is "fn"
+        hexv (Optional[float]): Chip thickness in mm (boring only)
+        kr (Optional[float]): Cutting edge angle in degrees
+        resolution (int): Number of grid points per axis
+
+    Returns:
+        FeasibilityGrid: Utilization arrays shaped (len(y), len(x))
+
+    Raises:
+        ValueError: If y_name is not supported by the insert
+    """
+    ranges = {"fn": "avance_f_mmtr", "ap": "profondeur_passe_ap_mm"}
+    if y_name not in ranges or ranges[y_name] not in tool_conditions:
+        raise ValueError(f"Unsupported axis for this insert: {y_name}")
+    x = np.linspace(*tool_conditions["vitesse_coupe_Vc_mmin"], resolution)
+    y = np.linspace(*tool_conditions[ranges[y_name]], resolution)
+    Vc, Y = np.meshgrid(x, y)
+    if y_name == "fn":
+        res = evaluate_batch(tool_conditions, D, Vc.ravel(), Y.ravel(), ap=ap, hexv=hexv, kr=kr)
+    else:
+        res = evaluate_batch(tool_conditions, D, Vc.ravel(), fn, ap=Y.ravel(), hexv=hexv, kr=kr)
+
+    # n only depends on Vc, so the capacity is interpolated once per column
+    local_power, local_torque = curve.query_array(res["n"][:resolution], max_power, max_torque)
+    shape = (resolution, resolution)
+    return FeasibilityGrid(
+        "Vc",
+        y_name,
+        x,
+        y,
+        res["Pc"].reshape(shape) / local_power,
+        res["Mc"].reshape(shape) / local_torque
+    )
@@ -0,0 +1,377 @@
+"""
+Module for the machine registry.
+Holds the capacity curves of a whole shop, loaded lazily, and checks one job
+or a batch of jobs against every machine in one vectorized evaluation.
+"""
+
+import json
+import os
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+
+from config import VALIDATION_THRESHOLDS
+from calculations.batch import evaluate_batch, evaluate_table
+from calculations.capacity_curve import CapacityCurve, UniformCapacityTable
+from data.curve_store import CURVE_EXTENSION, load_curve
+
+# Optional per-machine settings in the machines directory
+MANIFEST_FILE = "machines.json"
+
+class MachineSpec(NamedTuple):
+    """A machine of the registry and its limits outside the capacity curve."""
+    machine_id: str
+    path: str
+    max_power: float
+    max_torque: float
+    name: str = ""
+    engagement_ratio: float = VALIDATION_THRESHOLDS["engagement_warning"]
+
+class FleetCheck(NamedTuple):
+    """Jobs checked against machines; every array is shaped (machines, jobs)."""
+    machine_ids: Tuple[str, ...]
+    n: np.ndarray
+    Pc: np.ndarray
+    Mc: np.ndarray
+    La: np.ndarray
+    power_available: np.ndarray
+    torque_available: np.ndarray
+    power_margin: np.ndarray
+    torque_margin: np.ndarray
+    engagement_margin: np.ndarray
+
+    @property
+    def margin(self) -> np.ndarray:
+        """Smallest of the power, torque and engagement margins (1 = unloaded, < 0 = over a limit)."""
+        return np.minimum(np.minimum(self.power_margin, self.torque_margin), self.engagement_margin)
+
+    @property
+    def ok(self) -> np.ndarray:
+        """Whether each machine can run each job."""
+        return self.margin >= 0
+
+    def capable(self, job: int = 0) -> List[Tuple[str, float]]:
+        """
+        List the machines able to run a job, largest margin first.
+
+        Args:
+            job (int): Job index
+
+        Returns:
+            List[Tuple[str, float]]: (machine id, margin) pairs
+        """
+        margin = self.margin[:, job]
+        order = np.argsort(-margin, kind="stable")
+        return [(self.machine_ids[i], float(margin[i])) for i in order if margin[i] >= 0]
+
+class StackedTables(NamedTuple):
+    """Uniform lookup tables of several machines stacked into 2-D arrays."""
+    machine_ids: Tuple[str, ...]
+    n0: np.ndarray
+    dn: np.ndarray
+    n_max: np.ndarray
+    power: np.ndarray
+    torque: np.ndarray
+    max_power: np.ndarray
+    max_torque: np.ndarray
+    engagement_ratio: np.ndarray
+
+def stacked_capacity(stack: StackedTables, n: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Interpolate the capacity of every machine at every rotation speed.
+
+    Args:
+        stack (StackedTables): Machine tables from MachineRegistry.stacked()
+        n (np.ndarray): Rotation speeds in RPM (NaN for invalid jobs)
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Power (kW) and torque (Nm) shaped (machines, speeds)
+    """
+    # Uniform-grid interpolation for every (machine, speed) pair at once
+    size = stack.power.shape[1]
+    x = (n[None, :] - stack.n0[:, None]) / stack.dn[:, None]
+    np.clip(x, 0, size - 1, out=x)
+    x[np.isnan(x)] = 0  # invalid jobs, masked by the caller
+    i = np.minimum(x.astype(np.intp), size - 2)
+    alpha = x - i
+    p1 = np.take_along_axis(stack.power, i, axis=1)
+    p2 = np.take_along_axis(stack.power, i + 1, axis=1)
+    t1 = np.take_along_axis(stack.torque, i, axis=1)
+    t2 = np.take_along_axis(stack.torque, i + 1, axis=1)
+    inside = (n[None, :] > stack.n0[:, None]) & (n[None, :] < stack.n_max[:, None])
+    power = np.where(inside, p1 + alpha * (p2 - p1), stack.max_power[:, None])
+    torque = np.where(inside, t1 + alpha * (t2 - t1), stack.max_torque[:, None])
+    return power, torque
+
+def check_stacked(stack: StackedTables, results: Dict[str, np.ndarray], D: Any) -> FleetCheck:
+    """
+    Check computed jobs against stacked machine tables.
+
+    Args:
+        stack (StackedTables): Machine tables from MachineRegistry.stacked()
+        results (Dict[str, np.ndarray]): n, Pc, Mc and La arrays from evaluate_batch()
+            or evaluate_table()
+        D (Any): Tool diameters in mm, scalar or shaped like the results
+
+    Returns:
+        FleetCheck: Availability and margins shaped (machines, jobs)
+    """
+    n = np.atleast_1d(np.asarray(results["n"], dtype=np.float64))
+    Pc = np.atleast_1d(np.asarray(results["Pc"], dtype=np.float64))
+    Mc = np.atleast_1d(np.asarray(results["Mc"], dtype=np.float64))
+    La = np.atleast_1d(np.asarray(results["La"], dtype=np.float64))
+    D = np.broadcast_to(np.asarray(D, dtype=np.float64), n.shape)
+
+    power, torque = stacked_capacity(stack, n)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        power_margin = 1 - Pc[None, :] / power
+        torque_margin = 1 - Mc[None, :] / torque
+        engagement_margin = 1 - La[None, :] / (stack.engagement_ratio[:, None] * D[None, :])
+    # Operations without an engagement length (perçage) have no engagement limit
+    engagement_margin = np.where(np.isnan(La)[None, :], np.inf, engagement_margin)
+
+    shape = power.shape
+    return FleetCheck(
+        stack.machine_ids,
+        np.broadcast_to(n, shape),
+        np.broadcast_to(Pc, shape),
+        np.broadcast_to(Mc, shape),
+        np.broadcast_to(La, shape),
+        power,
+        torque,
+        power_margin,
+        torque_margin,
+        engagement_margin
+    )
+
+class MachineRegistry:
+    """Machines of a shop with lazily loaded curves and a stacked interpolation index."""
+
+    def __init__(self, specs: Sequence[MachineSpec] = (), table_size: int = 4096):
+        """
+        Create the registry; no curve is loaded until it is needed.
+
+        Args:
+            specs (Sequence[MachineSpec]): Machines of the registry
+            table_size (int): Points of the uniform lookup table built per machine
+        """
+        self.table_size = table_size
+        self._specs = {}
+        self._curves = {}
+        self._tables = {}
+        self._stacks = {}
+        self._lock = threading.Lock()
+        for spec in specs:
+            self.add(spec)
+
+    @classmethod
+    def from_directory(cls, directory: str, max_power: float, max_torque: float,
+                       table_size: int = 4096) -> "MachineRegistry":
+        """
+        Register every curve file (.mcap or .json) of a directory.
+
+        A machines.json manifest may give, per machine id (file name without
+        extension), the file, name, max_power, max_torque and engagement_ratio.
+
+        Args:
+            directory (str): Machines directory
+            max_power (float): Default power outside the curve range in kW
+            max_torque (float): Default torque outside the curve range in Nm
+            table_size (int): Points of the uniform lookup table built per machine
+
+        Returns:
+            MachineRegistry: Registry of the directory (empty if it doesn't exist)
+        """
+        registry = cls(table_size=table_size)
+        if not os.path.isdir(directory):
+            return registry
+        manifest = {}
+        manifest_path = os.path.join(directory, MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+
+        files = {}
+        for name in sorted(os.listdir(directory)):
+            stem, ext = os.path.splitext(name)
+            if name == MANIFEST_FILE or ext not in (".json", CURVE_EXTENSION):
+                continue
+            # A JSON path also picks up an up-to-date .mcap sibling (see load_curve)
+            if ext == ".json" or stem not in files:
+                files[stem] = os.path.join(directory, name)
+        for machine_id in sorted(set(files) | set(manifest)):
+            settings = manifest.get(machine_id, {})
+            path = os.path.join(directory, settings["file"]) if "file" in settings else files.get(machine_id)
+            if path is None:
+                raise ValueError(f"No curve file for machine {machine_id}")
+            registry.add(MachineSpec(
+                machine_id,
+                path,
+                float(settings.get("max_power", max_power)),
+                float(settings.get("max_torque", max_torque)),
+                settings.get("name", ""),
+                float(settings.get("engagement_ratio", VALIDATION_THRESHOLDS["engagement_warning"]))
+            ))
+        return registry
+
+    def add(self, spec: MachineSpec):
+        """
+        Register or replace a machine.
+
+        Args:
+            spec (MachineSpec): Machine to register
+        """
+        with self._lock:
+            self._specs[spec.machine_id] = spec
+            self._curves.pop(spec.machine_id, None)
+            self._tables.pop(spec.machine_id, None)
+            self._stacks.clear()
+
+    def __len__(self) -> int:
+        return len(self._specs)
+
+    def __contains__(self, machine_id: str) -> bool:
+        return machine_id in self._specs
+
+    @property
+    def machine_ids(self) -> List[str]:
+        """Registered machine ids, sorted."""
+        return sorted(self._specs)
+
+    def spec(self, machine_id: str) -> MachineSpec:
+        """Settings of a registered machine."""
+        return self._specs[machine_id]
+
+    def curve(self, machine_id: str) -> CapacityCurve:
+        """
+        Get the capacity curve of a machine, loading it on first use.
+
+        Args:
+            machine_id (str): Machine id
+
+        Returns:
+            CapacityCurve: The machine curve
+
+        Raises:
+            KeyError: If the machine is not registered
+        """
+        curve = self._curves.get(machine_id)
+        if curve is None:
+            spec = self._specs[machine_id]
+            curve = load_curve(spec.path)
+            with self._lock:
+                self._curves[machine_id] = curve
+        return curve
+
+    def table(self, machine_id: str) -> UniformCapacityTable:
+        """
+        Get the uniform lookup table of a machine, built on first use.
+
+        Args:
+            machine_id (str): Machine id
+
+        Returns:
+            UniformCapacityTable: O(1) interpolation index of the machine curve
+        """
+        table = self._tables.get(machine_id)
+        if table is None:
+            table = self.curve(machine_id).resample(self.table_size)
+            with self._lock:
+                self._tables[machine_id] = table
+        return table
+
+    def _stack(self, machine_ids: Tuple[str, ...]) -> StackedTables:
+        """Stack the lookup tables of the given machines (cached per machine set)."""
+        stack = self._stacks.get(machine_ids)
+        if stack is not None:
+            return stack
+        tables = [self.table(machine_id) for machine_id in machine_ids]
+        specs = [self._specs[machine_id] for machine_id in machine_ids]
+        stack = StackedTables(
+            machine_ids,
+            np.array([t.n0 for t in tables]),
+            np.array([t.dn for t in tables]),
+            np.array([t.n_max for t in tables]),
+            np.stack([t.power for t in tables]),
+            np.stack([t.torque for t in tables]),
+            np.array([s.max_power for s in specs], dtype=np.float64),
+            np.array([s.max_torque for s in specs], dtype=np.float64),
+            np.array([s.engagement_ratio for s in specs], dtype=np.float64)
+        )
+        with self._lock:
+            self._stacks[machine_ids] = stack
+        return stack
+
+    def stacked(self, machines: Optional[Sequence[str]] = None) -> StackedTables:
+        """
+        Get the lookup tables of machines stacked into 2-D arrays (built once per machine set).
+
+        Args:
+            machines (Optional[Sequence[str]]): Machine ids (default: all, sorted)
+
+        Returns:
+            StackedTables: Tables and limits, one row per machine
+        """
+        return self._stack(tuple(machines) if machines is not None else tuple(self.machine_ids))
+
+    def check_results(self, results: Dict[str, np.ndarray], D: Any,
+                      machines: Optional[Sequence[str]] = None) -> FleetCheck:
+        """
+        Check already computed jobs against machines.
+
+        Args:
+            results (Dict[str, np.ndarray]): n, Pc, Mc and La arrays from evaluate_batch()
+                or evaluate_table()
+            D (Any): Tool diameters in mm, scalar or shaped like the results
+            machines (Optional[Sequence[str]]): Machine ids (default: all, sorted)
+
+        Returns:
+            FleetCheck: Availability and margins shaped (machines, jobs)
+        """
+        return check_stacked(self.stacked(machines), results, D)
+
+    def check(self, tool_conditions: Dict[str, Any], D: Any, Vc: Any, fn: Any, ap: Any = None,
+              hexv: Any = None, kr: Any = None, machines: Optional[Sequence[str]] = None) -> FleetCheck:
+        """
+        Check one job, or a batch of jobs with the same insert, against machines.
+
+        Args:
+            tool_conditions (Dict[str, Any]): Cutting conditions of the insert
+            D (Any): Tool diameters in mm
+            Vc (Any): Cutting speeds in m/min
+            fn (Any): Feeds per revolution in mm
+            ap (Any): Depths of cut in mm
+            hexv (Any): Chip thicknesses in mm (boring)
+            kr (Any): Cutting edge angles in degrees
+            machines (Optional[Sequence[str]]): Machine ids (default: all, sorted)
+
+        Returns:
+            FleetCheck: Availability and margins shaped (machines, jobs)
+
+        Raises:
+            ValueError: If the inputs are invalid
+        """
+        results = evaluate_batch(tool_conditions, D, Vc, fn, ap=ap, hexv=hexv, kr=kr)
+        return self.check_results(results, np.broadcast_to(np.asarray(D, dtype=np.float64), results["n"].shape),
+                                  machines)
+
+    def check_table(self, table: Any, conditions: Dict[str, Dict[str, Any]], tool_column: str = "Plaquette",
+                    machines: Optional[Sequence[str]] = None) -> FleetCheck:
+        """
+        Check a table of jobs mixing several inserts against machines.
+
+        Args:
+            table (Any): Mapping or DataFrame with the insert, D, Vc, fn and optional ap/hex/kr columns
+            conditions (Dict[str, Dict[str, Any]]): Cutting conditions of every insert
+            tool_column (str): Name of the insert column
+            machines (Optional[Sequence[str]]): Machine ids (default: all, sorted)
+
+        Returns:
+            FleetCheck: Availability and margins shaped (machines, jobs)
+
+        Raises:
+            ValueError: If an insert is unknown or the inputs are invalid
+        """
+        results = evaluate_table(table, conditions, tool_column)
+        return self.check_results(results, np.asarray(table["D"], dtype=np.float64), machines)
@@ -0,0 +1,287 @@
+"""
+Module for the single-pass operation model.
+Computes every result of one operating point once, as an immutable object that
+the metrics, diagnostics, gauges and history all read from, either in one call
+(compute_operation) or incrementally across reruns (OperationGraph).
+"""
+
+import math
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from config import CUTTING_CONSTANTS, VALIDATION_THRESHOLDS
+from calculations.batch import BORING, DRILLING, evaluate_batch, operation_parameters
+from calculations.capacity_curve import CapacityBracket, CapacityCurve
+from calculations.cutting_calculations import (
+    coefficient_kc,
+    effort_axial_percage,
+    get_local_capacity,
+    hex_co,
+    length_la,
+    power_pc,
+    rotation_speed,
+    torque_mc
+)
+from calculations.reactive import ReactiveGraph
+from tracing import span
+
+class OperationResult(NamedTuple):
+    """All inputs, intermediate values and checks of one operating point."""
+    tool: str
+    operation: str
+    kind: str
+    D: float
+    Vc: float
+    fn: float
+    ap: float
+    kr: float
+    kc1: float
+    m0: float
+    Y0: float
+    n: float
+    hexv: float
+    kc: float
+    Fc: Optional[float]
+    Fa: Optional[float]
+    Pc: float
+    Mc: float
+    La: Optional[float]
+    local_power: float
+    local_torque: float
+    bracket: Optional[CapacityBracket]
+
+    @property
+    def max_engagement(self) -> float:
+        """Maximum engagement length in mm (threshold × D)."""
+        return VALIDATION_THRESHOLDS["engagement_warning"] * self.D
+
+    @property
+    def power_ok(self) -> bool:
+        return self.Pc <= self.local_power
+
+    @property
+    def torque_ok(self) -> bool:
+        return self.Mc <= self.local_torque
+
+    @property
+    def engagement_ok(self) -> bool:
+        return self.La is None or self.La <= self.max_engagement
+
+    @property
+    def ok(self) -> bool:
+        return self.power_ok and self.torque_ok and self.engagement_ok
+
+def _optional(value: float) -> Optional[float]:
+    """Map the NaN of fields that do not apply to the operation to None."""
+    return None if math.isnan(value) else value
+
+def compute_operation(tool: str, tool_conditions: Dict[str, Any], D: float, Vc: float, fn: float,
+                      ap: float, hexv: Optional[float], kr: float, curve: CapacityCurve,
+                      max_power: float, max_torque: float, kc1: Optional[float] = None,
+                      m0: Optional[float] = None) -> OperationResult:
+    """
+    Compute one operating point with the calculator registered for its operation.
+
+    Args:
+        tool (str): Insert name
+        tool_conditions (Dict[str, Any]): Cutting conditions of the insert
+        D (float): Tool diameter in mm
+        Vc (float): Cutting speed in m/min
+        fn (float): Feed per revolution in mm
+        ap (float): Depth of cut in mm as entered
+        hexv (Optional[float]): Chip thickness in mm as entered (boring only)
+        kr (float): Cutting edge angle in degrees as entered
+        curve (CapacityCurve): Machine capacity curve
+        max_power (float): Power outside the curve range in kW
+        max_torque (float): Torque outside the curve range in Nm
+        kc1 (Optional[float]): Specific cutting force for 1mm² chip area
+        m0 (Optional[float]): Material constant
+
+    Returns:
+        OperationResult: Immutable result of the operating point
+
+    Raises:
+        ValueError: If the inputs are invalid
+    """
+    with span("calc.formulas"):
+        params = operation_parameters(tool_conditions, kr, kc1, m0)
+        res = {key: float(values[0]) for key, values in
+               evaluate_batch(tool_conditions, D, Vc, fn, ap=ap, hexv=hexv, kr=kr, kc1=kc1, m0=m0).items()}
+    with span("calc.interpolation"):
+        local_power, local_torque = curve.query(res["n"], max_power, max_torque)
+        bracket = curve.bracket(res["n"])
+    return OperationResult(
+        tool=tool,
+        operation=tool_conditions.get("operation", ""),
+        kind=params["kind"],
+        D=D,
+        Vc=Vc,
+        fn=fn,
+        ap=ap if params["ap"] is None else params["ap"],
+        kr=params["kr"],
+        kc1=params["kc1"],
+        m0=params["m0"],
+        Y0=params["Y0"],
+        n=res["n"],
+        hexv=res["hex"],
+        kc=res["kc"],
+        Fc=_optional(res["Fc"]),
+        Fa=_optional(res["Fa"]),
+        Pc=res["Pc"],
+        Mc=res["Mc"],
+        La=_optional(res["La"]),
+        local_power=local_power,
+        local_torque=local_torque,
+        bracket=bracket
+    )
+
+def _capacity(n: float, curve: CapacityCurve, max_power: float,
+              max_torque: float) -> Tuple[float, float, Optional[CapacityBracket]]:
+    local_power, local_torque = get_local_capacity(n, curve, max_power, max_torque)
+    return local_power, local_torque, curve.bracket(n)
+
+def _chip_thickness(params: Dict[str, Any], fn: float, hexv: Optional[float]) -> float:
+    # Boring takes the entered hex, else the recommended one (same rule as the batch calculators)
+    if params["kind"] == BORING:
+        if hexv is not None and not math.isnan(hexv):
+            return hexv
+        if params["hex_rec"] is not None:
+            return params["hex_rec"]
+    return hex_co(fn, params["kr"])
+
+def _specific_force(params: Dict[str, Any], hexv: float) -> float:
+    # Drilling takes kc on (2/hex)^m0, that is the coefficient of hex/2
+    return coefficient_kc(params["kc1"], hexv / 2 if params["kind"] == DRILLING else hexv,
+                          params["m0"], params["Y0"])
+
+def _depth(params: Dict[str, Any], ap: float) -> float:
+    return float(ap if params["ap"] is None else params["ap"])
+
+def _engagement(params: Dict[str, Any], ap: float) -> Optional[float]:
+    if params["kind"] == DRILLING:
+        return None
+    return length_la(ap, params["kr"]) if ap > 0 else 0.0
+
+def _cutting_force(params: Dict[str, Any], kc: float, ap: float, fn: float) -> Optional[float]:
+    return None if params["kind"] == DRILLING else kc * ap * fn
+
+def _axial_force(params: Dict[str, Any], kc: float, fn: float, D: float) -> Optional[float]:
+    return effort_axial_percage(kc, fn, D) if params["kind"] == DRILLING else None
+
+def _power(params: Dict[str, Any], Fc: Optional[float], Fa: Optional[float], Vc: float) -> float:
+    if params["kind"] == DRILLING:
+        return Fa * Vc / CUTTING_CONSTANTS["drilling_power_divisor"]
+    return power_pc(Fc, Vc)
+
+class OperationGraph(ReactiveGraph):
+    """
+    The calculation chain of one operating point as a reactive graph.
+
+    Each intermediate value of compute_operation() is a node (n → capacity,
+    hex → kc → Fc/Fa → Pc → Mc, La) computed with the scalar formulas of
+    cutting_calculations and the parameters of operation_parameters(), and
+    only recomputed when one of its inputs changed: a new ap leaves n, the interpolated capacity and kc
+    untouched, a new D leaves kc untouched. Kept across reruns, one graph
+    per session.
+    """
+
+    INPUTS = ("tool", "tool_conditions", "D", "Vc", "fn", "ap", "hexv", "kr",
+              "curve", "max_power", "max_torque", "kc1", "m0")
+
+    def __init__(self):
+        """Declare the inputs and nodes of the calculation chain."""
+        super().__init__()
+        for name in self.INPUTS:
+            self.input(name)
+        self.node("params", ("tool_conditions", "kr", "kc1", "m0"), operation_parameters)
+        self.node("n", ("Vc", "D"), rotation_speed)
+        self.node("capacity", ("n", "curve", "max_power", "max_torque"), _capacity)
+        self.node("hex", ("params", "fn", "hexv"), _chip_thickness)
+        self.node("kc", ("params", "hex"), _specific_force)
+        self.node("ap_used", ("params", "ap"), _depth)
+        self.node("La", ("params", "ap_used"), _engagement)
+        self.node("Fc", ("params", "kc", "ap_used", "fn"), _cutting_force)
+        self.node("Fa", ("params", "kc", "fn", "D"), _axial_force)
+        self.node("Pc", ("params", "Fc", "Fa", "Vc"), _power)
+        self.node("Mc", ("Pc", "n"), torque_mc)
+        self.node("result", ("tool", "tool_conditions", "params", "D", "Vc", "fn", "ap_used", "n", "hex",
+                             "kc", "Fc", "Fa", "Pc", "Mc", "La", "capacity"), self._result)
+
+    @staticmethod
+    def _result(tool, tool_conditions, params, D, Vc, fn, ap, n, hexv, kc, Fc, Fa, Pc, Mc, La,
+                capacity) -> OperationResult:
+        local_power, local_torque, bracket = capacity
+        return OperationResult(
+            tool=tool,
+            operation=tool_conditions.get("operation", ""),
+            kind=params["kind"],
+            D=D,
+            Vc=Vc,
+            fn=fn,
+            ap=ap,
+            kr=params["kr"],
+            kc1=params["kc1"],
+            m0=params["m0"],
+            Y0=params["Y0"],
+            n=n,
+            hexv=hexv,
+            kc=kc,
+            Fc=Fc,
+            Fa=Fa,
+            Pc=Pc,
+            Mc=Mc,
+            La=La,
+            local_power=local_power,
+            local_torque=local_torque,
+            bracket=bracket
+        )
+
+    def set_point(self, tool: str, tool_conditions: Dict[str, Any], D: float, Vc: float, fn: float,
+                  ap: float, hexv: Optional[float], kr: float, curve: CapacityCurve,
+                  max_power: float, max_torque: float, kc1: Optional[float] = None,
+                  m0: Optional[float] = None) -> Tuple[str, ...]:
+        """
+        Set the inputs of an operating point without computing anything.
+
+        Takes the arguments of compute_operation(); the nodes are computed
+        when read.
+
+        Returns:
+            Tuple[str, ...]: Names of the inputs whose value changed
+        """
+        return self.set(tool=tool, tool_conditions=tool_conditions, D=float(D), Vc=float(Vc), fn=float(fn),
+                        ap=float(ap), hexv=None if hexv is None else float(hexv), kr=float(kr), curve=curve,
+                        max_power=float(max_power), max_torque=float(max_torque),
+                        kc1=None if kc1 is None else float(kc1), m0=None if m0 is None else float(m0))
+
+    def update(self, tool: str, tool_conditions: Dict[str, Any], D: float, Vc: float, fn: float,
+               ap: float, hexv: Optional[float], kr: float, curve: CapacityCurve,
+               max_power: float, max_torque: float, kc1: Optional[float] = None,
+               m0: Optional[float] = None) -> OperationResult:
+        """
+        Set the inputs and get the result, recomputing only the nodes they affect.
+
+        Takes the arguments of compute_operation() and gives the same result.
+
+        Args:
+            tool (str): Insert name
+            tool_conditions (Dict[str, Any]): Cutting conditions of the insert
+            D (float): Tool diameter in mm
+            Vc (float): Cutting speed in m/min
+            fn (float): Feed per revolution in mm
+            ap (float): Depth of cut in mm as entered
+            hexv (Optional[float]): Chip thickness in mm as entered (boring only)
+            kr (float): Cutting edge angle in degrees as entered
+            curve (CapacityCurve): Machine capacity curve
+            max_power (float): Power outside the curve range in kW
+            max_torque (float): Torque outside the curve range in Nm
+            kc1 (Optional[float]): Specific cutting force for 1mm² chip area
+            m0 (Optional[float]): Material constant
+
+        Returns:
+            OperationResult: Result of the operating point
+
+        Raises:
+            ValueError: If the inputs are invalid
+        """
+        self.set_point(tool, tool_conditions, D, Vc, fn, ap, hexv, kr, curve, max_power, max_torque, kc1=kc1, m0=m0)
+        return self.get("result")
@@ -0,0 +1,135 @@
+"""
+Module for cutting condition optimization.
+Searches the admissible (Vc, fn, ap) box of an insert for the maximum material
+removal rate that stays within the interpolated machine capacity.
+"""
+
+from typing import Any, Dict, NamedTuple, Optional
+import numpy as np
+
+from config import VALIDATION_THRESHOLDS
+from calculations.batch import DRILLING, GROOVING, evaluate_batch, operation_kind
+from calculations.capacity_curve import CapacityCurve
+
+class OptimizationResult(NamedTuple):
+    """Best operating point found by the optimizer."""
+    Vc: float
+    fn: float
+    ap: float
+    mrr: float
+    Pc: float
+    Mc: float
+    La: float
+    local_power: float
+    local_torque: float
+    feasible: bool
+    evaluations: int
+
+def material_removal_rate(kind: str, Vc: Any, fn: Any, ap: Any, D: Any) -> np.ndarray:
+    """
+    Calculate the material removal rate.
+
+    Args:
+        kind (str): Operation kind from operation_kind()
+        Vc (Any): Cutting speed in m/min
+        fn (Any): Feed per revolution in mm
+        ap (Any): Depth of cut in mm
+        D (Any): Tool diameter in mm
+
+    Returns:
+        np.ndarray: Material removal rate in cm³/min
+    """
+    if kind == DRILLING:
+        return np.asarray(Vc) * fn * D / 4
+    return np.asarray(Vc) * ap * fn
+
+def search_box(tool_conditions: Dict[str, Any], kind: str) -> Dict[str, np.ndarray]:
+    """
+    Get the admissible box of an insert: the [min, max] bounds of Vc, fn and ap.
+
+    Args:
+        tool_conditions (Dict[str, Any]): Cutting conditions of the insert
+        kind (str): Operation kind from operation_kind()
+
+    Returns:
+        Dict[str, np.ndarray]: Bounds by variable (min == max when the variable is fixed)
+    """
+    box = {
+        "Vc": tool_conditions["vitesse_coupe_Vc_mmin"],
+        "fn": tool_conditions["avance_f_mmtr"]
+    }
+    if kind == GROOVING:
+        box["ap"] = [tool_conditions.get("insert_length_mm", 0.0)] * 2
+    elif kind != DRILLING and "profondeur_passe_ap_mm" in tool_conditions:
+        box["ap"] = tool_conditions["profondeur_passe_ap_mm"]
+    else:
+        box["ap"] = [0.0, 0.0]
+    return {name: np.asarray(bounds, dtype=np.float64) for name, bounds in box.items()}
+
+def optimize_mrr(tool_conditions: Dict[str, Any], D: float, curve: CapacityCurve,
+                 max_power: float, max_torque: float, hexv: Optional[float] = None,
+                 kr: Optional[float] = None, grid_size: int = 16, refine_steps: int = 5) -> OptimizationResult:
+    """
+    Find the (Vc, fn, ap) maximizing the material removal rate of an insert.
+
+    A vectorized grid over the admissible box is evaluated first, then the grid
+    is repeatedly shrunk around the best feasible point. Constraints are
+    Pc ≤ interpolated power, Mc ≤ interpolated torque and La ≤ engagement
+    threshold × D. When no point is feasible, the point with the smallest
+    overload is returned with feasible=False.
+
+    Args:
+        tool_conditions (Dict[str, Any]): Cutting conditions of the insert
+        D (float): Tool diameter in mm
+        curve (CapacityCurve): Machine capacity curve
+        max_power (float): Power outside the curve range in kW
+        max_torque (float): Torque outside the curve range in Nm
+        hexv (Optional[float]): Chip thickness in mm (boring only)
+        kr (Optional[float]): Cutting edge angle in degrees
+        grid_size (int): Number of grid points per searched variable
+        refine_steps (int): Number of local refinement passes
+
+    Returns:
+        OptimizationResult: Best operating point found
+    """
+    kind = operation_kind(tool_conditions)
+    box = search_box(tool_conditions, kind)
+    lower = {name: bounds[0] for name, bounds in box.items()}
+    upper = {name: bounds[1] for name, bounds in box.items()}
+    max_la = VALIDATION_THRESHOLDS["engagement_warning"] * D
+    evaluations = 0
+    best, best_key = None, None
+
+    for _ in range(refine_steps + 1):
+        axes = [
+            np.linspace(lower[name], upper[name], grid_size if upper[name] > lower[name] else 1)
+            for name in ("Vc", "fn", "ap")
+        ]
+        Vc, fn, ap = (values.ravel() for values in np.meshgrid(*axes, indexing="ij"))
+        res = evaluate_batch(tool_conditions, D, Vc, fn, ap=ap, hexv=hexv, kr=kr)
+        local_power, local_torque = curve.query_array(res["n"], max_power, max_torque)
+        La = np.nan_to_num(res["La"], nan=0.0)
+        overload = np.maximum.reduce([res["Pc"] / local_power, res["Mc"] / local_torque, La / max_la])
+        mrr = material_removal_rate(kind, Vc, fn, ap, D)
+        evaluations += Vc.size
+
+        feasible = overload <= 1.0
+        i = int(np.argmax(np.where(feasible, mrr, -np.inf))) if feasible.any() else int(np.argmin(overload))
+        candidate = OptimizationResult(
+            float(Vc[i]), float(fn[i]), float(ap[i]), float(mrr[i]),
+            float(res["Pc"][i]), float(res["Mc"][i]), float(res["La"][i]),
+            float(local_power[i]), float(local_torque[i]),
+            bool(feasible[i]), evaluations
+        )
+        key = (candidate.feasible, candidate.mrr if candidate.feasible else -float(overload[i]))
+        if best is None or key > best_key:
+            best, best_key = candidate, key
+
+        # Shrink the box to one grid step around the best point
+        for name, values in zip(("Vc", "fn", "ap"), axes):
+            step = values[1] - values[0] if values.size > 1 else 0.0
+            centre = getattr(best, name)
+            lower[name] = max(box[name][0], centre - step)
+            upper[name] = min(box[name][1], centre + step)
+
+    return best._replace(evaluations=evaluations)
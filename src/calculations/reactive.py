@@ -0,0 +1,186 @@
+"""
+Module for small reactive dependency graphs.
+Inputs are set from outside and computed nodes are functions of inputs and
+other nodes. A node caches its value and is only recomputed, when read, if
+the value of one of its dependencies changed since it was last computed; a
+recomputed value equal to the previous one stops the propagation, so the
+nodes further down keep their cached values.
+"""
+
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from tracing import span
+
+_UNSET = object()
+
+class _Node:
+    """State of one input or computed node."""
+    __slots__ = ("name", "func", "inputs", "value", "changed_at", "verified_at")
+
+    def __init__(self, name: str, func: Optional[Callable], inputs: Tuple[str, ...]):
+        self.name = name
+        self.func = func  # None for an input
+        self.inputs = inputs
+        self.value = _UNSET
+        self.changed_at = 0  # revision at which the value last changed
+        self.verified_at = -1  # revision at which the value was last known up to date
+
+def _same(old: Any, new: Any) -> bool:
+    """Whether a new value can stand for the old one (same type and equal)."""
+    if old is new:
+        return True
+    try:
+        return type(old) is type(new) and bool(old == new)
+    except (TypeError, ValueError):
+        # Values without a plain truth value for == (NumPy arrays) always propagate
+        return False
+
+class ReactiveGraph:
+    """
+    Directed acyclic graph of inputs and cached computed nodes.
+
+    Values are pulled: set() only records the changed inputs, and get()
+    recomputes the stale nodes on the path to the node read. The number of
+    recomputations of each node is kept in recomputes.
+    """
+
+    def __init__(self):
+        """Create an empty graph."""
+        self._nodes: Dict[str, _Node] = {}
+        self._dependents: Dict[str, List[str]] = {}
+        self._revision = 0
+        self._recomputed: List[str] = []
+        self.recomputes: Counter = Counter()
+
+    def input(self, name: str, value: Any = _UNSET):
+        """
+        Declare an input.
+
+        Args:
+            name (str): Input name
+            value (Any): Initial value (default: none, the input must be set before it is read)
+
+        Raises:
+            ValueError: If the name is already used
+        """
+        self._add(_Node(name, None, ()))
+        if value is not _UNSET:
+            self.set(**{name: value})
+
+    def node(self, name: str, inputs: Sequence[str], func: Callable[..., Any]):
+        """
+        Declare a computed node.
+
+        Args:
+            name (str): Node name
+            inputs (Sequence[str]): Names of the inputs and nodes it depends on, declared before it
+            func (Callable[..., Any]): Function of the dependency values, in the order of inputs
+
+        Raises:
+            ValueError: If the name is already used or a dependency is unknown
+        """
+        unknown = [dep for dep in inputs if dep not in self._nodes]
+        if unknown:
+            raise ValueError(f"Unknown dependencies of {name}: {unknown}")
+        self._add(_Node(name, func, tuple(inputs)))
+        for dep in inputs:
+            self._dependents[dep].append(name)
+
+    def _add(self, node: _Node):
+        if node.name in self._nodes:
+            raise ValueError(f"Node already declared: {node.name}")
+        self._nodes[node.name] = node
+        self._dependents[node.name] = []
+
+    def set(self, **values: Any) -> Tuple[str, ...]:
+        """
+        Set inputs; inputs set to an equal value do not invalidate anything.
+
+        Args:
+            **values (Any): Values by input name
+
+        Returns:
+            Tuple[str, ...]: Names of the inputs whose value changed
+
+        Raises:
+            KeyError: If a name is not an input
+        """
+        changed = []
+        for name, value in values.items():
+            node = self._nodes.get(name)
+            if node is None or node.func is not None:
+                raise KeyError(f"Not an input: {name}")
+            if node.value is _UNSET or not _same(node.value, value):
+                changed.append(name)
+        self._recomputed = []
+        if changed:
+            self._revision += 1
+            for name in changed:
+                node = self._nodes[name]
+                node.value = values[name]
+                node.changed_at = self._revision
+        return tuple(changed)
+
+    def get(self, name: str) -> Any:
+        """
+        Read a value, recomputing the stale nodes it depends on.
+
+        Args:
+            name (str): Input or node name
+
+        Returns:
+            Any: Value of the node
+
+        Raises:
+            KeyError: If the name is unknown or an input it depends on was never set
+        """
+        node = self._nodes[name]
+        self._refresh(node)
+        return node.value
+
+    __getitem__ = get
+
+    def _refresh(self, node: _Node):
+        """Bring a node up to date with the current revision."""
+        if node.verified_at == self._revision:
+            return
+        if node.func is None:
+            if node.value is _UNSET:
+                raise KeyError(f"Input not set: {node.name}")
+        else:
+            for dep in node.inputs:
+                self._refresh(self._nodes[dep])
+            stale = node.value is _UNSET or any(
+                self._nodes[dep].changed_at > node.verified_at for dep in node.inputs)
+            if stale:
+                with span(f"graph.{node.name}"):
+                    value = node.func(*(self._nodes[dep].value for dep in node.inputs))
+                self.recomputes[node.name] += 1
+                self._recomputed.append(node.name)
+                if node.value is _UNSET or not _same(node.value, value):
+                    node.value = value
+                    node.changed_at = self._revision
+        node.verified_at = self._revision
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        """Inputs and nodes in declaration order (dependencies before dependents)."""
+        return tuple(self._nodes)
+
+    def dependencies(self, name: str) -> Tuple[str, ...]:
+        """Direct dependencies of a node (empty for an input)."""
+        return self._nodes[name].inputs
+
+    def dependents(self, name: str) -> Tuple[str, ...]:
+        """Nodes that read a node or an input directly."""
+        return tuple(self._dependents[name])
+
+    def is_input(self, name: str) -> bool:
+        """Whether the name is an input."""
+        return self._nodes[name].func is None
+
+    @property
+    def recomputed(self) -> Tuple[str, ...]:
+        """Nodes recomputed since the last set(), in evaluation order."""
+        return tuple(self._recomputed)
@@ -0,0 +1,249 @@
+"""
+Module for the process-wide calculation result cache.
+Memoizes operating points across sessions with quantized float keys, bounded
+LRU or TTL eviction, hit/miss counters, and invalidation when the data files
+change on disk.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, NamedTuple, Optional, Tuple
+
+from config import CONDITIONS_FILE, MACHINE_CAPACITIES_FILE, RESULT_CACHE_CONFIG
+from calculations.capacity_curve import CapacityCurve
+from calculations.operations import OperationGraph, OperationResult, compute_operation
+
+class CacheStats(NamedTuple):
+    """Counters of a result cache."""
+    hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+    size: int
+    maxsize: int
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of lookups answered from the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+def quantize(value: Any, decimals: int) -> Any:
+    """
+    Round a float so that values differing only by float noise share a key.
+
+    Args:
+        value (Any): Value to quantize (non-floats are returned unchanged)
+        decimals (int): Number of decimals kept
+
+    Returns:
+        Any: Quantized value
+    """
+    if isinstance(value, float):
+        # + 0.0 folds -0.0 into 0.0
+        return round(value, decimals) + 0.0
+    return value
+
+def file_signature(paths: Iterable[str]) -> Tuple[Tuple[str, int, int], ...]:
+    """
+    Identify the current version of a set of files.
+
+    Args:
+        paths (Iterable[str]): File paths
+
+    Returns:
+        Tuple[Tuple[str, int, int], ...]: (path, mtime_ns, size) per file, (path, -1, -1) if missing
+    """
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append((path, -1, -1))
+    return tuple(signature)
+
+def conditions_fingerprint(tool_conditions: Dict[str, Any]) -> str:
+    """
+    Hash the cutting conditions of an insert, used as a version identifier in keys.
+
+    Two entries of the same insert share a fingerprint only if every field
+    (kc1, m0, Y0, ranges...) is equal, so an edited catalog never returns
+    results computed from the previous values.
+
+    Args:
+        tool_conditions (Dict[str, Any]): Cutting conditions of the insert
+
+    Returns:
+        str: Hex digest of the conditions
+    """
+    text = json.dumps(tool_conditions, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+class ResultCache:
+    """Thread-safe bounded cache with LRU eviction and an optional time-to-live."""
+
+    def __init__(self, maxsize: int = 4096, ttl: Optional[float] = None, decimals: int = 6,
+                 sources: Iterable[str] = ()):
+        """
+        Create an empty cache.
+
+        Args:
+            maxsize (int): Maximum number of entries (least recently used are evicted first)
+            ttl (Optional[float]): Entry lifetime in seconds, None to keep entries until evicted
+            decimals (int): Decimals kept when quantizing float keys
+            sources (Iterable[str]): Data files whose modification clears the cache (made absolute,
+                so a later change of working directory does not stat other files)
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.decimals = decimals
+        self.sources = tuple(os.path.abspath(path) for path in sources)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._signature = file_signature(self.sources)
+        self._hits = self._misses = self._evictions = self._invalidations = 0
+
+    def make_key(self, *parts: Any) -> Tuple[Hashable, ...]:
+        """
+        Build a cache key with quantized floats.
+
+        Args:
+            *parts (Any): Key components
+
+        Returns:
+            Tuple[Hashable, ...]: Hashable key
+        """
+        return tuple(quantize(part, self.decimals) for part in parts)
+
+    def _check_sources(self):
+        """Clear the cache if one of the source files changed. Caller holds the lock."""
+        if not self.sources:
+            return
+        signature = file_signature(self.sources)
+        if signature != self._signature:
+            self._signature = signature
+            if self._entries:
+                self._entries.clear()
+                self._invalidations += 1
+
+    def get_or_compute(self, key: Tuple[Hashable, ...], compute: Callable[[], Any]) -> Any:
+        """
+        Return the cached value of key, computing and storing it on a miss.
+
+        The computation runs outside the lock, so a slow miss does not block
+        other sessions; two sessions missing the same key at the same time
+        both compute it and the last one wins.
+
+        Args:
+            key (Tuple[Hashable, ...]): Key built with make_key()
+            compute (Callable[[], Any]): Function producing the value
+
+        Returns:
+            Any: Cached or computed value
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._check_sources()
+            entry = self._entries.get(key)
+            if entry is not None and (self.ttl is None or now - entry[1] < self.ttl):
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[0]
+            self._misses += 1
+
+        value = compute()
+
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return value
+
+    def clear(self):
+        """Remove every entry (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._invalidations += 1
+
+    def stats(self) -> CacheStats:
+        """
+        Get the cache counters.
+
+        Returns:
+            CacheStats: Hits, misses, evictions, invalidations and size
+        """
+        with self._lock:
+            return CacheStats(self._hits, self._misses, self._evictions, self._invalidations,
+                              len(self._entries), self.maxsize)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+# Shared by every session of the server process
+RESULT_CACHE = ResultCache(
+    maxsize=RESULT_CACHE_CONFIG["maxsize"],
+    ttl=RESULT_CACHE_CONFIG["ttl"],
+    decimals=RESULT_CACHE_CONFIG["decimals"],
+    sources=(CONDITIONS_FILE, MACHINE_CAPACITIES_FILE)
+)
+
+def cached_compute_operation(tool: str, tool_conditions: Dict[str, Any], D: float, Vc: float, fn: float,
+                             ap: float, hexv: Optional[float], kr: float, curve: CapacityCurve,
+                             max_power: float, max_torque: float, kc1: Optional[float] = None,
+                             m0: Optional[float] = None, cache: Optional[ResultCache] = None,
+                             graph: Optional[OperationGraph] = None) -> OperationResult:
+    """
+    compute_operation() behind the shared result cache.
+
+    The inputs are quantized before computing, so a cached result is exactly
+    the result of its key. The conditions fingerprint and the curve content
+    hash are part of the key, so an edited insert (whichever catalog or
+    override it comes from) and two machines never share entries.
+
+    With a session graph, the quantized inputs are always set on the graph
+    and a missing point is computed by it, recomputing only the affected
+    nodes; a hit leaves the nodes to be computed when read.
+
+    Args:
+        tool (str): Insert name
+        tool_conditions (Dict[str, Any]): Cutting conditions of the insert
+        D (float): Tool diameter in mm
+        Vc (float): Cutting speed in m/min
+        fn (float): Feed per revolution in mm
+        ap (float): Depth of cut in mm as entered
+        hexv (Optional[float]): Chip thickness in mm as entered (boring only)
+        kr (float): Cutting edge angle in degrees as entered
+        curve (CapacityCurve): Machine capacity curve
+        max_power (float): Power outside the curve range in kW
+        max_torque (float): Torque outside the curve range in Nm
+        kc1 (Optional[float]): Specific cutting force for 1mm² chip area
+        m0 (Optional[float]): Material constant
+        cache (Optional[ResultCache]): Cache to use (default: RESULT_CACHE)
+        graph (Optional[OperationGraph]): Graph computing a missing point (default: compute_operation())
+
+    Returns:
+        OperationResult: Result of the quantized operating point
+
+    Raises:
+        ValueError: If the inputs are invalid
+    """
+    cache = RESULT_CACHE if cache is None else cache
+    key = cache.make_key(tool, conditions_fingerprint(tool_conditions), float(D), float(Vc), float(fn), float(ap),
+                         None if hexv is None else float(hexv), float(kr),
+                         None if kc1 is None else float(kc1), None if m0 is None else float(m0),
+                         curve.content_hash, float(max_power), float(max_torque))
+    _, _, D, Vc, fn, ap, hexv, kr, kc1, m0, _, max_power, max_torque = key
+    if graph is not None:
+        graph.set_point(tool, tool_conditions, D, Vc, fn, ap, hexv, kr, curve, max_power, max_torque, kc1=kc1, m0=m0)
+        return cache.get_or_compute(key, lambda: graph.get("result"))
+    return cache.get_or_compute(key, lambda: compute_operation(
+        tool, tool_conditions, D, Vc, fn, ap, hexv, kr, curve, max_power, max_torque, kc1=kc1, m0=m0))
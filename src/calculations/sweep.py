@@ -0,0 +1,330 @@
+"""
+Module for capacity planning sweeps.
+Evaluates every insert of a catalog over a diameter range and a grid of its
+admissible Vc × fn × ap box against every machine of a registry, and reduces
+the results to one summary row per insert, machine and diameter: maximum
+feasible material removal rate, its operating point and the limiting
+constraint.
+
+The space is split into chunks of (insert, diameters) run in a process pool.
+The stacked machine tables are placed once in shared memory and mapped by
+every worker, so a chunk task only carries the insert conditions and its
+diameters, and a chunk result only its summary rows.
+"""
+
+import os
+import signal
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+
+from config import SWEEP_CONFIG
+from calculations.batch import evaluate_batch, operation_kind
+from calculations.machine_registry import MachineRegistry, StackedTables, stacked_capacity
+from calculations.optimizer import material_removal_rate, search_box
+
+# Limiting constraint of a summary row: the machine limit with the smallest
+# margin at the reported point, or the insert range when the best point of the
+# whole grid is feasible
+LIMITS = ("puissance", "couple", "engagement", "plage")
+
+SUMMARY_FIELDS = ("insert", "operation", "machine", "D", "feasible", "mrr", "Vc", "fn", "ap",
+                  "Pc", "Mc", "margin", "limit", "feasible_share")
+
+class SweepProgress(NamedTuple):
+    """State of a running sweep, passed to the progress callback after each chunk."""
+    chunks_done: int
+    chunks_total: int
+    evaluations: int  # operating point × machine pairs checked so far
+    elapsed: float  # seconds
+
+    @property
+    def fraction(self) -> float:
+        return self.chunks_done / self.chunks_total if self.chunks_total else 1.0
+
+    @property
+    def eta(self) -> float:
+        """Estimated seconds left, from the rate of the chunks done so far."""
+        if not self.chunks_done:
+            return float("nan")
+        return self.elapsed * (self.chunks_total - self.chunks_done) / self.chunks_done
+
+class SweepResult(NamedTuple):
+    """Summary table of a sweep (columns of SUMMARY_FIELDS, one row per insert, machine and D)."""
+    table: Dict[str, np.ndarray]
+    evaluations: int
+    seconds: float
+    chunks_done: int
+    chunks_total: int
+    cancelled: bool
+    errors: Dict[str, str]  # insert name -> error of its chunks
+
+    @property
+    def rows(self) -> int:
+        return len(self.table["insert"])
+
+def grid_axes(tool_conditions: Dict[str, Any], grid_size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Get the Vc, fn and ap axes of the grid of an insert.
+
+    Args:
+        tool_conditions (Dict[str, Any]): Cutting conditions of the insert
+        grid_size (int): Points per variable (a fixed variable has one)
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: Vc, fn and ap values spanning the admissible box
+
+    Raises:
+        ValueError: If the insert has no Vc or fn range
+    """
+    try:
+        box = search_box(tool_conditions, operation_kind(tool_conditions))
+    except KeyError as e:
+        raise ValueError(f"Missing cutting range: {e.args[0]}") from None
+    return tuple(np.linspace(box[name][0], box[name][1], grid_size if box[name][1] > box[name][0] else 1)
+                 for name in ("Vc", "fn", "ap"))
+
+def sweep_chunk(stack: StackedTables, tool_conditions: Dict[str, Any], diameters: np.ndarray,
+                grid_size: int) -> Dict[str, np.ndarray]:
+    """
+    Evaluate one insert at some diameters against every machine and reduce to summary rows.
+
+    Args:
+        stack (StackedTables): Machine tables
+        tool_conditions (Dict[str, Any]): Cutting conditions of the insert
+        diameters (np.ndarray): Tool diameters in mm
+        grid_size (int): Points per variable of the Vc × fn × ap grid
+
+    Returns:
+        Dict[str, np.ndarray]: Numeric summary columns shaped (machines, diameters):
+        feasible, mrr, Vc, fn, ap, Pc, Mc, margin, limit (index in LIMITS) and feasible_share
+
+    Raises:
+        ValueError: If the conditions of the insert are invalid
+    """
+    kind = operation_kind(tool_conditions)
+    Vc_axis, fn_axis, ap_axis = grid_axes(tool_conditions, grid_size)
+    speeds, rest = Vc_axis.size, fn_axis.size * ap_axis.size
+    points, sizes, machines = speeds * rest, len(diameters), len(stack.machine_ids)
+    D = np.repeat(np.asarray(diameters, dtype=np.float64), points)
+    Vc, fn, ap = (np.tile(values.ravel(), sizes) for values in np.meshgrid(Vc_axis, fn_axis, ap_axis, indexing="ij"))
+    res = evaluate_batch(tool_conditions, D, Vc, fn, ap=ap)
+
+    # n only depends on D and Vc: the capacity is interpolated once per (D, Vc)
+    # and broadcast over the fn × ap points, instead of once per grid point
+    n = res["n"].reshape(sizes, speeds, rest)[:, :, 0].ravel()
+    power, torque = stacked_capacity(stack, n)
+    grid = (1, sizes, speeds, rest)
+    margins = np.empty((3, machines, sizes, speeds, rest))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Same margins as check_stacked()
+        np.divide(res["Pc"].reshape(grid), power.reshape(machines, sizes, speeds, 1), out=margins[0])
+        np.divide(res["Mc"].reshape(grid), torque.reshape(machines, sizes, speeds, 1), out=margins[1])
+        limit_la = stack.engagement_ratio[:, None, None, None] * D.reshape(grid)
+        np.divide(res["La"].reshape(grid), limit_la, out=margins[2])
+    np.subtract(1, margins, out=margins)
+    # Operations without an engagement length (perçage) have no engagement limit
+    margins[2][np.isnan(margins[2])] = np.inf
+    margins = margins.reshape(3, machines, sizes, points)
+    margin = margins.min(axis=0)
+    feasible = margin >= 0
+    mrr = material_removal_rate(kind, Vc, fn, ap, D).reshape(sizes, points)
+
+    # Best feasible point, or the least overloaded one when none is feasible
+    any_feasible = feasible.any(axis=2)
+    best = np.where(any_feasible, np.argmax(np.where(feasible, mrr, -np.inf), axis=2), np.argmax(margin, axis=2))
+    rows = np.arange(sizes)[None, :]
+    flat = rows * points + best
+    best_mrr = mrr[rows, best]
+
+    limit = np.argmin(np.take_along_axis(margins, best[None, :, :, None], axis=3)[..., 0], axis=0)
+    # The whole box is within the machine: the insert range limits the rate, not the machine
+    unbounded = any_feasible & (best_mrr >= mrr.max(axis=1)[None, :])
+    return {
+        "feasible": any_feasible,
+        "mrr": best_mrr,
+        "Vc": Vc[flat],
+        "fn": fn[flat],
+        "ap": ap[flat],
+        "Pc": res["Pc"][flat],
+        "Mc": res["Mc"][flat],
+        "margin": np.take_along_axis(margin, best[..., None], axis=2)[..., 0],
+        "limit": np.where(unbounded, LIMITS.index("plage"), limit),
+        "feasible_share": feasible.mean(axis=2)
+    }
+
+# Per-worker state, set by _init_worker
+_worker = {}
+
+def _init_worker(shm_name: str, shape: Tuple[int, int], scalars: Dict[str, Any]):
+    """Map the shared machine tables once per worker process."""
+    # Ctrl+C is handled by the parent, which cancels the sweep through its event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Pool workers share the resource tracker of the parent, which unlinks the block
+    shm = shared_memory.SharedMemory(name=shm_name)
+    tables = np.ndarray((2,) + tuple(shape), dtype=np.float64, buffer=shm.buf)
+    _worker["shm"] = shm
+    _worker["stack"] = StackedTables(power=tables[0], torque=tables[1], **scalars)
+
+def _run_chunk(tool_conditions: Dict[str, Any], diameters: np.ndarray, grid_size: int) -> Dict[str, np.ndarray]:
+    return sweep_chunk(_worker["stack"], tool_conditions, diameters, grid_size)
+
+def plan_chunks(conditions: Mapping[str, Dict[str, Any]], diameters: Sequence[float], machines: int,
+                grid_size: int, chunk_evaluations: int) -> List[Tuple[str, np.ndarray, int]]:
+    """
+    Split a sweep into chunks of (insert, diameters) of about chunk_evaluations checks each.
+
+    Args:
+        conditions (Mapping[str, Dict[str, Any]]): Cutting conditions by insert
+        diameters (Sequence[float]): Tool diameters in mm
+        machines (int): Number of machines
+        grid_size (int): Points per variable of the Vc × fn × ap grid
+        chunk_evaluations (int): Target number of operating point × machine checks per chunk
+
+    Returns:
+        List[Tuple[str, np.ndarray, int]]: (insert, diameters, evaluations) per chunk; an insert
+        without a valid grid gets one chunk of all the diameters and 0 evaluations
+    """
+    diameters = np.asarray(diameters, dtype=np.float64)
+    chunks = []
+    for name in conditions:
+        try:
+            points = int(np.prod([axis.size for axis in grid_axes(conditions[name], grid_size)]))
+        except ValueError:
+            # A single chunk, whose error the sweep reports for this insert
+            chunks.append((name, diameters, 0))
+            continue
+        per_chunk = max(1, chunk_evaluations // (points * machines))
+        for start in range(0, len(diameters), per_chunk):
+            part = diameters[start:start + per_chunk]
+            chunks.append((name, part, len(part) * points * machines))
+    return chunks
+
+def run_sweep(conditions: Mapping[str, Dict[str, Any]], registry: MachineRegistry, diameters: Sequence[float],
+              grid_size: int = SWEEP_CONFIG["grid_size"], workers: Optional[int] = SWEEP_CONFIG["workers"],
+              chunk_evaluations: int = SWEEP_CONFIG["chunk_evaluations"],
+              machines: Optional[Sequence[str]] = None,
+              progress: Optional[Callable[[SweepProgress], None]] = None,
+              cancel: Optional[threading.Event] = None) -> SweepResult:
+    """
+    Sweep every insert × diameter × Vc/fn/ap grid point × machine.
+
+    Chunks run in a process pool, at most two per worker in flight, so the
+    memory of the parent stays bounded; results are reassembled in catalog
+    order. Setting cancel stops submitting chunks, drops the queued ones and
+    returns the rows of the chunks finished so far.
+
+    Args:
+        conditions (Mapping[str, Dict[str, Any]]): Cutting conditions by insert (e.g. an InsertCatalog)
+        registry (MachineRegistry): Machines to check
+        diameters (Sequence[float]): Tool diameters in mm
+        grid_size (int): Points per variable of the Vc × fn × ap grid
+        workers (Optional[int]): Worker processes, None for one per CPU, 0 to run in this process
+        chunk_evaluations (int): Target number of operating point × machine checks per chunk
+        machines (Optional[Sequence[str]]): Machine ids (default: all, sorted)
+        progress (Optional[Callable[[SweepProgress], None]]): Called after each chunk
+        cancel (Optional[threading.Event]): Set to stop the sweep
+
+    Returns:
+        SweepResult: Summary table, counters and errors
+
+    Raises:
+        ValueError: If the registry has no machine
+    """
+    start = time.perf_counter()
+    if not len(registry) or (machines is not None and not len(machines)):
+        raise ValueError("No machine to sweep")
+    stack = registry.stacked(machines)
+    chunks = plan_chunks(conditions, diameters, len(stack.machine_ids), grid_size, chunk_evaluations)
+    results: Dict[int, Dict[str, np.ndarray]] = {}
+    errors: Dict[str, str] = {}
+    evaluations = done = 0
+    cancelled = False
+
+    def report(index: int, outcome: Any):
+        nonlocal evaluations, done
+        name, _, count = chunks[index]
+        if isinstance(outcome, Exception):
+            errors.setdefault(name, f"{type(outcome).__name__}: {outcome}")
+        else:
+            results[index] = outcome
+        evaluations += count
+        done += 1
+        if progress is not None:
+            progress(SweepProgress(done, len(chunks), evaluations, time.perf_counter() - start))
+
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    if workers == 0:
+        for index, (name, part, _) in enumerate(chunks):
+            if cancel is not None and cancel.is_set():
+                cancelled = True
+                break
+            try:
+                outcome = sweep_chunk(stack, conditions[name], part, grid_size)
+            except ValueError as e:
+                outcome = e
+            report(index, outcome)
+    else:
+        shm = shared_memory.SharedMemory(create=True, size=2 * stack.power.nbytes)
+        try:
+            tables = np.ndarray((2,) + stack.power.shape, dtype=np.float64, buffer=shm.buf)
+            tables[0], tables[1] = stack.power, stack.torque
+            scalars = {field: getattr(stack, field) for field in StackedTables._fields
+                       if field not in ("power", "torque")}
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(shm.name, stack.power.shape, scalars)) as pool:
+                pending = {}
+                queue = iter(enumerate(chunks))
+                while True:
+                    if cancel is not None and cancel.is_set():
+                        cancelled = True
+                        break
+                    while len(pending) < 2 * workers:
+                        item = next(queue, None)
+                        if item is None:
+                            break
+                        index, (name, part, _) = item
+                        pending[pool.submit(_run_chunk, conditions[name], part, grid_size)] = index
+                    if not pending:
+                        break
+                    finished, _ = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        index = pending.pop(future)
+                        error = future.exception()
+                        if error is not None and not isinstance(error, ValueError):
+                            raise error
+                        report(index, error if error is not None else future.result())
+                for future in pending:
+                    future.cancel()
+        finally:
+            shm.close()
+            shm.unlink()
+
+    return SweepResult(_summary_table(chunks, results, stack.machine_ids, conditions), evaluations,
+                       time.perf_counter() - start, done, len(chunks), cancelled, errors)
+
+def _summary_table(chunks: List[Tuple[str, np.ndarray, int]], results: Dict[int, Dict[str, np.ndarray]],
+                   machine_ids: Tuple[str, ...], conditions: Mapping[str, Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Assemble the chunk results into one table, in catalog, machine and diameter order."""
+    by_insert: Dict[str, List[int]] = {}
+    for index in sorted(results):
+        by_insert.setdefault(chunks[index][0], []).append(index)
+    parts = {field: [] for field in SUMMARY_FIELDS}
+    for name, indexes in by_insert.items():
+        diameters = np.concatenate([chunks[i][1] for i in indexes])
+        columns = {field: np.concatenate([results[i][field] for i in indexes], axis=1)
+                   for field in results[indexes[0]]}
+        machines, sizes = columns["mrr"].shape
+        parts["insert"].append(np.full(machines * sizes, name, dtype=object))
+        parts["operation"].append(np.full(machines * sizes, conditions[name].get("operation", ""), dtype=object))
+        parts["machine"].append(np.repeat(np.array(machine_ids, dtype=object), sizes))
+        parts["D"].append(np.tile(diameters, machines))
+        for field, values in columns.items():
+            values = values.ravel()
+            parts[field].append(np.array(LIMITS, dtype=object)[values] if field == "limit" else values)
+    text = ("insert", "operation", "machine", "limit")
+    return {field: np.concatenate(values) if values else np.empty(0, dtype=object if field in text else np.float64)
+            for field, values in parts.items()}
@@ -0,0 +1,229 @@
+"""
+Module for the uncertainty mode of the calculator.
+The material constants (kc1, m0, Y0) vary with the batch and the hardness of
+the material, and D and Vc with the machining tolerances: they are sampled
+from configurable distributions around the operating point, the formulas are
+evaluated on every sample at once with evaluate_batch(), and the resulting
+distribution of Pc and Mc is compared with the capacity interpolated at each
+sample's rotation speed.
+"""
+
+import math
+from typing import Any, Dict, Mapping, NamedTuple, Optional, Tuple
+import numpy as np
+
+from config import CONDITIONS_FILE, MACHINE_CAPACITIES_FILE, UNCERTAINTY_CONFIG
+from calculations.batch import evaluate_batch, operation_parameters
+from calculations.capacity_curve import CapacityCurve
+from calculations.result_cache import ResultCache, conditions_fingerprint
+from tracing import span
+
+DISTRIBUTION_KINDS = ("normal", "uniform", "triangular")
+SAMPLED_PARAMETERS = ("kc1", "m0", "Y0", "D", "Vc")
+QUANTILES = (0.05, 0.5, 0.95)
+
+class Distribution(NamedTuple):
+    """Spread of one parameter around its nominal value."""
+    kind: str  # "normal", "uniform" or "triangular"
+    spread: float  # standard deviation (normal) or half-width (uniform, triangular)
+    relative: bool = False  # spread as a fraction of the nominal value
+
+    def sample(self, nominal: float, size: int, rng: np.random.Generator) -> np.ndarray:
+        """
+        Draw values around a nominal value.
+
+        Normal draws are clipped at 4 standard deviations, so a 10 % spread
+        never produces a negative kc1 or diameter.
+
+        Args:
+            nominal (float): Nominal value (center of the distribution)
+            size (int): Number of values
+            rng (np.random.Generator): Random generator
+
+        Returns:
+            np.ndarray: Sampled values
+
+        Raises:
+            ValueError: If the kind is unknown or the spread negative
+        """
+        width = self.spread * abs(nominal) if self.relative else self.spread
+        if width < 0:
+            raise ValueError(f"Negative spread: {self.spread}")
+        if width == 0:
+            return np.full(size, float(nominal))
+        if self.kind == "normal":
+            return np.clip(rng.normal(nominal, width, size), nominal - 4 * width, nominal + 4 * width)
+        if self.kind == "uniform":
+            return rng.uniform(nominal - width, nominal + width, size)
+        if self.kind == "triangular":
+            return rng.triangular(nominal - width, nominal, nominal + width, size)
+        raise ValueError(f"Unknown distribution: {self.kind}")
+
+def default_distributions() -> Dict[str, Distribution]:
+    """
+    Get the distributions of UNCERTAINTY_CONFIG.
+
+    Returns:
+        Dict[str, Distribution]: Distribution by sampled parameter
+    """
+    return {name: Distribution(*spec) for name, spec in UNCERTAINTY_CONFIG["distributions"].items()}
+
+class UncertaintyResult(NamedTuple):
+    """Distribution of the cutting power and torque of one operating point."""
+    samples: int
+    Pc_quantiles: Tuple[float, ...]  # kW at QUANTILES
+    Mc_quantiles: Tuple[float, ...]  # Nm at QUANTILES
+    Pc_mean: float
+    Pc_std: float
+    Mc_mean: float
+    Mc_std: float
+    Pc_counts: np.ndarray  # histogram of Pc
+    Pc_edges: np.ndarray
+    Mc_counts: np.ndarray  # histogram of Mc
+    Mc_edges: np.ndarray
+    p_power: float  # probability of exceeding the interpolated power
+    p_torque: float  # probability of exceeding the interpolated torque
+    p_overload: float  # probability of exceeding either
+
+    @property
+    def overload_error(self) -> float:
+        """Standard error of p_overload (binomial): about 0.0016 at p = 0.5 with 100k samples."""
+        return math.sqrt(self.p_overload * (1 - self.p_overload) / self.samples)
+
+def simulate(tool_conditions: Dict[str, Any], D: float, Vc: float, fn: float, ap: float,
+             hexv: Optional[float], kr: float, curve: CapacityCurve, max_power: float, max_torque: float,
+             kc1: Optional[float] = None, m0: Optional[float] = None,
+             distributions: Optional[Mapping[str, Distribution]] = None,
+             samples: int = UNCERTAINTY_CONFIG["samples"], seed: Optional[int] = UNCERTAINTY_CONFIG["seed"],
+             bins: int = UNCERTAINTY_CONFIG["bins"]) -> UncertaintyResult:
+    """
+    Monte Carlo simulation of one operating point.
+
+    The nominal kc1, m0 and Y0 are those the operation rules apply (Y0 fixed
+    at 20 % for drilling and grooving, for instance); parameters without a
+    distribution keep their nominal value.
+
+    Args:
+        tool_conditions (Dict[str, Any]): Cutting conditions of the insert
+        D (float): Nominal tool diameter in mm
+        Vc (float): Nominal cutting speed in m/min
+        fn (float): Feed per revolution in mm
+        ap (float): Depth of cut in mm
+        hexv (Optional[float]): Chip thickness in mm (boring only)
+        kr (float): Cutting edge angle in degrees
+        curve (CapacityCurve): Machine capacity curve
+        max_power (float): Power outside the curve range in kW
+        max_torque (float): Torque outside the curve range in Nm
+        kc1 (Optional[float]): Nominal specific cutting force (default: CUTTING_CONSTANTS)
+        m0 (Optional[float]): Nominal material constant (default: CUTTING_CONSTANTS)
+        distributions (Optional[Mapping[str, Distribution]]): Distribution by parameter among
+            SAMPLED_PARAMETERS (default: UNCERTAINTY_CONFIG)
+        samples (int): Number of samples
+        seed (Optional[int]): Random seed, None for fresh samples on every call
+        bins (int): Histogram bins of Pc and Mc
+
+    Returns:
+        UncertaintyResult: Quantiles, moments and histograms of Pc and Mc, and probabilities of overload
+
+    Raises:
+        ValueError: If a parameter or a distribution is invalid
+    """
+    distributions = default_distributions() if distributions is None else distributions
+    unknown = set(distributions) - set(SAMPLED_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Parameters that cannot be sampled: {sorted(unknown)}")
+    params = operation_parameters(tool_conditions, kr, kc1, m0)
+    nominal = {"kc1": params["kc1"], "m0": params["m0"], "Y0": params["Y0"], "D": D, "Vc": Vc}
+    rng = np.random.default_rng(seed)
+    with span("calc.uncertainty_sampling"):
+        # Drawn in a fixed order so the same seed gives the same samples whatever the mapping order
+        values = {name: distributions[name].sample(nominal[name], samples, rng) if name in distributions
+                  else nominal[name] for name in SAMPLED_PARAMETERS}
+    with span("calc.formulas"):
+        res = evaluate_batch(tool_conditions, values["D"], values["Vc"], fn, ap=ap, hexv=hexv, kr=kr,
+                             kc1=values["kc1"], m0=values["m0"], Y0=values["Y0"])
+    with span("calc.interpolation"):
+        local_power, local_torque = curve.query_array(res["n"], max_power, max_torque)
+    with span("calc.uncertainty_summary"):
+        Pc, Mc = res["Pc"], res["Mc"]
+        over_power = Pc > local_power
+        over_torque = Mc > local_torque
+        Pc_counts, Pc_edges = np.histogram(Pc, bins=bins)
+        Mc_counts, Mc_edges = np.histogram(Mc, bins=bins)
+        return UncertaintyResult(
+            samples=samples,
+            Pc_quantiles=tuple(np.quantile(Pc, QUANTILES).tolist()),
+            Mc_quantiles=tuple(np.quantile(Mc, QUANTILES).tolist()),
+            Pc_mean=float(Pc.mean()),
+            Pc_std=float(Pc.std()),
+            Mc_mean=float(Mc.mean()),
+            Mc_std=float(Mc.std()),
+            Pc_counts=Pc_counts,
+            Pc_edges=Pc_edges,
+            Mc_counts=Mc_counts,
+            Mc_edges=Mc_edges,
+            p_power=float(over_power.mean()),
+            p_torque=float(over_torque.mean()),
+            p_overload=float((over_power | over_torque).mean())
+        )
+
+# Summaries only (histograms, not the samples), so a few kB per operating point
+UNCERTAINTY_CACHE = ResultCache(
+    maxsize=UNCERTAINTY_CONFIG["cache_size"],
+    sources=(CONDITIONS_FILE, MACHINE_CAPACITIES_FILE)
+)
+
+def cached_simulate(tool: str, tool_conditions: Dict[str, Any], D: float, Vc: float, fn: float, ap: float,
+                    hexv: Optional[float], kr: float, curve: CapacityCurve, max_power: float, max_torque: float,
+                    kc1: Optional[float] = None, m0: Optional[float] = None,
+                    distributions: Optional[Mapping[str, Distribution]] = None,
+                    samples: int = UNCERTAINTY_CONFIG["samples"], seed: int = UNCERTAINTY_CONFIG["seed"],
+                    bins: int = UNCERTAINTY_CONFIG["bins"],
+                    cache: Optional[ResultCache] = None) -> UncertaintyResult:
+    """
+    simulate() behind a cache keyed on the input tuple.
+
+    With a fixed seed the simulation is deterministic, so a rerun that does
+    not change the operating point or the distributions reuses the result.
+    The conditions fingerprint is part of the key, so an edited insert is
+    simulated again.
+
+    Args:
+        tool (str): Insert name
+        tool_conditions (Dict[str, Any]): Cutting conditions of the insert
+        D (float): Nominal tool diameter in mm
+        Vc (float): Nominal cutting speed in m/min
+        fn (float): Feed per revolution in mm
+        ap (float): Depth of cut in mm
+        hexv (Optional[float]): Chip thickness in mm (boring only)
+        kr (float): Cutting edge angle in degrees
+        curve (CapacityCurve): Machine capacity curve
+        max_power (float): Power outside the curve range in kW
+        max_torque (float): Torque outside the curve range in Nm
+        kc1 (Optional[float]): Nominal specific cutting force (default: CUTTING_CONSTANTS)
+        m0 (Optional[float]): Nominal material constant (default: CUTTING_CONSTANTS)
+        distributions (Optional[Mapping[str, Distribution]]): Distribution by parameter
+            (default: UNCERTAINTY_CONFIG)
+        samples (int): Number of samples
+        seed (int): Random seed
+        bins (int): Histogram bins of Pc and Mc
+        cache (Optional[ResultCache]): Cache to use (default: UNCERTAINTY_CACHE)
+
+    Returns:
+        UncertaintyResult: Result of the quantized operating point
+
+    Raises:
+        ValueError: If a parameter or a distribution is invalid
+    """
+    cache = UNCERTAINTY_CACHE if cache is None else cache
+    distributions = default_distributions() if distributions is None else distributions
+    key = cache.make_key(tool, conditions_fingerprint(tool_conditions), float(D), float(Vc), float(fn), float(ap),
+                         None if hexv is None else float(hexv), float(kr),
+                         None if kc1 is None else float(kc1), None if m0 is None else float(m0),
+                         curve.content_hash, float(max_power), float(max_torque),
+                         tuple(sorted((name, tuple(d)) for name, d in distributions.items())),
+                         int(samples), seed, int(bins))
+    _, _, D, Vc, fn, ap, hexv, kr, kc1, m0, _, max_power, max_torque = key[:13]
+    return cache.get_or_compute(key, lambda: simulate(
+        tool_conditions, D, Vc, fn, ap, hexv, kr, curve, max_power, max_torque, kc1=kc1, m0=m0,
+        distributions=distributions, samples=samples, seed=seed, bins=bins))
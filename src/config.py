@@ -6,10 +6,136 @@ Contains constants, settings, and default values.
 # File paths
 CONDITIONS_FILE = "conditions_coupe_sandvik.json"
 MACHINE_CAPACITIES_FILE = "machine_capacities.json"
+HISTORY_DB_FILE = "history.sqlite3"
+MACHINES_DIR = "machines"  # one capacity curve (.mcap or .json) per machine, optional machines.json
 
 # Default values
 DEFAULT_MAX_POWER = 14.9  # kW
 DEFAULT_MAX_TORQUE = 95.0  # Nm
+DEFAULT_DIAMETER = 50.0  # mm
+
+# Cutting model constants (per-operation rules of the calculation sheet)
+CUTTING_CONSTANTS = {
+    "kc1": 400.0,  # N/mm²
+    "m0": 0.25,
+    "kr": 95.0,  # default KAPR angle (°)
+    "Y0": 6.0,  # % when the insert does not provide one
+    "drilling_kr": 90.0,  # perçage
+    "drilling_Y0": 20.0,  # % fixed for perçage
+    "drilling_power_divisor": 240000.0,  # Pc = Fa × Vc / 240000
+    "boring_kr": 90.0,  # alésage
+    "grooving_Y0": 20.0  # % fixed for grooving inserts
+}
+
+# Process-wide result cache (shared by every session of the server)
+RESULT_CACHE_CONFIG = {
+    "maxsize": 4096,  # entries, least recently used evicted first
+    "ttl": None,  # seconds, None = keep until evicted or data files change
+    "decimals": 6  # float keys are rounded so repeated slider values hit
+}
+
+# Hot reload of the data files (conditions, machine curve, machines directory)
+DATA_WATCH_CONFIG = {
+    "interval": 1.0  # seconds between two checks of the file dates and sizes
+}
+
+# Insert catalog (conditions file, or its .jsonl version for large catalogs)
+CATALOG_CONFIG = {
+    "cache_size": 1024,  # .jsonl entries kept parsed in memory
+    "max_options": 1000  # inserts listed in the sidebar before asking to refine the filters
+}
+
+# Preprocessing of digitized capacity curves (convert_machine_curve.py --simplify)
+CURVE_SIMPLIFY_CONFIG = {
+    "window": 9,  # points per local linear fit, 0 = no smoothing (clipped to the tolerances)
+    "max_power_error": 0.1,  # kW at most between the simplified curve and the source points
+    "max_torque_error": 1.0  # Nm at most between the simplified curve and the source points
+}
+
+# Ingestion of digitizer exports (ingest_machines.py)
+INGEST_CONFIG = {
+    "source_dir": "exports",  # XLSX/CSV exports, one machine per file
+    "interval": 2.0,  # seconds between polls in --watch mode
+    "workers": 1  # processes converting changed files
+}
+
+# Machine registry
+MACHINE_REGISTRY_CONFIG = {
+    "table_size": 4096  # points of the uniform lookup table built per machine
+}
+
+# Calculation history (SQLite, shared by every session)
+HISTORY_CONFIG = {
+    "batch_size": 50,  # pending records written in one transaction
+    "flush_interval": 2.0,  # seconds before pending records are written anyway
+    "page_size": 50,  # rows per page in the Historique tab
+    "archive_chunk_size": 65536,  # rows per record batch (and Parquet row group) of the archives
+    "archive_compression": "zstd"  # Parquet and Arrow IPC compression
+}
+
+# Cold start (checked by tests/test_startup.py, profiled by launcher.py --profile-imports)
+STARTUP_CONFIG = {
+    "import_budget_ms": 1200,  # cold import of every module the app imports (streamlit included)
+    "project_budget_ms": 250,  # share of the calculations, data and ui packages
+    "deferred_modules": ("pandas", "plotly.graph_objs._figure", "pyarrow", "openpyxl")  # imported on first use only
+}
+
+# Timing of the rerun stages (tracing.py): debug panel and JSON lines trace file
+TRACE_CONFIG = {
+    "enabled": False,  # trace every rerun of every session (also CUTTING_TRACE=1, launcher.py --trace)
+    "file": "traces.jsonl",  # next to app.log (CUTTING_TRACE_FILE overrides it)
+    "keep": 20,  # reruns shown in the debug panel
+    "max_bytes": 10 * 1024 * 1024  # the file is renamed to traces.jsonl.1 above this size
+}
+
+# Benchmark suite (tests/test_benchmarks.py, run with RUN_BENCHMARKS=1)
+BENCHMARK_CONFIG = {
+    "baseline_file": "benchmark_baselines.json",  # next to the test module
+    "max_regression": 0.25,  # fails when a benchmark is more than 25 % slower than its baseline
+    "repeat": 7,  # timings are the best of repeat samples
+    "min_sample_time": 0.05,  # seconds, the loops of a sample are multiplied until it lasts this long
+    "rerun_max_regression": 0.5,  # full app reruns (Streamlit runtime) vary more than the hot paths
+    "rerun_repeat": 9  # samples of the app reruns
+}
+
+# Uncertainty mode (calculations/uncertainty.py): Monte Carlo sampling of the
+# material constants and of the machining tolerances around the operating point.
+# Distributions are (kind, spread, relative): "normal" (spread = standard deviation,
+# clipped at 4 standard deviations), "uniform" or "triangular" (spread = half-width);
+# relative spreads are fractions of the nominal value.
+UNCERTAINTY_CONFIG = {
+    "samples": 100_000,  # per operating point
+    "seed": 0,  # same samples on every rerun: moving an input does not reshuffle the results
+    "bins": 60,  # histogram bins of Pc and Mc
+    "cache_size": 64,  # operating points kept (summaries only, a few kB each)
+    "distributions": {
+        "kc1": ("normal", 0.10, True),  # ±10 % (1 σ) between material batches
+        "m0": ("uniform", 0.03, False),
+        "Y0": ("uniform", 2.0, False),  # % points
+        "D": ("uniform", 0.05, False),  # mm, diameter tolerance
+        "Vc": ("normal", 0.02, True)  # spindle speed regulation
+    }
+}
+
+# Capacity planning sweeps (sweep_catalog.py): inserts × diameters × Vc/fn/ap grid × machines
+SWEEP_CONFIG = {
+    "diameters": (10.0, 100.0, 10.0),  # mm, start, stop (included) and step
+    "grid_size": 16,  # points per variable of each insert's Vc × fn × ap box (16³ = 4096)
+    "chunk_evaluations": 1_000_000,  # operating point × machine checks per task (about 100 MB of arrays)
+    "workers": None  # processes, None = one per CPU
+}
+
+# Local HTTP API of the calculation core (api_server.py)
+API_CONFIG = {
+    "host": "127.0.0.1",  # localhost only
+    "port": 8502,  # next to Streamlit's 8501
+    "workers": 2,  # processes checking the large batches, 0 = check them in the server thread
+    "inline_max_bytes": 64 * 1024,  # batches up to this body size are checked without a worker
+    "max_body_bytes": 64 * 1024 * 1024,  # larger requests are refused (413)
+    "max_rows": 500_000,  # lines per batch
+    "latency_window": 2048,  # recent requests per route behind the latency percentiles
+    "reload_interval": 1.0  # seconds between two checks of the data files
+}
 
 # UI settings
 PAGE_CONFIG = {
@@ -24,7 +150,9 @@ PLOT_CONFIG = {
     "torque_color": "red",
     "power_title": "Puissance (kW)",
     "torque_title": "Couple (Nm)",
-    "rotation_title": "Vitesse de rotation (tr/min)"
+    "rotation_title": "Vitesse de rotation (tr/min)",
+    "capacity_max_points": 1000,  # capacity curve points sent to the browser (LTTB above)
+    "history_max_points": 20000  # newest history points overlaid on the capacity curve
 }
 
 # Validation settings
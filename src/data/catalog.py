@@ -0,0 +1,350 @@
+"""
+Module for the indexed insert catalog.
+Reads the cutting conditions from the JSON dict file or from a JSON Lines file
+streamed line by line, and indexes the inserts by operation, material and
+Vc/fn/ap/hex ranges so that catalogs of 100k inserts are queried in
+milliseconds. Entries of a JSON Lines file are kept on disk and read back by
+byte offset when used.
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+CATALOG_EXTENSION = ".jsonl"
+
+# Range fields that can be queried, mapped to their [min, max] key in the conditions
+RANGE_FIELDS = {
+    "Vc": "vitesse_coupe_Vc_mmin",
+    "fn": "avance_f_mmtr",
+    "ap": "profondeur_passe_ap_mm",
+    "hex": "hex_mm"
+}
+
+def _normalize(text: Any) -> str:
+    return str(text).strip().lower()
+
+def material_terms(material: Any) -> List[str]:
+    """
+    Terms a material is indexed under: the full name and each "/" alternative.
+
+    Args:
+        material (Any): Material of an insert, e.g. "acier/fonte"
+
+    Returns:
+        List[str]: Lower-case terms, e.g. ["acier/fonte", "acier", "fonte"]
+    """
+    full = _normalize(material)
+    parts = [part.strip() for part in full.split("/") if part.strip()]
+    return [full] + [part for part in parts if part != full]
+
+def _range(conditions: Dict[str, Any], key: str) -> Tuple[float, float]:
+    """[min, max] of a range field, (nan, nan) if absent or invalid."""
+    try:
+        low, high = conditions[key]
+        return float(low), float(high)
+    except (KeyError, TypeError, ValueError):
+        return np.nan, np.nan
+
+class _RangeIndex:
+    """Inserts sorted by range minimum, for "accepts value" lookups."""
+
+    def __init__(self, low: np.ndarray, high: np.ndarray):
+        known = np.flatnonzero(~np.isnan(low) & ~np.isnan(high))
+        order = known[np.argsort(low[known], kind="stable")]
+        self.rows = order
+        self.low = low[order]
+        self.high = high[order]
+
+    def accepting(self, value: float) -> np.ndarray:
+        """Rows whose range contains value (unsorted)."""
+        end = np.searchsorted(self.low, value, side="right")
+        return self.rows[:end][self.high[:end] >= value]
+
+class InsertCatalog(Mapping):
+    """
+    Read-only mapping of insert name to cutting conditions, with secondary indexes.
+
+    The file is scanned on first use. For a JSON Lines catalog only the indexed
+    fields and the byte offset of each line are kept; the full conditions of an
+    insert are parsed when it is looked up, and the last cache_size entries are
+    kept in memory.
+    """
+
+    def __init__(self, path: str, cache_size: int = 1024):
+        """
+        Create a catalog over a conditions file (nothing is read yet).
+
+        Args:
+            path (str): conditions_coupe_sandvik.json (dict by insert name) or a .jsonl
+                file with one {"name": ..., <conditions>} object per line
+            cache_size (int): Entries of a JSON Lines catalog kept in memory
+        """
+        self.path = path
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._entries = OrderedDict()
+
+    # -- Loading -------------------------------------------------------------
+
+    def _scan_json(self) -> Iterator[Tuple[str, Dict[str, Any], Optional[int]]]:
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError(f"Cutting conditions must be a dictionary: {self.path}")
+        for name, conditions in data.items():
+            yield name, conditions, None
+
+    def _scan_jsonl(self) -> Iterator[Tuple[str, Dict[str, Any], Optional[int]]]:
+        with open(self.path, "rb") as f:
+            offset = 0
+            for number, line in enumerate(f, 1):
+                start, offset = offset, offset + len(line)
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    name = record.pop("name")
+                except (ValueError, KeyError, AttributeError, TypeError):
+                    raise ValueError(f"Invalid catalog line {number} in {self.path}")
+                yield name, record, start
+
+    def _signature(self) -> Tuple[int, int, int]:
+        """(inode, size, mtime) of the file, to detect a rewrite after indexing."""
+        stat = os.stat(self.path)
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def _load(self):
+        """Scan the file and build the indexes. Called under the lock."""
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"File not found: {self.path}")
+        self._signature_at_load = self._signature()
+        self._entries = OrderedDict()
+        scan = self._scan_jsonl() if self.path.endswith(CATALOG_EXTENSION) else self._scan_json()
+        names, offsets, operations, materials = [], [], [], []
+        ranges = {field: [] for field in RANGE_FIELDS}
+        for name, conditions, offset in scan:
+            if not isinstance(conditions, dict):
+                raise ValueError(f"Conditions for {name} must be a dictionary")
+            names.append(name)
+            offsets.append(-1 if offset is None else offset)
+            operations.append(_normalize(conditions.get("operation", "")))
+            materials.append(material_terms(conditions.get("material", "")))
+            for field, key in RANGE_FIELDS.items():
+                ranges[field].append(_range(conditions, key))
+            if offset is None:
+                self._entries[name] = conditions
+
+        self._names = names
+        self._rows = {name: row for row, name in enumerate(names)}
+        if len(self._rows) != len(names):
+            raise ValueError(f"Duplicate insert names in {self.path}")
+        self._offsets = np.asarray(offsets, dtype=np.int64)
+        self._in_memory = not self.path.endswith(CATALOG_EXTENSION)
+        self._by_operation = self._group(operations)
+        self._by_material = self._group(materials)
+        self._ranges = {}
+        for field, values in ranges.items():
+            bounds = np.asarray(values, dtype=np.float64).reshape(-1, 2)
+            self._ranges[field] = _RangeIndex(bounds[:, 0], bounds[:, 1])
+        self._loaded = True
+
+    @staticmethod
+    def _group(values: List[Any]) -> Dict[str, np.ndarray]:
+        """Row ids per value (or per term for lists of terms)."""
+        groups = {}
+        for row, value in enumerate(values):
+            for term in (value if isinstance(value, list) else [value]):
+                groups.setdefault(term, []).append(row)
+        return {term: np.asarray(rows, dtype=np.int64) for term, rows in groups.items()}
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._load()
+
+    def _read_entry(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Parse the line of an insert in a JSON Lines catalog.
+
+        Returns None if the file was rewritten since it was indexed (the cached
+        offsets no longer point at the insert).
+        """
+        if self._signature() != self._signature_at_load:
+            return None
+        with open(self.path, "rb") as f:
+            f.seek(int(self._offsets[self._rows[name]]))
+            line = f.readline()
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(record, dict) or record.pop("name", None) != name:
+            return None
+        return record
+
+    # -- Mapping interface ---------------------------------------------------
+
+    def __getitem__(self, name: str) -> Dict[str, Any]:
+        self._ensure_loaded()
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                if not self._in_memory:
+                    self._entries.move_to_end(name)
+                return entry
+        if name not in self._rows:
+            raise KeyError(name)
+        entry = self._read_entry(name)
+        if entry is None:
+            # The file changed under the index: scan it again and retry once
+            with self._lock:
+                self._load()
+            if name not in self._rows:
+                raise KeyError(name)
+            entry = self._read_entry(name)
+            if entry is None:
+                raise ValueError(f"Catalog changed while reading {name!r}: {self.path}")
+        with self._lock:
+            self._entries[name] = entry
+            while len(self._entries) > self.cache_size:
+                self._entries.popitem(last=False)
+        return entry
+
+    def __iter__(self) -> Iterator[str]:
+        self._ensure_loaded()
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._names)
+
+    def __contains__(self, name: Any) -> bool:
+        self._ensure_loaded()
+        return name in self._rows
+
+    # -- Indexed queries -----------------------------------------------------
+
+    def operations(self) -> List[str]:
+        """Sorted operations present in the catalog (lower case)."""
+        self._ensure_loaded()
+        return sorted(op for op in self._by_operation if op)
+
+    def materials(self) -> List[str]:
+        """Sorted materials and material alternatives present in the catalog (lower case)."""
+        self._ensure_loaded()
+        return sorted(term for term in self._by_material if term)
+
+    def query(self, operation: Optional[str] = None, material: Optional[str] = None,
+              limit: Optional[int] = None, **values: float) -> List[str]:
+        """
+        Find the inserts matching every given criterion.
+
+        Example: query(operation="alésage", material="aluminium", Vc=800) lists the
+        boring inserts for aluminium whose Vc range contains 800 m/min.
+
+        Args:
+            operation (Optional[str]): Operation (case-insensitive exact match)
+            material (Optional[str]): Material or one of its "/" alternatives
+            limit (Optional[int]): Maximum number of names returned
+            **values (float): Values that must lie in the insert ranges (Vc, fn, ap, hex)
+
+        Returns:
+            List[str]: Insert names in catalog order
+
+        Raises:
+            ValueError: If a range field is unknown
+        """
+        self._ensure_loaded()
+        unknown = set(values) - set(RANGE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown range fields: {sorted(unknown)} (expected {list(RANGE_FIELDS)})")
+        empty = np.empty(0, dtype=np.int64)
+        candidates = []
+        if operation is not None:
+            candidates.append(self._by_operation.get(_normalize(operation), empty))
+        if material is not None:
+            candidates.append(self._by_material.get(_normalize(material), empty))
+        for field, value in values.items():
+            if value is not None:
+                candidates.append(self._ranges[field].accepting(float(value)))
+        if not candidates:
+            rows = np.arange(len(self._names))
+        else:
+            # Intersect on a boolean mask, starting from the most selective index
+            candidates.sort(key=len)
+            mask = np.zeros(len(self._names), dtype=bool)
+            mask[candidates[0]] = True
+            for other in candidates[1:]:
+                keep = np.zeros_like(mask)
+                keep[other] = True
+                mask &= keep
+            rows = np.flatnonzero(mask)
+        if limit is not None:
+            rows = rows[:limit]
+        return [self._names[row] for row in rows]
+
+def write_jsonl(entries: Iterable[Tuple[str, Dict[str, Any]]], path: str):
+    """
+    Write a JSON Lines catalog (written next to its destination and renamed).
+
+    Args:
+        entries (Iterable[Tuple[str, Dict[str, Any]]]): (insert name, conditions) pairs,
+            e.g. the items() of a conditions dict
+        path (str): Destination .jsonl path
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for name, conditions in entries:
+            f.write(json.dumps({"name": name, **conditions}, ensure_ascii=False))
+            f.write("\n")
+    os.replace(tmp_path, path)
+
+def resolve_catalog_path(path: str) -> str:
+    """
+    Prefer the JSON Lines version of a conditions file when it is up to date.
+
+    Args:
+        path (str): Conditions file path (.json or .jsonl)
+
+    Returns:
+        str: The .jsonl sibling if it exists and is not older than path (or path is
+            missing), else path
+    """
+    if path.endswith(CATALOG_EXTENSION):
+        return path
+    candidate = os.path.splitext(path)[0] + CATALOG_EXTENSION
+    try:
+        candidate_mtime = os.stat(candidate).st_mtime_ns
+    except OSError:
+        return path
+    try:
+        return candidate if candidate_mtime >= os.stat(path).st_mtime_ns else path
+    except OSError:
+        return candidate
+
+def load_catalog(path: str, cache_size: int = 1024) -> InsertCatalog:
+    """
+    Open the insert catalog of a conditions file.
+
+    Args:
+        path (str): Conditions file path (.json or .jsonl)
+        cache_size (int): Entries of a JSON Lines catalog kept in memory
+
+    Returns:
+        InsertCatalog: Catalog, indexed on first use
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+    """
+    path = resolve_catalog_path(path)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"File not found: {path}")
+    return InsertCatalog(path, cache_size=cache_size)
@@ -0,0 +1,325 @@
+"""
+Module for the binary machine capacity curve format.
+Stores a curve as three float64 columns behind a fixed-size header so it can
+be memory-mapped with no parsing, and converts the JSON and Excel sources.
+Small curves are read into memory instead, so no map keeps the file open when
+it is replaced (Windows refuses to replace a mapped file).
+
+File layout (little-endian):
+    0    magic b"MCAP" and format version (uint16)
+    6    flags (uint16, bit 0 = columns sorted by n)
+    8    number of points (uint64)
+    16   machine id (UTF-8, 64 bytes, NUL padded)
+    80   units of n, power and torque (3 × 8 bytes ASCII)
+    104  content hash (SHA-1 hex of the three columns, 40 bytes)
+    256  n, power and torque columns (count × float64 each)
+"""
+
+import json
+import os
+import struct
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from calculations.capacity_curve import CapacityCurve, load_capacity_curve
+
+CURVE_EXTENSION = ".mcap"
+CURVE_MAGIC = b"MCAP"
+CURVE_VERSION = 1
+HEADER_SIZE = 256
+FLAG_SORTED = 1
+DEFAULT_UNITS = ("rpm", "kW", "Nm")
+MAP_MIN_POINTS = 1 << 16  # smaller curves (1.5 MB) are read rather than mapped
+CACHE_SIZE = 1024  # curve files kept open by load_curve()
+
+_HEADER = struct.Struct("<4sHHQ64s8s8s8s40s")
+
+def _encode(text: str, size: int) -> bytes:
+    """Encode a header string, which must fit in size bytes."""
+    data = text.encode("utf-8")
+    if len(data) > size:
+        raise ValueError(f"'{text}' is longer than {size} bytes")
+    return data
+
+def _decode(data: bytes) -> str:
+    return data.rstrip(b"\0").decode("utf-8")
+
+def write_curve(path: str, curve: CapacityCurve, units: Tuple[str, str, str] = DEFAULT_UNITS):
+    """
+    Write a capacity curve in the binary format.
+
+    The file is written next to its destination and renamed, so readers never
+    see a partial file. The cached curve of the destination is released first.
+
+    Args:
+        path (str): Destination .mcap path
+        curve (CapacityCurve): Sorted curve to write
+        units (Tuple[str, str, str]): Units of n, power and torque
+    """
+    header = _HEADER.pack(
+        CURVE_MAGIC, CURVE_VERSION, FLAG_SORTED, len(curve),
+        _encode(curve.machine_id, 64), *(_encode(unit, 8) for unit in units),
+        curve.content_hash.encode("ascii")
+    )
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header.ljust(HEADER_SIZE, b"\0"))
+        for values in (curve.n, curve.power, curve.torque):
+            f.write(np.ascontiguousarray(values, dtype="<f8").tobytes())
+    release_curve(path)
+    os.replace(tmp_path, path)
+
+def read_header(path: str) -> Dict[str, Any]:
+    """
+    Read the header of a binary curve file.
+
+    Args:
+        path (str): .mcap file path
+
+    Returns:
+        Dict[str, Any]: count, machine_id, units, content_hash and sorted flag
+
+    Raises:
+        ValueError: If the file is not a valid curve file
+    """
+    with open(path, "rb") as f:
+        data = f.read(HEADER_SIZE)
+    if len(data) < HEADER_SIZE:
+        raise ValueError(f"Truncated curve file: {path}")
+    magic, version, flags, count, machine_id, unit_n, unit_p, unit_t, content_hash = _HEADER.unpack_from(data)
+    if magic != CURVE_MAGIC:
+        raise ValueError(f"Not a machine capacity curve file: {path}")
+    if version != CURVE_VERSION:
+        raise ValueError(f"Unsupported curve format version {version}: {path}")
+    if os.path.getsize(path) != HEADER_SIZE + 3 * 8 * count:
+        raise ValueError(f"Curve file size does not match its header: {path}")
+    return {
+        "count": count,
+        "machine_id": _decode(machine_id),
+        "units": (_decode(unit_n), _decode(unit_p), _decode(unit_t)),
+        "content_hash": content_hash.decode("ascii"),
+        "sorted": bool(flags & FLAG_SORTED)
+    }
+
+def read_curve(path: str, map_min_points: int = MAP_MIN_POINTS) -> CapacityCurve:
+    """
+    Memory-map a binary curve file.
+
+    Only the header is read; the columns are mapped read-only and paged in by
+    the OS on first access. Curves under map_min_points points are read in one
+    call instead, and the file is closed.
+
+    Args:
+        path (str): .mcap file path
+        map_min_points (int): Points from which the columns are mapped
+
+    Returns:
+        CapacityCurve: Curve backed by the mapped (or read) columns
+
+    Raises:
+        ValueError: If the file is not a valid curve file
+    """
+    header = read_header(path)
+    count = header["count"]
+    if count == 0:
+        empty = np.empty(0, dtype=np.float64)
+        return CapacityCurve(empty, empty, empty, header["machine_id"])
+    if count < map_min_points:
+        columns = np.fromfile(path, dtype="<f8", count=3 * count, offset=HEADER_SIZE).reshape(3, count)
+    else:
+        columns = np.memmap(path, dtype="<f8", mode="r", offset=HEADER_SIZE, shape=(3, count))
+    if not header["sorted"]:
+        return CapacityCurve(columns[0], columns[1], columns[2], header["machine_id"])
+    return CapacityCurve.from_sorted_arrays(columns[0], columns[1], columns[2],
+                                            header["machine_id"], header["content_hash"])
+
+def _check_finite(curve: CapacityCurve) -> CapacityCurve:
+    """Reject curves holding NaN or infinite values."""
+    if not all(np.isfinite(values).all() for values in (curve.n, curve.power, curve.torque)):
+        raise ValueError("Curve values must be finite numbers")
+    return curve
+
+def records_to_curve(records: List[Dict[str, float]], machine_id: str) -> CapacityCurve:
+    """
+    Build a curve from n/power/torque records, checking the values.
+
+    Args:
+        records (List[Dict[str, float]]): Machine capacity records
+        machine_id (str): Machine identifier
+
+    Returns:
+        CapacityCurve: The sorted curve
+
+    Raises:
+        ValueError: If a record is missing a field or holds a non-numeric value
+    """
+    try:
+        curve = CapacityCurve.from_records(records, machine_id)
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Each record must contain numeric fields n, power and torque ({e})")
+    return _check_finite(curve)
+
+def read_json_curve(json_path: str, machine_id: Optional[str] = None) -> CapacityCurve:
+    """
+    Read a machine_capacities.json records file.
+
+    Args:
+        json_path (str): Source JSON file
+        machine_id (Optional[str]): Machine identifier (default: source file name)
+
+    Returns:
+        CapacityCurve: The sorted curve
+    """
+    with open(json_path, encoding="utf-8") as f:
+        records = json.load(f)
+    return records_to_curve(records, machine_id or os.path.splitext(os.path.basename(json_path))[0])
+
+def read_excel_curve(xlsx_path: str, machine_id: Optional[str] = None) -> CapacityCurve:
+    """
+    Read a digitized Excel sheet (columns n, power, torque).
+
+    Args:
+        xlsx_path (str): Source .xlsx file, as read by data_extraction(machine_capacities).py
+        machine_id (Optional[str]): Machine identifier (default: source file name)
+
+    Returns:
+        CapacityCurve: The sorted curve
+    """
+    import pandas as pd
+    df = pd.read_excel(xlsx_path, engine="openpyxl")
+    df.columns = [str(col).lower() for col in df.columns]
+    required_columns = ["n", "power", "torque"]
+    if not all(col in df.columns for col in required_columns):
+        raise ValueError(f"Excel file must contain columns: {required_columns}")
+    curve = CapacityCurve(
+        df["n"].to_numpy(dtype=np.float64),
+        df["power"].to_numpy(dtype=np.float64),
+        df["torque"].to_numpy(dtype=np.float64),
+        machine_id or os.path.splitext(os.path.basename(xlsx_path))[0]
+    )
+    return _check_finite(curve)
+
+def read_source_curve(path: str, machine_id: Optional[str] = None) -> CapacityCurve:
+    """
+    Read a curve source file, JSON records or Excel sheet depending on its extension.
+
+    Args:
+        path (str): Source .json or .xlsx file
+        machine_id (Optional[str]): Machine identifier (default: source file name)
+
+    Returns:
+        CapacityCurve: The sorted curve
+    """
+    if path.lower().endswith((".xlsx", ".xlsm")):
+        return read_excel_curve(path, machine_id)
+    return read_json_curve(path, machine_id)
+
+def convert_json(json_path: str, out_path: str, machine_id: Optional[str] = None) -> CapacityCurve:
+    """
+    Convert a machine_capacities.json records file to the binary format.
+
+    Args:
+        json_path (str): Source JSON file
+        out_path (str): Destination .mcap file
+        machine_id (Optional[str]): Machine identifier (default: source file name)
+
+    Returns:
+        CapacityCurve: The converted curve
+    """
+    curve = read_json_curve(json_path, machine_id)
+    write_curve(out_path, curve)
+    return curve
+
+def convert_excel(xlsx_path: str, out_path: str, machine_id: Optional[str] = None) -> CapacityCurve:
+    """
+    Convert a digitized Excel sheet (columns n, power, torque) to the binary format.
+
+    Args:
+        xlsx_path (str): Source .xlsx file, as read by data_extraction(machine_capacities).py
+        out_path (str): Destination .mcap file
+        machine_id (Optional[str]): Machine identifier (default: source file name)
+
+    Returns:
+        CapacityCurve: The converted curve
+    """
+    curve = read_excel_curve(xlsx_path, machine_id)
+    write_curve(out_path, curve)
+    return curve
+
+def binary_path(path: str) -> str:
+    """Path of the binary file matching a curve source file."""
+    return os.path.splitext(path)[0] + CURVE_EXTENSION
+
+def resolve_curve_path(path: str) -> str:
+    """
+    Prefer the binary version of a JSON curve when it is up to date.
+
+    Args:
+        path (str): Curve file path (.json or .mcap)
+
+    Returns:
+        str: The .mcap sibling if it exists and is not older than path, else path
+    """
+    if path.endswith(CURVE_EXTENSION):
+        return path
+    candidate = binary_path(path)
+    try:
+        if os.stat(candidate).st_mtime_ns >= os.stat(path).st_mtime_ns:
+            return candidate
+    except OSError:
+        pass
+    return path
+
+# Absolute path -> ((mtime_ns, size), curve): one version per file, least recently used first
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def _read_curve(path: str, mtime_ns: int, size: int) -> CapacityCurve:
+    """Read or map a binary curve, cached per file version."""
+    with _cache_lock:
+        entry = _cache.get(path)
+        if entry is not None and entry[0] == (mtime_ns, size):
+            _cache.move_to_end(path)
+            return entry[1]
+    curve = read_curve(path)
+    with _cache_lock:
+        # Replaces (and releases) the stale version of the file
+        _cache[path] = ((mtime_ns, size), curve)
+        _cache.move_to_end(path)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return curve
+
+def release_curve(path: str):
+    """
+    Drop the cached curve of a file, so that the cache no longer holds it mapped.
+
+    Args:
+        path (str): .mcap file path
+    """
+    with _cache_lock:
+        _cache.pop(os.path.abspath(path), None)
+
+def load_curve(path: str) -> CapacityCurve:
+    """
+    Load a machine capacity curve from a .mcap or JSON file.
+
+    Args:
+        path (str): Curve file path
+
+    Returns:
+        CapacityCurve: The sorted curve
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+    """
+    path = resolve_curve_path(path)
+    if not path.endswith(CURVE_EXTENSION):
+        return load_capacity_curve(path)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"File not found: {path}")
+    stat = os.stat(path)
+    return _read_curve(os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
@@ -8,14 +8,32 @@ import os
 from typing import Dict, List, Any
 import streamlit as st
 
+from calculations.capacity_curve import CapacityCurve
+from data.catalog import InsertCatalog, load_catalog
+from data.curve_store import load_curve
+from data.validation import validate_conditions, validate_curve, validate_file
+from tracing import traced
+
+@st.cache_data(max_entries=32)
+def _load_json(file_path: str, mtime_ns: int, size: int) -> Dict[str, Any]:
+    """Parse a JSON file (cached per file version)."""
+    try:
+        with open(file_path, encoding="utf-8") as f:
+            return json.load(f)
+    except json.JSONDecodeError as e:
+        raise json.JSONDecodeError(f"Invalid JSON in file {file_path}: {str(e)}", e.doc, e.pos)
+
 class DataLoader:
     """Class for loading and caching data files."""
     
     @staticmethod
-    @st.cache_data
+    @traced("data.load_json")
     def load_json(file_path: str) -> Dict[str, Any]:
         """
         Load and cache JSON data from a file.
+
+        The cache is keyed on the file date and size, so an edited file is read
+        again on the next call instead of after a server restart.
         
         Args:
             file_path (str): Path to the JSON file
@@ -29,18 +47,61 @@ class DataLoader:
         """
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
-            
-        try:
-            with open(file_path, encoding="utf-8") as f:
-                return json.load(f)
-        except json.JSONDecodeError as e:
-            raise json.JSONDecodeError(f"Invalid JSON in file {file_path}: {str(e)}", e.doc, e.pos)
+        stat = os.stat(file_path)
+        return _load_json(file_path, stat.st_mtime_ns, stat.st_size)
             
     @staticmethod
+    @traced("data.load_machine_curve")
+    def load_machine_curve(file_path: str) -> CapacityCurve:
+        """
+        Load a machine capacity curve, memory-mapping its binary version when available.
+
+        A .mcap file next to the JSON file (see convert_machine_curve.py) is used
+        when it is not older than the JSON file; it is mapped with no parsing.
+
+        Args:
+            file_path (str): Path to the .json or .mcap curve file
+
+        Returns:
+            CapacityCurve: The sorted curve
+
+        Raises:
+            FileNotFoundError: If the file doesn't exist
+            ValueError: If the binary file is invalid
+        """
+        return load_curve(file_path)
+
+    @staticmethod
+    @traced("data.load_catalog")
+    def load_catalog(file_path: str, cache_size: int = 1024) -> InsertCatalog:
+        """
+        Open the indexed insert catalog of a cutting conditions file.
+
+        A .jsonl file next to the JSON file is used when it is not older than the
+        JSON file; it is streamed once to build the indexes and its entries are
+        read back by byte offset.
+
+        Args:
+            file_path (str): Path to the .json or .jsonl conditions file
+            cache_size (int): Entries of a .jsonl catalog kept in memory
+
+        Returns:
+            InsertCatalog: Mapping of insert name to conditions, indexed on first use
+
+        Raises:
+            FileNotFoundError: If the file doesn't exist
+        """
+        return load_catalog(file_path, cache_size=cache_size)
+
+    @staticmethod
+    @traced("data.validate_machine_capacities")
     def validate_machine_capacities(data: List[Dict[str, float]]) -> bool:
         """
         Validate machine capacities data structure.
-        
+
+        Checks column by column that n, power and torque are finite,
+        non-negative numbers and that no speed is given twice.
+
         Args:
             data (List[Dict[str, float]]): Machine capacities data
             
@@ -50,25 +111,19 @@ class DataLoader:
         Raises:
             ValueError: If data structure is invalid
         """
-        if not isinstance(data, list):
-            raise ValueError("Machine capacities must be a list")
-            
-        required_fields = {"n", "power", "torque"}
-        for record in data:
-            if not isinstance(record, dict):
-                raise ValueError("Each record must be a dictionary")
-            if not all(field in record for field in required_fields):
-                raise ValueError(f"Each record must contain fields: {required_fields}")
-            if not all(isinstance(record[field], (int, float)) for field in required_fields):
-                raise ValueError("All values must be numbers")
-                
+        validate_curve(data)
         return True
         
     @staticmethod
+    @traced("data.validate_cutting_conditions")
     def validate_cutting_conditions(data: Dict[str, Any]) -> bool:
         """
         Validate cutting conditions data structure.
-        
+
+        Checks the fields read by the application: operation and material, the
+        Vc and fn ranges (ap and hex when present) with min <= rec <= max, and
+        the optional Y0, insert_length_mm, kc1 and m0 numbers.
+
         Args:
             data (Dict[str, Any]): Cutting conditions data
             
@@ -80,14 +135,28 @@ class DataLoader:
         """
         if not isinstance(data, dict):
             raise ValueError("Cutting conditions must be a dictionary")
-            
-        required_fields = {"Vc", "fn", "ap", "ae", "kc1", "m0", "Y0"}
-        for tool_type, conditions in data.items():
-            if not isinstance(conditions, dict):
-                raise ValueError(f"Conditions for {tool_type} must be a dictionary")
-            if not all(field in conditions for field in required_fields):
-                raise ValueError(f"Each tool type must contain fields: {required_fields}")
-            if not all(isinstance(conditions[field], (int, float)) for field in required_fields):
-                raise ValueError("All values must be numbers")
-                
-        return True 
\ No newline at end of file
+        validate_conditions(data.items())
+        return True
+
+    @staticmethod
+    @traced("data.validate_file")
+    def validate_file(file_path: str, kind: str) -> int:
+        """
+        Validate a data file once per content.
+
+        The result is remembered by content hash for the whole process, so an
+        unchanged file is only hashed again when its date or size changes and
+        never validated again.
+
+        Args:
+            file_path (str): Conditions (.json/.jsonl) or machine capacities (.json) file
+            kind (str): "conditions" or "curve"
+
+        Returns:
+            int: Number of inserts or records
+
+        Raises:
+            FileNotFoundError: If the file doesn't exist
+            ValueError: If the data is invalid
+        """
+        return validate_file(file_path, kind)
@@ -0,0 +1,221 @@
+"""
+Module for the columnar archives of the calculation history.
+Exports the history to Parquet or Arrow IPC files, written in record batches
+so months of records never sit in memory at once, at full precision and with
+the machine and curve version of every record; reads them back as Arrow
+tables for analysis, or imports them into a history store.
+pyarrow is imported on first use (optional dependency).
+"""
+
+import os
+from typing import IO, TYPE_CHECKING, Any, Iterator, List, Optional, Sequence, Tuple, Union
+
+from config import HISTORY_CONFIG
+from data.history_store import HISTORY_COLUMNS, HistoryStore
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+ARCHIVE_FORMATS = ("parquet", "arrow")
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_TEXT_COLUMNS = ("session", "insert_name", "operation", "machine", "curve_version")
+_EXTENSIONS = {".parquet": "parquet", ".pq": "parquet", ".arrow": "arrow", ".feather": "arrow", ".ipc": "arrow"}
+
+def history_schema() -> "pa.Schema":
+    """
+    Get the Arrow schema of the history archives.
+
+    Returns:
+        pa.Schema: date as a timestamp, text columns as strings, values as float64, saved as a boolean
+    """
+    import pyarrow as pa
+    types = {"date": pa.timestamp("s"), "saved": pa.bool_()}
+    types.update({name: pa.string() for name in _TEXT_COLUMNS})
+    return pa.schema([(name, types.get(name, pa.float64())) for name in HISTORY_COLUMNS])
+
+def archive_format(path: str, fmt: Optional[str] = None) -> str:
+    """
+    Get the format of an archive from its extension unless given.
+
+    Args:
+        path (str): Archive file name
+        fmt (Optional[str]): "parquet" or "arrow", None to use the extension
+
+    Returns:
+        str: One of ARCHIVE_FORMATS
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+    if fmt is None:
+        fmt = _EXTENSIONS.get(os.path.splitext(str(path))[1].lower())
+    if fmt not in ARCHIVE_FORMATS:
+        raise ValueError(f"Unknown archive format for {path}: use {', '.join(_EXTENSIONS)}")
+    return fmt
+
+def _record_batch(rows: Sequence[Sequence[Any]], schema: "pa.Schema") -> "pa.RecordBatch":
+    """Build a record batch from rows in HISTORY_COLUMNS order."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    columns = list(zip(*rows))
+    arrays = []
+    for i, field in enumerate(schema):
+        if field.name == "date":
+            arrays.append(pc.strptime(pa.array(columns[i], pa.string()), format=DATE_FORMAT, unit="s"))
+        elif field.name == "saved":
+            arrays.append(pa.array([bool(value) for value in columns[i]], pa.bool_()))
+        else:
+            arrays.append(pa.array(columns[i], field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def export_history(store: HistoryStore, target: Union[str, IO[bytes]], fmt: Optional[str] = None,
+                   compression: str = HISTORY_CONFIG["archive_compression"],
+                   chunk_size: int = HISTORY_CONFIG["archive_chunk_size"], **filters: Any) -> int:
+    """
+    Write the matching records to a Parquet or Arrow IPC file, oldest first.
+
+    Records are read from the store and written chunk_size at a time (one
+    Parquet row group or Arrow record batch each).
+
+    Args:
+        store (HistoryStore): History to export
+        target (Union[str, IO[bytes]]): File path or binary file object
+        fmt (Optional[str]): "parquet" or "arrow" (default: from the extension, Parquet for file objects)
+        compression (str): Codec ("zstd", "lz4", "snappy" for Parquet, or "none")
+        chunk_size (int): Records per batch
+        **filters (Any): insert_name, operation, machine, session or saved
+
+    Returns:
+        int: Number of records written
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    fmt = archive_format(target, fmt) if isinstance(target, (str, os.PathLike)) else fmt or "parquet"
+    if fmt not in ARCHIVE_FORMATS:
+        raise ValueError(f"Unknown archive format: {fmt}")
+    schema = history_schema()
+    codec = None if compression == "none" else compression
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(target, schema, compression=codec or "none")
+    else:
+        writer = pa.ipc.new_file(target, schema, options=pa.ipc.IpcWriteOptions(compression=codec))
+    count = 0
+    try:
+        for rows in store.iter_rows(chunk_size, **filters):
+            batch = _record_batch(rows, schema)
+            if fmt == "parquet":
+                writer.write_batch(batch, row_group_size=chunk_size)
+            else:
+                writer.write_batch(batch)
+            count += len(rows)
+    finally:
+        writer.close()
+    return count
+
+def read_history(source: Union[str, IO[bytes]], columns: Optional[Sequence[str]] = None,
+                 fmt: Optional[str] = None) -> "pa.Table":
+    """
+    Read a history archive for analysis (table.to_pandas() for a DataFrame).
+
+    Parquet files are read in parallel and only the requested columns are
+    decoded; Arrow IPC files are memory-mapped.
+
+    Args:
+        source (Union[str, IO[bytes]]): File path or binary file object
+        columns (Optional[Sequence[str]]): Columns to read (default: all)
+        fmt (Optional[str]): "parquet" or "arrow" (default: from the extension, Parquet for file objects)
+
+    Returns:
+        pa.Table: Records of the archive
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    fmt = archive_format(source, fmt) if isinstance(source, (str, os.PathLike)) else fmt or "parquet"
+    if fmt == "parquet":
+        table = pq.read_table(source, columns=None if columns is None else list(columns))
+        # Parquet has no second unit: the dates come back in milliseconds
+        if "date" in table.column_names and pa.types.is_timestamp(table.schema.field("date").type):
+            table = table.set_column(table.column_names.index("date"), "date",
+                                     table.column("date").cast(pa.timestamp("s")))
+        return table
+    if fmt != "arrow":
+        raise ValueError(f"Unknown archive format: {fmt}")
+    if isinstance(source, (str, os.PathLike)):
+        source = pa.memory_map(str(source))
+    table = pa.ipc.open_file(source).read_all()
+    return table if columns is None else table.select(list(columns))
+
+def _iter_batches(source: Union[str, IO[bytes]], fmt: Optional[str],
+                  chunk_size: int) -> Tuple[List[str], Iterator["pa.RecordBatch"]]:
+    """Column names of an archive and its history columns, chunk_size records at a time."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    fmt = archive_format(source, fmt) if isinstance(source, (str, os.PathLike)) else fmt or "parquet"
+    if fmt == "parquet":
+        archive = pq.ParquetFile(source)
+        names = archive.schema_arrow.names
+        columns = [name for name in HISTORY_COLUMNS if name in names]
+        return names, archive.iter_batches(batch_size=chunk_size, columns=columns)
+    if fmt != "arrow":
+        raise ValueError(f"Unknown archive format: {fmt}")
+    reader = pa.ipc.open_file(pa.memory_map(str(source)) if isinstance(source, (str, os.PathLike)) else source)
+
+    def batches():
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            for start in range(0, batch.num_rows, chunk_size):
+                yield batch.slice(start, chunk_size)
+
+    return reader.schema.names, batches()
+
+def import_history(store: HistoryStore, source: Union[str, IO[bytes]], fmt: Optional[str] = None,
+                   chunk_size: int = HISTORY_CONFIG["archive_chunk_size"]) -> int:
+    """
+    Append the records of an archive to a history store, chunk_size at a time.
+
+    The archive is read batch by batch (Parquet row groups, Arrow record
+    batches), never as a whole table. Columns missing from the archive (older
+    exports) are left empty, saved defaulting to 0. The records are appended
+    as they are: importing the same archive twice stores its records twice.
+
+    Args:
+        store (HistoryStore): History to import into
+        source (Union[str, IO[bytes]]): File path or binary file object
+        fmt (Optional[str]): "parquet" or "arrow" (default: from the extension, Parquet for file objects)
+        chunk_size (int): Records written per transaction
+
+    Returns:
+        int: Number of records imported
+
+    Raises:
+        ValueError: If the format is unknown or the archive has no date or insert_name column
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    names, batches = _iter_batches(source, fmt, chunk_size)
+    missing = {"date", "insert_name"} - set(names)
+    if missing:
+        raise ValueError(f"Not a history archive, missing columns: {sorted(missing)}")
+    count = 0
+    for batch in batches:
+        columns = []
+        for name in HISTORY_COLUMNS:
+            if name not in batch.schema.names:
+                columns.append([0 if name == "saved" else None] * batch.num_rows)
+                continue
+            values = batch.column(name)
+            if name == "date" and pa.types.is_timestamp(values.type):
+                # Parquet stores the dates in milliseconds: %S would print the fraction
+                values = pc.strftime(pc.cast(values, pa.timestamp("s")), format=DATE_FORMAT)
+            elif name == "saved":
+                values = pc.cast(values, pa.int64()).fill_null(0)
+            columns.append(values.to_pylist())
+        count += store.append_rows(zip(*columns))
+    return count
@@ -0,0 +1,328 @@
+"""
+Module for the persistent calculation history.
+Stores operating points in one WAL-mode SQLite file shared by every session,
+with batched writes, indexed filters, paging and streamed CSV export. Reads
+merge the pending batch in memory instead of writing it first.
+"""
+
+import atexit
+import csv
+import io
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Stored columns, in table and export order (values are kept at full precision)
+HISTORY_COLUMNS = (
+    "date", "session", "insert_name", "operation", "machine", "curve_version",
+    "D", "Vc", "fn", "ap", "hex", "La", "Pc", "Mc", "Fa", "saved"
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    session TEXT,
+    insert_name TEXT NOT NULL,
+    operation TEXT,
+    machine TEXT,
+    curve_version TEXT,
+    D REAL, Vc REAL, fn REAL, ap REAL, hex REAL, La REAL,
+    Pc REAL, Mc REAL, Fa REAL,
+    saved INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_history_date ON history (date);
+CREATE INDEX IF NOT EXISTS idx_history_insert ON history (insert_name, date);
+CREATE INDEX IF NOT EXISTS idx_history_operation ON history (operation, date);
+CREATE INDEX IF NOT EXISTS idx_history_machine ON history (machine, date);
+CREATE INDEX IF NOT EXISTS idx_history_session ON history (session, date);
+"""
+
+# Filters accepted by count(), page() and iter_csv(), mapped to their column
+_FILTERS = {
+    "insert_name": "insert_name",
+    "operation": "operation",
+    "machine": "machine",
+    "session": "session",
+    "saved": "saved"
+}
+
+_DATE = HISTORY_COLUMNS.index("date")
+
+class HistoryStore:
+    """Thread-safe SQLite calculation history with batched writes."""
+
+    def __init__(self, path: str, batch_size: int = 50, flush_interval: float = 2.0):
+        """
+        Open (and create if needed) the history database.
+
+        Args:
+            path (str): SQLite file path (":memory:" for a temporary store)
+            batch_size (int): Pending records that trigger a write
+            flush_interval (float): Seconds after which pending records are written anyway
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending = []
+        self._distinct = {}  # column -> set of stored values, loaded on first distinct()
+        self._last_flush = time.monotonic()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        atexit.register(self.close)
+
+    def append(self, record: Dict[str, Any], flush: bool = False):
+        """
+        Queue one record; it is written with the next batch.
+
+        Args:
+            record (Dict[str, Any]): Values keyed by HISTORY_COLUMNS (missing ones are NULL)
+            flush (bool): Write the pending batch now
+        """
+        row = tuple(record.get(column) for column in HISTORY_COLUMNS[:-1]) + (int(record.get("saved", 0)),)
+        with self._lock:
+            self._pending.append(row)
+            if (flush or len(self._pending) >= self.batch_size
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush_locked()
+
+    def flush(self):
+        """Write the pending records."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        """Write the pending records in one transaction. Caller holds the lock."""
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        placeholders = ", ".join("?" * len(HISTORY_COLUMNS))
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                f"INSERT INTO history ({', '.join(HISTORY_COLUMNS)}) VALUES ({placeholders})",
+                self._pending
+            )
+        self._remember(self._pending)
+        self._pending = []
+
+    def _remember(self, rows: Iterable[Sequence[Any]]):
+        """Add the values of written rows to the loaded distinct() lists. Caller holds the lock."""
+        for column, values in self._distinct.items():
+            i = HISTORY_COLUMNS.index(column)
+            values.update(row[i] for row in rows if row[i] is not None)
+
+    def _pending_matching(self, filters: Dict[str, Any]) -> List[Tuple[Any, ...]]:
+        """Pending rows matching the filters, newest first. Caller holds the lock."""
+        tests = [(HISTORY_COLUMNS.index(_FILTERS[name]), value) for name, value in filters.items()
+                 if value is not None]
+        rows = [row for row in reversed(self._pending) if all(row[i] == value for i, value in tests)]
+        # Stable sort: among equal dates the latest appended row stays first, as with ORDER BY id DESC
+        return sorted(rows, key=lambda row: row[_DATE], reverse=True)
+
+    @staticmethod
+    def _where(filters: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        """Build the WHERE clause of the given filters (None values are ignored)."""
+        clauses, params = [], []
+        for name, value in filters.items():
+            if name not in _FILTERS:
+                raise ValueError(f"Unknown history filter: {name}")
+            if value is not None:
+                clauses.append(f"{_FILTERS[name]} = ?")
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def count(self, **filters: Any) -> int:
+        """
+        Count the records matching the filters.
+
+        Args:
+            **filters (Any): insert_name, operation, machine, session or saved
+
+        Returns:
+            int: Number of records
+        """
+        where, params = self._where(filters)
+        with self._lock:
+            stored = self._conn.execute(f"SELECT COUNT(*) FROM history{where}", params).fetchone()[0]
+            return stored + len(self._pending_matching(filters))
+
+    def page(self, page: int = 0, page_size: int = 50, **filters: Any) -> List[Dict[str, Any]]:
+        """
+        Get one page of records, newest first.
+
+        Args:
+            page (int): Page index starting at 0
+            page_size (int): Records per page
+            **filters (Any): insert_name, operation, machine, session or saved
+
+        Returns:
+            List[Dict[str, Any]]: Records keyed by HISTORY_COLUMNS
+        """
+        where, params = self._where(filters)
+        start = page * page_size
+        with self._lock:
+            pending = self._pending_matching(filters)
+            # Position of each pending row among all records: pending rows come after every stored
+            # row (higher id), so only the stored rows with a later date rank before them
+            ranks = []
+            for i, row in enumerate(pending):
+                later = self._conn.execute(
+                    f"SELECT COUNT(*) FROM history{where}{' AND' if where else ' WHERE'} date > ?",
+                    params + [row[_DATE]]
+                ).fetchone()[0]
+                ranks.append(later + i)
+            before = sum(rank < start for rank in ranks)
+            on_page = {rank: row for rank, row in zip(ranks, pending) if start <= rank < start + page_size}
+            stored = iter(self._conn.execute(
+                f"SELECT {', '.join(HISTORY_COLUMNS)} FROM history{where} "
+                "ORDER BY date DESC, id DESC LIMIT ? OFFSET ?",
+                params + [page_size - len(on_page), start - before]
+            ).fetchall())
+        rows = [on_page[rank] if rank in on_page else next(stored, None)
+                for rank in range(start, start + page_size)]
+        return [dict(zip(HISTORY_COLUMNS, row)) for row in rows if row is not None]
+
+    def columns(self, names: Sequence[str], limit: Optional[int] = None, **filters: Any) -> Dict[str, List[Any]]:
+        """
+        Read some columns of the matching records, newest first (for plots).
+
+        Args:
+            names (Sequence[str]): Columns among HISTORY_COLUMNS
+            limit (Optional[int]): Maximum number of records, None for all
+            **filters (Any): insert_name, operation, machine, session or saved
+
+        Returns:
+            Dict[str, List[Any]]: Values by column, one per record
+
+        Raises:
+            ValueError: If a column or a filter is unknown
+        """
+        unknown = [name for name in names if name not in HISTORY_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown history columns: {unknown}")
+        where, params = self._where(filters)
+        with self._lock:
+            pending = self._pending_matching(filters)
+            rows = self._conn.execute(
+                f"SELECT date, {', '.join(names)} FROM history{where} ORDER BY date DESC, id DESC LIMIT ?",
+                params + [-1 if limit is None else limit]
+            ).fetchall()
+        if pending:
+            positions = [HISTORY_COLUMNS.index(name) for name in (("date",) + tuple(names))]
+            # Pending rows go before the stored rows of the same date (higher id); sorted() is stable
+            rows = sorted([tuple(row[i] for i in positions) for row in pending] + rows,
+                          key=lambda row: row[0], reverse=True)[:limit]
+        return {name: [row[i + 1] for row in rows] for i, name in enumerate(names)}
+
+    def iter_rows(self, chunk_size: int = 5000, **filters: Any) -> Iterator[List[Tuple[Any, ...]]]:
+        """
+        Stream the matching records as chunks of rows, oldest first.
+
+        Only chunk_size rows are held in memory at a time; the read runs on its
+        own connection so the store stays available while the rows are read.
+
+        Args:
+            chunk_size (int): Rows fetched per chunk
+            **filters (Any): insert_name, operation, machine, session or saved
+
+        Yields:
+            List[Tuple[Any, ...]]: Rows in HISTORY_COLUMNS order, at full precision
+        """
+        where, params = self._where(filters)
+        self.flush()
+        conn = self._conn if self.path == ":memory:" else sqlite3.connect(self.path)
+        try:
+            cursor = conn.execute(
+                f"SELECT {', '.join(HISTORY_COLUMNS)} FROM history{where} ORDER BY date, id", params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            if conn is not self._conn:
+                conn.close()
+
+    def iter_csv(self, chunk_size: int = 5000, **filters: Any) -> Iterator[bytes]:
+        """
+        Stream the matching records as CSV, oldest first.
+
+        Args:
+            chunk_size (int): Rows fetched and encoded per chunk
+            **filters (Any): insert_name, operation, machine, session or saved
+
+        Yields:
+            bytes: UTF-8 CSV chunks, the first one being the header
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(HISTORY_COLUMNS)
+        yield buffer.getvalue().encode("utf-8")
+        for rows in self.iter_rows(chunk_size, **filters):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(rows)
+            yield buffer.getvalue().encode("utf-8")
+
+    def append_rows(self, rows: Iterable[Sequence[Any]]) -> int:
+        """
+        Write many records at once, in one transaction (imports).
+
+        Args:
+            rows (Iterable[Sequence[Any]]): Rows in HISTORY_COLUMNS order
+
+        Returns:
+            int: Number of records written
+        """
+        placeholders = ", ".join("?" * len(HISTORY_COLUMNS))
+
+        def remembered(rows):
+            for row in rows:
+                self._remember((row,))
+                yield row
+
+        with self._lock:
+            self._flush_locked()
+            with self._conn:
+                self._conn.execute("BEGIN")
+                cursor = self._conn.executemany(
+                    f"INSERT INTO history ({', '.join(HISTORY_COLUMNS)}) VALUES ({placeholders})",
+                    remembered(rows))
+            return cursor.rowcount
+
+    def distinct(self, column: str) -> List[Any]:
+        """
+        List the distinct values of an indexed column (for filter choices).
+
+        The stored values are read once, then kept up to date by the writes of
+        this store (records written by other processes appear after a restart).
+
+        Args:
+            column (str): insert_name, operation, machine or session
+
+        Returns:
+            List[Any]: Sorted distinct values
+        """
+        if column not in _FILTERS:
+            raise ValueError(f"Unknown history column: {column}")
+        with self._lock:
+            if column not in self._distinct:
+                self._distinct[column] = {row[0] for row in self._conn.execute(
+                    f"SELECT DISTINCT {column} FROM history WHERE {column} IS NOT NULL")}
+            i = HISTORY_COLUMNS.index(column)
+            values = self._distinct[column] | {row[i] for row in self._pending if row[i] is not None}
+        return sorted(values)
+
+    def close(self):
+        """Write the pending records and close the database."""
+        with self._lock:
+            if self._conn is None:
+                return
+            self._flush_locked()
+            self._conn.close()
+            self._conn = None
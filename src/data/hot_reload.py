@@ -0,0 +1,149 @@
+"""
+Module for the hot reload of the data files.
+Watches the source files of a dataset from a background thread, rebuilds the
+dataset off the request path when they change, and swaps the new version in
+atomically so readers always get one complete, consistent snapshot.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Iterable, NamedTuple, Tuple
+
+from calculations.result_cache import file_signature
+
+class Snapshot(NamedTuple):
+    """One loaded version of a dataset."""
+    version: int
+    data: Any
+    signature: Tuple[Tuple[str, int, int], ...]
+    loaded_at: float  # time.time() of the swap
+
+class ReloadStats(NamedTuple):
+    """Counters of a hot reloader."""
+    version: int
+    reloads: int  # successful loads, the first one included
+    failures: int
+    last_duration: float  # seconds
+    total_duration: float  # seconds
+    last_error: str
+    loaded_at: float
+
+class HotReloader:
+    """
+    Holder of the current snapshot of a dataset, reloaded when its files change.
+
+    Readers call current() once and use the returned snapshot for the whole
+    request: a reload builds the next snapshot aside and replaces the reference
+    in one assignment, so a request never mixes two versions. If a reload
+    fails, the previous snapshot stays current and the error is recorded.
+    """
+
+    def __init__(self, build: Callable[[], Any], sources: Callable[[], Iterable[str]], interval: float = 1.0):
+        """
+        Load the first snapshot (errors are raised to the caller).
+
+        Args:
+            build (Callable[[], Any]): Loads the dataset (runs in the watcher thread on reloads)
+            sources (Callable[[], Iterable[str]]): Paths whose date or size changes trigger a reload
+                (evaluated at each poll, so new files can be picked up)
+            interval (float): Seconds between two polls of the watcher thread
+        """
+        self.build = build
+        self.sources = sources
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._reloads = self._failures = 0
+        self._last_duration = self._total_duration = 0.0
+        self._last_error = ""
+        self._failed_signature = None
+        self._snapshot = None
+        self._load(file_signature(self.sources()), raise_errors=True)
+
+    def current(self) -> Snapshot:
+        """
+        Get the current snapshot.
+
+        Returns:
+            Snapshot: Latest successfully loaded version
+        """
+        return self._snapshot
+
+    def _load(self, signature: Tuple[Tuple[str, int, int], ...], raise_errors: bool = False) -> bool:
+        """Build and swap in a snapshot of the given file versions."""
+        start = time.perf_counter()
+        try:
+            data = self.build()
+        except Exception as e:
+            with self._lock:
+                self._failures += 1
+                self._last_error = f"{type(e).__name__}: {e}"
+                self._failed_signature = signature
+            if raise_errors:
+                raise
+            return False
+        duration = time.perf_counter() - start
+        with self._lock:
+            version = self._snapshot.version + 1 if self._snapshot else 1
+            self._snapshot = Snapshot(version, data, signature, time.time())
+            self._reloads += 1
+            self._last_duration = duration
+            self._total_duration += duration
+            self._last_error = ""
+            self._failed_signature = None
+        return True
+
+    def check(self) -> bool:
+        """
+        Reload now if a source file changed since the current snapshot.
+
+        A version that failed to load is not retried until the files change again.
+
+        Returns:
+            bool: True if a new snapshot was swapped in
+        """
+        signature = file_signature(self.sources())
+        if signature == self._snapshot.signature or signature == self._failed_signature:
+            return False
+        return self._load(signature)
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                # check() records build errors; a listing error is retried at the next poll
+                pass
+
+    def start(self) -> "HotReloader":
+        """
+        Start the watcher thread (daemon, polling every interval seconds).
+
+        Returns:
+            HotReloader: self
+        """
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._watch, name="data-watcher", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the watcher thread."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def stats(self) -> ReloadStats:
+        """
+        Get the reload counters.
+
+        Returns:
+            ReloadStats: Version, reload and failure counts, durations and last error
+        """
+        with self._lock:
+            return ReloadStats(self._snapshot.version, self._reloads, self._failures, self._last_duration,
+                               self._total_duration, self._last_error, self._snapshot.loaded_at)
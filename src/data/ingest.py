@@ -0,0 +1,295 @@
+"""
+Module for the incremental ingestion of digitizer exports.
+Converts a folder of XLSX/CSV capacity curves into the binary machine store,
+streaming each file, skipping files whose content has not changed since the
+last run, writing every result atomically and removing the curves whose
+export was deleted.
+"""
+
+import csv
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from calculations.capacity_curve import CapacityCurve
+from calculations.curve_simplify import simplify_curve
+from data.curve_store import CURVE_EXTENSION, write_curve
+
+SOURCE_EXTENSIONS = (".xlsx", ".xlsm", ".csv")
+# Ingestion state kept in the store (no .json extension, so it is not taken for a curve)
+STATE_FILE = ".ingest_state"
+
+REQUIRED_COLUMNS = ("n", "power", "torque")
+
+class IngestResult(NamedTuple):
+    """Outcome of one source file."""
+    source: str
+    machine_id: str
+    status: str  # "converted", "unchanged", "failed" or "removed"
+    points: int = 0
+    seconds: float = 0.0
+    error: str = ""
+    max_power_error: float = 0.0  # kW between the written curve and the export (simplified curves)
+    max_torque_error: float = 0.0  # Nm between the written curve and the export (simplified curves)
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    SHA-1 of a file, read in chunks.
+
+    Args:
+        path (str): File path
+        chunk_size (int): Bytes read at a time
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _rows(path: str) -> Iterator[Tuple[Any, ...]]:
+    """Stream the rows of a CSV or XLSX export, header first."""
+    if path.lower().endswith((".xlsx", ".xlsm")):
+        from openpyxl import load_workbook
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            yield from workbook.active.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            sample = f.read(4096)
+            f.seek(0)
+            try:
+                dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+            except csv.Error:
+                dialect = csv.excel
+            yield from csv.reader(f, dialect)
+
+def _number(cell: Any) -> float:
+    """Cell value as a float (decimal commas of French exports are accepted)."""
+    if isinstance(cell, str):
+        cell = cell.strip().replace(",", ".")
+    return float(cell)
+
+def read_export(path: str, machine_id: Optional[str] = None) -> CapacityCurve:
+    """
+    Read a digitizer export (columns n, power, torque) row by row.
+
+    Args:
+        path (str): .xlsx or .csv file (CSV delimiter detected among , ; and tab)
+        machine_id (Optional[str]): Machine identifier (default: source file name)
+
+    Returns:
+        CapacityCurve: The sorted curve
+
+    Raises:
+        ValueError: If a column is missing or a value is not a finite number
+    """
+    rows = _rows(path)
+    header = [str(name).strip().lower() for name in next(rows, ())]
+    if not all(column in header for column in REQUIRED_COLUMNS):
+        raise ValueError(f"File must contain columns: {list(REQUIRED_COLUMNS)}")
+    positions = [header.index(column) for column in REQUIRED_COLUMNS]
+    values = []
+    for number, row in enumerate(rows, 2):
+        if row is None or all(cell in (None, "") for cell in row):
+            continue
+        try:
+            values.append([_number(row[i]) for i in positions])
+        except (IndexError, TypeError, ValueError):
+            raise ValueError(f"Row {number}: n, power and torque must be numbers")
+    data = np.asarray(values, dtype=np.float64).reshape(-1, 3)
+    if not np.isfinite(data).all():
+        raise ValueError("Curve values must be finite numbers")
+    return CapacityCurve(data[:, 0], data[:, 1], data[:, 2],
+                         machine_id or os.path.splitext(os.path.basename(path))[0])
+
+def _convert(source: str, out_path: str, machine_id: str,
+             simplify: Optional[Dict[str, float]]) -> IngestResult:
+    """Convert one export (runs in a worker process when workers > 1)."""
+    start = time.perf_counter()
+    try:
+        curve = read_export(source, machine_id)
+        errors = (0.0, 0.0)
+        if simplify:
+            curve, report = simplify_curve(curve, simplify["max_power_error"], simplify["max_torque_error"],
+                                           int(simplify.get("window", 0)))
+            if not report.within(simplify["max_power_error"], simplify["max_torque_error"]):
+                raise ValueError(f"Simplified curve is {report.max_power_error:.3f} kW, "
+                                 f"{report.max_torque_error:.3f} Nm away from the export (tolerances "
+                                 f"{simplify['max_power_error']:g} kW, {simplify['max_torque_error']:g} Nm)")
+            errors = (report.max_power_error, report.max_torque_error)
+        write_curve(out_path, curve)
+    except (OSError, ValueError) as e:
+        return IngestResult(source, machine_id, "failed", seconds=time.perf_counter() - start, error=str(e))
+    return IngestResult(source, machine_id, "converted", len(curve), time.perf_counter() - start,
+                        max_power_error=errors[0], max_torque_error=errors[1])
+
+class Ingestor:
+    """Incremental converter of a source folder into a machine store."""
+
+    def __init__(self, source_dir: str, store_dir: str, simplify: Optional[Dict[str, float]] = None,
+                 workers: int = 1):
+        """
+        Prepare the ingestion (the previous state is read from the store).
+
+        Args:
+            source_dir (str): Folder of digitizer exports (.xlsx, .xlsm, .csv)
+            store_dir (str): Machine store written to (one <machine_id>.mcap per export)
+            simplify (Optional[Dict[str, float]]): window, max_power_error and max_torque_error
+                of the smoothing/simplification stage, None to keep every point
+            workers (int): Processes converting changed files in parallel
+        """
+        self.source_dir = source_dir
+        self.store_dir = store_dir
+        self.simplify = dict(simplify) if simplify else None
+        self.workers = workers
+        self.state_path = os.path.join(store_dir, STATE_FILE)
+        self.state = self._read_state()
+
+    def _read_state(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if state.get("simplify") != self.simplify:
+            # Settings changes invalidate every file (the names are kept to remove deleted exports)
+            return {name: {} for name in state.get("files", {})}
+        return state["files"]
+
+    def _write_state(self):
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"simplify": self.simplify, "files": self.state}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+    def sources(self) -> List[str]:
+        """Export file names of the source folder, sorted."""
+        if not os.path.isdir(self.source_dir):
+            return []
+        return sorted(name for name in os.listdir(self.source_dir)
+                      if name.lower().endswith(SOURCE_EXTENSIONS) and not name.startswith(("~$", ".")))
+
+    def _pending(self, names: List[str],
+                 force: bool) -> Tuple[List[Tuple[str, str, str, Dict[str, Any]]], List[IngestResult]]:
+        """Split the sources into changed files and the results of the files not converted."""
+        pending, unchanged = [], []
+        exports = {}
+        for name in names:
+            exports.setdefault(os.path.splitext(name)[0], []).append(name)
+        for name in names:
+            start = time.perf_counter()
+            path = os.path.join(self.source_dir, name)
+            machine_id = os.path.splitext(name)[0]
+            if len(exports[machine_id]) > 1:
+                # tour.csv and tour.xlsx would both write tour.mcap: neither is converted
+                others = ", ".join(other for other in exports[machine_id] if other != name)
+                unchanged.append(IngestResult(path, machine_id, "failed",
+                                              error=f"Duplicate machine id '{machine_id}' (also {others})"))
+                continue
+            out_path = os.path.join(self.store_dir, machine_id + CURVE_EXTENSION)
+            stat = os.stat(path)
+            signature = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+            known = self.state.get(name)
+            if not force and known and (os.path.exists(out_path) or "error" in known):
+                # Unchanged stat: no need to read the file; changed stat: compare the content
+                same = all(known.get(key) == value for key, value in signature.items())
+                digest = None if same else file_digest(path)
+                if same or digest == known.get("sha1"):
+                    known.update(signature)
+                    # A file that failed is reported again, but only retried once it changes
+                    unchanged.append(IngestResult(path, machine_id, "failed" if "error" in known else "unchanged",
+                                                  known.get("points", 0), time.perf_counter() - start,
+                                                  known.get("error", "")))
+                    continue
+            else:
+                digest = file_digest(path)
+            pending.append((path, out_path, machine_id, {**signature, "sha1": digest}))
+        return pending, unchanged
+
+    def _remove_deleted(self, names: List[str]) -> List[IngestResult]:
+        """Remove the curves and state entries of the exports no longer in the source folder."""
+        machine_ids = {os.path.splitext(name)[0] for name in names}
+        removed = []
+        for name in sorted(set(self.state) - set(names)):
+            machine_id = os.path.splitext(name)[0]
+            # A renamed export (tour.csv → tour.xlsx) keeps writing the same curve
+            if machine_id not in machine_ids:
+                try:
+                    os.remove(os.path.join(self.store_dir, machine_id + CURVE_EXTENSION))
+                except FileNotFoundError:
+                    pass
+            del self.state[name]
+            removed.append(IngestResult(os.path.join(self.source_dir, name), machine_id, "removed"))
+        return removed
+
+    def run(self, force: bool = False) -> List[IngestResult]:
+        """
+        Convert the new and changed exports and remove the curves of deleted ones.
+
+        Exports sharing a machine id (tour.csv and tour.xlsx) are reported
+        as failed and none of them is converted. Nothing is removed when the
+        source folder itself is missing.
+
+        Args:
+            force (bool): Convert every export even if unchanged
+
+        Returns:
+            List[IngestResult]: One result per export (and per deleted export), in file name order
+        """
+        os.makedirs(self.store_dir, exist_ok=True)
+        before = json.dumps(self.state, sort_keys=True)
+        names = self.sources()
+        pending, results = self._pending(names, force)
+        jobs = [(path, out_path, machine_id, self.simplify) for path, out_path, machine_id, _ in pending]
+        if self.workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                converted = list(pool.map(_convert, *zip(*jobs)))
+        else:
+            converted = [_convert(*job) for job in jobs]
+        for (path, _, _, signature), result in zip(pending, converted):
+            name = os.path.basename(path)
+            if result.status == "converted":
+                self.state[name] = {**signature, "points": result.points}
+            else:
+                self.state[name] = {**signature, "error": result.error}
+        results.extend(converted)
+        if os.path.isdir(self.source_dir):
+            results.extend(self._remove_deleted(names))
+        if json.dumps(self.state, sort_keys=True) != before or not os.path.exists(self.state_path):
+            self._write_state()
+        return sorted(results, key=lambda result: result.source)
+
+    def watch(self, interval: float = 2.0,
+              callback: Optional[Callable[[List[IngestResult]], None]] = None,
+              stop: Optional[Callable[[], bool]] = None):
+        """
+        Poll the source folder and convert the exports as they change.
+
+        Each poll only stats the files; unchanged files are never read.
+
+        Args:
+            interval (float): Seconds between polls
+            callback (Callable[[List[IngestResult]], None]): Called with the results of each poll
+                whose outcome differs from the previous one
+            stop (Callable[[], bool]): Returns True to stop watching (default: run until interrupted)
+        """
+        previous = None
+        while stop is None or not stop():
+            results = self.run()
+            outcome = [(result.source, result.status, result.error) for result in results]
+            if callback is not None and outcome != previous and (
+                    previous is not None or any(result.status != "unchanged" for result in results)):
+                callback(results)
+            previous = [(source, "unchanged" if status == "converted" else status, error)
+                        for source, status, error in outcome if status != "removed"]
+            time.sleep(interval)
@@ -0,0 +1,301 @@
+"""
+Module for the validation of the data files.
+Checks the cutting conditions and the machine capacity curves column by
+column with NumPy against schemas built once at import (inserts are checked
+in chunks, so a streamed catalog is never held in memory), and remembers the
+files already validated by content hash so unchanged data is never checked
+twice.
+"""
+
+import json
+import os
+import threading
+from itertools import islice
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from data.ingest import file_digest
+
+# Errors listed per check before the message is truncated
+_MAX_REPORTED = 5
+
+# Inserts converted to columns at a time by validate_conditions()
+CHUNK_SIZE = 10000
+
+class RangeField(NamedTuple):
+    """A [min, max] range of the conditions and its recommended value."""
+    range_key: str
+    rec_key: Optional[str]
+    required: bool
+
+class ConditionsSchema(NamedTuple):
+    """Fields of an insert read by the application."""
+    text: Tuple[str, ...]
+    numbers: Tuple[str, ...]  # optional scalar fields, checked when present
+    ranges: Tuple[RangeField, ...]
+
+class CurveSchema(NamedTuple):
+    """Fields of a machine capacity record."""
+    columns: Tuple[str, ...]
+    non_negative: Tuple[str, ...]
+    increasing: str  # strictly increasing once sorted (records are sorted when loaded)
+
+CONDITIONS_SCHEMA = ConditionsSchema(
+    text=("operation", "material"),
+    numbers=("Y0", "insert_length_mm", "kc1", "m0"),
+    ranges=(
+        RangeField("vitesse_coupe_Vc_mmin", "vitesse_coupe_rec", True),
+        RangeField("avance_f_mmtr", "avance_f_rec", True),
+        RangeField("profondeur_passe_ap_mm", "profondeur_passe_rec", False),
+        RangeField("hex_mm", "hex_rec", False)
+    )
+)
+
+CURVE_SCHEMA = CurveSchema(columns=("n", "power", "torque"), non_negative=("n", "power", "torque"),
+                           increasing="n")
+
+class _Failures:
+    """Failed checks with their first failing rows, accumulated over chunks."""
+
+    def __init__(self):
+        self._checks: Dict[str, Tuple[List[str], int]] = {}  # message -> (first labels, count)
+
+    def __bool__(self) -> bool:
+        return bool(self._checks)
+
+    def add(self, message: str, labels: Sequence[Any], mask: np.ndarray):
+        """Record the rows of mask that fail the check."""
+        rows = np.flatnonzero(mask)
+        if rows.size == 0:
+            return
+        names, count = self._checks.get(message, ([], 0))
+        names = names + [str(labels[row]) for row in rows[:_MAX_REPORTED - len(names)]]
+        self._checks[message] = (names, count + rows.size)
+
+    def raise_if_any(self):
+        """
+        Raise the failed checks, one line each.
+
+        Raises:
+            ValueError: Naming the first rows of each failed check
+        """
+        if self._checks:
+            raise ValueError("\n".join(
+                f"{message}: {', '.join(names)}" + (f" (+{count - len(names)})" if count > len(names) else "")
+                for message, (names, count) in self._checks.items()))
+
+def _numbers(values: List[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert a column to float64, with a mask of the cells that are not numbers.
+
+    Missing cells are NaN and not flagged; booleans and strings are flagged.
+    """
+    types = set(map(type, values))
+    if types <= {int, float}:
+        return np.array(values, dtype=np.float64), np.zeros(len(values), dtype=bool)
+    bad = np.fromiter((not (v is None or (isinstance(v, (int, float)) and not isinstance(v, bool)))
+                       for v in values), dtype=bool, count=len(values))
+    column = np.array([np.nan if v is None or flag else v for v, flag in zip(values, bad)], dtype=np.float64)
+    return column, bad
+
+def validate_conditions(entries: Iterable[Tuple[str, Any]], schema: ConditionsSchema = CONDITIONS_SCHEMA,
+                        chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Validate inserts column by column, chunk_size inserts at a time.
+
+    Args:
+        entries (Iterable[Tuple[str, Any]]): (insert name, conditions) pairs, e.g. streamed
+            from a JSON Lines catalog
+        schema (ConditionsSchema): Expected fields
+        chunk_size (int): Inserts held in memory at a time
+
+    Returns:
+        int: Number of inserts checked
+
+    Raises:
+        ValueError: Listing every failed check with the first inserts concerned
+    """
+    entries = iter(entries)
+    structure, errors = _Failures(), _Failures()
+    count = 0
+    while True:
+        chunk = list(islice(entries, chunk_size))
+        if not chunk:
+            break
+        count += len(chunk)
+        names = [name for name, _ in chunk]
+        records = [conditions for _, conditions in chunk]
+        not_dict = np.fromiter((not isinstance(r, dict) for r in records), dtype=bool, count=len(records))
+        structure.add("Conditions must be a dictionary", names, not_dict)
+        # Field checks are only reported when every insert is a dictionary
+        if not structure:
+            _check_conditions(names, records, schema, errors)
+    structure.raise_if_any()
+    errors.raise_if_any()
+    return count
+
+def _check_conditions(names: List[Any], records: List[Dict[str, Any]], schema: ConditionsSchema,
+                      errors: _Failures):
+    """Run the field checks of validate_conditions() on one chunk of inserts."""
+    for key in schema.text:
+        missing = np.fromiter((not isinstance(r.get(key), str) or not r.get(key) for r in records),
+                              dtype=bool, count=len(records))
+        errors.add(f"'{key}' must be a non-empty string", names, missing)
+    for key in schema.numbers:
+        column, bad = _numbers([r.get(key) for r in records])
+        errors.add(f"'{key}' must be a number", names, bad)
+        errors.add(f"'{key}' must be finite and not negative", names,
+                   ~bad & ~np.isnan(column) & ~(np.isfinite(column) & (column >= 0)))
+    for field in schema.ranges:
+        ranges = [r.get(field.range_key) for r in records]
+        present = np.fromiter((value is not None for value in ranges), dtype=bool, count=len(ranges))
+        if field.required:
+            errors.add(f"'{field.range_key}' is required", names, ~present)
+        shaped = np.fromiter((isinstance(v, list) and len(v) == 2 for v in ranges), dtype=bool, count=len(ranges))
+        errors.add(f"'{field.range_key}' must be a [min, max] list", names, present & ~shaped)
+        ok = present & shaped
+        low, bad_low = _numbers([v[0] if flag else None for v, flag in zip(ranges, ok)])
+        high, bad_high = _numbers([v[1] if flag else None for v, flag in zip(ranges, ok)])
+        errors.add(f"'{field.range_key}' bounds must be numbers", names, bad_low | bad_high)
+        with np.errstate(invalid="ignore"):
+            errors.add(f"'{field.range_key}' must satisfy 0 <= min <= max (finite)", names,
+                       ok & ~bad_low & ~bad_high &
+                       ~(np.isfinite(low) & np.isfinite(high) & (0 <= low) & (low <= high)))
+            if field.rec_key is not None:
+                rec, bad_rec = _numbers([r.get(field.rec_key) for r in records])
+                errors.add(f"'{field.rec_key}' must be a number", names, bad_rec)
+                errors.add(f"'{field.rec_key}' is required with '{field.range_key}'", names,
+                           ok & ~bad_rec & np.isnan(rec))
+                errors.add(f"'{field.rec_key}' must lie in '{field.range_key}'", names,
+                           ok & ~bad_low & ~bad_high & ~bad_rec & ~np.isnan(rec) &
+                           ~((low <= rec) & (rec <= high)))
+
+def validate_curve(records: Any, schema: CurveSchema = CURVE_SCHEMA) -> int:
+    """
+    Validate machine capacity records column by column.
+
+    Args:
+        records (Any): List of {n, power, torque} records
+        schema (CurveSchema): Expected columns
+
+    Returns:
+        int: Number of records checked
+
+    Raises:
+        ValueError: Listing every failed check with the first records concerned
+    """
+    if not isinstance(records, list):
+        raise ValueError("Machine capacities must be a list")
+    labels = [f"#{i}" for i in range(len(records))]
+    not_dict = np.fromiter((not isinstance(r, dict) for r in records), dtype=bool, count=len(records))
+    errors = _Failures()
+    errors.add("Each record must be a dictionary", labels, not_dict)
+    errors.raise_if_any()
+
+    columns = {}
+    for key in schema.columns:
+        column, bad = _numbers([r.get(key) for r in records])
+        errors.add(f"'{key}' must be a number", labels, bad | np.isnan(column))
+        errors.add(f"'{key}' must be finite", labels, np.isinf(column))
+        columns[key] = column
+    errors.raise_if_any()
+    for key in schema.non_negative:
+        errors.add(f"'{key}' must not be negative", labels, columns[key] < 0)
+    # Digitized curves are not always in order, but a speed given twice makes the curve ambiguous
+    order = np.argsort(columns[schema.increasing], kind="stable")
+    n = columns[schema.increasing][order]
+    repeated = np.zeros(n.size, dtype=bool)
+    repeated[order[1:][n[1:] == n[:-1]]] = True
+    errors.add(f"'{schema.increasing}' values must be distinct", labels, repeated)
+    errors.raise_if_any()
+    return len(records)
+
+def _read_conditions(path: str) -> Iterable[Tuple[str, Any]]:
+    """(name, conditions) pairs of a conditions file, JSON Lines files being streamed."""
+    if path.endswith(".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if not isinstance(record, dict) or "name" not in record:
+                    raise ValueError(f"Invalid catalog line {number}")
+                yield record.pop("name"), record
+    else:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError("Cutting conditions must be a dictionary")
+        yield from data.items()
+
+def _read_curve(path: str) -> Any:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+_VALIDATORS = {
+    "conditions": lambda path: validate_conditions(_read_conditions(path)),
+    "curve": lambda path: validate_curve(_read_curve(path))
+}
+
+class ValidationCache:
+    """Results of file validations, keyed by content hash."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._digests = {}  # (path, mtime_ns, size) -> content hash
+        self._results = {}  # (kind, content hash) -> record count or error message
+        self.validations = 0
+
+    def digest(self, path: str) -> str:
+        """Content hash of a file, only recomputed when its date or size changes."""
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            digest = self._digests.get(key)
+        if digest is None:
+            digest = file_digest(path)
+            with self._lock:
+                self._digests[key] = digest
+        return digest
+
+    def validate_file(self, path: str, kind: str) -> int:
+        """
+        Validate a data file unless the same content was already validated.
+
+        Args:
+            path (str): Conditions (.json/.jsonl) or machine capacities (.json) file
+            kind (str): "conditions" or "curve"
+
+        Returns:
+            int: Number of inserts or records
+
+        Raises:
+            FileNotFoundError: If the file doesn't exist
+            ValueError: If the file is invalid (also raised again for the same content)
+        """
+        if kind not in _VALIDATORS:
+            raise ValueError(f"Unknown data kind: {kind}")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"File not found: {path}")
+        key = (kind, self.digest(path))
+        with self._lock:
+            result = self._results.get(key)
+        if result is None:
+            try:
+                result = _VALIDATORS[kind](path)
+            except ValueError as e:
+                result = f"Invalid data in {path}:\n{e}"
+            with self._lock:
+                self._results[key] = result
+                self.validations += 1
+        if isinstance(result, str):
+            raise ValueError(result)
+        return result
+
+# Shared by every session of the server process
+VALIDATION_CACHE = ValidationCache()
+
+def validate_file(path: str, kind: str) -> int:
+    """validate_file() of the shared VALIDATION_CACHE."""
+    return VALIDATION_CACHE.validate_file(path, kind)
@@ -0,0 +1,559 @@
+"""
+Module for the local HTTP API of the calculation core.
+An asyncio server (standard library only) exposing single checks, batch
+checks of thousands of job lines, machine capacity lookups and request
+latency metrics. The insert catalog and the capacity curve are loaded once
+(and reloaded when their files change); large batches are parsed, checked
+and serialized in a process pool so the event loop only moves bytes.
+"""
+
+import asyncio
+import json
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from calculations.batch import CHECK_FIELDS, check_table
+from calculations.capacity_curve import CapacityCurve
+from calculations.cutting_calculations import get_local_capacity
+from calculations.result_cache import ResultCache, cached_compute_operation
+from config import API_CONFIG, CUTTING_CONSTANTS, RESULT_CACHE_CONFIG
+from data.catalog import InsertCatalog, load_catalog
+from data.curve_store import load_curve
+from data.hot_reload import HotReloader
+from data.validation import validate_file
+
+# Columns of a batch: insert name, required numbers, optional numbers
+BATCH_TOOL_COLUMN = "insert"
+BATCH_REQUIRED = ("D", "Vc", "fn")
+BATCH_OPTIONAL = ("ap", "hex", "kr")
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            411: "Length Required", 413: "Payload Too Large", 500: "Internal Server Error",
+            501: "Not Implemented"}
+
+def _finite(value: Any) -> Any:
+    """JSON-safe number: NaN and infinities (not valid JSON) become null."""
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+def _json(data: Any) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def _column(values: Any, name: str, size: int) -> np.ndarray:
+    """Float64 column of a batch (null is NaN)."""
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError(f"Column '{name}' must be a list of {size} values")
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ValueError(f"Column '{name}' must contain numbers") from None
+
+def _result_column(values: np.ndarray) -> list:
+    """JSON list of a result array, non-finite values as null."""
+    if values.dtype == bool:
+        return values.tolist()
+    finite = np.isfinite(values)
+    if finite.all():
+        return values.tolist()
+    return [v if ok else None for v, ok in zip(values.tolist(), finite.tolist())]
+
+class CheckService:
+    """Calculation core behind the API: one insert catalog and one capacity curve."""
+
+    def __init__(self, conditions: InsertCatalog, curve: CapacityCurve, max_power: float, max_torque: float,
+                 max_rows: int = API_CONFIG["max_rows"]):
+        """
+        Args:
+            conditions (InsertCatalog): Cutting conditions by insert
+            curve (CapacityCurve): Machine capacity curve
+            max_power (float): Default power outside the curve range in kW
+            max_torque (float): Default torque outside the curve range in Nm
+            max_rows (int): Maximum number of lines of a batch
+        """
+        self.conditions = conditions
+        self.curve = curve
+        self.max_power = max_power
+        self.max_torque = max_torque
+        self.max_rows = max_rows
+        # One cache per data version: a reload builds a new service, so /check never
+        # answers from the previous catalog or curve
+        self.cache = ResultCache(maxsize=RESULT_CACHE_CONFIG["maxsize"], ttl=RESULT_CACHE_CONFIG["ttl"],
+                                 decimals=RESULT_CACHE_CONFIG["decimals"])
+
+    @classmethod
+    def from_files(cls, conditions_path: str, curve_path: str, max_power: float, max_torque: float,
+                   max_rows: int = API_CONFIG["max_rows"]) -> "CheckService":
+        """
+        Validate and load the data files, building the catalog indexes.
+
+        Args:
+            conditions_path (str): Conditions file (.json, or its .jsonl catalog)
+            curve_path (str): Capacity curve file (.json, or its .mcap version)
+            max_power (float): Default power outside the curve range in kW
+            max_torque (float): Default torque outside the curve range in Nm
+            max_rows (int): Maximum number of lines of a batch
+
+        Returns:
+            CheckService: Service ready to answer requests
+
+        Raises:
+            FileNotFoundError: If a file doesn't exist
+            ValueError: If a file is invalid
+        """
+        conditions = load_catalog(conditions_path)
+        validate_file(conditions.path, "conditions")
+        len(conditions)  # builds the indexes
+        if os.path.exists(curve_path):
+            validate_file(curve_path, "curve")
+        return cls(conditions, load_curve(curve_path), max_power, max_torque, max_rows)
+
+    def _limits(self, request: Dict[str, Any]) -> Tuple[float, float]:
+        try:
+            return (float(request.get("max_power", self.max_power)),
+                    float(request.get("max_torque", self.max_torque)))
+        except (TypeError, ValueError):
+            raise ValueError("'max_power' and 'max_torque' must be numbers") from None
+
+    def capacity(self, n: float, max_power: Optional[float] = None,
+                 max_torque: Optional[float] = None) -> Dict[str, float]:
+        """
+        Machine capacity at a rotation speed.
+
+        Args:
+            n (float): Rotation speed in RPM
+            max_power (Optional[float]): Power outside the curve range in kW (default: service limit)
+            max_torque (Optional[float]): Torque outside the curve range in Nm (default: service limit)
+
+        Returns:
+            Dict[str, float]: n, power (kW) and torque (Nm)
+
+        Raises:
+            ValueError: If n or a limit is NaN or infinite
+        """
+        if not all(math.isfinite(value) for value in (n, max_power, max_torque) if value is not None):
+            raise ValueError("'n', 'max_power' and 'max_torque' must be finite numbers")
+        power, torque = get_local_capacity(n, self.curve,
+                                           self.max_power if max_power is None else max_power,
+                                           self.max_torque if max_torque is None else max_torque)
+        return {"n": n, "power": power, "torque": torque}
+
+    def check(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Compute and check one operating point.
+
+        Args:
+            request (Dict[str, Any]): insert, D, Vc, fn and optionally ap (default 0),
+                hex (default: hex_rec of the insert), kr, max_power, max_torque
+
+        Returns:
+            Dict[str, Any]: Every field of the OperationResult, the interpolation
+            bracket and the power/torque/engagement checks
+
+        Raises:
+            ValueError: If the insert is unknown or the inputs are invalid
+        """
+        if not isinstance(request, dict):
+            raise ValueError("The request must be a JSON object")
+        name = request.get("insert")
+        if name not in self.conditions:
+            raise ValueError(f"Unknown insert: {name}")
+        conditions = self.conditions[name]
+        try:
+            D, Vc, fn = (float(request[key]) for key in BATCH_REQUIRED)
+            # Same defaults as a batch line without these columns
+            ap = float(request.get("ap", 0.0))
+            hexv = None if request.get("hex") is None else float(request["hex"])
+            kr = float(request.get("kr", CUTTING_CONSTANTS["kr"]))
+        except KeyError as e:
+            raise ValueError(f"Missing field: {e.args[0]}") from None
+        except (TypeError, ValueError):
+            raise ValueError("D, Vc, fn, ap, hex and kr must be numbers") from None
+        max_power, max_torque = self._limits(request)
+        r = cached_compute_operation(name, conditions, D, Vc, fn, ap, hexv, kr, self.curve, max_power, max_torque,
+                                     cache=self.cache)
+        result = {key: _finite(value) for key, value in r._asdict().items() if key != "bracket"}
+        result["bracket"] = None if r.bracket is None else r.bracket._asdict()
+        result.update(max_engagement=r.max_engagement, power_ok=r.power_ok, torque_ok=r.torque_ok,
+                      engagement_ok=r.engagement_ok, ok=r.ok)
+        return result
+
+    def batch(self, body: bytes) -> Tuple[int, bytes]:
+        """
+        Check a batch of job lines, from the request body to the response body.
+
+        The body is {"rows": [{"insert": ..., "D": ..., ...}, ...]} or, more
+        compact, {"columns": {"insert": [...], "D": [...], ...}}, with optional
+        max_power and max_torque. Lines that cannot be computed (unknown insert,
+        missing value...) are flagged valid=false instead of failing the batch.
+
+        Args:
+            body (bytes): JSON request body
+
+        Returns:
+            Tuple[int, bytes]: Number of lines, and the JSON response
+            {"rows", "failed", "results": {field: [one value per line]}}
+
+        Raises:
+            ValueError: If the body is not a valid batch
+        """
+        try:
+            request = json.loads(body)
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise ValueError(f"Invalid JSON: {e}") from None
+        if not isinstance(request, dict):
+            raise ValueError("The request must be a JSON object")
+        if "rows" in request:
+            rows = request["rows"]
+            if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+                raise ValueError("'rows' must be a list of objects")
+            fields = {BATCH_TOOL_COLUMN, *BATCH_REQUIRED, *(f for f in BATCH_OPTIONAL if any(f in row for row in rows))}
+            columns = {field: [row.get(field) for row in rows] for field in fields}
+        elif isinstance(request.get("columns"), dict):
+            columns = request["columns"]
+        else:
+            raise ValueError("The request must have 'rows' or 'columns'")
+        names = columns.get(BATCH_TOOL_COLUMN)
+        if not isinstance(names, list):
+            raise ValueError(f"Column '{BATCH_TOOL_COLUMN}' is required")
+        size = len(names)
+        if size > self.max_rows:
+            raise ValueError(f"Too many lines: {size} (at most {self.max_rows} per request)")
+        table = {BATCH_TOOL_COLUMN: np.array([str(name) for name in names], dtype=str)}
+        for name in BATCH_REQUIRED:
+            if name not in columns:
+                raise ValueError(f"Column '{name}' is required")
+            table[name] = _column(columns[name], name, size)
+        for name in BATCH_OPTIONAL:
+            if name in columns:
+                table[name] = _column(columns[name], name, size)
+        max_power, max_torque = self._limits(request)
+        if size == 0:
+            return 0, _json({"rows": 0, "failed": 0, "results": {field: [] for field in CHECK_FIELDS}})
+        results = check_table(table, self.conditions, self.curve, max_power, max_torque,
+                              tool_column=BATCH_TOOL_COLUMN)
+        return size, _json({
+            "rows": size,
+            "failed": int(np.count_nonzero(~results["ok"])),
+            "results": {field: _result_column(results[field]) for field in CHECK_FIELDS}
+        })
+
+# Per-worker service, loaded once by _init_worker
+_worker = {}
+
+def _init_worker(conditions_path: str, curve_path: str, max_power: float, max_torque: float, max_rows: int):
+    """Load the catalog and the capacity curve once per worker process."""
+    _worker["service"] = CheckService.from_files(conditions_path, curve_path, max_power, max_torque, max_rows)
+
+def _run_batch(body: bytes) -> Tuple[int, bytes]:
+    return _worker["service"].batch(body)
+
+class LatencyMetrics:
+    """Request counts and latencies per route, with the event loop lag."""
+
+    BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self, window: int = API_CONFIG["latency_window"]):
+        """
+        Args:
+            window (int): Number of recent requests per route kept for the percentiles
+        """
+        self.window = window
+        self.started_at = time.time()
+        self.routes: Dict[str, Dict[str, Any]] = {}
+        self.loop_lag = deque(maxlen=window)  # seconds
+        self.max_loop_lag = 0.0
+        self.in_flight = 0
+        self.pool_in_flight = 0
+
+    def record(self, route: str, status: int, seconds: float, rows: int = 0):
+        """Record one answered request."""
+        stats = self.routes.get(route)
+        if stats is None:
+            stats = self.routes[route] = {"count": 0, "errors": 0, "rows": 0, "seconds": 0.0,
+                                          "buckets": [0] * (len(self.BUCKETS_MS) + 1),
+                                          "recent": deque(maxlen=self.window)}
+        stats["count"] += 1
+        stats["errors"] += status >= 400
+        stats["rows"] += rows
+        stats["seconds"] += seconds
+        ms = seconds * 1000
+        stats["buckets"][next((i for i, limit in enumerate(self.BUCKETS_MS) if ms <= limit),
+                              len(self.BUCKETS_MS))] += 1
+        stats["recent"].append(ms)
+
+    def record_lag(self, seconds: float):
+        """Record how late the event loop woke up a periodic task."""
+        self.loop_lag.append(seconds)
+        self.max_loop_lag = max(self.max_loop_lag, seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Current metrics as a JSON-serializable dictionary.
+
+        Returns:
+            Dict[str, Any]: Uptime, requests in flight, loop lag and, per route, counts
+            and latency percentiles (ms) over the recent window
+        """
+        routes = {}
+        for route, stats in sorted(self.routes.items()):
+            recent = np.fromiter(stats["recent"], dtype=np.float64)
+            p50, p95, p99 = np.percentile(recent, (50, 95, 99)) if recent.size else (0.0, 0.0, 0.0)
+            routes[route] = {
+                "count": stats["count"],
+                "errors": stats["errors"],
+                "rows": stats["rows"],
+                "mean_ms": round(1000 * stats["seconds"] / stats["count"], 3),
+                "p50_ms": round(float(p50), 3),
+                "p95_ms": round(float(p95), 3),
+                "p99_ms": round(float(p99), 3),
+                "max_recent_ms": round(float(recent.max()), 3) if recent.size else 0.0,
+                "buckets_ms": dict(zip([str(b) for b in self.BUCKETS_MS] + ["+Inf"], stats["buckets"]))
+            }
+        lag = np.fromiter(self.loop_lag, dtype=np.float64) * 1000
+        return {
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "in_flight": self.in_flight,
+            "pool_in_flight": self.pool_in_flight,
+            "loop_lag_ms": {"p99": round(float(np.percentile(lag, 99)), 3) if lag.size else 0.0,
+                            "max": round(self.max_loop_lag * 1000, 3)},
+            "routes": routes
+        }
+
+    def prometheus(self) -> str:
+        """
+        Current metrics in the Prometheus text format.
+
+        Returns:
+            str: Latency histogram and request counters per route
+        """
+        lines = ["# TYPE api_request_duration_seconds histogram"]
+        for route, stats in sorted(self.routes.items()):
+            cumulative = 0
+            for limit, count in zip(list(self.BUCKETS_MS) + [None], stats["buckets"]):
+                cumulative += count
+                le = "+Inf" if limit is None else f"{limit / 1000:g}"
+                lines.append(f'api_request_duration_seconds_bucket{{route="{route}",le="{le}"}} {cumulative}')
+            lines.append(f'api_request_duration_seconds_sum{{route="{route}"}} {stats["seconds"]:.6f}')
+            lines.append(f'api_request_duration_seconds_count{{route="{route}"}} {stats["count"]}')
+        lines.append("# TYPE api_request_errors_total counter")
+        lines += [f'api_request_errors_total{{route="{r}"}} {s["errors"]}' for r, s in sorted(self.routes.items())]
+        lines.append("# TYPE api_batch_rows_total counter")
+        lines += [f'api_batch_rows_total{{route="{r}"}} {s["rows"]}' for r, s in sorted(self.routes.items())]
+        lines.append("# TYPE api_event_loop_lag_max_seconds gauge")
+        lines.append(f"api_event_loop_lag_max_seconds {self.max_loop_lag:.6f}")
+        return "\n".join(lines) + "\n"
+
+class ApiServer:
+    """HTTP/1.1 server (keep-alive, Content-Length bodies) around a CheckService."""
+
+    def __init__(self, conditions_path: str, curve_path: str, max_power: float, max_torque: float,
+                 host: str = API_CONFIG["host"], port: int = API_CONFIG["port"],
+                 workers: int = API_CONFIG["workers"], inline_max_bytes: int = API_CONFIG["inline_max_bytes"],
+                 max_body_bytes: int = API_CONFIG["max_body_bytes"], max_rows: int = API_CONFIG["max_rows"],
+                 reload_interval: float = API_CONFIG["reload_interval"]):
+        """
+        Load the data files (errors are raised to the caller).
+
+        Args:
+            conditions_path (str): Conditions file (.json, or its .jsonl catalog)
+            curve_path (str): Capacity curve file (.json, or its .mcap version)
+            max_power (float): Default power outside the curve range in kW
+            max_torque (float): Default torque outside the curve range in Nm
+            host (str): Listening address (localhost by default)
+            port (int): Listening port, 0 for any free port
+            workers (int): Processes checking the batches, 0 to check them in the event loop thread
+            inline_max_bytes (int): Batches up to this body size are checked in the event loop
+                (a few hundred lines take less time than the trip to a worker)
+            max_body_bytes (int): Largest accepted request body
+            max_rows (int): Maximum number of lines of a batch
+            reload_interval (float): Seconds between two checks of the data files
+        """
+        self.conditions_path = conditions_path
+        self.curve_path = curve_path
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.inline_max_bytes = inline_max_bytes
+        self.max_body_bytes = max_body_bytes
+        self.metrics = LatencyMetrics()
+        self.data = HotReloader(
+            lambda: CheckService.from_files(conditions_path, curve_path, max_power, max_torque, max_rows),
+            self._sources, interval=reload_interval
+        )
+        self._initargs = (conditions_path, curve_path, max_power, max_torque, max_rows)
+        self._pool = None
+        self._pool_version = None
+        self._server = None
+        self._lag_task = None
+
+    def _sources(self) -> Tuple[str, ...]:
+        """Data files whose change reloads the service (sources and their .jsonl / .mcap versions)."""
+        return (self.conditions_path, os.path.splitext(self.conditions_path)[0] + ".jsonl",
+                self.curve_path, os.path.splitext(self.curve_path)[0] + ".mcap")
+
+    def _worker_pool(self, version: int) -> ProcessPoolExecutor:
+        """Process pool loaded with the given data version (replaced when the files change)."""
+        if self._pool is None or self._pool_version != version:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                             initargs=self._initargs)
+            self._pool_version = version
+        return self._pool
+
+    async def start(self) -> "ApiServer":
+        """
+        Start listening, the data watcher and, if workers > 0, the worker pool.
+
+        Returns:
+            ApiServer: self (port holds the actual port when 0 was given)
+        """
+        self.data.start()
+        if self.workers > 0:
+            # Workers are started and loaded now rather than by the first large batch
+            pool = self._worker_pool(self.data.current().version)
+            await asyncio.gather(*(asyncio.wrap_future(pool.submit(len, ())) for _ in range(self.workers)))
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._lag_task = asyncio.create_task(self._watch_loop_lag())
+        return self
+
+    async def serve_forever(self):
+        """Answer requests until cancelled."""
+        await self._server.serve_forever()
+
+    async def close(self):
+        """Stop listening and shut the worker pool and the data watcher down."""
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        self.data.stop()
+
+    async def _watch_loop_lag(self, interval: float = 0.05):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            self.metrics.record_lag(max(0.0, loop.time() - start - interval))
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Answer the requests of one connection until it is closed."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                start = time.perf_counter()
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                    headers = {}
+                    while True:
+                        line = await reader.readline()
+                        if line in (b"\r\n", b"\n", b""):
+                            break
+                        name, _, value = line.decode("latin-1").partition(":")
+                        headers[name.strip().lower()] = value.strip()
+                except (ValueError, asyncio.LimitOverrunError):
+                    await self._respond(writer, 400, _json({"error": "Malformed request"}), False)
+                    break
+                keep_alive = (headers.get("connection", "").lower() != "close" if version == "HTTP/1.1"
+                              else headers.get("connection", "").lower() == "keep-alive")
+                if "chunked" in headers.get("transfer-encoding", "").lower():
+                    await self._respond(writer, 501, _json({"error": "Chunked bodies are not supported"}), False)
+                    break
+                try:
+                    length = int(headers.get("content-length", "0"))
+                except ValueError:
+                    await self._respond(writer, 411, _json({"error": "Invalid Content-Length"}), False)
+                    break
+                if length > self.max_body_bytes:
+                    await self._respond(writer, 413, _json({"error": f"Body larger than {self.max_body_bytes} bytes"}),
+                                        False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                self.metrics.in_flight += 1
+                try:
+                    route, status, payload, content_type, rows = await self._dispatch(method, target, body)
+                finally:
+                    self.metrics.in_flight -= 1
+                await self._respond(writer, status, payload, keep_alive, content_type)
+                self.metrics.record(route, status, time.perf_counter() - start, rows)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: bytes, keep_alive: bool,
+                       content_type: str = "application/json"):
+        head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + payload)
+        await writer.drain()
+
+    async def _dispatch(self, method: str, target: str, body: bytes) -> Tuple[str, int, bytes, str, int]:
+        """Route a request: (route, status, body, content type, batch lines)."""
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        routes = {"/health": "GET", "/metrics": "GET", "/capacity": "GET", "/check": "POST", "/batch": "POST"}
+        if url.path not in routes:
+            return "other", 404, _json({"error": f"Unknown path: {url.path}"}), "application/json", 0
+        if method != routes[url.path]:
+            return url.path, 405, _json({"error": f"Use {routes[url.path]} for {url.path}"}), "application/json", 0
+        snapshot = self.data.current()
+        service = snapshot.data
+        rows = 0
+        try:
+            if url.path == "/health":
+                payload = _json({"status": "ok", "data_version": snapshot.version,
+                                 "inserts": len(service.conditions), "curve_points": len(service.curve),
+                                 "workers": self.workers})
+            elif url.path == "/metrics":
+                if query.get("format") == "prometheus":
+                    return url.path, 200, self.metrics.prometheus().encode("utf-8"), "text/plain; version=0.0.4", 0
+                payload = _json(self.metrics.snapshot())
+            elif url.path == "/capacity":
+                try:
+                    n = float(query["n"])
+                    limits = [float(query[key]) if key in query else None for key in ("max_power", "max_torque")]
+                except (KeyError, ValueError):
+                    raise ValueError("'n' (and optional 'max_power', 'max_torque') must be numbers") from None
+                payload = _json(service.capacity(n, *limits))
+            elif url.path == "/check":
+                try:
+                    request = json.loads(body)
+                except (UnicodeDecodeError, json.JSONDecodeError) as e:
+                    raise ValueError(f"Invalid JSON: {e}") from None
+                payload = _json(service.check(request))
+            else:
+                if self.workers > 0 and len(body) > self.inline_max_bytes:
+                    pool = self._worker_pool(snapshot.version)
+                    self.metrics.pool_in_flight += 1
+                    try:
+                        rows, payload = await asyncio.wrap_future(pool.submit(_run_batch, body))
+                    finally:
+                        self.metrics.pool_in_flight -= 1
+                else:
+                    rows, payload = service.batch(body)
+        except ValueError as e:
+            return url.path, 400, _json({"error": str(e)}), "application/json", rows
+        except Exception as e:
+            return url.path, 500, _json({"error": f"{type(e).__name__}: {e}"}), "application/json", rows
+        return url.path, 200, payload, "application/json", rows
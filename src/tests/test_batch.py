@@ -0,0 +1,120 @@
+"""
+Test module for batch cutting calculations.
+"""
+
+import math
+import numpy as np
+import pytest
+from calculations.batch import (
+    DRILLING,
+    BORING,
+    GROOVING,
+    TURNING,
+    operation_kind,
+    evaluate_batch,
+    evaluate_table,
+    check_table
+)
+from calculations.capacity_curve import CapacityCurve
+from calculations.cutting_calculations import rotation_speed, hex_co, length_la, power_pc, torque_mc
+
+CONDITIONS = {
+    "groove": {"operation": "gorge", "Y0": 20, "insert_length_mm": 3.0},
+    "bore": {"operation": "alésage", "hex_rec": 0.25, "Y0": 6},
+    "drill": {"operation": "perçage", "Y0": 20},
+    "turn": {"operation": "chariotage/dressage", "Y0": 20}
+}
+
+def test_operation_kind():
+    """Test operation rule selection."""
+    assert operation_kind(CONDITIONS["groove"]) == GROOVING
+    assert operation_kind(CONDITIONS["bore"]) == BORING
+    assert operation_kind(CONDITIONS["drill"]) == DRILLING
+    assert operation_kind(CONDITIONS["turn"]) == TURNING
+
+def test_evaluate_batch_turning_matches_scalar():
+    """Test that the batch turning rules match the scalar formulas."""
+    D, Vc, fn, ap, kr = 40.0, 2000.0, 0.25, 1.5, 95.0
+    res = evaluate_batch(CONDITIONS["turn"], [D, D], Vc, fn, ap=ap)
+    n = rotation_speed(Vc, D)
+    hexv = hex_co(fn, kr)
+    kc = 400 * (1 / hexv**0.25) * (1 - 20/100)
+    Pc = power_pc(kc * ap * fn, Vc)
+    assert res["n"] == pytest.approx([n, n])
+    assert res["kc"][0] == pytest.approx(kc)
+    assert res["Pc"][0] == pytest.approx(Pc)
+    assert res["Mc"][0] == pytest.approx(torque_mc(Pc, n))
+    assert res["La"][0] == pytest.approx(length_la(ap, kr))
+    assert np.isnan(res["Fa"]).all()
+
+def test_evaluate_batch_operation_rules():
+    """Test the drilling, boring and grooving specific rules."""
+    drill = evaluate_batch(CONDITIONS["drill"], 20.0, 175.0, 0.18)
+    kc = 400 * (2 / 0.18)**0.25 * 0.8
+    assert drill["kc"][0] == pytest.approx(kc)
+    assert drill["Pc"][0] == pytest.approx(kc * 0.18 * 20.0 * 175.0 / 240000)
+    assert np.isnan(drill["La"][0])
+
+    bore = evaluate_batch(CONDITIONS["bore"], 50.0, 445.0, 0.25, ap=1.25, hexv=[0.3, np.nan])
+    assert bore["hex"] == pytest.approx([0.3, 0.25])
+    assert bore["La"] == pytest.approx([1.25, 1.25])
+
+    groove = evaluate_batch(CONDITIONS["groove"], 50.0, 200.0, 0.08, ap=10.0)
+    assert groove["Fc"][0] == pytest.approx(groove["kc"][0] * 3.0 * 0.08)
+    assert groove["La"][0] == pytest.approx(3.0 / math.sin(math.radians(95)))
+
+def test_evaluate_batch_invalid_inputs():
+    """Test invalid diameters and chip thicknesses."""
+    with pytest.raises(ValueError):
+        evaluate_batch(CONDITIONS["turn"], [10.0, 0.0], 100.0, 0.1, ap=1.0)
+    with pytest.raises(ValueError):
+        evaluate_batch(CONDITIONS["drill"], 10.0, 100.0, 0.0)
+
+def test_evaluate_table():
+    """Test a table mixing several inserts."""
+    table = {
+        "Plaquette": ["turn", "drill", "turn", "bore"],
+        "D": [40.0, 20.0, 30.0, 50.0],
+        "Vc": [2000.0, 175.0, 1500.0, 445.0],
+        "fn": [0.25, 0.18, 0.2, 0.25],
+        "ap": [1.5, np.nan, 2.0, 1.25]
+    }
+    res = evaluate_table(table, CONDITIONS)
+    for i, tool in enumerate(table["Plaquette"]):
+        row = evaluate_batch(CONDITIONS[tool], table["D"][i], table["Vc"][i], table["fn"][i], ap=table["ap"][i])
+        assert res["Pc"][i] == pytest.approx(row["Pc"][0])
+
+    with pytest.raises(ValueError):
+        evaluate_table({"Plaquette": ["unknown"], "D": [1.0], "Vc": [1.0], "fn": [1.0]}, CONDITIONS)
+
+def test_check_table_flags():
+    """Test pass/fail flags and invalid rows."""
+    curve = CapacityCurve([100, 100000], [5.0, 5.0], [10.0, 10.0])
+    table = {
+        "Plaquette": ["turn", "turn", "drill", "unknown", "turn"],
+        "D": [40.0, 40.0, 20.0, 10.0, 0.0],
+        "Vc": [300.0, 2500.0, 175.0, 100.0, 100.0],
+        "fn": [0.12, 0.6, 0.18, 0.1, 0.1],
+        "ap": [0.5, 7.0, np.nan, 1.0, 1.0]
+    }
+    res = check_table(table, CONDITIONS, curve, 99.0, 99.0)
+    assert list(res["valid"]) == [True, True, True, False, False]
+    assert list(res["ok"]) == [True, False, True, False, False]
+    assert not res["power_ok"][1]
+    assert res["engagement_ok"][2]
+    assert np.isnan(res["Pc"][3])
+
+def test_check_table_invalid_kr():
+    """Test that a kr outside ]0, 180[ only invalidates its row, for the operations using kr."""
+    curve = CapacityCurve([100, 100000], [5.0, 5.0], [10.0, 10.0])
+    table = {
+        "Plaquette": ["turn", "turn", "groove", "turn", "drill", "bore", "turn"],
+        "D": [40.0] * 7,
+        "Vc": [200.0] * 7,
+        "fn": [0.2] * 7,
+        "ap": [1.0] * 7,
+        "kr": [90.0, 0.0, 180.0, np.inf, 0.0, 0.0, np.nan]
+    }
+    res = check_table(table, CONDITIONS, curve, 99.0, 99.0)
+    assert list(res["valid"]) == [True, False, False, False, True, True, True]
+    assert np.isnan(res["Pc"][1]) and np.isfinite(res["Pc"][[0, 4, 5, 6]]).all()
@@ -0,0 +1,334 @@
+"""
+Benchmark suite of the hot paths: cutting formulas (scalar and batched),
+capacity interpolation from the real 564-point curve up to 1M points, data
+loading and validation, and full reruns of app.py through Streamlit's
+testing harness.
+
+Timings are compared with the JSON baselines of benchmark_baselines.json, in
+seconds and relative to a calibration workload timed alongside them, and a
+benchmark fails when both are above its baseline by more than
+BENCHMARK_CONFIG["max_regression"] (BENCHMARK_CONFIG["rerun_max_regression"]
+for the app reruns). On another environment than the baselines' only the
+relative figure is compared. The suite takes about half a minute, so it
+only runs on demand:
+
+    RUN_BENCHMARKS=1 python -m pytest tests/test_benchmarks.py
+    BENCHMARK_UPDATE=1 python -m pytest tests/test_benchmarks.py  # record new baselines
+"""
+
+import json
+import os
+import platform
+import shutil
+import sys
+import time
+import numpy as np
+import pytest
+from calculations.batch import evaluate_batch
+from calculations.capacity_curve import CapacityCurve
+from calculations.operations import OperationGraph, compute_operation
+from calculations.machine_registry import MachineRegistry, MachineSpec
+from calculations.sweep import sweep_chunk
+from calculations.uncertainty import simulate
+from calculations.cutting_calculations import (
+    rotation_speed,
+    hex_co,
+    length_la,
+    coefficient_kc,
+    power_pc,
+    torque_mc,
+    effort_axial_percage,
+    get_local_capacity
+)
+from config import BENCHMARK_CONFIG
+from data.data_loader import DataLoader
+from data.validation import ValidationCache, validate_conditions, validate_curve
+from tracing import discard, span, traced
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), BENCHMARK_CONFIG["baseline_file"])
+UPDATE = bool(os.environ.get("BENCHMARK_UPDATE"))
+
+pytestmark = pytest.mark.skipif(not (UPDATE or os.environ.get("RUN_BENCHMARKS")),
+                                reason="benchmarks run with RUN_BENCHMARKS=1 or BENCHMARK_UPDATE=1")
+
+CONDITIONS = {
+    "groove": {"operation": "gorge", "Y0": 20, "insert_length_mm": 3.0},
+    "bore": {"operation": "alésage", "hex_rec": 0.25, "Y0": 6},
+    "drill": {"operation": "perçage", "Y0": 20},
+    "turn": {"operation": "chariotage/dressage", "Y0": 20}
+}
+CURVE_SIZES = (564, 10_000, 100_000, 1_000_000)
+BATCH_SIZE = 100_000
+
+def _environment():
+    """What the timings depend on besides the code."""
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count()
+    }
+
+_CALIBRATION_DATA = np.random.default_rng(0).random(20_000)
+
+def _calibration():
+    """Fixed workload timed along every benchmark: interpreter loop and NumPy sort, about half each."""
+    total = 0.0
+    for i in range(2000):
+        total += i * 0.5
+    np.sort(_CALIBRATION_DATA)
+
+def _read_baselines():
+    if not os.path.exists(BASELINE_FILE):
+        return {"environment": _environment(), "benchmarks": {}}
+    with open(BASELINE_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+def _write_baseline(name, seconds, relative):
+    baselines = _read_baselines()
+    if baselines["environment"] != _environment():
+        baselines = {"environment": _environment(), "benchmarks": {}}
+    baselines["benchmarks"][name] = {"seconds": seconds, "relative": relative}
+    baselines["benchmarks"] = dict(sorted(baselines["benchmarks"].items()))
+    tmp_path = BASELINE_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(baselines, f, indent=2)
+        f.write("\n")
+    os.replace(tmp_path, BASELINE_FILE)
+
+def _loops(func, min_sample_time):
+    """Number of calls making a sample last at least min_sample_time (after one warm-up call)."""
+    func()
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_sample_time:
+            return loops
+        loops *= 10 if elapsed < min_sample_time / 10 else 2
+
+def measure(func, repeat=BENCHMARK_CONFIG["repeat"], min_sample_time=BENCHMARK_CONFIG["min_sample_time"]):
+    """
+    Time a function like timeit, interleaving its samples with samples of a calibration workload.
+
+    The speed of a shared machine drifts by tens of percent within minutes;
+    the ratio of the two best samples taken side by side varies much less and
+    is what the baselines compare.
+
+    Args:
+        func (Callable[[], Any]): Function to time
+        repeat (int): Number of samples of each
+        min_sample_time (float): Minimum duration of a sample in seconds
+
+    Returns:
+        Tuple[float, float]: Seconds per call, and the same relative to one calibration call
+    """
+    loops, calibration_loops = _loops(func, min_sample_time), _loops(_calibration, min_sample_time)
+    best = best_calibration = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        best = min(best, (time.perf_counter() - start) / loops)
+        start = time.perf_counter()
+        for _ in range(calibration_loops):
+            _calibration()
+        best_calibration = min(best_calibration, (time.perf_counter() - start) / calibration_loops)
+    return best, best / best_calibration
+
+def check(name, func, max_regression=BENCHMARK_CONFIG["max_regression"], **kwargs):
+    """Time a benchmark and compare it with its baseline (or record it with BENCHMARK_UPDATE=1)."""
+    seconds, relative = measure(func, **kwargs)
+    print(f"{name}: {seconds * 1e6:.3f} µs ({relative:.4g} calibration units)")
+    if UPDATE:
+        _write_baseline(name, seconds, relative)
+        return
+    baselines = _read_baselines()
+    baseline = baselines["benchmarks"].get(name)
+    if baseline is None:
+        pytest.skip(f"no baseline for {name}, run with BENCHMARK_UPDATE=1")
+    same_environment = baselines["environment"] == _environment()
+
+    def slowdown_of(seconds, relative):
+        # A real regression shows in both figures; the machine slowing down only in the seconds,
+        # and a lucky calibration sample only in the relative cost. Seconds measured on another
+        # machine say nothing, the calibration-normalised cost is compared alone
+        ratio = relative / baseline["relative"]
+        return (min(seconds / baseline["seconds"], ratio) if same_environment else ratio) - 1
+
+    slowdown = slowdown_of(seconds, relative)
+    if slowdown > max_regression:
+        # Measured again before failing: a busy spell of the machine rarely lasts two measurements
+        seconds, relative = (min(pair) for pair in zip((seconds, relative), measure(func, **kwargs)))
+        slowdown = slowdown_of(seconds, relative)
+    assert slowdown <= max_regression, (
+        f"{name} regressed by {slowdown:.0%} ({seconds * 1e6:.3f} µs, {relative:.4g} calibration units; "
+        f"{baseline['seconds'] * 1e6:.3f} µs, {baseline['relative']:.4g} in the baseline)")
+
+def _real_curve():
+    with open(os.path.join(ROOT, "machine_capacities.json"), encoding="utf-8") as f:
+        return CapacityCurve.from_records(json.load(f))
+
+def _curve(size):
+    """The shipped curve (564 points) or a synthetic spindle curve of the given size."""
+    if size == 564:
+        curve = _real_curve()
+        assert len(curve) == size
+        return curve
+    n = np.linspace(50.0, 6000.0, size)
+    power = np.minimum(n / 200.0, 14.9)
+    return CapacityCurve(n, power, 30000 * power / (np.pi * n))
+
+SCALAR_FORMULAS = {
+    "rotation_speed": lambda: rotation_speed(180.0, 50.0),
+    "hex_co": lambda: hex_co(0.25, 95.0),
+    "length_la": lambda: length_la(1.5, 95.0),
+    "coefficient_kc": lambda: coefficient_kc(400.0, 0.25, 0.25, 6.0),
+    "power_pc": lambda: power_pc(900.0, 180.0),
+    "torque_mc": lambda: torque_mc(2.7, 1146.0),
+    "effort_axial_percage": lambda: effort_axial_percage(400.0, 0.1, 12.0)
+}
+
+@pytest.mark.parametrize("name", sorted(SCALAR_FORMULAS))
+def test_formula_scalar(name):
+    """Benchmark one scalar call of each formula."""
+    check(f"formula.{name}", SCALAR_FORMULAS[name])
+
+@pytest.mark.parametrize("kind", sorted(CONDITIONS))
+def test_formula_batch(kind):
+    """Benchmark the batched formulas of each operation on 100k operating points."""
+    rng = np.random.default_rng(0)
+    D = rng.uniform(10.0, 100.0, BATCH_SIZE)
+    Vc = rng.uniform(50.0, 300.0, BATCH_SIZE)
+    fn = rng.uniform(0.05, 0.4, BATCH_SIZE)
+    ap = rng.uniform(0.5, 4.0, BATCH_SIZE)
+    check(f"formula.batch_{kind}_{BATCH_SIZE}", lambda: evaluate_batch(CONDITIONS[kind], D, Vc, fn, ap=ap))
+
+@pytest.mark.parametrize("size", CURVE_SIZES)
+def test_local_capacity(size):
+    """Benchmark scalar and array capacity lookups on curves of 564 to 1M points."""
+    curve = _curve(size)
+    speeds = np.random.default_rng(0).uniform(0.0, 6500.0, BATCH_SIZE)
+    check(f"capacity.get_local_capacity_{size}", lambda: get_local_capacity(1234.5, curve, 14.9, 95.0))
+    check(f"capacity.query_array_{size}x{BATCH_SIZE}", lambda: curve.query_array(speeds, 14.9, 95.0))
+
+@pytest.mark.parametrize("kind", sorted(CONDITIONS))
+def test_uncertainty(kind):
+    """Benchmark the Monte Carlo simulation of one operating point (100k samples, default spreads)."""
+    curve = _real_curve()
+    check(f"uncertainty.simulate_{kind}_{BATCH_SIZE}",
+          lambda: simulate(CONDITIONS[kind], 40.0, 150.0, 0.2, 1.5, None, 95.0, curve, 14.9, 95.0,
+                           samples=BATCH_SIZE), repeat=5)
+
+@pytest.mark.parametrize("size", (564, 100_000))
+def test_capacity_figure(size):
+    """Benchmark the capacity figure with 10k history points, downsampled once per curve as in the app."""
+    from calculations.curve_simplify import downsample_curve
+    from ui.components import UIComponents
+    curve = _curve(size)
+    check(f"ui.downsample_curve_{size}", lambda: downsample_curve(curve, 1000), repeat=5)
+    shown = downsample_curve(curve, 1000)
+    rng = np.random.default_rng(0)
+    history = {"n": rng.uniform(50.0, 6000.0, 10_000), "Pc": rng.uniform(0.0, 15.0, 10_000),
+               "Mc": rng.uniform(0.0, 95.0, 10_000)}
+    check(f"ui.capacity_figure_{size}",
+          lambda: UIComponents.capacity_figure(shown, (1500.0, 5.0, 40.0), history).to_json(), repeat=5)
+
+def test_operation_graph():
+    """Benchmark one operating point from scratch and through the graph when only ap changes."""
+    curve = _real_curve()
+    check("operation.compute", lambda: compute_operation("turn", CONDITIONS["turn"], 40.0, 150.0, 0.2, 1.5,
+                                                         None, 95.0, curve, 14.9, 95.0))
+    graph = OperationGraph()
+    depths = iter(np.tile([1.5, 2.0], 1_000_000))
+    check("operation.graph_update_ap", lambda: graph.update("turn", CONDITIONS["turn"], 40.0, 150.0, 0.2,
+                                                            next(depths), None, 95.0, curve, 14.9, 95.0))
+
+def test_sweep_chunk():
+    """Benchmark one sweep chunk: a turning insert, 10 diameters, a 16-point grid, the shipped curve."""
+    registry = MachineRegistry()
+    registry.add(MachineSpec("machine", os.path.join(ROOT, "machine_capacities.json"), 14.9, 95.0))
+    stack = registry.stacked()
+    turning = dict(CONDITIONS["turn"], profondeur_passe_ap_mm=[0.5, 7.0], avance_f_mmtr=[0.12, 0.6],
+                   vitesse_coupe_Vc_mmin=[150, 400])
+    diameters = np.linspace(10.0, 100.0, 10)
+    check("sweep.chunk_turn_10x4096", lambda: sweep_chunk(stack, turning, diameters, 16), repeat=5)
+
+def test_data_loading():
+    """Benchmark parsing and validating the shipped data files, cold and cached."""
+    conditions_path = os.path.join(ROOT, "conditions_coupe_sandvik.json")
+    curve_path = os.path.join(ROOT, "machine_capacities.json")
+    with open(conditions_path, encoding="utf-8") as f:
+        conditions = json.load(f)
+    with open(curve_path, encoding="utf-8") as f:
+        records = json.load(f)
+
+    def parse():
+        with open(conditions_path, encoding="utf-8") as f:
+            json.load(f)
+        with open(curve_path, encoding="utf-8") as f:
+            json.load(f)
+
+    cache = ValidationCache()
+    check("data.parse_json", parse)
+    check("data.load_json_cached", lambda: DataLoader.load_json(conditions_path))
+    check("data.validate_conditions", lambda: validate_conditions(conditions.items()))
+    check("data.validate_curve", lambda: validate_curve(records))
+    check("data.validate_file_cached", lambda: cache.validate_file(curve_path, "curve"))
+
+def test_history_archive(tmp_path):
+    """Benchmark exporting 100k history records to Parquet and reading them back for analysis."""
+    pytest.importorskip("pyarrow")
+    from data.history_archive import export_history, read_history
+    from data.history_store import HistoryStore
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+    store.append_rows((f"2025-01-{1 + i % 28:02d} 08:{i // 60 % 60:02d}:{i % 60:02d}", "session", "CCMT 09 T3 08-UM",
+                       "alésage", "machine", "c0ffee", 50.0, 445.0 + i / 3, 0.25, 1.5, 0.3, 1.6, 1.2345, 2.5,
+                       None, i % 3 == 0) for i in range(100_000))
+    path = str(tmp_path / "history.parquet")
+    check("data.history_export_parquet_100k", lambda: export_history(store, path), repeat=3)
+    check("data.history_read_parquet_100k", lambda: read_history(path), repeat=5)
+    store.close()
+
+def test_tracing_overhead():
+    """Benchmark a span and a traced call when no trace is active (the default)."""
+    discard()
+
+    def block():
+        with span("calc.interpolation"):
+            pass
+
+    check("tracing.span_inactive", block)
+    check("tracing.traced_inactive", traced("calc.noop")(lambda: None))
+
+@pytest.fixture
+def app_test(tmp_path, monkeypatch):
+    """The application started headlessly in a scratch directory (own history database)."""
+    from streamlit.testing.v1 import AppTest
+    for name in ("conditions_coupe_sandvik.json", "machine_capacities.json"):
+        shutil.copy(os.path.join(ROOT, name), tmp_path)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, "path", list(sys.path))
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=60).run()
+    assert not at.exception
+    return at
+
+def test_app_rerun(app_test):
+    """Benchmark full script reruns, unchanged and with a new diameter."""
+    # A rerun goes through the whole Streamlit runtime, whose timing varies more than a hot path's
+    tolerance = {"max_regression": BENCHMARK_CONFIG["rerun_max_regression"],
+                 "repeat": BENCHMARK_CONFIG["rerun_repeat"]}
+    check("app.rerun", app_test.run, **tolerance)
+    values = iter(np.tile([51.5, 50.0], 1000))
+
+    def change_diameter():
+        # Looked up again after each run: the element tree is rebuilt by every rerun
+        diameter = next(w for w in app_test.number_input if w.label.startswith("Diamètre"))
+        diameter.set_value(float(next(values))).run()
+
+    check("app.rerun_input_change", change_diameter, **tolerance)
+    assert not app_test.exception
@@ -37,13 +37,13 @@ def test_length_la():
 
 def test_coefficient_kc():
     """Test specific cutting force coefficient calculation."""
-    assert round(coefficient_kc(2000, 0.1, 90, 0.2, 0.3), 2) == 1994.0
+    assert round(coefficient_kc(2000, 0.1, 0.2, 0.3), 2) == 3160.28
     
     # Test invalid inputs
     with pytest.raises(ValueError):
-        coefficient_kc(2000, 0, 90, 0.2, 0.3)
+        coefficient_kc(2000, 0, 0.2, 0.3)
     with pytest.raises(ValueError):
-        coefficient_kc(2000, 0.1, 0, 0.2, 0.3)
+        coefficient_kc(2000, hex_co(0.1, 0), 0.2, 0.3)
 
 def test_power_pc():
     """Test cutting power calculation."""
@@ -0,0 +1,79 @@
+"""
+Test module for machine capacity curves.
+"""
+
+import json
+import numpy as np
+import pytest
+from calculations.capacity_curve import CapacityCurve, load_capacity_curve
+
+RECORDS = [
+    {"n": 2000, "power": 10, "torque": 100},
+    {"n": 1000, "power": 5, "torque": 50},
+    {"n": 3000, "power": 12, "torque": 40}
+]
+
+def _reference(n, records, max_power, max_torque):
+    """Sort-and-scan interpolation the curve replaces."""
+    caps = sorted(records, key=lambda rec: rec["n"])
+    ns = [rec["n"] for rec in caps]
+    if n <= ns[0] or n >= ns[-1]:
+        return max_power, max_torque
+    for i in range(len(ns)-1):
+        if ns[i] <= n <= ns[i+1]:
+            alpha = (n - ns[i]) / (ns[i+1] - ns[i])
+            return (caps[i]["power"] + alpha * (caps[i+1]["power"] - caps[i]["power"]),
+                    caps[i]["torque"] + alpha * (caps[i+1]["torque"] - caps[i]["torque"]))
+
+def test_query_matches_reference():
+    """Test scalar and array queries against the sort-and-scan interpolation."""
+    curve = CapacityCurve.from_records(RECORDS)
+    speeds = [500, 1000, 1500, 2000, 2500, 3000, 3500]
+    powers, torques = curve.query_array(speeds, 15, 150)
+    for i, n in enumerate(speeds):
+        expected = _reference(n, RECORDS, 15, 150)
+        assert curve.query(n, 15, 150) == pytest.approx(expected)
+        assert (powers[i], torques[i]) == pytest.approx(expected)
+
+def test_bracket():
+    """Test the bracketing points and interpolation factor."""
+    curve = CapacityCurve.from_records(RECORDS)
+    b = curve.bracket(2500)
+    assert (b.n1, b.n2, b.p1, b.p2, b.t1, b.t2) == (2000, 3000, 10, 12, 100, 40)
+    assert b.alpha == pytest.approx(0.5)
+    assert curve.bracket(3000) is None
+    assert CapacityCurve.from_records([]).bracket(1500) is None
+
+def test_resampled_table():
+    """Test the uniform lookup table."""
+    curve = CapacityCurve.from_records(RECORDS)
+    table = curve.resample(2001)
+    speeds = np.array([500, 1200, 1999.5, 2750, 3500])
+    powers, torques = table.query_array(speeds, 15, 150)
+    expected_p, expected_t = curve.query_array(speeds, 15, 150)
+    assert powers == pytest.approx(expected_p)
+    assert torques == pytest.approx(expected_t)
+    assert table.query(2750, 15, 150) == pytest.approx(curve.query(2750, 15, 150))
+    assert table.query(3000, 15, 150) == (15, 150)
+
+def test_load_capacity_curve(tmp_path):
+    """Test loading a curve file once per file version."""
+    path = tmp_path / "caps.json"
+    path.write_text(json.dumps(RECORDS), encoding="utf-8")
+    curve = load_capacity_curve(str(path))
+    assert curve is load_capacity_curve(str(path))
+    assert curve.machine_id == "caps"
+    assert list(curve.n) == [1000, 2000, 3000]
+    with pytest.raises(FileNotFoundError):
+        load_capacity_curve(str(tmp_path / "missing.json"))
+
+def test_large_curve_scalar_lookup():
+    """Test scalar lookups on curves too large for the Python list bisect."""
+    rng = np.random.default_rng(1)
+    n = np.sort(rng.uniform(10.0, 6000.0, 10000))
+    curve = CapacityCurve(n, rng.uniform(1.0, 15.0, n.size), rng.uniform(20.0, 250.0, n.size))
+    speeds = rng.uniform(0.0, 7000.0, 200)
+    power, torque = curve.query_array(speeds, 99.0, 999.0)
+    for i, speed in enumerate(speeds):
+        assert curve.query(speed, 99.0, 999.0) == pytest.approx((power[i], torque[i]))
+    assert curve._n_list is None
@@ -0,0 +1,83 @@
+"""
+Test module for the indexed insert catalog.
+"""
+
+import json
+import os
+import pytest
+from data.catalog import InsertCatalog, load_catalog, material_terms, resolve_catalog_path, write_jsonl
+
+CONDITIONS_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "conditions_coupe_sandvik.json")
+
+def _entries(count):
+    materials = ["aluminium", "acier/fonte", "inox"]
+    for i in range(count):
+        low = 50 + 10 * i
+        yield f"INS-{i}", {"operation": "alésage" if i % 2 else "perçage", "material": materials[i % 3],
+                           "vitesse_coupe_Vc_mmin": [low, low + 300], "avance_f_mmtr": [0.1, 0.3],
+                           "vitesse_coupe_rec": low + 100, "Y0": 6}
+
+def test_json_catalog_mapping():
+    """Test that the JSON dict file reads as a mapping with its indexes."""
+    with open(CONDITIONS_PATH, encoding="utf-8") as f:
+        data = json.load(f)
+    catalog = InsertCatalog(CONDITIONS_PATH)
+    assert len(catalog) == len(data) and list(catalog) == list(data)
+    assert catalog["CCMT 09 T3 08-UM 1125"] == data["CCMT 09 T3 08-UM 1125"]
+    assert "inconnue" not in catalog
+    assert catalog.query(operation="Alésage", material="acier", Vc=445) == ["CCMT 09 T3 08-UM 1125"]
+    assert catalog.query(material="aluminium", ap=6.0) == ["CCGX 12 04 08-AL H10"]
+    assert catalog.query(Vc=100000) == []
+    with pytest.raises(ValueError):
+        catalog.query(kr=95)
+
+def test_jsonl_catalog_streamed(tmp_path):
+    """Test the JSON Lines catalog: lazy scan, offset reads and range queries."""
+    path = str(tmp_path / "catalog.jsonl")
+    write_jsonl(_entries(300), path)
+    catalog = InsertCatalog(path, cache_size=4)
+    assert not catalog._loaded
+    assert len(catalog) == 300
+    assert catalog["INS-123"]["vitesse_coupe_Vc_mmin"] == [1280, 1580]
+    for i in range(10):
+        catalog[f"INS-{i}"]
+    assert len(catalog._entries) == 4
+    # Vc = 800 lies in [50 + 10 i, 350 + 10 i] for i in 45..75
+    expected = [f"INS-{i}" for i in range(45, 76) if i % 2 and i % 3 == 0]
+    assert catalog.query(operation="alésage", material="aluminium", Vc=800) == expected
+    assert catalog.query(Vc=800, limit=3) == ["INS-45", "INS-46", "INS-47"]
+    assert catalog.materials() == ["acier", "acier/fonte", "aluminium", "fonte", "inox"]
+    with pytest.raises(KeyError):
+        catalog["INS-300"]
+
+def test_jsonl_catalog_rewritten(tmp_path):
+    """Test that a rewritten .jsonl is re-indexed instead of returning another insert."""
+    path = str(tmp_path / "catalog.jsonl")
+    entries = list(_entries(2))
+    write_jsonl(entries, path)
+    catalog = InsertCatalog(path, cache_size=0)
+    assert catalog["INS-0"]["vitesse_coupe_Vc_mmin"] == [50, 350]
+    write_jsonl(reversed(entries), path)
+    assert catalog["INS-0"]["vitesse_coupe_Vc_mmin"] == [50, 350]
+    assert catalog["INS-1"]["vitesse_coupe_Vc_mmin"] == [60, 360]
+    assert list(catalog) == ["INS-1", "INS-0"]
+    write_jsonl(entries[:1], path)
+    with pytest.raises(KeyError):
+        catalog["INS-1"]
+
+def test_resolve_and_errors(tmp_path):
+    """Test the .jsonl preference and invalid catalogs."""
+    json_path = str(tmp_path / "conditions.json")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(dict(_entries(3)), f)
+    assert resolve_catalog_path(json_path) == json_path
+    write_jsonl(_entries(3), str(tmp_path / "conditions.jsonl"))
+    assert load_catalog(json_path).path.endswith(".jsonl")
+    assert material_terms("Acier/Fonte") == ["acier/fonte", "acier", "fonte"]
+
+    bad = tmp_path / "bad.jsonl"
+    bad.write_text('{"name": "A", "Y0": 6}\n{"Y0": 6}\n', encoding="utf-8")
+    with pytest.raises(ValueError):
+        len(InsertCatalog(str(bad)))
+    with pytest.raises(FileNotFoundError):
+        load_catalog(str(tmp_path / "absent.json"))
@@ -0,0 +1,91 @@
+"""
+Test module for the capacity curve smoothing and simplification.
+"""
+
+import os
+import numpy as np
+import pytest
+from calculations.capacity_curve import CapacityCurve, load_capacity_curve
+from calculations.curve_simplify import douglas_peucker, downsample_curve, local_linear_smooth, lttb, simplify_curve
+
+CURVE_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "machine_capacities.json")
+
+def test_local_linear_smooth():
+    """Test that lines are kept exactly and alternating noise is removed."""
+    x = np.linspace(0, 100, 51)
+    line = 2 * x + 1
+    assert np.allclose(local_linear_smooth(x, line, 7), line)
+    noisy = line + np.where(np.arange(51) % 2, 0.5, -0.5)
+    assert np.max(np.abs(local_linear_smooth(x, noisy, 9) - line)) < 0.2
+    assert np.array_equal(local_linear_smooth(x, noisy, 0), noisy)
+
+def test_douglas_peucker_bound():
+    """Test the error bound and the kept points of a piecewise linear series."""
+    x = np.linspace(0, 10, 101)
+    y = np.minimum(x, 5.0)
+    assert list(douglas_peucker(x, [y], [1e-9])) == [0, 50, 100]
+    z = np.sin(x)
+    kept = douglas_peucker(x, [z], [0.01])
+    assert np.max(np.abs(np.interp(x, x[kept], z[kept]) - z)) <= 0.01
+    assert 2 < kept.size < 101
+
+def test_simplify_machine_curve():
+    """Test the preprocessing of the digitized curve and its report."""
+    curve = load_capacity_curve(CURVE_PATH)
+    simplified, report = simplify_curve(curve, 0.1, 1.0, window=9)
+    assert report.points_in == len(curve) == 564
+    assert report.points_out == len(simplified) < len(curve)
+    assert report.smoothing_power_error <= 0.1 + 1e-9 and report.smoothing_torque_error <= 1.0 + 1e-9
+    assert report.max_power_error <= report.smoothing_power_error + report.simplification_power_error + 1e-9
+    assert simplified.n[0] == curve.n[0] and simplified.n[-1] == curve.n[-1]
+
+    # The tolerances bound the error to the source points, with or without smoothing
+    assert report.within(0.1, 1.0)
+    unsmoothed = simplify_curve(curve, 0.1, 1.0)[1]
+    assert unsmoothed.within(0.1, 1.0) and unsmoothed.smoothing_power_error == 0.0
+    assert report.points_out < unsmoothed.points_out
+    assert not report.within(0.05, 1.0)
+
+    exact, report = simplify_curve(curve, 0.0, 0.0)
+    assert report.max_power_error == report.max_torque_error == 0.0
+    with pytest.raises(ValueError):
+        simplify_curve(CapacityCurve([1.0, 2.0], [1.0, 1.0], [1.0, 1.0]), -1.0, 1.0)
+
+def _lttb_reference(x, y, threshold):
+    """Textbook LTTB, one bucket at a time."""
+    every = (len(x) - 2) / (threshold - 2)
+    kept, a = [0], 0
+    for i in range(threshold - 2):
+        start, stop = int(i * every) + 1, int((i + 1) * every) + 1
+        following = slice(stop, min(int((i + 2) * every) + 1, len(x)))
+        cx, cy = (x[-1], y[-1]) if i == threshold - 3 else (x[following].mean(), y[following].mean())
+        area = np.abs((x[a] - cx) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (cy - y[a]))
+        a = start + int(np.argmax(area))
+        kept.append(a)
+    return np.array(kept + [len(x) - 1])
+
+def test_lttb():
+    """Test the selection against the textbook algorithm and that spikes are kept."""
+    rng = np.random.default_rng(3)
+    x = np.sort(rng.uniform(0.0, 6000.0, 20_011))
+    y = np.sin(x / 300) + rng.normal(0.0, 0.05, x.size)
+    y[7777] = 10.0
+    kept = lttb(x, y, 500)
+    assert np.array_equal(kept, _lttb_reference(x, y, 500))
+    assert kept.size == 500 and kept[0] == 0 and kept[-1] == x.size - 1 and np.all(np.diff(kept) > 0)
+    assert 7777 in kept
+    assert np.array_equal(lttb(x[:100], y[:100], 500), np.arange(100))
+    with pytest.raises(ValueError):
+        lttb(x, y, 2)
+
+def test_downsample_curve():
+    """Test that a long curve is reduced to the shape of both series and a short one kept."""
+    n = np.linspace(50.0, 6000.0, 100_000)
+    curve = CapacityCurve(n, np.minimum(n / 200.0, 14.9), np.minimum(95.0, 14.9 * 30000 / (np.pi * n)))
+    small = downsample_curve(curve, 1000)
+    assert 500 <= len(small) <= 1000 and small.n[0] == n[0] and small.n[-1] == n[-1]
+    # The knee of the power curve survives and the interpolation stays close everywhere
+    assert np.min(np.abs(small.n - 2980.0)) < 10.0
+    assert np.max(np.abs(np.interp(n, small.n, small.power) - curve.power)) < 0.05
+    assert np.max(np.abs(np.interp(n, small.n, small.torque) - curve.torque)) < 0.5
+    assert downsample_curve(small, 1000) is small
@@ -0,0 +1,94 @@
+"""
+Test module for the binary machine capacity curve format.
+"""
+
+import json
+import os
+import numpy as np
+import pytest
+from calculations.capacity_curve import CapacityCurve
+from data.curve_store import (
+    _cache,
+    convert_excel,
+    convert_json,
+    load_curve,
+    read_curve,
+    read_header,
+    resolve_curve_path,
+    write_curve
+)
+
+RECORDS = [
+    {"n": 1000.0, "power": 8.0, "torque": 60.0},
+    {"n": 100.0, "power": 2.0, "torque": 80.0},
+    {"n": 5000.0, "power": 12.0, "torque": 20.0}
+]
+
+def test_json_round_trip(tmp_path):
+    """Test that a converted curve maps back to the same values and version."""
+    source = tmp_path / "machine_capacities.json"
+    source.write_text(json.dumps(RECORDS), encoding="utf-8")
+    converted = convert_json(str(source), str(tmp_path / "machine.mcap"))
+
+    header = read_header(str(tmp_path / "machine.mcap"))
+    assert header["count"] == 3 and header["machine_id"] == "machine_capacities"
+    assert header["units"] == ("rpm", "kW", "Nm") and header["sorted"]
+
+    curve = read_curve(str(tmp_path / "machine.mcap"), map_min_points=0)
+    assert isinstance(curve.n, np.memmap)
+    assert list(curve.n) == [100.0, 1000.0, 5000.0]
+    assert curve.content_hash == converted.content_hash == CapacityCurve.from_records(RECORDS).content_hash
+    assert curve.query(3000.0, 1.0, 1.0) == converted.query(3000.0, 1.0, 1.0)
+    assert curve.bracket(500.0).n1 == 100.0
+
+def test_excel_conversion(tmp_path):
+    """Test the conversion of a digitized Excel sheet."""
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("openpyxl")
+    source = tmp_path / "machine_capacities.xlsx"
+    pd.DataFrame(RECORDS).rename(columns={"n": "N", "power": "Power"}).to_excel(source, index=False)
+    curve = convert_excel(str(source), str(tmp_path / "machine.mcap"), machine_id="tour-1")
+    assert read_curve(str(tmp_path / "machine.mcap")).machine_id == "tour-1"
+    assert list(curve.power) == [2.0, 8.0, 12.0]
+
+def test_invalid_files(tmp_path):
+    """Test that bad sources and corrupted files are rejected."""
+    source = tmp_path / "bad.json"
+    source.write_text(json.dumps([{"n": 1.0, "power": "x", "torque": 1.0}]), encoding="utf-8")
+    with pytest.raises(ValueError):
+        convert_json(str(source), str(tmp_path / "bad.mcap"))
+
+    path = str(tmp_path / "machine.mcap")
+    write_curve(path, CapacityCurve.from_records(RECORDS))
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 8)
+    with pytest.raises(ValueError):
+        read_curve(path)
+    with pytest.raises(ValueError):
+        read_curve(str(source))
+
+def test_binary_preferred_when_up_to_date(tmp_path):
+    """Test that load_curve uses the .mcap sibling only when it is not stale."""
+    source = tmp_path / "machine_capacities.json"
+    source.write_text(json.dumps(RECORDS), encoding="utf-8")
+    assert resolve_curve_path(str(source)) == str(source)
+
+    binary = str(tmp_path / "machine_capacities.mcap")
+    convert_json(str(source), binary)
+    os.utime(binary, ns=(os.stat(source).st_mtime_ns,) * 2)
+    assert resolve_curve_path(str(source)) == binary
+    assert load_curve(str(source)).content_hash == CapacityCurve.from_records(RECORDS).content_hash
+
+    os.utime(source, ns=(os.stat(binary).st_mtime_ns + 10**9,) * 2)
+    assert resolve_curve_path(str(source)) == str(source)
+
+def test_cached_curves_release_their_file(tmp_path):
+    """Test that small curves are read, and that rewriting a file drops its cached curve."""
+    path = str(tmp_path / "machine.mcap")
+    write_curve(path, CapacityCurve.from_records(RECORDS))
+    first = load_curve(path)
+    assert not isinstance(first.n, np.memmap) and load_curve(path) is first
+    assert _cache[os.path.abspath(path)][1] is first
+    write_curve(path, CapacityCurve.from_records([dict(r, power=2 * r["power"]) for r in RECORDS]))
+    assert os.path.abspath(path) not in _cache
+    assert list(load_curve(path).power) == [4.0, 16.0, 24.0]
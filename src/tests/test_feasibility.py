@@ -0,0 +1,40 @@
+"""
+Test module for feasibility maps.
+"""
+
+import pytest
+from calculations.batch import evaluate_batch
+from calculations.capacity_curve import CapacityCurve
+from calculations.feasibility import feasibility_grid
+
+BORING = {
+    "operation": "alésage",
+    "profondeur_passe_ap_mm": [0.5, 4.0],
+    "avance_f_mmtr": [0.12, 0.4],
+    "hex_rec": 0.25,
+    "vitesse_coupe_Vc_mmin": [55, 560],
+    "Y0": 6
+}
+
+CURVE = CapacityCurve([100, 1000, 5000], [2.0, 8.0, 12.0], [80.0, 60.0, 20.0])
+
+def test_feasibility_grid_matches_pointwise_evaluation():
+    """Test grid cells against a direct evaluation of the same point."""
+    grid = feasibility_grid(BORING, 50.0, CURVE, 10.0, 90.0, y_name="fn", ap=2.0, resolution=41)
+    assert grid.power_utilization.shape == (41, 41)
+    for i, j in [(0, 0), (10, 30), (40, 40)]:
+        res = evaluate_batch(BORING, 50.0, grid.x[j], grid.y[i], ap=2.0)
+        power, torque = CURVE.query(res["n"][0], 10.0, 90.0)
+        assert grid.power_utilization[i, j] == pytest.approx(res["Pc"][0] / power)
+        assert grid.torque_utilization[i, j] == pytest.approx(res["Mc"][0] / torque)
+        assert grid.utilization[i, j] == pytest.approx(max(res["Pc"][0] / power, res["Mc"][0] / torque))
+
+def test_feasibility_grid_ap_axis():
+    """Test the Vc × ap plane and unsupported axes."""
+    grid = feasibility_grid(BORING, 50.0, CURVE, 10.0, 90.0, y_name="ap", fn=0.2, resolution=11)
+    assert grid.y[0] == 0.5 and grid.y[-1] == 4.0
+    # Power grows linearly with ap at fixed Vc
+    assert grid.power_utilization[-1, 5] == pytest.approx(grid.power_utilization[0, 5] * 8)
+    with pytest.raises(ValueError):
+        feasibility_grid({"operation": "perçage", "avance_f_mmtr": [0.1, 0.2],
+                          "vitesse_coupe_Vc_mmin": [100, 200]}, 10.0, CURVE, 10.0, 90.0, y_name="ap")
@@ -0,0 +1,70 @@
+"""
+Test module for the Parquet and Arrow archives of the calculation history.
+"""
+
+import io
+import pytest
+from data import history_archive
+from data.history_archive import archive_format, export_history, import_history, read_history
+from data.history_store import HISTORY_COLUMNS, HistoryStore
+
+pa = pytest.importorskip("pyarrow")
+
+def _store(size=120):
+    store = HistoryStore(":memory:", batch_size=1000)
+    for i in range(size):
+        store.append({"date": f"2025-03-{1 + i // 60:02d} 10:{i % 60:02d}:07", "session": "s1",
+                      "insert_name": "CCMT" if i % 2 else "880", "operation": "alésage",
+                      "machine": "tour", "curve_version": "c0ffee", "D": 50.0 + i / 7, "Vc": 445.0,
+                      "fn": 0.25, "Pc": 1.0 / (i + 3), "Mc": 2.0, "Fa": None if i % 2 else 12.5,
+                      "saved": i % 4 == 0})
+    return store
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_round_trip(tmp_path, monkeypatch, fmt):
+    """Test that an export keeps full precision and metadata and imports back identically."""
+    store = _store()
+    path = str(tmp_path / f"history.{fmt}")
+    assert export_history(store, path, chunk_size=50) == 120
+    table = read_history(path)
+    assert table.column_names == list(HISTORY_COLUMNS) and table.num_rows == 120
+    assert table.schema.field("date").type == pa.timestamp("s") and table.schema.field("saved").type == pa.bool_()
+    assert table.column("Pc").to_pylist()[5] == 1.0 / 8
+    assert set(table.column("curve_version").to_pylist()) == {"c0ffee"}
+    assert read_history(path, columns=("D", "Mc")).column_names == ["D", "Mc"]
+
+    # The import streams the batches instead of reading the whole table
+    monkeypatch.setattr(history_archive, "read_history", None)
+    copy = HistoryStore(":memory:")
+    assert import_history(copy, path, chunk_size=32) == 120
+    assert list(copy.iter_rows()) == list(store.iter_rows())
+    with open(path, "rb") as f:
+        assert import_history(copy, f, fmt=fmt) == 120
+
+def test_filters_buffers_and_formats():
+    """Test filtered exports to file objects and the format checks."""
+    store = _store()
+    buffer = io.BytesIO()
+    assert export_history(store, buffer, fmt="arrow", compression="lz4", saved=1) == 30
+    buffer.seek(0)
+    assert read_history(buffer, fmt="arrow").column("saved").to_pylist() == [True] * 30
+    assert archive_format("a/b.PARQUET") == "parquet" and archive_format("b.feather") == "arrow"
+    with pytest.raises(ValueError, match="Unknown archive format"):
+        archive_format("history.csv")
+    empty = io.BytesIO()
+    assert export_history(HistoryStore(":memory:"), empty) == 0
+    empty.seek(0)
+    assert read_history(empty).num_rows == 0
+
+def test_import_partial_archive(tmp_path):
+    """Test that older archives without some columns import with empty values."""
+    path = str(tmp_path / "old.parquet")
+    import pyarrow.parquet as pq
+    pq.write_table(pa.table({"date": ["2024-12-31 23:59:59"], "insert_name": ["880"], "Pc": [1.5]}), path)
+    store = HistoryStore(":memory:")
+    assert import_history(store, path) == 1
+    row = store.page()[0]
+    assert row["date"] == "2024-12-31 23:59:59" and row["Pc"] == 1.5 and row["machine"] is None
+    pq.write_table(pa.table({"Pc": [1.5]}), path)
+    with pytest.raises(ValueError, match="Not a history archive"):
+        import_history(store, path)
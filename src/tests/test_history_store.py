@@ -0,0 +1,98 @@
+"""
+Test module for the SQLite calculation history.
+"""
+
+import csv
+import io
+import sqlite3
+import pytest
+from data.history_store import HISTORY_COLUMNS, HistoryStore
+
+def _record(i, insert_name="CCMT", session="a", saved=0):
+    return {"date": f"2025-01-01 08:{i // 60:02d}:{i % 60:02d}", "session": session,
+            "insert_name": insert_name, "operation": "alésage", "machine": "machine",
+            "D": 50.0, "Vc": 445.0 + i / 3, "fn": 0.25, "Pc": 1.23456789, "Mc": 2.0, "saved": saved}
+
+def test_batched_writes(tmp_path):
+    """Test that records are written per batch and visible to readers."""
+    path = str(tmp_path / "history.sqlite3")
+    store = HistoryStore(path, batch_size=3, flush_interval=3600)
+    store.append(_record(0))
+    store.append(_record(1))
+    other = sqlite3.connect(path)
+    assert other.execute("SELECT COUNT(*) FROM history").fetchone()[0] == 0
+    store.append(_record(2))
+    assert other.execute("SELECT COUNT(*) FROM history").fetchone()[0] == 3
+    assert other.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    store.append(_record(3))
+    assert store.count() == 4
+    store.close()
+
+    reopened = HistoryStore(path)
+    assert reopened.count() == 4
+    assert reopened.page(0, 1)[0]["Pc"] == 1.23456789
+    reopened.close()
+
+def test_paging_and_filters():
+    """Test newest-first pages and indexed filters."""
+    store = HistoryStore(":memory:", batch_size=100)
+    for i in range(25):
+        store.append(_record(i, insert_name="CCMT" if i % 2 else "880", session="a" if i < 10 else "b",
+                             saved=int(i % 5 == 0)))
+    assert store.count() == 25
+    assert store.count(insert_name="880", session="b") == 8
+    assert store.count(saved=1) == 5
+    page = store.page(1, 10)
+    assert len(page) == 10 and page[0]["date"] == _record(14)["date"]
+    assert len(store.page(2, 10)) == 5
+    assert store.distinct("insert_name") == ["880", "CCMT"]
+    with pytest.raises(ValueError):
+        store.count(Pc=1.0)
+
+def test_iter_csv_streams_chunks(tmp_path):
+    """Test the CSV export chunking and content."""
+    store = HistoryStore(str(tmp_path / "history.sqlite3"), batch_size=100)
+    for i in range(12):
+        store.append(_record(i))
+    chunks = list(store.iter_csv(chunk_size=5, session="a"))
+    assert len(chunks) == 1 + 3
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+    assert list(rows[0]) == list(HISTORY_COLUMNS)
+    assert len(rows) == 12 and rows[0]["date"] == _record(0)["date"]
+    assert float(rows[-1]["Vc"]) == pytest.approx(445.0 + 11 / 3)
+    store.close()
+
+def test_columns_for_plots():
+    """Test reading whole columns, newest first, filtered and limited."""
+    store = HistoryStore(":memory:", batch_size=100)
+    for i in range(30):
+        store.append(_record(i, saved=int(i % 3 == 0)))
+    columns = store.columns(("Vc", "Pc"), saved=1)
+    assert set(columns) == {"Vc", "Pc"} and len(columns["Vc"]) == 10
+    assert columns["Vc"][0] == _record(27)["Vc"] and columns["Pc"][0] == pytest.approx(1.23456789)
+    assert len(store.columns(("D",), limit=7)["D"]) == 7
+    with pytest.raises(ValueError):
+        store.columns(("id",))
+
+def test_reads_merge_pending_batch(tmp_path):
+    """Test that reads see the pending batch without writing it, in the stored order."""
+    path = str(tmp_path / "history.sqlite3")
+    store = HistoryStore(path, batch_size=100, flush_interval=3600)
+    flushed = HistoryStore(":memory:")
+    # Interleaved dates: pending rows rank both before and after stored ones
+    for i in (0, 5, 3, 8, 1, 5, 9, 2):
+        for target in (store, flushed):
+            target.append(_record(i, insert_name="880" if i % 2 else "CCMT"), flush=target is flushed)
+        if i == 8:
+            store.flush()
+    assert store.distinct("insert_name") == ["880", "CCMT"]
+    other = sqlite3.connect(path)
+    for filters in ({}, {"insert_name": "880"}):
+        assert store.count(**filters) == flushed.count(**filters)
+        for page in range(4):
+            assert store.page(page, 3, **filters) == flushed.page(page, 3, **filters)
+        assert store.columns(("Vc",), limit=5, **filters) == flushed.columns(("Vc",), limit=5, **filters)
+    assert other.execute("SELECT COUNT(*) FROM history").fetchone()[0] == 4
+    store.append(_record(10, insert_name="490"), flush=True)
+    assert store.distinct("insert_name") == ["490", "880", "CCMT"]
+    store.close()
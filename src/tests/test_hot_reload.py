@@ -0,0 +1,68 @@
+"""
+Test module for the hot reload of the data files.
+"""
+
+import json
+import os
+import time
+import pytest
+from data.hot_reload import HotReloader
+
+def _reloader(path, interval=1.0):
+    def build():
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return HotReloader(build, lambda: (str(path),), interval=interval)
+
+def _write(path, data, mtime_ns):
+    path.write_text(json.dumps(data), encoding="utf-8")
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+def test_reload_on_change(tmp_path):
+    """Test that a changed file swaps in a new snapshot and old ones stay intact."""
+    path = tmp_path / "data.json"
+    _write(path, {"v": 1}, 10**18)
+    reloader = _reloader(path)
+    first = reloader.current()
+    assert first.version == 1 and first.data == {"v": 1}
+    assert not reloader.check()
+
+    _write(path, {"v": 2}, 2 * 10**18)
+    assert reloader.check()
+    assert reloader.current().data == {"v": 2} and reloader.current().version == 2
+    assert first.data == {"v": 1}
+    stats = reloader.stats()
+    assert stats.reloads == 2 and stats.failures == 0 and stats.last_duration > 0
+
+def test_failed_reload_keeps_snapshot(tmp_path):
+    """Test that an invalid file keeps the previous version until it is fixed."""
+    path = tmp_path / "data.json"
+    _write(path, {"v": 1}, 10**18)
+    reloader = _reloader(path)
+    path.write_text("{", encoding="utf-8")
+    os.utime(path, ns=(2 * 10**18, 2 * 10**18))
+    assert not reloader.check()
+    assert not reloader.check()
+    stats = reloader.stats()
+    assert reloader.current().data == {"v": 1}
+    assert stats.failures == 1 and "JSONDecodeError" in stats.last_error
+    _write(path, {"v": 3}, 3 * 10**18)
+    assert reloader.check() and reloader.stats().last_error == ""
+
+    path.unlink()
+    with pytest.raises(FileNotFoundError):
+        _reloader(path)
+
+def test_watcher_thread(tmp_path):
+    """Test that the background thread picks up a change."""
+    path = tmp_path / "data.json"
+    _write(path, {"v": 1}, 10**18)
+    reloader = _reloader(path, interval=0.01).start()
+    try:
+        _write(path, {"v": 2}, 2 * 10**18)
+        deadline = time.monotonic() + 5
+        while reloader.current().version == 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert reloader.current().data == {"v": 2}
+    finally:
+        reloader.stop()
@@ -0,0 +1,195 @@
+"""
+Test module for the local HTTP API of the calculation core.
+"""
+
+import asyncio
+import json
+import os
+import urllib.error
+import urllib.request
+import numpy as np
+import pytest
+from calculations.batch import CHECK_FIELDS, check_table
+from calculations.cutting_calculations import get_local_capacity
+from calculations.operations import compute_operation
+from data.catalog import load_catalog
+from data.curve_store import load_curve
+from http_api import ApiServer, CheckService, LatencyMetrics
+
+ROOT = os.path.join(os.path.dirname(__file__), "..", "..")
+CONDITIONS_PATH = os.path.join(ROOT, "conditions_coupe_sandvik.json")
+CURVE_PATH = os.path.join(ROOT, "machine_capacities.json")
+LIMITS = (14.9, 95.0)
+
+BORE = "CCMT 09 T3 08-UM 1125"
+DRILL = "880-06 04 W06H-P-GM 4344"
+GROOVE = "N123G2-0300-0001-CF 1125"
+
+def _table(size):
+    rng = np.random.default_rng(0)
+    return {
+        "insert": [[BORE, DRILL, GROOVE][i % 3] for i in range(size)],
+        "D": rng.uniform(10.0, 80.0, size).round(3).tolist(),
+        "Vc": rng.uniform(80.0, 250.0, size).round(3).tolist(),
+        "fn": rng.uniform(0.08, 0.3, size).round(4).tolist(),
+        "ap": rng.uniform(0.5, 3.0, size).round(3).tolist()
+    }
+
+def _request(port, method, path, body=None):
+    """(status, decoded body) of one HTTP request."""
+    data = None if body is None else (body if isinstance(body, bytes) else json.dumps(body).encode("utf-8"))
+    request = urllib.request.Request(f"http://127.0.0.1:{port}{path}", data=data, method=method)
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            status, text = response.status, response.read()
+    except urllib.error.HTTPError as e:
+        status, text = e.code, e.read()
+    return status, (json.loads(text) if text.startswith(b"{") else text.decode("utf-8"))
+
+def _serve(scenario, **options):
+    """Run scenario(port) in a thread while the server answers in the event loop."""
+    async def main():
+        server = await ApiServer(CONDITIONS_PATH, CURVE_PATH, *LIMITS, port=0, **options).start()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, scenario, server.port), server
+        finally:
+            await server.close()
+    return asyncio.run(main())
+
+def test_service_check_and_capacity():
+    """Test that a single check and a capacity lookup match the calculation core."""
+    service = CheckService.from_files(CONDITIONS_PATH, CURVE_PATH, *LIMITS)
+    conditions, curve = load_catalog(CONDITIONS_PATH), load_curve(CURVE_PATH)
+    result = service.check({"insert": BORE, "D": 40, "Vc": 200, "fn": 0.2, "ap": 1.5, "hex": 0.2})
+    expected = compute_operation(BORE, conditions[BORE], 40.0, 200.0, 0.2, 1.5, 0.2, 95.0, curve, *LIMITS)
+    assert result["n"] == pytest.approx(expected.n) and result["Pc"] == pytest.approx(expected.Pc)
+    assert result["ok"] == expected.ok and result["bracket"] == expected.bracket._asdict()
+    assert result["Fa"] is None  # NaN for boring, null in JSON
+
+    capacity = service.capacity(1500.0)
+    assert (capacity["power"], capacity["torque"]) == get_local_capacity(1500.0, curve, *LIMITS)
+    with pytest.raises(ValueError, match="finite"):
+        service.capacity(float("nan"))
+
+    for request, message in (({"insert": "inconnue", "D": 1, "Vc": 1, "fn": 1}, "Unknown insert"),
+                             ({"insert": BORE, "D": 40, "fn": 0.2}, "Missing field: Vc"),
+                             ({"insert": BORE, "D": "a", "Vc": 1, "fn": 1}, "must be numbers")):
+        with pytest.raises(ValueError, match=message):
+            service.check(request)
+
+def test_service_batch():
+    """Test that rows and columns batches match check_table and flag bad lines."""
+    service = CheckService.from_files(CONDITIONS_PATH, CURVE_PATH, *LIMITS, max_rows=1000)
+    columns = _table(300)
+    columns["insert"][7] = "inconnue"
+    columns["D"][8] = None
+    size, body = service.batch(json.dumps({"columns": columns}).encode("utf-8"))
+    response = json.loads(body)
+    expected = check_table({name: np.array(values, dtype=None if name == "insert" else float)
+                            for name, values in columns.items()},
+                           load_catalog(CONDITIONS_PATH), load_curve(CURVE_PATH), *LIMITS, tool_column="insert")
+    assert size == response["rows"] == 300 and response["failed"] == int(np.count_nonzero(~expected["ok"]))
+    assert set(response["results"]) == set(CHECK_FIELDS)
+    for field in CHECK_FIELDS:
+        values = np.array([np.nan if v is None else v for v in response["results"][field]])
+        np.testing.assert_allclose(values, expected[field].astype(float))
+    assert response["results"]["valid"][7:9] == [False, False] and response["results"]["n"][7] is None
+
+    rows = [dict(zip(columns, values)) for values in zip(*columns.values())]
+    assert json.loads(service.batch(json.dumps({"rows": rows}).encode("utf-8"))[1]) == response
+
+    for body, message in ((b"{", "Invalid JSON"), (b"[]", "JSON object"), (b"{}", "'rows' or 'columns'"),
+                          (json.dumps({"columns": {"insert": [BORE], "D": [1], "Vc": [1]}}).encode(), "'fn'"),
+                          (json.dumps({"columns": {"insert": [BORE], "D": [1, 2], "Vc": [1], "fn": [1]}}).encode(),
+                           "list of 1 values"),
+                          (json.dumps({"columns": _table(1001)}).encode(), "Too many lines")):
+        with pytest.raises(ValueError, match=message):
+            service.batch(body)
+
+def test_endpoints():
+    """Test the routes, the error statuses and the metrics of the server."""
+    def scenario(port):
+        status, health = _request(port, "GET", "/health")
+        assert status == 200 and health["status"] == "ok" and health["curve_points"] == 564
+        status, capacity = _request(port, "GET", "/capacity?n=1500")
+        assert status == 200 and capacity["power"] > 0
+        status, result = _request(port, "POST", "/check", {"insert": DRILL, "D": 12, "Vc": 150, "fn": 0.15})
+        assert status == 200 and result["tool"] == DRILL and result["Fa"] > 0 and result["Fc"] is None
+        status, batch = _request(port, "POST", "/batch", {"columns": _table(50)})
+        assert status == 200 and batch["rows"] == 50 and len(batch["results"]["ok"]) == 50
+
+        assert _request(port, "GET", "/nowhere")[0] == 404
+        assert _request(port, "GET", "/batch")[0] == 405
+        assert _request(port, "GET", "/capacity?n=abc")[0] == 400
+        # NaN and infinities are not valid JSON numbers
+        assert _request(port, "GET", "/capacity?n=nan")[0] == 400
+        assert _request(port, "GET", "/capacity?n=1500&max_power=inf")[0] == 400
+        status, error = _request(port, "POST", "/check", b"{")
+        assert status == 400 and "Invalid JSON" in error["error"]
+
+        status, metrics = _request(port, "GET", "/metrics")
+        routes = metrics["routes"]
+        assert routes["/batch"]["count"] == 2 and routes["/batch"]["errors"] == 1 and routes["/batch"]["rows"] == 50
+        assert routes["/check"]["count"] == 2 and routes["/check"]["p99_ms"] >= routes["/check"]["p50_ms"] > 0
+        status, text = _request(port, "GET", "/metrics?format=prometheus")
+        assert 'api_request_duration_seconds_count{route="/capacity"} 4' in text
+
+    _serve(scenario, workers=0)
+
+def test_batch_in_worker_pool():
+    """Test that large batches are checked by the worker pool with the same results."""
+    table = _table(2000)
+    expected = json.loads(CheckService.from_files(CONDITIONS_PATH, CURVE_PATH, *LIMITS)
+                          .batch(json.dumps({"columns": table}).encode("utf-8"))[1])
+
+    def scenario(port):
+        status, response = _request(port, "POST", "/batch", {"columns": table})
+        assert status == 200 and response == expected
+        status, response = _request(port, "POST", "/batch", {"columns": table, "max_power": 1.0})
+        assert status == 200 and response["failed"] > expected["failed"]
+        assert _request(port, "POST", "/batch", {"columns": {"insert": []}})[0] == 400
+
+    _, server = _serve(scenario, workers=1, inline_max_bytes=0)
+    assert server.metrics.routes["/batch"]["rows"] == 4000
+
+def test_latency_metrics():
+    """Test the percentiles and histogram buckets of the latency metrics."""
+    metrics = LatencyMetrics(window=100)
+    for ms in range(1, 201):
+        metrics.record("/check", 200 if ms % 50 else 400, ms / 1000)
+    snapshot = metrics.snapshot()["routes"]["/check"]
+    assert snapshot["count"] == 200 and snapshot["errors"] == 4
+    assert snapshot["p50_ms"] == pytest.approx(150.5) and snapshot["max_recent_ms"] == pytest.approx(200)
+    assert snapshot["buckets_ms"]["1"] == 1 and snapshot["buckets_ms"]["250"] == 100
+    assert sum(snapshot["buckets_ms"].values()) == 200
+
+def test_check_after_catalog_reload(tmp_path):
+    """Test that /check answers with the reloaded catalog instead of cached results of the previous one."""
+    path = tmp_path / "conditions.json"
+    with open(CONDITIONS_PATH, encoding="utf-8") as f:
+        catalog = json.load(f)
+    path.write_text(json.dumps(catalog), encoding="utf-8")
+    point = {"insert": BORE, "D": 50, "Vc": 445, "fn": 0.25, "ap": 1.25, "hex": 0.3, "kr": 95}
+
+    async def main():
+        server = await ApiServer(str(path), CURVE_PATH, *LIMITS, port=0, workers=0, reload_interval=60).start()
+
+        def scenario(port):
+            before = [_request(port, "POST", "/check", point)[1] for _ in range(2)]
+            catalog[BORE]["Y0"] = 40
+            path.write_text(json.dumps(catalog), encoding="utf-8")
+            os.utime(path, ns=(1, 1))
+            assert server.data.check()
+            return before, _request(port, "POST", "/check", point)[1]
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, scenario, server.port)
+        finally:
+            await server.close()
+
+    (first, cached), after = asyncio.run(main())
+    assert cached == first
+    conditions = load_catalog(str(path))
+    expected = compute_operation(BORE, conditions[BORE], 50.0, 445.0, 0.25, 1.25, 0.3, 95.0,
+                                 load_curve(CURVE_PATH), *LIMITS)
+    assert after["Pc"] == pytest.approx(expected.Pc) and after["Pc"] < first["Pc"]
@@ -0,0 +1,86 @@
+"""
+Test module for the incremental ingestion of digitizer exports.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from data.curve_store import read_curve
+from data.ingest import STATE_FILE, Ingestor, read_export
+
+def _export(path, scale=1.0, sep=","):
+    frame = pd.DataFrame({"N": [3000.0, 100.0, 1500.0], "Power": [12.0, 2.0, 9.0], "torque": [30.0, 80.0, 60.0]})
+    frame["Power"] *= scale
+    if path.endswith(".xlsx"):
+        frame.to_excel(path, index=False)
+    else:
+        frame.to_csv(path, index=False, sep=sep)
+
+def test_read_export(tmp_path):
+    """Test CSV (with French separators) and XLSX exports."""
+    csv_path = str(tmp_path / "tour.csv")
+    (tmp_path / "tour.csv").write_text("n;power;torque\n3000;12,5;30\n100;2;80\n\n", encoding="utf-8")
+    curve = read_export(csv_path)
+    assert curve.machine_id == "tour"
+    assert list(curve.n) == [100.0, 3000.0] and curve.power[1] == 12.5
+    xlsx_path = str(tmp_path / "fraiseuse.xlsx")
+    _export(xlsx_path)
+    assert list(read_export(xlsx_path).torque) == [80.0, 60.0, 30.0]
+    (tmp_path / "bad.csv").write_text("n,power\n1,2\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        read_export(str(tmp_path / "bad.csv"))
+
+def test_incremental_ingestion(tmp_path):
+    """Test that only new or changed exports are converted."""
+    source, store = tmp_path / "exports", str(tmp_path / "machines")
+    source.mkdir()
+    for i in range(3):
+        _export(str(source / f"m{i}.csv"))
+    results = Ingestor(str(source), store).run()
+    assert [r.status for r in results] == ["converted"] * 3
+    assert os.path.exists(os.path.join(store, STATE_FILE))
+
+    # Touched but identical content, changed content, new file, invalid file
+    os.utime(source / "m0.csv", ns=(1, 1))
+    _export(str(source / "m1.csv"), scale=2.0)
+    _export(str(source / "m3.csv"))
+    (source / "m4.csv").write_text("n,power,torque\nx,1,2\n", encoding="utf-8")
+    results = {r.machine_id: r.status for r in Ingestor(str(source), store).run()}
+    assert results == {"m0": "unchanged", "m1": "converted", "m2": "unchanged",
+                       "m3": "converted", "m4": "failed"}
+    assert np.array_equal(read_curve(os.path.join(store, "m1.mcap")).power, [4.0, 18.0, 24.0])
+
+    ingestor = Ingestor(str(source), store)
+    assert {r.status for r in ingestor.run()} == {"unchanged", "failed"}
+    assert [r.status for r in ingestor.run(force=True)].count("converted") == 4
+    # Changing the simplification settings converts everything again
+    settings = {"window": 9, "max_power_error": 0.1, "max_torque_error": 1.0}
+    converted = [r for r in Ingestor(str(source), store, settings).run() if r.status == "converted"]
+    assert len(converted) == 4
+    assert all(r.max_power_error <= 0.1 + 1e-9 and r.max_torque_error <= 1.0 + 1e-9 for r in converted)
+
+def test_duplicate_and_deleted_exports(tmp_path):
+    """Test that exports sharing a machine id fail and deleted exports leave the store."""
+    source, store = tmp_path / "exports", str(tmp_path / "machines")
+    source.mkdir()
+    for name in ("tour.csv", "fraiseuse.csv", "centre.csv"):
+        _export(str(source / name))
+    Ingestor(str(source), store).run()
+
+    _export(str(source / "tour.xlsx"), scale=2.0)
+    results = {os.path.basename(r.source): r for r in Ingestor(str(source), store).run()}
+    assert results["tour.csv"].status == results["tour.xlsx"].status == "failed"
+    assert "Duplicate machine id 'tour'" in results["tour.xlsx"].error
+    # The curve of the first export is not overwritten
+    assert np.array_equal(read_curve(os.path.join(store, "tour.mcap")).power, [2.0, 9.0, 12.0])
+
+    # Renamed export: the curve is converted again and kept; deleted export: the curve is removed
+    os.remove(source / "tour.csv")
+    os.remove(source / "fraiseuse.csv")
+    results = {os.path.basename(r.source): r.status for r in Ingestor(str(source), store).run()}
+    assert results == {"centre.csv": "unchanged", "fraiseuse.csv": "removed", "tour.csv": "removed",
+                       "tour.xlsx": "converted"}
+    assert sorted(os.listdir(store)) == [STATE_FILE, "centre.mcap", "tour.mcap"]
+    assert np.array_equal(read_curve(os.path.join(store, "tour.mcap")).power, [4.0, 18.0, 24.0])
+    assert {r.status for r in Ingestor(str(source), store).run()} == {"unchanged"}
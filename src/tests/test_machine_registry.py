@@ -0,0 +1,92 @@
+"""
+Test module for the machine registry.
+"""
+
+import json
+import numpy as np
+import pytest
+from calculations.batch import evaluate_batch
+from calculations.capacity_curve import CapacityCurve
+from calculations.machine_registry import MachineRegistry, MachineSpec
+from data.curve_store import write_curve
+
+TURN = {"operation": "chariotage/dressage", "Y0": 20}
+DRILL = {"operation": "perçage", "Y0": 20}
+
+CURVES = {
+    "small": [(100, 1.0, 20.0), (6000, 3.0, 10.0)],
+    "medium": [(50, 2.0, 80.0), (1000, 8.0, 60.0), (5000, 12.0, 20.0)],
+    "large": [(20, 5.0, 300.0), (4000, 25.0, 200.0)]
+}
+
+@pytest.fixture
+def machines_dir(tmp_path):
+    """Machines directory mixing JSON and binary curves with a manifest."""
+    for machine_id, points in CURVES.items():
+        records = [{"n": n, "power": p, "torque": t} for n, p, t in points]
+        if machine_id == "large":
+            write_curve(str(tmp_path / "large.mcap"), CapacityCurve.from_records(records, "large"))
+        else:
+            (tmp_path / f"{machine_id}.json").write_text(json.dumps(records), encoding="utf-8")
+    (tmp_path / "machines.json").write_text(json.dumps({
+        "large": {"name": "Centre 5 axes", "max_power": 30.0},
+        "small": {"engagement_ratio": 0.2}
+    }), encoding="utf-8")
+    return tmp_path
+
+def test_from_directory_is_lazy(machines_dir):
+    """Test registration from a directory and lazy curve loading."""
+    registry = MachineRegistry.from_directory(str(machines_dir), 10.0, 90.0)
+    assert registry.machine_ids == ["large", "medium", "small"]
+    assert registry.spec("large").name == "Centre 5 axes"
+    assert registry.spec("large").max_power == 30.0 and registry.spec("medium").max_power == 10.0
+    assert not registry._curves
+    assert len(registry.curve("large")) == 2
+    assert list(registry._curves) == ["large"]
+    assert MachineRegistry.from_directory(str(machines_dir / "missing"), 10.0, 90.0).machine_ids == []
+
+def test_check_matches_each_curve(machines_dir):
+    """Test the stacked evaluation against each machine curve on its own."""
+    registry = MachineRegistry.from_directory(str(machines_dir), 10.0, 90.0, table_size=8192)
+    D = np.array([40.0, 40.0, 10.0, 80.0])
+    Vc = np.array([300.0, 600.0, 2000.0, 50.0])
+    fn = np.array([0.12, 0.3, 0.2, 0.5])
+    ap = np.array([0.5, 3.0, 1.0, 4.0])
+    fleet = registry.check(TURN, D, Vc, fn, ap=ap)
+    res = evaluate_batch(TURN, D, Vc, fn, ap=ap)
+    assert fleet.margin.shape == (3, 4)
+    for m, machine_id in enumerate(fleet.machine_ids):
+        spec = registry.spec(machine_id)
+        curve = registry.curve(machine_id)
+        for j in range(4):
+            power, torque = curve.query(res["n"][j], spec.max_power, spec.max_torque)
+            assert fleet.power_available[m, j] == pytest.approx(power, rel=1e-3)
+            assert fleet.torque_available[m, j] == pytest.approx(torque, rel=1e-3)
+            ok = (res["Pc"][j] <= power and res["Mc"][j] <= torque
+                  and res["La"][j] <= spec.engagement_ratio * D[j])
+            assert fleet.ok[m, j] == ok
+
+def test_capable_machines_and_engagement(machines_dir):
+    """Test the ranking by margin, the engagement limit and drilling."""
+    registry = MachineRegistry.from_directory(str(machines_dir), 10.0, 90.0)
+    # Pc ≈ 3.2 kW at n ≈ 2400 tr/min: over the small machine (≈ 1.8 kW)
+    fleet = registry.check(TURN, 40.0, 300.0, 0.3, ap=5.0)
+    names = [machine_id for machine_id, _ in fleet.capable()]
+    assert names[0] == "large" and "small" not in names
+
+    fleet = registry.check(TURN, 10.0, 100.0, 0.05, ap=3.0, machines=["small", "large"])
+    assert fleet.machine_ids == ("small", "large")
+    assert fleet.engagement_margin[0, 0] < 0 <= fleet.engagement_margin[1, 0]
+
+    drill = registry.check(DRILL, 20.0, 175.0, 0.18)
+    assert np.isinf(drill.engagement_margin).all()
+
+def test_check_table(machines_dir):
+    """Test a table mixing inserts, including an invalid row."""
+    registry = MachineRegistry([MachineSpec("m", str(machines_dir / "medium.json"), 10.0, 90.0)])
+    table = {"Plaquette": ["turn", "drill"], "D": [40.0, 20.0], "Vc": [300.0, 175.0],
+             "fn": [0.12, 0.18], "ap": [0.5, np.nan]}
+    fleet = registry.check_table(table, {"turn": TURN, "drill": DRILL})
+    assert fleet.ok.shape == (1, 2) and fleet.ok.all()
+    bad = registry.check_results({"n": [np.nan], "Pc": [np.nan], "Mc": [np.nan], "La": [np.nan]}, 10.0)
+    assert not bad.ok.any()
@@ -0,0 +1,85 @@
+"""
+Test module for the single-pass operation model.
+"""
+
+import pytest
+from calculations.batch import OPERATIONS, DRILLING, BORING, GROOVING, TURNING, evaluate_batch
+from calculations.capacity_curve import CapacityCurve
+from calculations.operations import OperationGraph, compute_operation
+
+CURVE = CapacityCurve([100, 1000, 5000], [2.0, 8.0, 12.0], [80.0, 60.0, 20.0])
+
+BORE = {"operation": "alésage", "hex_rec": 0.25, "Y0": 6}
+DRILL = {"operation": "perçage", "Y0": 20}
+GROOVE = {"operation": "gorge", "Y0": 20, "insert_length_mm": 3.0}
+
+def test_every_operation_is_registered():
+    """Test that each operation kind has a calculator."""
+    assert set(OPERATIONS) == {DRILLING, BORING, GROOVING, TURNING}
+
+def test_compute_operation_matches_batch():
+    """Test the result against the batch engine and the capacity curve."""
+    r = compute_operation("bore", BORE, 50.0, 445.0, 0.25, 1.25, 0.3, 95.0, CURVE, 10.0, 90.0)
+    res = evaluate_batch(BORE, 50.0, 445.0, 0.25, ap=1.25, hexv=0.3, kr=95.0)
+    assert r.kind == BORING and r.kr == 90.0
+    assert r.hexv == pytest.approx(0.3)
+    for field in ("n", "kc", "Fc", "Pc", "Mc", "La"):
+        assert getattr(r, field) == pytest.approx(res[field][0])
+    assert (r.local_power, r.local_torque) == pytest.approx(CURVE.query(r.n, 10.0, 90.0))
+    assert (r.bracket.n1, r.bracket.n2) == (1000, 5000)
+    assert r.ok
+
+def test_compute_operation_operation_fields():
+    """Test the fields that only apply to some operations."""
+    drill = compute_operation("drill", DRILL, 20.0, 175.0, 0.18, 0.0, None, 95.0, CURVE, 10.0, 90.0)
+    assert drill.Fc is None and drill.La is None
+    assert drill.Fa == pytest.approx(drill.kc * 0.18 * 20.0)
+    assert drill.engagement_ok
+
+    groove = compute_operation("groove", GROOVE, 50.0, 200.0, 0.08, 10.0, None, 95.0, CURVE, 10.0, 90.0)
+    assert groove.ap == 3.0 and groove.Fa is None
+
+def test_compute_operation_limits():
+    """Test the pass/fail flags and points outside the curve."""
+    r = compute_operation("turn", {"operation": "chariotage", "Y0": 20}, 10.0, 2000.0, 0.6, 8.0,
+                          None, 95.0, CURVE, 10.0, 90.0)
+    assert r.bracket is None
+    assert (r.local_power, r.local_torque) == (10.0, 90.0)
+    assert not r.power_ok and not r.engagement_ok and not r.ok
+
+TURN = {"operation": "chariotage/dressage", "Y0": 20}
+
+@pytest.mark.parametrize("tool, conditions", [("bore", BORE), ("drill", DRILL), ("groove", GROOVE), ("turn", TURN)])
+def test_operation_graph_matches_compute_operation(tool, conditions):
+    """Test that the graph gives the result of compute_operation through a sequence of changes."""
+    graph = OperationGraph()
+    points = [(50.0, 445.0, 0.25, 1.25, 0.3), (50.0, 445.0, 0.25, 2.0, 0.3), (32.0, 445.0, 0.25, 2.0, 0.3),
+              (32.0, 200.0, 0.3, 2.0, None), (32.0, 200.0, 0.3, 2.0, None)]
+    for D, Vc, fn, ap, hexv in points:
+        expected = compute_operation(tool, conditions, D, Vc, fn, ap, hexv, 95.0, CURVE, 10.0, 90.0)
+        result = graph.update(tool, conditions, D, Vc, fn, ap, hexv, 95.0, CURVE, 10.0, 90.0)
+        for field in expected._fields:
+            value = getattr(result, field)
+            assert value == (pytest.approx(getattr(expected, field)) if isinstance(value, float)
+                             else getattr(expected, field))
+
+def test_operation_graph_recomputes_only_affected_nodes():
+    """Test that ap does not recompute n, the capacity or kc, and D does not recompute kc."""
+    graph = OperationGraph()
+    graph.update("turn", TURN, 50.0, 300.0, 0.2, 1.0, None, 95.0, CURVE, 10.0, 90.0)
+    assert graph.recomputes["kc"] == graph.recomputes["capacity"] == 1
+    graph.update("turn", TURN, 50.0, 300.0, 0.2, 2.5, None, 95.0, CURVE, 10.0, 90.0)
+    assert set(graph.recomputed) == {"ap_used", "La", "Fc", "Pc", "Mc", "result"}
+    graph.update("turn", TURN, 63.0, 300.0, 0.2, 2.5, None, 95.0, CURVE, 10.0, 90.0)
+    assert "kc" not in graph.recomputed and {"n", "capacity", "Mc"} <= set(graph.recomputed)
+    # The turning power does not depend on D: Pc and its force are reused
+    assert "Pc" not in graph.recomputed
+    graph.update("turn", TURN, 63.0, 300.0, 0.2, 2.5, None, 95.0, CURVE, 10.0, 90.0)
+    assert graph.recomputed == ()
+    assert graph.recomputes["n"] == 2 and graph.recomputes["kc"] == 1
+    # Drilling fixes kr: a new angle changes nothing downstream of the parameters
+    graph.update("drill", DRILL, 20.0, 100.0, 0.2, 0.0, None, 95.0, CURVE, 10.0, 90.0)
+    graph.update("drill", DRILL, 20.0, 100.0, 0.2, 0.0, None, 80.0, CURVE, 10.0, 90.0)
+    assert graph.recomputed == ("params",)
+    with pytest.raises(ValueError, match="positive"):
+        graph.update("drill", DRILL, 0.0, 100.0, 0.2, 0.0, None, 80.0, CURVE, 10.0, 90.0)
@@ -0,0 +1,49 @@
+"""
+Test module for cutting condition optimization.
+"""
+
+import pytest
+from calculations.capacity_curve import CapacityCurve
+from calculations.batch import evaluate_batch
+from calculations.optimizer import optimize_mrr, material_removal_rate
+
+TURNING = {
+    "operation": "chariotage/dressage",
+    "profondeur_passe_ap_mm": [0.5, 7.0],
+    "avance_f_mmtr": [0.12, 0.6],
+    "vitesse_coupe_Vc_mmin": [250, 2500],
+    "Y0": 20
+}
+
+FLAT_CURVE = CapacityCurve([10, 100000], [5.0, 5.0], [50.0, 50.0])
+
+def test_material_removal_rate():
+    """Test removal rate for turning and drilling."""
+    assert material_removal_rate("tournage", 200, 0.2, 2.0, 50) == pytest.approx(80.0)
+    assert material_removal_rate("perçage", 200, 0.2, 0.0, 20) == pytest.approx(200.0)
+
+def test_optimize_mrr_respects_constraints():
+    """Test that the optimum is feasible and close to the power limit."""
+    D = 80.0
+    res = optimize_mrr(TURNING, D, FLAT_CURVE, 99.0, 999.0)
+    assert res.feasible
+    assert res.Pc <= 5.0 + 1e-9
+    assert res.Mc <= 50.0 + 1e-9
+    assert res.La <= 0.7 * D
+    # The removal rate is limited by power, so the optimum sits on that limit
+    assert res.Pc == pytest.approx(5.0, rel=0.02)
+    check = evaluate_batch(TURNING, D, res.Vc, res.fn, ap=res.ap)
+    assert check["Pc"][0] == pytest.approx(res.Pc)
+
+def test_optimize_mrr_unconstrained_takes_box_corner():
+    """Test that a large machine runs at the top of every range."""
+    big = CapacityCurve([10, 100000], [1e6, 1e6], [1e6, 1e6])
+    res = optimize_mrr(TURNING, 20.0, big, 1e6, 1e6)
+    assert (res.Vc, res.fn, res.ap) == pytest.approx((2500, 0.6, 7.0))
+
+def test_optimize_mrr_infeasible():
+    """Test the least overloaded point is returned when nothing fits."""
+    tiny = CapacityCurve([10, 100000], [1e-4, 1e-4], [1e-4, 1e-4])
+    res = optimize_mrr(TURNING, 80.0, tiny, 1e-4, 1e-4)
+    assert not res.feasible
+    assert (res.fn, res.ap) == pytest.approx((0.12, 0.5))
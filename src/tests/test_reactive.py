@@ -0,0 +1,63 @@
+"""
+Test module for reactive dependency graphs.
+"""
+
+import pytest
+from calculations.reactive import ReactiveGraph
+
+def diamond():
+    """a, b -> total = a + b, sign = total >= 0 -> label."""
+    graph = ReactiveGraph()
+    graph.input("a", 1)
+    graph.input("b", 2)
+    graph.node("total", ("a", "b"), lambda a, b: a + b)
+    graph.node("sign", ("total",), lambda total: total >= 0)
+    graph.node("label", ("sign", "a"), lambda sign, a: f"{'+' if sign else '-'}{a}")
+    return graph
+
+def test_lazy_and_cached():
+    """Test that nodes are computed when read, once, until an input changes."""
+    graph = diamond()
+    assert not graph.recomputes
+    assert graph["label"] == "+1"
+    assert graph.recomputed == ("total", "sign", "label")
+    assert graph["label"] == "+1" and graph["total"] == 3
+    assert dict(graph.recomputes) == {"total": 1, "sign": 1, "label": 1}
+
+def test_only_affected_nodes_recompute():
+    """Test that a change reaches only its dependents and that unchanged values stop it."""
+    graph = diamond()
+    graph["label"]
+    assert graph.set(b=5) == ("b",)
+    assert graph["label"] == "+1"
+    # total changed, sign did not: label is reused
+    assert graph.recomputed == ("total", "sign")
+    assert graph.set(a=1, b=5) == () and graph["label"] == "+1" and graph.recomputed == ()
+    graph.set(a=-10)
+    assert graph["label"] == "--10" and graph.recomputed == ("total", "sign", "label")
+    assert dict(graph.recomputes) == {"total": 3, "sign": 3, "label": 2}
+    # Nodes that are not read are not computed
+    graph.set(b=20)
+    assert graph["total"] == 10 and graph.recomputed == ("total",)
+
+def test_errors_and_structure():
+    """Test failing nodes, declaration errors and the graph introspection."""
+    graph = ReactiveGraph()
+    graph.input("x")
+    graph.node("inverse", ("x",), lambda x: 1 / x)
+    with pytest.raises(KeyError, match="Input not set"):
+        graph["inverse"]
+    graph.set(x=0)
+    with pytest.raises(ZeroDivisionError):
+        graph["inverse"]
+    # A failed node is computed again on the next read
+    graph.set(x=4)
+    assert graph["inverse"] == 0.25
+    with pytest.raises(ValueError, match="Unknown dependencies"):
+        graph.node("double", ("y",), lambda y: 2 * y)
+    with pytest.raises(ValueError, match="already declared"):
+        graph.input("x")
+    with pytest.raises(KeyError, match="Not an input"):
+        graph.set(inverse=1)
+    assert graph.names == ("x", "inverse") and graph.dependencies("inverse") == ("x",)
+    assert graph.dependents("x") == ("inverse",) and graph.is_input("x") and not graph.is_input("inverse")
@@ -0,0 +1,116 @@
+"""
+Test module for the process-wide result cache.
+"""
+
+import os
+import threading
+import pytest
+from calculations.capacity_curve import CapacityCurve
+from calculations.operations import OperationGraph, compute_operation
+from calculations.result_cache import ResultCache, cached_compute_operation, conditions_fingerprint, quantize
+
+CURVE = CapacityCurve([100, 1000, 5000], [2.0, 8.0, 12.0], [80.0, 60.0, 20.0])
+BORE = {"operation": "alésage", "hex_rec": 0.25, "Y0": 6}
+
+def test_quantized_keys_hit():
+    """Test that float noise maps to the same key and counters."""
+    cache = ResultCache(maxsize=8)
+    assert quantize(0.1 + 0.2, 6) == quantize(0.3, 6)
+    assert quantize(-0.0, 6) == 0.0
+    calls = []
+    for fn in (0.1 + 0.2, 0.3, 0.3000000001):
+        cache.get_or_compute(cache.make_key("x", fn), lambda: calls.append(1) or len(calls))
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.size) == (2, 1, 1)
+    assert stats.hit_rate == pytest.approx(2 / 3)
+
+def test_lru_and_ttl_eviction(monkeypatch):
+    """Test least recently used eviction and entry expiry."""
+    cache = ResultCache(maxsize=2)
+    cache.get_or_compute(("a",), lambda: 1)
+    cache.get_or_compute(("b",), lambda: 2)
+    cache.get_or_compute(("a",), lambda: 0)
+    cache.get_or_compute(("c",), lambda: 3)
+    assert cache.get_or_compute(("a",), lambda: -1) == 1
+    assert cache.get_or_compute(("b",), lambda: -2) == -2
+    assert cache.stats().evictions == 2
+
+    now = [0.0]
+    monkeypatch.setattr("calculations.result_cache.time.monotonic", lambda: now[0])
+    cache = ResultCache(maxsize=2, ttl=10.0)
+    cache.get_or_compute(("a",), lambda: 1)
+    now[0] = 5.0
+    assert cache.get_or_compute(("a",), lambda: 2) == 1
+    now[0] = 11.0
+    assert cache.get_or_compute(("a",), lambda: 2) == 2
+
+def test_source_change_invalidates(tmp_path):
+    """Test that touching a data file clears the cache."""
+    source = tmp_path / "machine_capacities.json"
+    source.write_text("[]")
+    cache = ResultCache(maxsize=8, sources=[str(source)])
+    cache.get_or_compute(("a",), lambda: 1)
+    assert cache.get_or_compute(("a",), lambda: 2) == 1
+    source.write_text("[{}]")
+    os.utime(source, ns=(1, 1))
+    assert cache.get_or_compute(("a",), lambda: 2) == 2
+    assert cache.stats().invalidations == 1
+
+def test_cached_compute_operation():
+    """Test cached results against a direct computation and concurrent access."""
+    cache = ResultCache(maxsize=64)
+    direct = compute_operation("bore", BORE, 50.0, 445.0, 0.25, 1.25, 0.3, 95.0, CURVE, 10.0, 90.0)
+    threads = [threading.Thread(target=cached_compute_operation,
+                                args=("bore", BORE, 50.0, 445.0, 0.25, 1.25, 0.3, 95.0, CURVE, 10.0, 90.0),
+                                kwargs={"cache": cache}) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cached_compute_operation("bore", BORE, 50.0, 445.0, 0.25, 1.25, 0.3, 95.0, CURVE, 10.0, 90.0,
+                                    cache=cache) == direct
+    stats = cache.stats()
+    assert stats.size == 1 and stats.hits + stats.misses == 9
+
+    other = CapacityCurve([100, 5000], [1.0, 1.0], [5.0, 5.0])
+    r = cached_compute_operation("bore", BORE, 50.0, 445.0, 0.25, 1.25, 0.3, 95.0, other, 10.0, 90.0, cache=cache)
+    assert r.local_power == 1.0 and cache.stats().size == 2
+
+def test_edited_conditions_miss():
+    """Test that the same insert name with edited conditions is not answered from the cache."""
+    cache = ResultCache(maxsize=64)
+    before = cached_compute_operation("bore", BORE, 50.0, 445.0, 0.25, 1.25, 0.3, 95.0, CURVE, 10.0, 90.0,
+                                      cache=cache)
+    edited = dict(BORE, Y0=40)
+    assert conditions_fingerprint(edited) != conditions_fingerprint(BORE)
+    assert conditions_fingerprint(dict(reversed(list(BORE.items())))) == conditions_fingerprint(BORE)
+    after = cached_compute_operation("bore", edited, 50.0, 445.0, 0.25, 1.25, 0.3, 95.0, CURVE, 10.0, 90.0,
+                                     cache=cache)
+    assert after == compute_operation("bore", edited, 50.0, 445.0, 0.25, 1.25, 0.3, 95.0, CURVE, 10.0, 90.0)
+    assert after.Pc < before.Pc and cache.stats().size == 2
+
+def test_sources_are_absolute(tmp_path, monkeypatch):
+    """Test that relative sources keep pointing to the same files after a change of directory."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data.json").write_text("[]")
+    cache = ResultCache(maxsize=8, sources=["data.json"])
+    assert cache.sources == (str(tmp_path / "data.json"),)
+    cache.get_or_compute(("a",), lambda: 1)
+    monkeypatch.chdir(tmp_path.parent)
+    assert cache.get_or_compute(("a",), lambda: 2) == 1
+
+def test_cached_compute_operation_with_graph():
+    """Test that a session graph computes the misses and stays in step with the hits."""
+    cache = ResultCache(maxsize=64)
+    other_session, graph = OperationGraph(), OperationGraph()
+    args = ("bore", BORE, 50.0, 445.0, 0.25, 1.25, 0.3, 95.0, CURVE, 10.0, 90.0)
+    first = cached_compute_operation(*args, cache=cache, graph=other_session)
+    direct = compute_operation(*args)
+    assert (first.n, first.bracket) == (direct.n, direct.bracket)
+    assert (first.kc, first.Pc, first.Mc) == pytest.approx((direct.kc, direct.Pc, direct.Mc))
+    # Hit: the graph of this session gets the inputs but computes nothing until read
+    assert cached_compute_operation(*args, cache=cache, graph=graph) is first
+    assert graph.recomputed == () and graph["Pc"] == first.Pc
+    cached_compute_operation("bore", BORE, 50.0, 445.0, 0.25, 2.0, 0.3, 95.0, CURVE, 10.0, 90.0,
+                             cache=cache, graph=graph)
+    assert "kc" not in graph.recomputed and "Pc" in graph.recomputed
@@ -0,0 +1,39 @@
+"""
+Test module for the cold start of the application.
+"""
+
+import importlib.util
+import os
+import subprocess
+import sys
+from config import STARTUP_CONFIG
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+APP = os.path.join(ROOT, "app.py")
+
+def _launcher():
+    spec = importlib.util.spec_from_file_location("launcher", os.path.join(ROOT, "launcher.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def test_launcher_runs_budgeted_app():
+    """Test that the launcher starts (and profiles) the app the startup budget is checked on."""
+    assert os.path.join(ROOT, _launcher().APP_SCRIPT) == APP
+
+def test_heavy_modules_are_deferred():
+    """Test that importing the app modules loads neither pandas nor the plotly figure classes."""
+    modules = _launcher().app_imports(APP)
+    code = (f"import sys; sys.path[:0] = [{os.path.join(ROOT, 'src')!r}]\n"
+            + "".join(f"import {module}\n" for module in modules)
+            + "import calculations.cutting_calculations\n"
+            + f"print([m for m in {tuple(STARTUP_CONFIG['deferred_modules'])!r} if m in sys.modules])")
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=ROOT)
+    assert output.stdout.strip() == "[]"
+
+def test_cold_start_budget():
+    """Test the cold import time of the app against the startup budget."""
+    total, packages = _launcher().profile_imports(APP, ROOT)
+    project = sum(ms for package, ms in packages if package in ("calculations", "data", "ui", "config"))
+    assert total <= STARTUP_CONFIG["import_budget_ms"], packages[:5]
+    assert project <= STARTUP_CONFIG["project_budget_ms"], packages[:5]
@@ -0,0 +1,114 @@
+"""
+Test module for the capacity planning sweep.
+"""
+
+import threading
+import numpy as np
+import pytest
+from calculations.batch import evaluate_batch
+from calculations.capacity_curve import CapacityCurve
+from calculations.machine_registry import MachineRegistry, MachineSpec, check_stacked
+from calculations.optimizer import material_removal_rate, operation_kind
+from calculations.sweep import LIMITS, SUMMARY_FIELDS, grid_axes, plan_chunks, run_sweep, sweep_chunk
+from data.curve_store import write_curve
+
+CONDITIONS = {
+    "turn": {
+        "operation": "chariotage/dressage",
+        "profondeur_passe_ap_mm": [0.5, 7.0],
+        "avance_f_mmtr": [0.12, 0.6],
+        "vitesse_coupe_Vc_mmin": [150, 400],
+        "Y0": 20
+    },
+    "drill": {"operation": "perçage", "avance_f_mmtr": [0.1, 0.3], "vitesse_coupe_Vc_mmin": [60, 120], "Y0": 20},
+    "groove": {"operation": "gorge", "avance_f_mmtr": [0.05, 0.15], "vitesse_coupe_Vc_mmin": [100, 260],
+               "insert_length_mm": 3.0, "Y0": 20}
+}
+CURVES = {
+    "small": [(100, 1.0, 20.0), (6000, 3.0, 10.0)],
+    "large": [(20, 5.0, 300.0), (4000, 25.0, 200.0)]
+}
+DIAMETERS = np.array([10.0, 25.0, 40.0, 63.0, 80.0])
+
+@pytest.fixture
+def registry(tmp_path):
+    """Registry of a small and a large machine."""
+    registry = MachineRegistry()
+    for machine_id, points in CURVES.items():
+        path = str(tmp_path / f"{machine_id}.mcap")
+        write_curve(path, CapacityCurve([n for n, _, _ in points], [p for _, p, _ in points],
+                                        [t for _, _, t in points], machine_id))
+        registry.add(MachineSpec(machine_id, path, 10.0, 90.0))
+    return registry
+
+def test_plan_chunks():
+    """Test that chunks cover every insert and diameter once, near the target size."""
+    chunks = plan_chunks(CONDITIONS, DIAMETERS, 2, 8, 1000)
+    points = {name: int(np.prod([axis.size for axis in grid_axes(conditions, 8)]))
+              for name, conditions in CONDITIONS.items()}
+    assert points == {"turn": 512, "drill": 64, "groove": 64}
+    for name in CONDITIONS:
+        parts = [part for insert, part, _ in chunks if insert == name]
+        assert np.array_equal(np.concatenate(parts), DIAMETERS)
+    assert all(count == len(part) * points[name] * 2 for name, part, count in chunks)
+    # One diameter per chunk when a single diameter exceeds the target
+    assert all(len(part) == 1 for name, part, _ in chunks if name == "turn")
+    assert max(count for name, _, count in chunks if name != "turn") <= 1000
+
+@pytest.mark.parametrize("tool", sorted(CONDITIONS))
+def test_chunk_matches_brute_force(registry, tool):
+    """Test the best point of each machine and diameter against a point-by-point check."""
+    conditions = CONDITIONS[tool]
+    stack = registry.stacked()
+    summary = sweep_chunk(stack, conditions, DIAMETERS, 6)
+    Vc, fn, ap = (values.ravel() for values in np.meshgrid(*grid_axes(conditions, 6), indexing="ij"))
+    for j, D in enumerate(DIAMETERS):
+        check = check_stacked(stack, evaluate_batch(conditions, D, Vc, fn, ap=ap), D)
+        mrr = material_removal_rate(operation_kind(conditions), Vc, fn, ap, D)
+        for m in range(len(stack.machine_ids)):
+            feasible = check.margin[m] >= 0
+            assert summary["feasible"][m, j] == feasible.any()
+            assert summary["feasible_share"][m, j] == pytest.approx(feasible.mean())
+            if feasible.any():
+                assert summary["mrr"][m, j] == pytest.approx(mrr[feasible].max())
+                assert summary["margin"][m, j] >= 0
+            else:
+                assert summary["margin"][m, j] == pytest.approx(check.margin[m].max())
+    assert set(LIMITS[i] for i in summary["limit"].ravel()) <= set(LIMITS)
+
+def test_pool_matches_in_process(registry):
+    """Test that the pool and the in-process sweep give the same table in catalog order."""
+    seen = []
+    local = run_sweep(CONDITIONS, registry, DIAMETERS, grid_size=6, workers=0, chunk_evaluations=500,
+                      progress=seen.append)
+    pooled = run_sweep(CONDITIONS, registry, DIAMETERS, grid_size=6, workers=1, chunk_evaluations=500)
+    assert local.rows == pooled.rows == len(CONDITIONS) * len(CURVES) * len(DIAMETERS)
+    for field in SUMMARY_FIELDS:
+        assert np.array_equal(local.table[field], pooled.table[field])
+    assert list(dict.fromkeys(local.table["insert"])) == list(CONDITIONS)
+    assert list(local.table["machine"][:len(DIAMETERS) * 2:len(DIAMETERS)]) == ["large", "small"]
+    assert np.array_equal(local.table["D"][:len(DIAMETERS)], DIAMETERS)
+    # The small machine cannot do more than the large one
+    for name in CONDITIONS:
+        rows = local.table["insert"] == name
+        large, small = (local.table["mrr"][rows & (local.table["machine"] == m)] for m in ("large", "small"))
+        assert np.all(small <= large + 1e-9)
+    assert [p.chunks_done for p in seen] == list(range(1, local.chunks_total + 1))
+    assert seen[-1].fraction == 1.0 and seen[-1].evaluations == local.evaluations
+    assert not local.cancelled and not local.errors
+
+def test_cancel_and_errors(registry):
+    """Test that a cancelled sweep keeps the finished chunks and that invalid inserts are reported."""
+    cancel = threading.Event()
+    result = run_sweep(CONDITIONS, registry, DIAMETERS, grid_size=6, workers=0, chunk_evaluations=500,
+                       progress=lambda p: cancel.set() if p.chunks_done == 2 else None, cancel=cancel)
+    assert result.cancelled and result.chunks_done == 2 < result.chunks_total
+    assert result.rows == sum(len(part) for _, part, _ in
+                              plan_chunks(CONDITIONS, DIAMETERS, 2, 6, 500)[:2]) * len(CURVES)
+    broken = dict(CONDITIONS, broken={"operation": "gorge", "avance_f_mmtr": [0.05, 0.1], "Y0": 20})
+    for workers in (0, 1):
+        result = run_sweep(broken, registry, DIAMETERS, grid_size=4, workers=workers)
+        assert list(result.errors) == ["broken"] and "vitesse_coupe_Vc_mmin" in result.errors["broken"]
+        assert "broken" not in set(result.table["insert"]) and result.rows == len(CONDITIONS) * 10
+    with pytest.raises(ValueError, match="No machine"):
+        run_sweep(CONDITIONS, MachineRegistry(), DIAMETERS, workers=0)
@@ -0,0 +1,68 @@
+"""
+Test module for the timing of the application stages.
+"""
+
+import threading
+import pytest
+from tracing import Tracer, active_trace, discard, read_traces, span, stage, traced
+
+@traced("calc.double")
+def _double(x):
+    return 2 * x
+
+def test_stages_and_spans():
+    """Test the nesting, order and timing of stages and spans."""
+    tracer = Tracer()
+    trace = tracer.start("rerun", session="s1")
+    stage("app.data")
+    with span("data.load"):
+        with span("data.parse"):
+            pass
+    stage("app.calculation")
+    assert _double(2) == 4
+    assert tracer.finish() is trace and active_trace() is None
+    assert [(s.name, s.depth) for s in trace.spans] == [
+        ("app.data", 0), ("data.load", 1), ("data.parse", 2), ("app.calculation", 0), ("calc.double", 1)
+    ]
+    assert all(s.duration >= 0 for s in trace.spans)
+    assert trace.spans[3].start >= trace.spans[0].start + trace.spans[0].duration
+    assert trace.duration >= sum(s.duration for s in trace.spans if s.depth == 0)
+    assert trace.to_dict()["session"] == "s1"
+
+def test_no_active_trace():
+    """Test that spans, stages and traced functions do nothing outside a trace."""
+    Tracer().start("interrupted")
+    discard()
+    assert span("a") is span("b")
+    with span("a"):
+        stage("app.data")
+    assert _double(3) == 6 and active_trace() is None and Tracer().finish() is None
+
+    # A trace belongs to the thread (or task) that started it
+    tracer = Tracer()
+    trace = tracer.start("rerun")
+    thread = threading.Thread(target=lambda: span("other").__enter__())
+    thread.start()
+    thread.join()
+    tracer.finish()
+    assert trace.spans == []
+
+def test_trace_file(tmp_path):
+    """Test the JSON lines file, failed spans and the rotation of the file."""
+    path = str(tmp_path / "traces.jsonl")
+    tracer = Tracer(path, max_bytes=10**6)
+    for i in range(2):
+        tracer.start("rerun", number=i)
+        with pytest.raises(ValueError):
+            with span("calc.fail"):
+                raise ValueError("bad input")
+        tracer.finish()
+    traces = read_traces(path)
+    assert [t["number"] for t in traces] == [0, 1]
+    assert traces[0]["spans"][0]["name"] == "calc.fail" and traces[0]["spans"][0]["error"] == "ValueError"
+
+    tracer.max_bytes = 1
+    tracer.start("rerun", number=2)
+    tracer.finish()
+    assert [t["number"] for t in read_traces(path)] == [2]
+    assert len(read_traces(path + ".1")) == 2
@@ -0,0 +1,94 @@
+"""
+Test module for the Monte Carlo uncertainty mode.
+"""
+
+import numpy as np
+import pytest
+from calculations.batch import evaluate_batch
+from calculations.capacity_curve import CapacityCurve
+from calculations.operations import compute_operation
+from calculations.result_cache import ResultCache
+from calculations.uncertainty import Distribution, cached_simulate, default_distributions, simulate
+
+CONDITIONS = {
+    "groove": {"operation": "gorge", "Y0": 20, "insert_length_mm": 3.0},
+    "bore": {"operation": "alésage", "hex_rec": 0.25, "Y0": 6},
+    "drill": {"operation": "perçage", "Y0": 20},
+    "turn": {"operation": "chariotage/dressage", "Y0": 20}
+}
+CURVE = CapacityCurve([100.0, 1000.0, 3000.0], [2.0, 8.0, 10.0], [190.0, 76.0, 32.0])
+FIXED = {name: Distribution("uniform", 0.0) for name in ("kc1", "m0", "Y0", "D", "Vc")}
+
+def test_distributions():
+    """Test the center, spread and bounds of each distribution kind."""
+    rng = np.random.default_rng(1)
+    normal = Distribution("normal", 0.1, relative=True).sample(400.0, 200_000, rng)
+    assert normal.mean() == pytest.approx(400.0, rel=1e-3) and normal.std() == pytest.approx(40.0, rel=0.02)
+    assert normal.min() >= 240.0 and normal.max() <= 560.0
+    uniform = Distribution("uniform", 2.0).sample(6.0, 200_000, rng)
+    assert 4.0 <= uniform.min() and uniform.max() <= 8.0 and uniform.std() == pytest.approx(4 / np.sqrt(12), rel=0.02)
+    triangular = Distribution("triangular", 0.05).sample(50.0, 200_000, rng)
+    assert np.median(triangular) == pytest.approx(50.0, abs=1e-3) and 49.95 <= triangular.min()
+    assert np.all(Distribution("normal", 0.0).sample(3.0, 5, rng) == 3.0)
+    with pytest.raises(ValueError, match="Unknown distribution"):
+        Distribution("lognormal", 0.1).sample(1.0, 5, rng)
+    assert set(default_distributions()) == set(FIXED)
+
+def test_sampled_constants_in_batch():
+    """Test that kc1, m0 and Y0 arrays give the same values as scalar calls."""
+    kc1, m0, Y0 = np.array([350.0, 400.0, 450.0]), np.array([0.2, 0.25, 0.3]), np.array([4.0, 6.0, 8.0])
+    for conditions in CONDITIONS.values():
+        batch = evaluate_batch(conditions, 40.0, 150.0, 0.2, ap=1.5, kc1=kc1, m0=m0, Y0=Y0)
+        for i in range(3):
+            single = evaluate_batch(conditions, 40.0, 150.0, 0.2, ap=1.5, kc1=kc1[i], m0=m0[i], Y0=Y0[i])
+            assert batch["Pc"][i] == pytest.approx(single["Pc"][0])
+    # Y0 given explicitly replaces the value fixed by the drilling rule
+    drilled = evaluate_batch(CONDITIONS["drill"], 12.0, 150.0, 0.15, Y0=6.0)["Pc"][0]
+    assert drilled > evaluate_batch(CONDITIONS["drill"], 12.0, 150.0, 0.15)["Pc"][0]
+
+@pytest.mark.parametrize("tool", sorted(CONDITIONS))
+def test_zero_spread_is_nominal(tool):
+    """Test that without spread every sample is the nominal operating point."""
+    conditions = CONDITIONS[tool]
+    nominal = compute_operation(tool, conditions, 40.0, 150.0, 0.2, 1.5, None, 95.0, CURVE, 9.0, 60.0)
+    result = simulate(conditions, 40.0, 150.0, 0.2, 1.5, None, 95.0, CURVE, 9.0, 60.0,
+                      distributions=FIXED, samples=1000)
+    assert result.Pc_quantiles == pytest.approx((nominal.Pc,) * 3)
+    assert result.Mc_mean == pytest.approx(nominal.Mc) and result.Mc_std == pytest.approx(0.0, abs=1e-9)
+    assert result.p_overload == (0.0 if nominal.ok else 1.0)
+
+def test_probability_of_overload():
+    """Test the probability of exceeding the capacity against its closed form."""
+    # Only kc1 varies: Pc is proportional to kc1, so P(Pc > P) = P(kc1 > 400 × P / Pc nominal)
+    conditions = CONDITIONS["turn"]
+    curve = CapacityCurve([100.0, 1000.0, 3000.0], [1.0, 1.0, 1.0], [500.0, 500.0, 500.0])
+    nominal = compute_operation("turn", conditions, 40.0, 150.0, 0.3, 3.0, None, 95.0, curve, 1.0, 500.0)
+    spread = dict(FIXED, kc1=Distribution("uniform", 0.5, relative=True))
+    result = simulate(conditions, 40.0, 150.0, 0.3, 3.0, None, 95.0, curve, 1.0, 500.0,
+                      distributions=spread, samples=200_000)
+    threshold = nominal.local_power / nominal.Pc
+    expected = np.clip((1.5 - threshold) / 1.0, 0.0, 1.0)
+    assert 0 < expected < 1
+    assert result.p_power == pytest.approx(expected, abs=4 * result.overload_error + 1e-3)
+    assert result.p_torque == 0.0 and result.p_overload == result.p_power
+    assert result.Pc_counts.sum() == 200_000 and len(result.Pc_edges) == len(result.Pc_counts) + 1
+
+def test_cached_simulation():
+    """Test that identical inputs reuse the result and new spreads recompute it."""
+    cache = ResultCache(maxsize=4)
+    args = ("bore", CONDITIONS["bore"], 40.0, 150.0, 0.2, 1.5, 0.25, 95.0, CURVE, 9.0, 60.0)
+    first = cached_simulate(*args, samples=10_000, cache=cache)
+    assert cached_simulate(*args, samples=10_000, cache=cache) is first
+    wider = dict(default_distributions(), kc1=Distribution("normal", 0.2, True))
+    other = cached_simulate(*args, samples=10_000, distributions=wider, cache=cache)
+    assert other.Pc_std > first.Pc_std
+    assert cache.stats().hits == 1 and cache.stats().misses == 2
+    # Same seed, same samples: a fresh computation gives the same result
+    fresh = simulate(*args[1:], samples=10_000)
+    assert fresh.Pc_quantiles == first.Pc_quantiles and fresh.p_overload == first.p_overload
+    with pytest.raises(ValueError, match="cannot be sampled"):
+        simulate(*args[1:], distributions={"fn": Distribution("normal", 0.1)})
+    # Same insert name with an edited Y0: simulated again, not answered from the cache
+    edited = ("bore", dict(CONDITIONS["bore"], Y0=60)) + args[2:]
+    changed = cached_simulate(*edited, samples=10_000, cache=cache)
+    assert changed.Pc_mean == simulate(*edited[1:], samples=10_000).Pc_mean < first.Pc_mean
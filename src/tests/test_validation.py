@@ -0,0 +1,76 @@
+"""
+Test module for the vectorized data validation.
+"""
+
+import json
+import os
+import pytest
+from data.data_loader import DataLoader
+from data.validation import ValidationCache, validate_conditions, validate_curve
+
+ROOT = os.path.join(os.path.dirname(__file__), "..", "..")
+
+def _conditions():
+    with open(os.path.join(ROOT, "conditions_coupe_sandvik.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+def test_repository_data_is_valid():
+    """Test that the shipped data files pass the real schema."""
+    assert DataLoader.validate_cutting_conditions(_conditions())
+    with open(os.path.join(ROOT, "machine_capacities.json"), encoding="utf-8") as f:
+        assert DataLoader.validate_machine_capacities(json.load(f))
+
+def test_conditions_errors():
+    """Test the range checks and the naming of the failing inserts."""
+    data = _conditions()
+    boring = data["CCMT 09 T3 08-UM 1125"]
+    data["A"] = dict(boring, hex_rec=0.5)
+    data["B"] = dict(boring, avance_f_mmtr=[0.4, 0.1])
+    data["C"] = {k: v for k, v in boring.items() if k != "vitesse_coupe_rec"}
+    data["D"] = dict(boring, Y0=True, operation="")
+    with pytest.raises(ValueError) as error:
+        validate_conditions(data.items())
+    lines = str(error.value).splitlines()
+    assert "'hex_rec' must lie in 'hex_mm': A" in lines
+    assert "'avance_f_mmtr' must satisfy 0 <= min <= max (finite): B" in lines
+    assert "'vitesse_coupe_rec' is required with 'vitesse_coupe_Vc_mmin': C" in lines
+    assert "'Y0' must be a number: D" in lines
+    assert "'operation' must be a non-empty string: D" in lines
+
+def test_conditions_checked_in_chunks():
+    """Test that failures found in successive chunks are reported as one check."""
+    boring = _conditions()["CCMT 09 T3 08-UM 1125"]
+    entries = ((f"I{i}", dict(boring, Y0=-1) if i % 2 else boring) for i in range(23))
+    with pytest.raises(ValueError) as error:
+        validate_conditions(entries, chunk_size=4)
+    assert str(error.value) == "'Y0' must be finite and not negative: I1, I3, I5, I7, I9 (+6)"
+    assert validate_conditions(((f"I{i}", boring) for i in range(23)), chunk_size=4) == 23
+    with pytest.raises(ValueError, match="^Conditions must be a dictionary: I9$"):
+        validate_conditions(((f"I{i}", None if i == 9 else dict(boring, Y0=-1)) for i in range(12)), chunk_size=4)
+
+def test_curve_errors():
+    """Test the column checks of the capacity records."""
+    records = [{"n": 100, "power": 2.0, "torque": 80.0}, {"n": 50, "power": 1.0, "torque": 80.0}]
+    assert validate_curve(records) == 2
+    with pytest.raises(ValueError, match="'n' values must be distinct: #2"):
+        validate_curve(records + [{"n": 100.0, "power": 2.0, "torque": 80.0}])
+    with pytest.raises(ValueError, match="'power' must not be negative: #1"):
+        validate_curve([records[0], dict(records[1], power=-1.0)])
+    with pytest.raises(ValueError, match="'torque' must be a number: #0"):
+        validate_curve([dict(records[0], torque="80")])
+
+def test_validation_cache(tmp_path):
+    """Test that files are validated once per content, errors included."""
+    path = tmp_path / "machine.json"
+    path.write_text(json.dumps([{"n": 1, "power": 1, "torque": 1}, {"n": 2, "power": 1, "torque": 1}]))
+    cache = ValidationCache()
+    assert cache.validate_file(str(path), "curve") == 2
+    assert cache.validate_file(str(path), "curve") == 2
+    os.utime(path, ns=(1, 1))
+    assert cache.validate_file(str(path), "curve") == 2
+    assert cache.validations == 1
+    path.write_text(json.dumps([{"n": 1, "power": -1, "torque": 1}]))
+    for _ in range(2):
+        with pytest.raises(ValueError, match="must not be negative"):
+            cache.validate_file(str(path), "curve")
+    assert cache.validations == 2
@@ -0,0 +1,254 @@
+"""
+Module for the timing of the application stages.
+A trace is started at the top of a rerun, which is then cut into stages, and
+named spans (data loading, validation, interpolation, figure building, table
+rendering...) nest inside them. Finished traces are returned to the caller
+for the debug panel and appended as JSON lines to the trace file. Outside a
+trace, span() only looks up a context variable and returns a shared no-op
+context manager.
+"""
+
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+_current = contextvars.ContextVar("trace", default=None)
+
+class SpanRecord(NamedTuple):
+    """One finished span of a trace."""
+    name: str
+    start: float  # ms since the start of the trace
+    duration: float  # ms
+    depth: int  # 0 for the stages of the trace, 1 for the spans inside them...
+    error: Optional[str] = None  # exception type if the span was left by an exception
+
+class Trace:
+    """Spans of one traced run (a rerun of the app, a data reload...)."""
+
+    def __init__(self, name: str, **attrs: Any):
+        """
+        Start the trace clock.
+
+        Args:
+            name (str): Name of the traced run
+            **attrs (Any): JSON-serializable attributes stored with the trace (session...)
+        """
+        self.name = name
+        self.attrs = attrs
+        self.started_at = time.time()
+        self.duration = None  # ms, set by finish()
+        self.spans: List[SpanRecord] = []
+        self._t0 = time.perf_counter()
+        self._depth = 0
+        self._stage = None  # (name, start) of the open stage
+
+    def stage(self, name: Optional[str]):
+        """
+        Close the open stage and open the next one (None only closes).
+
+        Stages are top-level spans that need no with block, for scripts run
+        from top to bottom; spans opened inside a stage are nested under it.
+        Call it outside of any span.
+        """
+        now = time.perf_counter()
+        if self._stage is not None:
+            stage_name, start = self._stage
+            self.spans.append(SpanRecord(stage_name, (start - self._t0) * 1000, (now - start) * 1000, 0))
+        self._stage = None if name is None else (name, now)
+        self._depth = 0 if name is None else 1
+
+    def finish(self) -> "Trace":
+        """Close the open stage, stop the trace clock and sort the spans by start time."""
+        self.stage(None)
+        self.duration = (time.perf_counter() - self._t0) * 1000
+        self.spans.sort(key=lambda s: (s.start, s.depth))
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        JSON representation of the trace (one line of the trace file).
+
+        Returns:
+            Dict[str, Any]: Name, attributes, start date, duration and spans
+        """
+        return {
+            "trace": self.name,
+            "started_at": datetime.fromtimestamp(self.started_at).isoformat(timespec="milliseconds"),
+            "duration_ms": round(self.duration, 3) if self.duration is not None else None,
+            **self.attrs,
+            "spans": [{"name": s.name, "start_ms": round(s.start, 3), "duration_ms": round(s.duration, 3),
+                       "depth": s.depth, **({"error": s.error} if s.error else {})} for s in self.spans]
+        }
+
+class _Span:
+    """Context manager timing one span of the active trace."""
+    __slots__ = ("trace", "name", "start", "depth")
+
+    def __init__(self, trace: Trace, name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.depth = self.trace._depth
+        self.trace._depth += 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        trace = self.trace
+        trace._depth -= 1
+        trace.spans.append(SpanRecord(self.name, (self.start - trace._t0) * 1000, (end - self.start) * 1000,
+                                      self.depth, exc_type.__name__ if exc_type else None))
+        return False
+
+class _NoSpan:
+    """Span returned outside a trace: does nothing."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NO_SPAN = _NoSpan()
+
+def span(name: str):
+    """
+    Time a block as a span of the active trace (no-op without an active trace).
+
+    Args:
+        name (str): Stage name, e.g. "data.validate_file"
+
+    Returns:
+        Context manager timing the block
+    """
+    trace = _current.get()
+    if trace is None:
+        return _NO_SPAN
+    return _Span(trace, name)
+
+def stage(name: Optional[str]):
+    """
+    Start the next stage of the active trace, closing the previous one (no-op without an active trace).
+
+    Args:
+        name (Optional[str]): Stage name, e.g. "app.sidebar", None to only close the open stage
+    """
+    trace = _current.get()
+    if trace is not None:
+        trace.stage(name)
+
+def traced(name: str) -> Callable:
+    """
+    Decorator timing every call of a function as a span of the active trace.
+
+    Args:
+        name (str): Stage name
+
+    Returns:
+        Callable: Decorator
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            trace = _current.get()
+            if trace is None:
+                return func(*args, **kwargs)
+            with _Span(trace, name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def discard():
+    """Drop the active trace without finishing it (a rerun interrupted by st.stop() leaves one)."""
+    _current.set(None)
+
+def active_trace() -> Optional[Trace]:
+    """
+    Get the trace of the current thread or task.
+
+    Returns:
+        Optional[Trace]: The active trace, None when not tracing
+    """
+    return _current.get()
+
+class Tracer:
+    """Starts and finishes traces, appending the finished ones to a JSON lines file."""
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = 10 * 1024 * 1024):
+        """
+        Set the trace file.
+
+        Args:
+            path (Optional[str]): JSON lines file, None to keep traces in memory only
+            max_bytes (int): Size above which the file is renamed to <path>.1 and a new one started
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def start(self, name: str, **attrs: Any) -> Trace:
+        """
+        Start a trace in the current thread or task, replacing an unfinished one.
+
+        A rerun interrupted by st.stop() or st.rerun() never finishes its trace;
+        the next start() or discard() drops it.
+
+        Args:
+            name (str): Name of the traced run
+            **attrs (Any): JSON-serializable attributes stored with the trace
+
+        Returns:
+            Trace: The new active trace
+        """
+        trace = Trace(name, **attrs)
+        _current.set(trace)
+        return trace
+
+    def finish(self) -> Optional[Trace]:
+        """
+        Finish the active trace and append it to the trace file.
+
+        Returns:
+            Optional[Trace]: The finished trace, None if no trace was active
+        """
+        trace = _current.get()
+        if trace is None:
+            return None
+        _current.set(None)
+        trace.finish()
+        if self.path:
+            self.write(trace)
+        return trace
+
+    def write(self, trace: Trace):
+        """Append a finished trace to the trace file as one JSON line."""
+        line = json.dumps(trace.to_dict(), ensure_ascii=False) + "\n"
+        with self._lock:
+            try:
+                if os.path.getsize(self.path) > self.max_bytes:
+                    os.replace(self.path, self.path + ".1")
+            except FileNotFoundError:
+                pass
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+def read_traces(path: str) -> List[Dict[str, Any]]:
+    """
+    Read a trace file.
+
+    Args:
+        path (str): JSON lines file written by a Tracer
+
+    Returns:
+        List[Dict[str, Any]]: One dictionary per trace, oldest first
+    """
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
@@ -4,8 +4,21 @@ Contains reusable Streamlit components with consistent styling and error handlin
 """
 
 import streamlit as st
-from typing import Dict, Any, List, Optional
-import plotly.graph_objects as go
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple, Union
+import numpy as np
+
+from tracing import span
+
+# plotly is imported by the plotting methods on first use: it is not needed to
+# render the first elements of the page
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
+    from calculations.capacity_curve import CapacityCurve
+
+# Partial reruns: st.fragment (Streamlit >= 1.37), st.experimental_fragment (1.33 to 1.36).
+# Older versions have neither and the decorated blocks rerun with the whole page.
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda func: func)
 
 class UIComponents:
     """Class for reusable UI components."""
@@ -105,41 +118,98 @@ class UIComponents:
                 )
                 
     @staticmethod
-    def plot_capacity_curve(machine_caps: List[Dict[str, float]]):
+    def plot_capacity_curve(machine_caps: Union["CapacityCurve", List[Dict[str, float]]],
+                            point: Optional[Tuple[float, float, float]] = None,
+                            history: Optional[Dict[str, Any]] = None, max_points: int = 1000):
         """
         Plot the machine capacity curve.
         
         Args:
-            machine_caps (List[Dict[str, float]]): Machine capacity data
+            machine_caps (Union[CapacityCurve, List[Dict[str, float]]]): Machine capacity curve or records
+            point (Optional[Tuple[float, float, float]]): Current (n, Pc, Mc) operating point
+            history (Optional[Dict[str, Any]]): n, Pc and Mc arrays of past operating points
+                (and optionally their insert_name)
+            max_points (int): Maximum number of curve points sent to the browser
         """
-        if not machine_caps:
+        if not len(machine_caps):
             return
-            
-        # Sort data by rotation speed
-        caps = sorted(machine_caps, key=lambda x: x["n"])
-        ns = [cap["n"] for cap in caps]
-        powers = [cap["power"] for cap in caps]
-        torques = [cap["torque"] for cap in caps]
-        
+        with span("ui.capacity_figure"):
+            fig = UIComponents.capacity_figure(machine_caps, point, history, max_points)
+        with span("ui.render_chart"):
+            st.plotly_chart(fig, use_container_width=True)
+
+    @staticmethod
+    def capacity_figure(machine_caps: Union["CapacityCurve", List[Dict[str, float]]],
+                        point: Optional[Tuple[float, float, float]] = None,
+                        history: Optional[Dict[str, Any]] = None, max_points: int = 1000) -> "go.Figure":
+        """
+        Build the machine capacity curve figure.
+
+        Curves longer than max_points are downsampled with LTTB, which keeps
+        their peaks and knees, so the payload and the rendering time do not
+        grow with the curve. Past operating points are drawn with WebGL
+        (Scattergl) so thousands of them stay interactive.
+
+        Args:
+            machine_caps (Union[CapacityCurve, List[Dict[str, float]]]): Machine capacity curve or records
+            point (Optional[Tuple[float, float, float]]): Current (n, Pc, Mc) operating point
+            history (Optional[Dict[str, Any]]): n, Pc and Mc arrays of past operating points
+                (and optionally their insert_name)
+            max_points (int): Maximum number of curve points sent to the browser
+
+        Returns:
+            go.Figure: Power and torque against rotation speed, with the operating points
+        """
+        from calculations.capacity_curve import CapacityCurve
+        from calculations.curve_simplify import downsample_curve
+        curve = machine_caps if isinstance(machine_caps, CapacityCurve) else CapacityCurve.from_records(machine_caps)
+        curve = downsample_curve(curve, max_points)
+
         # Create figure
+        import plotly.graph_objects as go
         fig = go.Figure()
         
         # Add power curve
         fig.add_trace(go.Scatter(
-            x=ns,
-            y=powers,
+            x=curve.n,
+            y=curve.power,
             name="Puissance (kW)",
             line=dict(color="blue")
         ))
         
         # Add torque curve
         fig.add_trace(go.Scatter(
-            x=ns,
-            y=torques,
+            x=curve.n,
+            y=curve.torque,
             name="Couple (Nm)",
             line=dict(color="red"),
             yaxis="y2"
         ))
+
+        # Past operating points, one WebGL trace per axis
+        if history is not None and len(history["n"]):
+            text = history.get("insert_name")
+            for key, axis, color, label in (("Pc", "y", "rgba(0, 0, 255, 0.35)", "Historique Pc"),
+                                            ("Mc", "y2", "rgba(255, 0, 0, 0.35)", "Historique Mc")):
+                fig.add_trace(go.Scattergl(
+                    x=history["n"],
+                    y=history[key],
+                    mode="markers",
+                    marker=dict(size=5, color=color),
+                    name=label,
+                    text=text,
+                    yaxis=axis,
+                    hovertemplate=f"%{{text}}<br>n=%{{x:.0f}} tr/min<br>{key}=%{{y:.2f}}<extra></extra>"
+                    if text is not None else None
+                ))
+
+        # Current operating point
+        if point is not None:
+            n, Pc, Mc = point
+            fig.add_trace(go.Scatter(x=[n], y=[Pc], mode="markers", name="Point actuel Pc",
+                                     marker=dict(symbol="x", size=14, color="blue")))
+            fig.add_trace(go.Scatter(x=[n], y=[Mc], mode="markers", name="Point actuel Mc", yaxis="y2",
+                                     marker=dict(symbol="x", size=14, color="red")))
         
         # Update layout
         fig.update_layout(
@@ -153,9 +223,265 @@ class UIComponents:
             ),
             showlegend=True
         )
-        
-        st.plotly_chart(fig, use_container_width=True)
-        
+        return fig
+
+    @staticmethod
+    def gauge_figure(title: str, low_color: str, high_color: str) -> "go.Figure":
+        """
+        Build a gauge figure template once; update_gauge() then only changes its values.
+
+        Args:
+            title (str): Gauge title
+            low_color (str): Color of the band below the warning threshold
+            high_color (str): Color of the band between the warning threshold and the limit
+
+        Returns:
+            go.Figure: Gauge figure with placeholder values
+        """
+        import plotly.graph_objects as go
+        return go.Figure(go.Indicator(
+            mode="gauge+number+delta",
+            value=0,
+            delta={"reference": 1},
+            title={"text": title},
+            gauge={
+                "axis": {"range": [0, 1]},
+                "steps": [
+                    {"range": [0, 0.8], "color": low_color},
+                    {"range": [0.8, 1], "color": high_color}
+                ],
+                "threshold": {"value": 1, "line": {"color": "red", "width": 4}}
+            }
+        ))
+
+    @staticmethod
+    def update_gauge(fig: "go.Figure", value: float, limit: float, warning: float = 0.8) -> "go.Figure":
+        """
+        Set the value and the limit of a gauge built by gauge_figure().
+
+        Args:
+            fig (go.Figure): Gauge figure
+            value (float): Current value
+            limit (float): Limit (end of the axis and red threshold)
+            warning (float): Fraction of the limit where the warning band starts
+
+        Returns:
+            go.Figure: The same figure, updated in place
+        """
+        gauge = fig.data[0]
+        gauge.value = value
+        gauge.delta.reference = limit
+        gauge.gauge.axis.range = [0, limit]
+        gauge.gauge.steps[0].range = [0, warning * limit]
+        gauge.gauge.steps[1].range = [warning * limit, limit]
+        gauge.gauge.threshold.value = limit
+        return fig
+
+    @staticmethod
+    def plot_feasibility_map(grid: Any, marker: Tuple[float, float], metric: str = "max",
+                             max_points: int = 200):
+        """
+        Plot machine utilization over an operating plane with the current point marked.
+
+        Args:
+            grid (FeasibilityGrid): Utilization grid from feasibility_grid()
+            marker (Tuple[float, float]): Current (x, y) operating point
+            metric (str): "power", "torque" or "max" utilization
+            max_points (int): Maximum number of points per axis sent to the browser
+        """
+        with span("ui.feasibility_figure"):
+            fig = UIComponents.feasibility_figure(grid, marker, metric, max_points)
+        with span("ui.render_chart"):
+            st.plotly_chart(fig, use_container_width=True)
+
+    @staticmethod
+    def feasibility_figure(grid: Any, marker: Tuple[float, float], metric: str = "max",
+                           max_points: int = 200) -> "go.Figure":
+        """
+        Build the feasibility map figure.
+
+        The figure is sent again on every rerun, so the grid is strided down to
+        at most max_points per axis (about the width of the chart in pixels).
+
+        Args:
+            grid (FeasibilityGrid): Utilization grid from feasibility_grid()
+            marker (Tuple[float, float]): Current (x, y) operating point
+            metric (str): "power", "torque" or "max" utilization
+            max_points (int): Maximum number of points per axis sent to the browser
+
+        Returns:
+            go.Figure: Utilization contour with the limit line and the current point
+        """
+        z = {
+            "power": grid.power_utilization,
+            "torque": grid.torque_utilization,
+            "max": grid.utilization
+        }[metric]
+        sx = -(-len(grid.x) // max_points)
+        sy = -(-len(grid.y) // max_points)
+        x, y, z = grid.x[::sx], grid.y[::sy], z[::sy, ::sx]
+        labels = {"Vc": "Vc (m/min)", "fn": "Avance fn (mm/tr)", "ap": "ap (mm)"}
+
+        import plotly.graph_objects as go
+        fig = go.Figure()
+
+        # Utilization field (1.0 = machine limit) and limit line in a single trace, so
+        # the grid is sent once; 0.1 % resolution keeps the payload about 3x smaller
+        fig.add_trace(go.Contour(
+            x=x,
+            y=y,
+            z=np.round(z, 3),
+            zmin=0,
+            zmax=1.5,
+            colorscale=[[0, "lightgreen"], [0.53, "yellow"], [0.667, "orange"], [0.6671, "red"], [1, "darkred"]],
+            contours=dict(start=1, end=1, size=1, coloring="heatmap"),
+            line=dict(color="black", width=2),
+            colorbar=dict(title="Utilisation"),
+            hovertemplate="Vc=%{x:.0f}<br>%{y:.3f}<br>Utilisation=%{z:.2f}<extra></extra>"
+        ))
+
+        # Current operating point
+        fig.add_trace(go.Scatter(
+            x=[marker[0]],
+            y=[marker[1]],
+            mode="markers",
+            marker=dict(symbol="x", size=14, color="blue"),
+            name="Point actuel"
+        ))
+
+        fig.update_layout(
+            title="Carte de faisabilité",
+            xaxis_title=labels.get(grid.x_name, grid.x_name),
+            yaxis_title=labels.get(grid.y_name, grid.y_name),
+            showlegend=False
+        )
+        return fig
+
+    @staticmethod
+    def plot_uncertainty(result: Any, local_power: float, local_torque: float):
+        """
+        Plot the Monte Carlo distributions of Pc and Mc side by side.
+
+        Args:
+            result (UncertaintyResult): Result of calculations.uncertainty.simulate()
+            local_power (float): Power available at the nominal rotation speed in kW
+            local_torque (float): Torque available at the nominal rotation speed in Nm
+        """
+        with span("ui.uncertainty_figure"):
+            figures = (
+                UIComponents.uncertainty_figure(result.Pc_counts, result.Pc_edges, local_power,
+                                                "Puissance Pc (kW)", "lightgreen"),
+                UIComponents.uncertainty_figure(result.Mc_counts, result.Mc_edges, local_torque,
+                                                "Couple Mc (Nm)", "lightblue")
+            )
+        with span("ui.render_chart"):
+            for column, fig in zip(st.columns(2), figures):
+                with column:
+                    st.plotly_chart(fig, use_container_width=True)
+
+    @staticmethod
+    def uncertainty_figure(counts: np.ndarray, edges: np.ndarray, limit: float, title: str,
+                           color: str) -> "go.Figure":
+        """
+        Build the histogram of one Monte Carlo output.
+
+        Args:
+            counts (np.ndarray): Samples per bin
+            edges (np.ndarray): Bin edges (one more than counts)
+            limit (float): Machine capacity at the nominal rotation speed
+            title (str): Quantity and unit
+            color (str): Color of the bins below the limit
+
+        Returns:
+            go.Figure: Share of the samples per bin, bins above the limit in red, limit line
+        """
+        import plotly.graph_objects as go
+        centers = (edges[:-1] + edges[1:]) / 2
+        share = 100 * counts / max(counts.sum(), 1)
+        fig = go.Figure(go.Bar(
+            x=centers,
+            y=share,
+            width=np.diff(edges),
+            marker_color=np.where(centers > limit, "crimson", color).tolist(),
+            hovertemplate="%{x:.3g} : %{y:.2f} %<extra></extra>"
+        ))
+        fig.add_vline(x=limit, line=dict(color="red", dash="dash"), annotation_text="Capacité machine")
+        fig.update_layout(
+            title=title,
+            xaxis_title=title,
+            yaxis_title="% des tirages",
+            bargap=0,
+            margin=dict(l=0, r=0, t=40, b=0),
+            showlegend=False
+        )
+        return fig
+
+    @staticmethod
+    def trace_waterfall(trace: Any) -> "go.Figure":
+        """
+        Build the waterfall of the spans of a trace.
+
+        Args:
+            trace (Trace): Finished trace from tracing.Tracer
+
+        Returns:
+            go.Figure: One bar per span from its start to its end, nested spans indented
+        """
+        import plotly.graph_objects as go
+        spans = trace.spans
+        labels = [f"{i + 1:>2}. " + "\u2003" * s.depth + s.name for i, s in enumerate(spans)]
+        fig = go.Figure(go.Bar(
+            x=[s.duration for s in spans],
+            base=[s.start for s in spans],
+            y=labels,
+            orientation="h",
+            marker_color=["crimson" if s.error else ("steelblue" if s.depth == 0 else "lightsteelblue")
+                          for s in spans],
+            hovertemplate="%{y}<br>début %{base:.1f} ms<br>durée %{x:.1f} ms<extra></extra>"
+        ))
+        fig.update_layout(
+            title=f"{trace.name} : {trace.duration:.0f} ms",
+            xaxis_title="ms depuis le début du rerun",
+            yaxis=dict(autorange="reversed"),
+            height=120 + 22 * len(spans),
+            margin=dict(l=0, r=0, t=40, b=0),
+            showlegend=False
+        )
+        return fig
+
+    @staticmethod
+    def trace_sidebar(traces: List[Any], path: Optional[str], keep: int):
+        """
+        Debug panel of the sidebar: waterfall of a recent rerun and median duration of each stage.
+
+        The "Chronologie des reruns" checkbox (key "debug_trace") turns the
+        tracing of the session on; the app reads it before starting a rerun.
+
+        Args:
+            traces (List[Trace]): Finished traces of the session, oldest first
+            path (Optional[str]): Trace file the traces are also written to
+            keep (int): Number of reruns kept
+        """
+        with st.sidebar.expander("Débogage"):
+            st.checkbox("Chronologie des reruns", key="debug_trace",
+                        help=f"Durée de chaque étape des {keep} derniers reruns"
+                             + (f", aussi écrite dans {path}" if path else ""))
+            if not (st.session_state.debug_trace and traces):
+                return
+            choice = st.selectbox(
+                "Rerun", range(len(traces) - 1, -1, -1),
+                format_func=lambda i: f"{datetime.fromtimestamp(traces[i].started_at):%H:%M:%S} — "
+                                      f"{traces[i].duration:.0f} ms"
+            )
+            st.plotly_chart(UIComponents.trace_waterfall(traces[choice]), use_container_width=True)
+            stages = {}
+            for trace in traces:
+                for record in trace.spans:
+                    if record.depth == 0:
+                        stages.setdefault(record.name, []).append(record.duration)
+            medians = sorted(((float(np.median(ms)), name) for name, ms in stages.items()), reverse=True)
+            st.caption("Médiane par étape : " + ", ".join(f"{name} {ms:.1f} ms" for ms, name in medians))
+
     @staticmethod
     def error_message(message: str):
         """
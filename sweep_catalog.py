@@ -0,0 +1,112 @@
+"""
+Capacity planning sweep: every insert of the catalog × a diameter range × a
+grid of each insert's Vc/fn/ap range × every machine of the fleet, reduced to
+the maximum feasible material removal rate and the limiting constraint per
+insert, machine and diameter, written to a CSV file.
+"""
+
+import argparse
+import os
+import signal
+import sys
+import threading
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+from config import (CONDITIONS_FILE, MACHINE_CAPACITIES_FILE, MACHINES_DIR, MACHINE_REGISTRY_CONFIG,
+                    DEFAULT_MAX_POWER, DEFAULT_MAX_TORQUE, SWEEP_CONFIG)
+from calculations.machine_registry import MachineRegistry, MachineSpec
+from calculations.sweep import SUMMARY_FIELDS, SweepProgress, run_sweep
+from data.catalog import load_catalog
+
+def parse_diameters(text: str) -> np.ndarray:
+    """
+    Parse a diameter range "start:stop:step" (stop included) or a list "10,16,25".
+
+    Args:
+        text (str): Range or comma-separated list in mm
+
+    Returns:
+        np.ndarray: Diameters in mm
+
+    Raises:
+        ValueError: If the text is not a range or a list of positive numbers
+    """
+    if ":" in text:
+        start, stop, step = (float(value) for value in text.split(":"))
+        if step <= 0:
+            raise ValueError(f"Pas de diamètre invalide : {step}")
+        diameters = np.arange(start, stop + step / 2, step)
+    else:
+        diameters = np.array([float(value) for value in text.split(",")])
+    if not diameters.size or np.any(diameters <= 0):
+        raise ValueError(f"Diamètres invalides : {text}")
+    return diameters
+
+def print_progress(progress: SweepProgress):
+    """Progress line rewritten in place on stderr."""
+    eta = f", reste ~{progress.eta:.0f} s" if progress.chunks_done else ""
+    sys.stderr.write(f"\r[INFO] {progress.chunks_done}/{progress.chunks_total} blocs ({100 * progress.fraction:.0f} %), "
+                     f"{progress.evaluations / 1e6:.1f} M évaluations en {progress.elapsed:.1f} s{eta}   ")
+    sys.stderr.flush()
+
+def main():
+    """Command-line entry point."""
+    start, stop, step = SWEEP_CONFIG["diameters"]
+    parser = argparse.ArgumentParser(description="Balayage du catalogue de plaquettes sur le parc machines "
+                                                 "(débit copeaux max et contrainte limitante).")
+    parser.add_argument("-o", "--output", default="balayage.csv", help="Fichier CSV de synthèse")
+    parser.add_argument("--conditions", default=CONDITIONS_FILE, help="Conditions de coupe (JSON ou catalogue JSONL)")
+    parser.add_argument("--machines", default=MACHINES_DIR,
+                        help="Dossier du parc machines (à défaut, la courbe --machine seule)")
+    parser.add_argument("--machine", default=MACHINE_CAPACITIES_FILE, help="Courbe de capacité machine (JSON ou .mcap)")
+    parser.add_argument("--max-power", type=float, default=DEFAULT_MAX_POWER, help="Puissance hors courbe (kW)")
+    parser.add_argument("--max-torque", type=float, default=DEFAULT_MAX_TORQUE, help="Couple hors courbe (Nm)")
+    parser.add_argument("--diameters", default=f"{start:g}:{stop:g}:{step:g}",
+                        help="Diamètres en mm : début:fin:pas (fin incluse) ou liste 10,16,25")
+    parser.add_argument("--grid", type=int, default=SWEEP_CONFIG["grid_size"],
+                        help="Points par variable de la grille Vc × fn × ap de chaque plaquette")
+    parser.add_argument("--workers", type=int, default=SWEEP_CONFIG["workers"] or os.cpu_count(),
+                        help="Nombre de processus (0 : dans ce processus)")
+    parser.add_argument("--chunk", type=int, default=SWEEP_CONFIG["chunk_evaluations"],
+                        help="Évaluations (point × machine) par bloc")
+    args = parser.parse_args()
+
+    try:
+        diameters = parse_diameters(args.diameters)
+        conditions = load_catalog(args.conditions)
+        registry = MachineRegistry.from_directory(args.machines, args.max_power, args.max_torque,
+                                                  table_size=MACHINE_REGISTRY_CONFIG["table_size"])
+        if not len(registry):
+            if not os.path.exists(args.machine):
+                raise FileNotFoundError(f"Fichier introuvable : {args.machine}")
+            registry.add(MachineSpec(os.path.splitext(os.path.basename(args.machine))[0], args.machine,
+                                     args.max_power, args.max_torque))
+    except (FileNotFoundError, ValueError) as e:
+        print(f"[ERROR] {e}")
+        sys.exit(2)
+
+    print(f"[INFO] {len(conditions)} plaquettes × {len(diameters)} diamètres × {len(registry)} machines, "
+          f"grille {args.grid} points par variable, {args.workers} processus")
+
+    # Ctrl+C finishes the chunks in progress and writes the rows computed so far
+    cancel = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: cancel.set())
+    result = run_sweep(conditions, registry, diameters, grid_size=args.grid, workers=args.workers,
+                       chunk_evaluations=args.chunk, progress=print_progress, cancel=cancel)
+    sys.stderr.write("\n")
+
+    import pandas as pd
+    pd.DataFrame({field: result.table[field] for field in SUMMARY_FIELDS}).to_csv(args.output, index=False)
+    for name, error in result.errors.items():
+        print(f"[ERROR] {name} : {error}")
+    rate = result.evaluations / result.seconds / 1e6 if result.seconds else 0.0
+    status = "interrompu" if result.cancelled else "terminé"
+    print(f"[INFO] Balayage {status} : {result.chunks_done}/{result.chunks_total} blocs, "
+          f"{result.evaluations / 1e6:.1f} M évaluations en {result.seconds:.1f} s ({rate:.1f} M/s)")
+    print(f"[INFO] {result.rows} lignes ({int(np.count_nonzero(result.table['feasible']))} réalisables) -> {args.output}")
+    sys.exit(1 if result.cancelled or result.errors else 0)
+
+if __name__ == "__main__":
+    main()